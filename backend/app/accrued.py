@@ -0,0 +1,196 @@
+# backend/app/accrued.py
+"""
+Накопленный купонный доход (НКД) по сохранённому графику купонов — без запроса
+ACCRUEDINT к MOEX, для любой даты расчётов и сразу для всех бумаг.
+
+Конвенции:
+  - "act/period" (по умолчанию, как считает MOEX): C * (t - t_prev) / (t_next - t_prev);
+  - "act/365": номинал * ставка * (t - t_prev) / 365;
+  - "30/360": номинал * ставка * дни_30_360(t_prev, t) / 360.
+Для первого купона, когда предыдущая дата неизвестна, начало периода оценивается
+по шагу между соседними купонами.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Sequence
+from datetime import date
+import logging
+
+import numpy as np
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+CONVENTIONS = ("act/period", "act/365", "30/360")
+DEFAULT_PERIOD_DAYS = 182
+DEFAULT_FACE = 1000.0
+_FAR = np.iinfo(np.int64).max // 2
+
+
+def _days_30_360(d1: np.ndarray, d2: np.ndarray) -> np.ndarray:
+    """30/360 US по ординалам дат (векторно)."""
+    def split(ords):
+        y = np.empty(ords.shape, dtype=np.int64)
+        m = np.empty(ords.shape, dtype=np.int64)
+        dd = np.empty(ords.shape, dtype=np.int64)
+        for i, o in np.ndenumerate(ords):
+            x = date.fromordinal(int(o))
+            y[i], m[i], dd[i] = x.year, x.month, x.day
+        return y, m, dd
+    y1, m1, dd1 = split(d1)
+    y2, m2, dd2 = split(d2)
+    dd1 = np.minimum(dd1, 30)
+    dd2 = np.where((dd1 == 30) & (dd2 == 31), 30, dd2)
+    return 360 * (y2 - y1) + 30 * (m2 - m1) + (dd2 - dd1)
+
+
+def schedule_matrix(schedules: Sequence[Sequence[tuple]]) -> tuple[np.ndarray, np.ndarray]:
+    """[(date, value)] по бумагам -> (D, V): ординалы дат и суммы купонов, дополнение _FAR/NaN."""
+    n = len(schedules)
+    m = max((len(s) for s in schedules), default=0) or 1
+    D = np.full((n, m), _FAR, dtype=np.int64)
+    V = np.full((n, m), np.nan)
+    for i, sched in enumerate(schedules):
+        s = sorted((d, v) for d, v in sched if d is not None)
+        if not s:
+            continue
+        D[i, :len(s)] = [d.toordinal() for d, _ in s]
+        V[i, :len(s)] = [np.nan if v is None else float(v) for _, v in s]
+    return D, V
+
+
+def accrued_bulk(
+    schedules: Sequence[Sequence[tuple]],
+    settlement: date,
+    convention: str = "act/period",
+    face_values: Optional[Sequence[Optional[float]]] = None,
+    coupon_rates: Optional[Sequence[Optional[float]]] = None,
+) -> np.ndarray:
+    """
+    НКД на одну бумагу для каждой строки schedules на дату settlement.
+    coupon_rates (% годовых) нужны для act/365 и 30/360; если ставки нет,
+    она выводится из суммы текущего купона и длины периода.
+    NaN — купонов после settlement нет (бумага погашена) или график пуст.
+    """
+    if convention not in CONVENTIONS:
+        raise ValueError(f"unknown day count convention: {convention}")
+    n = len(schedules)
+    if n == 0:
+        return np.zeros(0)
+
+    D, V = schedule_matrix(schedules)
+    s = settlement.toordinal()
+    rows = np.arange(n)
+
+    # индекс ближайшего купона строго после даты расчётов
+    nxt = (D <= s).sum(axis=1)
+    has_next = nxt < D.shape[1]
+    nxt_c = np.minimum(nxt, D.shape[1] - 1)
+    t_next = D[rows, nxt_c]
+    has_next &= t_next < _FAR
+    coupon = V[rows, nxt_c]
+
+    # последнее известное значение купона, если будущий ещё не объявлен (NaN)
+    for i in np.where(has_next & np.isnan(coupon))[0]:
+        known = V[i, :nxt_c[i]][~np.isnan(V[i, :nxt_c[i]])]
+        coupon[i] = known[-1] if known.size else np.nan
+
+    # начало периода: предыдущая дата купона или оценка по шагу графика
+    prev_idx = nxt_c - 1
+    t_prev = np.where(prev_idx >= 0, D[rows, np.maximum(prev_idx, 0)], 0)
+    step = np.full(n, DEFAULT_PERIOD_DAYS, dtype=np.int64)
+    after = np.minimum(nxt_c + 1, D.shape[1] - 1)
+    t_after = D[rows, after]
+    use_after = (prev_idx < 0) & (after != nxt_c) & (t_after < _FAR)
+    step = np.where(use_after, t_after - t_next, step)
+    t_prev = np.where(prev_idx >= 0, t_prev, t_next - step)
+
+    period = np.maximum(t_next - t_prev, 1)
+    elapsed = np.clip(s - t_prev, 0, period)
+
+    if convention == "act/period":
+        out = coupon * elapsed / period
+    else:
+        face = np.array([float(f or DEFAULT_FACE) for f in (face_values or [None] * n)])
+        rate = np.array([np.nan if r is None else float(r) / 100.0 for r in (coupon_rates or [None] * n)])
+        implied = coupon / face * 365.0 / period
+        rate = np.where(np.isnan(rate), implied, rate)
+        if convention == "act/365":
+            out = face * rate * elapsed / 365.0
+        else:
+            d30 = _days_30_360(t_prev, np.full(n, s, dtype=np.int64))
+            out = face * rate * np.clip(d30, 0, None) / 360.0
+
+    out = np.round(out, 2)
+    out[~has_next] = np.nan
+    return out
+
+
+def accrued_range(schedules: Sequence[Sequence[tuple]], days: np.ndarray) -> np.ndarray:
+    """
+    НКД (act/period) на одну бумагу по каждой строке schedules сразу на все даты days
+    (ординалы, по возрастанию) -> [бумаги × дни]; то же, что accrued_bulk на каждую дату,
+    но график разбирается один раз, а поиск купона векторизован по дням.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    D, V = schedule_matrix(schedules)
+    out = np.full((len(schedules), days.size), np.nan)
+    for i in range(len(schedules)):
+        m = int((D[i] < _FAR).sum())
+        if m == 0:
+            continue
+        d = D[i, :m]
+        # будущий купон без значения — последнее известное (как в accrued_bulk)
+        v = V[i, :m].copy()
+        known = ~np.isnan(v)
+        last = np.maximum.accumulate(np.where(known, np.arange(m), -1))
+        v = np.where(last >= 0, v[np.maximum(last, 0)], np.nan)
+
+        nxt = np.searchsorted(d, days, side="right")
+        has_next = nxt < m
+        nxt_c = np.minimum(nxt, m - 1)
+        t_next = d[nxt_c]
+        step = d[1] - d[0] if m > 1 else DEFAULT_PERIOD_DAYS
+        t_prev = np.where(nxt_c > 0, d[np.maximum(nxt_c - 1, 0)], t_next - step)
+        period = np.maximum(t_next - t_prev, 1)
+        elapsed = np.clip(days - t_prev, 0, period)
+        row = np.round(v[nxt_c] * elapsed / period, 2)
+        row[~has_next] = np.nan
+        out[i] = row
+    return out
+
+
+async def load_coupon_schedules(db: AsyncSession, bond_ids: Optional[Sequence[int]] = None) -> dict[int, list]:
+    q = select(models.Coupon.bond_id, models.Coupon.date, models.Coupon.value)
+    if bond_ids:
+        q = q.where(models.Coupon.bond_id.in_(bond_ids))
+    out: dict[int, list] = {}
+    for bond_id, d, v in (await db.execute(q)).all():
+        out.setdefault(bond_id, []).append((d, v))
+    return out
+
+
+async def accrued_for_bonds(
+    db: AsyncSession,
+    settlement: Optional[date] = None,
+    bond_ids: Optional[Sequence[int]] = None,
+    convention: str = "act/period",
+) -> dict[int, Optional[float]]:
+    """{bond_id: НКД на одну бумагу} на дату settlement по локальному графику купонов."""
+    settlement = settlement or date.today()
+    qb = select(models.Bond.id, models.Bond.face_value, models.Bond.coupon)
+    if bond_ids:
+        qb = qb.where(models.Bond.id.in_(bond_ids))
+    bonds = (await db.execute(qb)).all()
+    if not bonds:
+        return {}
+    schedules = await load_coupon_schedules(db, [b.id for b in bonds])
+    values = accrued_bulk(
+        [schedules.get(b.id, []) for b in bonds],
+        settlement,
+        convention,
+        face_values=[b.face_value for b in bonds],
+        coupon_rates=[b.coupon for b in bonds],
+    )
+    return {b.id: (None if np.isnan(v) else float(v)) for b, v in zip(bonds, values)}
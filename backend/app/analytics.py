@@ -0,0 +1,282 @@
+# backend/app/analytics.py
+"""
+Локальная аналитика облигаций: доходность к погашению (эффективная, годовая
+капитализация — как YIELD на MOEX), дюрация Маколея/модифицированная,
+выпуклость и текущая доходность по сохранённому графику купонов и амортизаций,
+last_price и nkd.
+
+Расчёт векторизован: денежные потоки всего портфеля раскладываются в матрицы
+[бумаги × платежи] (с нулевым дополнением), YTM ищется Ньютоном сразу для всех
+строк, не сошедшиеся строки добиваются бисекцией на общем отрезке.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Sequence
+from datetime import date
+import logging
+
+import numpy as np
+
+from app import models, bulk, accrued, events, metrics
+from app.database import get_session, get_read_session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+DEFAULT_FACE = 1000.0
+DAYS_IN_YEAR = 365.0
+Y_MIN, Y_MAX = -0.95, 10.0     # отрезок поиска доходности (доли)
+NEWTON_ITER = 50
+BISECT_ITER = 80
+TOL = 1e-10
+
+
+# --- денежные потоки ---
+
+def build_cashflows(
+    coupons: Sequence[tuple],
+    amortizations: Sequence[tuple],
+    face_value: Optional[float],
+    maturity_date: Optional[date],
+    settlement: date,
+) -> list[tuple[date, float]]:
+    """
+    Будущие платежи одной бумаги (date, amount) после settlement.
+    coupons/amortizations: [(date, value)]. Неизвестные будущие купоны (value=None)
+    заполняются последним известным значением. Если графика амортизаций нет —
+    погашение face_value в maturity_date.
+    """
+    flows: dict[date, float] = {}
+
+    last_known = None
+    for d, v in sorted(coupons, key=lambda c: c[0]):
+        if v is not None:
+            last_known = float(v)
+        if d <= settlement:
+            continue
+        value = float(v) if v is not None else last_known
+        if value:
+            flows[d] = flows.get(d, 0.0) + value
+
+    principal = [(d, float(v)) for d, v in amortizations if d > settlement and v]
+    if principal:
+        for d, v in principal:
+            flows[d] = flows.get(d, 0.0) + v
+    elif maturity_date and maturity_date > settlement:
+        face = float(face_value or DEFAULT_FACE)
+        flows[maturity_date] = flows.get(maturity_date, 0.0) + face
+
+    return sorted(flows.items())
+
+
+def to_matrices(schedules: Sequence[list], settlement: date) -> tuple[np.ndarray, np.ndarray]:
+    """Список графиков -> (T, CF): время в годах и суммы, формы [n, max_len], дополнение нулями."""
+    n = len(schedules)
+    m = max((len(s) for s in schedules), default=0) or 1
+    T = np.zeros((n, m))
+    CF = np.zeros((n, m))
+    base = settlement.toordinal()
+    for i, sched in enumerate(schedules):
+        if not sched:
+            continue
+        T[i, :len(sched)] = [(d.toordinal() - base) / DAYS_IN_YEAR for d, _ in sched]
+        CF[i, :len(sched)] = [v for _, v in sched]
+    return T, CF
+
+
+# --- ядро: векторизованный расчёт ---
+
+def _pv(y: np.ndarray, T: np.ndarray, CF: np.ndarray) -> np.ndarray:
+    return (CF * np.power(1.0 + y[:, None], -T)).sum(axis=1)
+
+
+def solve_ytm(price: np.ndarray, T: np.ndarray, CF: np.ndarray) -> np.ndarray:
+    """
+    Эффективная доходность y (доли): sum(CF / (1+y)^T) = price (грязная цена).
+    Ньютон для всех строк сразу, затем бисекция для не сошедшихся. NaN — нет решения.
+    """
+    n = price.shape[0]
+    valid = (price > 0) & (CF.sum(axis=1) > 0)
+    y = np.full(n, 0.1)
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(NEWTON_ITER):
+            disc = np.power(1.0 + y[:, None], -T)
+            f = (CF * disc).sum(axis=1) - price
+            df = -(T * CF * disc / (1.0 + y[:, None])).sum(axis=1)
+            step = np.where(df != 0, f / df, 0.0)
+            y_new = np.clip(y - step, Y_MIN, Y_MAX)
+            done = np.abs(y_new - y) < TOL
+            y = y_new
+            if done[valid].all():
+                break
+
+        f_y = _pv(y, T, CF) - price
+        bad = valid & ~(np.isfinite(f_y) & (np.abs(f_y) < 1e-6 * np.maximum(price, 1.0)))
+        if bad.any():
+            # бисекция (PV монотонно убывает по y) на общем отрезке
+            idx = np.where(bad)[0]
+            lo = np.full(idx.size, Y_MIN)
+            hi = np.full(idx.size, Y_MAX)
+            Tb, CFb, Pb = T[idx], CF[idx], price[idx]
+            f_lo = _pv(lo, Tb, CFb) - Pb
+            f_hi = _pv(hi, Tb, CFb) - Pb
+            bracketed = (f_lo > 0) & (f_hi < 0)
+            for _ in range(BISECT_ITER):
+                mid = (lo + hi) / 2
+                f_mid = _pv(mid, Tb, CFb) - Pb
+                go_right = f_mid > 0
+                lo = np.where(go_right, mid, lo)
+                hi = np.where(go_right, hi, mid)
+            y[idx] = np.where(bracketed, (lo + hi) / 2, np.nan)
+
+    y[~valid] = np.nan
+    return y
+
+
+def risk_metrics(y: np.ndarray, T: np.ndarray, CF: np.ndarray) -> dict[str, np.ndarray]:
+    """Дюрация Маколея (лет), модифицированная дюрация и выпуклость при доходности y."""
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        g = 1.0 + y[:, None]
+        disc = np.power(g, -T)
+        pv_i = CF * disc
+        pv = pv_i.sum(axis=1)
+        macaulay = (T * pv_i).sum(axis=1) / pv
+        modified = macaulay / (1.0 + y)
+        convexity = (T * (T + 1.0) * pv_i / (g * g)).sum(axis=1) / pv
+    return {"duration": macaulay, "modified_duration": modified, "convexity": convexity}
+
+
+def compute_metrics(
+    dirty_price: np.ndarray,
+    clean_price: np.ndarray,
+    annual_coupon: np.ndarray,
+    T: np.ndarray,
+    CF: np.ndarray,
+) -> dict[str, np.ndarray]:
+    y = solve_ytm(dirty_price, T, CF)
+    out = risk_metrics(np.nan_to_num(y, nan=0.0), T, CF)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["current_yield"] = np.where(clean_price > 0, annual_coupon / clean_price, np.nan)
+    out["ytm"] = y
+    for k in ("duration", "modified_duration", "convexity"):
+        out[k] = np.where(np.isfinite(y), out[k], np.nan)
+    return out
+
+
+# --- загрузка из БД ---
+
+def _finite(v) -> Optional[float]:
+    v = float(v)
+    return v if np.isfinite(v) else None
+
+
+async def load_schedules(db: AsyncSession, bond_ids: Optional[Sequence[int]] = None) -> tuple[list, dict, dict]:
+    """Облигации, купоны и амортизации тремя запросами: (bonds, {bond_id: [(d, v)]}, {bond_id: [(d, v)]})."""
+    qb = select(models.Bond)
+    qc = select(models.Coupon.bond_id, models.Coupon.date, models.Coupon.value)
+    qa = select(models.Amortization.bond_id, models.Amortization.date, models.Amortization.value)
+    if bond_ids:
+        qb = qb.where(models.Bond.id.in_(bond_ids))
+        qc = qc.where(models.Coupon.bond_id.in_(bond_ids))
+        qa = qa.where(models.Amortization.bond_id.in_(bond_ids))
+    bonds = list((await db.execute(qb)).scalars().all())
+    coupons: dict[int, list] = {}
+    for bond_id, d, v in (await db.execute(qc)).all():
+        coupons.setdefault(bond_id, []).append((d, v))
+    amorts: dict[int, list] = {}
+    for bond_id, d, v in (await db.execute(qa)).all():
+        amorts.setdefault(bond_id, []).append((d, v))
+    return bonds, coupons, amorts
+
+
+def annual_coupon_for(bond, coupons: Sequence[tuple], settlement: date) -> float:
+    """Годовой купон в деньгах: по ставке coupon (%) от номинала, иначе сумма купонов за год вперёд."""
+    if bond.coupon:
+        return float(bond.coupon) / 100.0 * float(bond.face_value or DEFAULT_FACE)
+    horizon = date.fromordinal(settlement.toordinal() + 365)
+    return float(sum(v for d, v in coupons if v and settlement < d <= horizon))
+
+
+def local_nkd(bonds: Sequence, coupons: dict, settlement: date) -> dict[int, float]:
+    """НКД из локального графика купонов для бумаг без ACCRUEDINT с MOEX (или для расчёта на прошлую дату)."""
+    need = [b for b in bonds if b.nkd is None or settlement != date.today()]
+    if not need:
+        return {}
+    values = accrued.accrued_bulk([coupons.get(b.id, []) for b in need], settlement)
+    return {b.id: float(v) for b, v in zip(need, values) if np.isfinite(v)}
+
+
+def analyze_bonds(bonds: Sequence, coupons: dict, amorts: dict, settlement: date,
+                  prices: Optional[dict] = None, nkd: Optional[dict] = None) -> list[dict]:
+    """
+    Чистая функция над загруженными данными. prices/nkd — необязательные
+    переопределения {bond_id: value} (для сценариев и расчёта на дату).
+    """
+    prices = prices or {}
+    nkd = nkd or {}
+    schedules, dirty, clean, annual = [], [], [], []
+    for b in bonds:
+        schedules.append(build_cashflows(coupons.get(b.id, []), amorts.get(b.id, []), b.face_value, b.maturity_date, settlement))
+        p = prices.get(b.id, b.last_price)
+        a = nkd.get(b.id, b.nkd)
+        clean.append(float(p) if p is not None else np.nan)
+        dirty.append(float(p) + float(a or 0.0) if p is not None else np.nan)
+        annual.append(annual_coupon_for(b, coupons.get(b.id, []), settlement))
+
+    T, CF = to_matrices(schedules, settlement)
+    m = compute_metrics(np.array(dirty), np.array(clean), np.array(annual), T, CF)
+    out = []
+    for i, b in enumerate(bonds):
+        ytm = _finite(m["ytm"][i])
+        cy = _finite(m["current_yield"][i])
+        out.append({
+            "id": b.id,
+            "secid": b.secid,
+            "ytm": round(ytm * 100, 4) if ytm is not None else None,
+            "duration": _finite(m["duration"][i]),
+            "modified_duration": _finite(m["modified_duration"][i]),
+            "convexity": _finite(m["convexity"][i]),
+            "current_yield": round(cy * 100, 4) if cy is not None else None,
+        })
+    return out
+
+
+async def portfolio_analytics(db: AsyncSession, settlement: Optional[date] = None,
+                              bond_ids: Optional[Sequence[int]] = None) -> list[dict]:
+    settlement = settlement or date.today()
+    bonds, coupons, amorts = await load_schedules(db, bond_ids)
+    if not bonds:
+        return []
+    return analyze_bonds(bonds, coupons, amorts, settlement, nkd=local_nkd(bonds, coupons, settlement))
+
+
+@metrics.job("analytics_refresh")
+async def refresh_bond_analytics(db: AsyncSession, settlement: Optional[date] = None) -> int:
+    """Пересчитывает и сохраняет ytm/ytm_date/duration/... для всех бумаг одним bulk UPDATE."""
+    settlement = settlement or date.today()
+    rows = []
+    for r in await portfolio_analytics(db, settlement):
+        row = {"id": r["id"], "duration": r["duration"], "modified_duration": r["modified_duration"],
+               "convexity": r["convexity"], "current_yield": r["current_yield"]}
+        if r["ytm"] is not None:
+            row["ytm"] = r["ytm"]
+            row["ytm_date"] = settlement
+        rows.append(row)
+    n = await bulk.update_bond_quotes(db, rows)
+    await db.commit()
+    return n
+
+
+@router.get("/bonds")
+async def get_bond_analytics(settlement: Optional[date] = None, db: AsyncSession = Depends(get_read_session)):
+    return await portfolio_analytics(db, settlement)
+
+
+@router.post("/refresh")
+async def post_refresh_analytics(db: AsyncSession = Depends(get_session)):
+    updated = await refresh_bond_analytics(db)
+    events.emit("analytics", f"Пересчитана аналитика: {updated} облигаций", payload={"updated": updated})
+    return {"updated": updated}
@@ -0,0 +1,85 @@
+# backend/app/bonds.py
+"""
+Список облигаций (GET /bonds) без ORM-объектов и N+1:
+  1) бумаги одним SELECT по колонкам BondOut + последняя цена покупки (коррелированный
+     подзапрос по ix_trades_bond_last_buy — одна строка индекса на бумагу);
+  2) купоны всех бумаг одним SELECT, группировка по bond_id в Python.
+
+Ответ собирается из dict'ов с полями BondOut (rating и amortization_display —
+через schemas.format_rating/format_amortization) и сериализуется заранее собранным
+TypeAdapter сразу в JSON-байты: без валидации BondOut и вызова computed-полей на
+каждом объекте. ?coupons=false убирает поле coupons (таблице на фронтенде оно не нужно).
+"""
+from collections import defaultdict
+from operator import itemgetter
+from fastapi import APIRouter, Depends, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Iterable, Mapping
+
+from app import models, schemas, metrics
+from app.database import get_read_session
+
+router = APIRouter(tags=["bonds"])
+
+# колонки bonds из BondOut читаются как есть; coupons, stale и computed-поля добавляются
+_FIELDS = tuple(schemas.BondOut.model_fields)
+_BOND_COLUMNS = tuple(f for f in _FIELDS if f in models.Bond.__table__.c)
+_ROW_FIELDS = tuple(f for f in _FIELDS if f not in ("coupons", "stale"))
+_row_values = itemgetter(*_ROW_FIELDS)
+_ROWS_JSON = TypeAdapter(list[dict[str, Any]])
+
+
+def _bonds_query():
+    B, T = models.Bond, models.Trade
+    last_buy = (
+        select(T.buy_price)
+        .where(T.bond_id == B.id, T.buy_price.isnot(None))
+        .order_by(T.buy_date.desc().nulls_last(), T.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return select(*(B.__table__.c[c] for c in _BOND_COLUMNS), last_buy.label("last_buy_price")).order_by(B.id)
+
+
+def _coupons_query():
+    C = models.Coupon
+    return select(C.bond_id, C.date, C.value, C.currency).order_by(C.bond_id, C.date)
+
+
+def build_items(rows: Iterable[Mapping], coupons_by_bond: Mapping[int, list] | None) -> list[dict]:
+    """Строки bonds (+ купоны) -> dict'ы в формате BondOut; coupons_by_bond=None — без поля coupons."""
+    out = []
+    for r in rows:
+        item = dict(zip(_ROW_FIELDS, _row_values(r)))
+        if coupons_by_bond is not None:
+            item["coupons"] = coupons_by_bond.get(r["id"], [])
+        item["stale"] = bool(r["stale_reason"])
+        item["rating"] = schemas.format_rating(
+            r["akra_rating"], r["akra_forecast"], r["raexpert_rating"],
+            r["raexpert_forecast"], r["nkr_rating"], r["nkr_forecast"],
+        )
+        item["amortization_display"] = schemas.format_amortization(r["amortization"])
+        out.append(item)
+    return out
+
+
+def dump(items: list[dict]) -> bytes:
+    return _ROWS_JSON.dump_json(items)
+
+
+@metrics.db_query("bonds_list")
+async def load_bonds(db: AsyncSession, with_coupons: bool = True) -> list[dict]:
+    rows = (await db.execute(_bonds_query())).mappings().all()
+    coupons_by_bond = None
+    if with_coupons:
+        coupons_by_bond = defaultdict(list)
+        for bond_id, d, value, currency in (await db.execute(_coupons_query())).all():
+            coupons_by_bond[bond_id].append({"date": d, "value": value, "currency": currency})
+    return build_items(rows, coupons_by_bond)
+
+
+@router.get("/bonds", response_model=list[schemas.BondOut])
+async def list_bonds(coupons: bool = True, db: AsyncSession = Depends(get_read_session)):
+    return Response(dump(await load_bonds(db, with_coupons=coupons)), media_type="application/json")
@@ -0,0 +1,241 @@
+# backend/app/bulk.py
+"""
+Пакетная запись в БД: вместо session.get/add по одной строке — многострочные
+INSERT ... ON CONFLICT DO UPDATE (и UPDATE по первичному ключу через executemany).
+Полное обновление портфеля укладывается в несколько statement'ов.
+Функции не делают commit — транзакцией управляет вызывающий код.
+"""
+from sqlalchemy import event, update, func, case, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Sequence
+from datetime import date, datetime, timezone
+import logging
+
+from app import models, cache_bus
+
+logger = logging.getLogger(__name__)
+
+# asyncpg ограничивает число параметров в одном запросе 32767
+_MAX_PARAMS = 32000
+
+# поля Bond, которые обновляет массовый refresh котировок
+BOND_QUOTE_FIELDS = (
+    "last_price",
+    "nkd",
+    "day_open",
+    "week_open",
+    "month_open",
+    "year_open",
+    "ytm",
+    "ytm_date",
+    "stale_reason",
+    "face_value",
+    "duration",
+    "modified_duration",
+    "convexity",
+    "current_yield",
+)
+
+
+def _chunks(rows: Sequence[dict], n_cols: int) -> Iterable[Sequence[dict]]:
+    size = max(1, _MAX_PARAMS // max(n_cols, 1))
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def _upsert(
+    session: AsyncSession,
+    model,
+    rows: Sequence[dict],
+    conflict_cols: Sequence[str],
+    update_cols: Sequence[str],
+) -> int:
+    """Многострочный INSERT ... ON CONFLICT (conflict_cols) DO UPDATE SET update_cols."""
+    if not rows:
+        return 0
+    n_cols = len(rows[0])
+    total = 0
+    for chunk in _chunks(rows, n_cols):
+        stmt = pg_insert(model).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(conflict_cols),
+            set_={c: getattr(stmt.excluded, c) for c in update_cols},
+        )
+        await session.execute(stmt)
+        total += len(chunk)
+    return total
+
+
+async def upsert_fx_rates(session: AsyncSession, rates: dict, now: datetime | None = None) -> list:
+    """
+    rates: {CUR: rate}; None-значения пропускаются, варианты регистра одной валюты
+    сводятся к одной строке (последняя побеждает) — иначе ON CONFLICT задел бы строку дважды.
+    Возвращает список ORM-объектов FxRate после записи.
+    """
+    now = now or datetime.utcnow()
+    rows = list({
+        cur.upper(): {"currency": cur.upper(), "rate": float(rate), "updated_at": now}
+        for cur, rate in (rates or {}).items()
+        if cur and rate is not None
+    }.values())
+    if not rows:
+        return []
+    stmt = pg_insert(models.FxRate).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.FxRate.currency],
+        set_={"rate": stmt.excluded.rate, "updated_at": stmt.excluded.updated_at},
+    ).returning(models.FxRate)
+    res = await session.scalars(stmt, execution_options={"populate_existing": True})
+    # локальный кэш — после commit вызывающего кода (раньше его перечитали бы со старыми
+    # курсами); остальным воркерам — NOTIFY из триггера, он тоже уходит только после commit
+    event.listen(session.sync_session, "after_commit", lambda _s: cache_bus.invalidate("fx_rates"), once=True)
+    return list(res.all())
+
+
+async def upsert_fx_history(session: AsyncSession, rates: dict, on_date: date | None = None) -> int:
+    """rates: {CUR: rate} на дату on_date (по умолчанию сегодня); конфликт по (currency, date)."""
+    on_date = on_date or date.today()
+    rows = list({
+        cur.upper(): {"currency": cur.upper(), "date": on_date, "rate": float(rate)}
+        for cur, rate in (rates or {}).items()
+        if cur and rate is not None
+    }.values())
+    return await _upsert(session, models.FxRateHistory, rows, ("currency", "date"), ("rate",))
+
+
+async def upsert_portfolio_values(session: AsyncSession, rows: Sequence[dict]) -> int:
+    """rows: строки portfolio_value_daily; конфликт по date — пересчитанный день перезаписывается."""
+    cols = ("value_rub", "invested_rub", "proceeds_rub", "coupon_income_rub", "computed_at")
+    return await _upsert(session, models.PortfolioValueDaily, list(rows), ("date",), cols)
+
+
+async def upsert_coupons_bulk(session: AsyncSession, coupons_by_bond: dict[int, Iterable[dict]]) -> int:
+    """
+    coupons_by_bond: {bond_id: записи moex_client.fetch_coupons_from_moex ({"date", "value",
+    "currency", ...})} — все облигации одним набором statement'ов; конфликт по (bond_id, date).
+    """
+    rows = []
+    for bond_id, coupons in (coupons_by_bond or {}).items():
+        seen = set()
+        for c in coupons or []:
+            d = c.get("date")
+            if d is None or d in seen:
+                continue
+            seen.add(d)
+            rows.append({"bond_id": bond_id, "date": d, "value": c.get("value"), "currency": c.get("currency")})
+    if not rows:
+        return 0
+    C = models.Coupon
+    total = 0
+    for chunk in _chunks(rows, 4):
+        stmt = pg_insert(C).values(list(chunk))
+        # пустое значение с MOEX не затирает прогноз app.floaters; опубликованное — заменяет его
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bond_id", "date"],
+            set_={
+                "value": func.coalesce(stmt.excluded.value, case((C.projected, C.value), else_=None)),
+                "currency": stmt.excluded.currency,
+                "projected": and_(stmt.excluded.value.is_(None), C.projected),
+            },
+        )
+        await session.execute(stmt)
+        total += len(chunk)
+    return total
+
+
+async def upsert_projected_coupons(session: AsyncSession, rows: Sequence[dict]) -> int:
+    """
+    rows: [{"bond_id", "date", "value"}] — прогноз купонов флоатеров.
+    Перезаписываются только пустые или ранее спрогнозированные купоны.
+    """
+    if not rows:
+        return 0
+    C = models.Coupon
+    total = 0
+    data = [{"bond_id": r["bond_id"], "date": r["date"], "value": r["value"], "projected": True} for r in rows]
+    for chunk in _chunks(data, 4):
+        stmt = pg_insert(C).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bond_id", "date"],
+            set_={"value": stmt.excluded.value, "projected": True},
+            where=or_(C.value.is_(None), C.projected),
+        )
+        await session.execute(stmt)
+        total += len(chunk)
+    return total
+
+
+async def upsert_reference_rates(session: AsyncSession, name: str, points: Iterable[tuple], is_forecast: bool = False) -> int:
+    """points: [(date, rate %)] ставки name; конфликт по (name, date)."""
+    name = name.upper()
+    dedup = {
+        d: {"name": name, "date": d, "rate": float(v), "is_forecast": is_forecast}
+        for d, v in points or [] if d is not None and v is not None
+    }
+    return await _upsert(session, models.ReferenceRate, list(dedup.values()), ("name", "date"), ("rate", "is_forecast"))
+
+
+async def upsert_amortizations_bulk(session: AsyncSession, amort_by_bond: dict[int, Iterable[dict]]) -> int:
+    """amort_by_bond: {bond_id: [{"date", "value", "value_prc"}]} (moex_client.fetch_amortizations_from_moex)."""
+    rows = []
+    for bond_id, items in (amort_by_bond or {}).items():
+        seen = set()
+        for a in items or []:
+            d = a.get("date")
+            if d is None or d in seen:
+                continue
+            seen.add(d)
+            rows.append({"bond_id": bond_id, "date": d, "value": a.get("value"), "value_prc": a.get("value_prc")})
+    return await _upsert(session, models.Amortization, rows, ("bond_id", "date"), ("value", "value_prc"))
+
+
+async def upsert_prices(session: AsyncSession, rows: Iterable[dict]) -> int:
+    """rows: [{"bond_id", "date", "value"}]; конфликт по (bond_id, date) — перезаписываем value."""
+    dedup = {}
+    for r in rows or []:
+        if r.get("bond_id") is None or r.get("date") is None or r.get("value") is None:
+            continue
+        dedup[(r["bond_id"], r["date"])] = {"bond_id": r["bond_id"], "date": r["date"], "value": float(r["value"])}
+    return await _upsert(session, models.Price, list(dedup.values()), ("bond_id", "date"), ("value",))
+
+
+async def upsert_index_history(session: AsyncSession, secid: str, points: Iterable[tuple]) -> int:
+    """points: [(date, close)] индекса secid; конфликт по (secid, date)."""
+    secid = secid.upper()
+    dedup = {d: {"secid": secid, "date": d, "close": float(v)} for d, v in points or [] if d is not None and v is not None}
+    return await _upsert(session, models.IndexHistory, list(dedup.values()), ("secid", "date"), ("close",))
+
+
+async def upsert_bond_catalog(session: AsyncSession, rows: Sequence[dict]) -> int:
+    """rows: строки bond_catalog (app.screener); конфликт по secid — перезаписываются все поля."""
+    if not rows:
+        return 0
+    cols = [c for c in rows[0] if c != "secid"]
+    return await _upsert(session, models.BondCatalog, list(rows), ("secid",), cols)
+
+
+async def update_bond_quotes(session: AsyncSession, rows: Iterable[dict]) -> int:
+    """
+    rows: [{"id": bond_id, "last_price": ..., "nkd": ..., ...}] — только поля из BOND_QUOTE_FIELDS.
+    Строки Bond уже существуют (name NOT NULL), поэтому вместо INSERT ... ON CONFLICT
+    используется UPDATE по первичному ключу, который SQLAlchemy отправляет одним executemany.
+    Строки группируются по набору полей, чтобы не затирать незаданные значения NULL'ами.
+    """
+    groups: dict[tuple, list] = {}
+    for r in rows or []:
+        if r.get("id") is None:
+            continue
+        fields = tuple(sorted(k for k in r if k in BOND_QUOTE_FIELDS))
+        if not fields:
+            continue
+        groups.setdefault(fields, []).append({"id": r["id"], **{k: r[k] for k in fields}})
+
+    total = 0
+    now = datetime.now(timezone.utc)
+    for params in groups.values():
+        for p in params:
+            p["updated_at"] = now
+        await session.execute(update(models.Bond), params)
+        total += len(params)
+    return total
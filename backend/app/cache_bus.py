@@ -0,0 +1,123 @@
+# backend/app/cache_bus.py
+"""
+Согласованность локальных кэшей между воркерами через PostgreSQL LISTEN/NOTIFY
+(без внешних сервисов).
+
+Триггеры (миграция 0002_cache_notify) на bonds, trades, coupons и fx_rates после
+каждого изменяющего statement'а делают pg_notify('cache_invalidate', <таблица>).
+NOTIFY транзакционный: уведомление уходит только после commit, повторы внутри
+одной транзакции PostgreSQL схлопывает. Путь записи не важен — ORM, app.bulk,
+сырой SQL или COPY.
+
+Каждый воркер держит одно отдельное (не из пула) соединение asyncpg с LISTEN
+(run_cache_listener_forever) и по уведомлению сбрасывает кэши, подписанные через
+subscribe(table, fn) или LocalCache(..., tables=...). После переподключения
+сбрасывается всё: уведомления, пришедшие без слушателя, потеряны. TTL кэшей
+ограничивает устаревание, если слушатель не запущен.
+"""
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+import asyncio, logging, os, time
+
+import asyncpg
+
+from app import metrics
+from app.database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidate"
+TABLES = ("bonds", "trades", "coupons", "fx_rates")
+# период проверки соединения слушателя, сек (обнаружить обрыв без RST)
+CACHE_LISTENER_KEEPALIVE = float(os.getenv("CACHE_LISTENER_KEEPALIVE", "30"))
+
+_subscribers: dict[str, list[Callable[[], None]]] = defaultdict(list)
+
+
+def subscribe(table: str, fn: Callable[[], None]) -> None:
+    """fn() вызывается при изменении table в любом воркере (и при invalidate в этом)."""
+    _subscribers[table].append(fn)
+
+
+def invalidate(table: str) -> None:
+    """Сбросить локальные кэши, зависящие от table."""
+    for fn in _subscribers.get(table, ()):
+        try:
+            fn()
+        except Exception:
+            logger.exception("cache_bus: invalidation of %s failed", table)
+
+
+def invalidate_all() -> None:
+    for table in list(_subscribers):
+        invalidate(table)
+
+
+class LocalCache:
+    """
+    Одно значение в памяти воркера с TTL, сбрасывается при изменении tables.
+    Поколение защищает от гонки: значение, загрузка которого началась до сброса,
+    не сохраняется.
+    """
+
+    def __init__(self, name: str, ttl: float, tables: Iterable[str]):
+        self.name = name
+        self.ttl = ttl
+        self._value: Any = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        for table in tables:
+            subscribe(table, self.clear)
+
+    def get(self) -> Optional[Any]:
+        if self._value is not None and time.monotonic() - self._loaded_at < self.ttl:
+            metrics.cache_hit(self.name)
+            return self._value
+        metrics.cache_miss(self.name)
+        return None
+
+    async def get_or_load(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get()
+        if value is not None:
+            return value
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self._value, self._loaded_at = value, time.monotonic()
+        return value
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._value = None
+
+
+def _on_notify(connection, pid: int, channel: str, payload: str) -> None:
+    logger.debug("cache_bus: %s changed (pid %s)", payload, pid)
+    invalidate(payload)
+
+
+def asyncpg_dsn() -> str:
+    # asyncpg принимает обычный postgresql:// без указания драйвера SQLAlchemy
+    return (DATABASE_URL or "").replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def run_cache_listener_forever(retry_sec: float = 5.0) -> None:
+    """Фоновая задача воркера: LISTEN cache_invalidate с переподключением."""
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(asyncpg_dsn())
+            await conn.add_listener(CHANNEL, _on_notify)
+            invalidate_all()
+            logger.info("cache_bus: listening on %s", CHANNEL)
+            while True:
+                await asyncio.sleep(CACHE_LISTENER_KEEPALIVE)
+                await conn.fetchval("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("cache_bus: listener failed: %s; retry in %.0fs", exc, retry_sec)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(retry_sec)
@@ -0,0 +1,157 @@
+# backend/app/charts.py
+"""
+Графики на стороне сервера: дневной ряд индекса (index_history) или облигации
+(price_history) берётся из локального хранилища и прореживается до запрошенного числа точек
+(LTTB или min/max по корзинам), так что год или вся история приходят одним
+небольшим ответом вместо десятков запросов браузера к MOEX.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Tuple
+from datetime import date, timedelta
+import logging
+
+from app.database import get_read_session
+from app import models, price_history, index_history
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/chart", tags=["charts"])
+
+RANGES = ("day", "week", "month", "year", "all")
+
+Point = Tuple[date, float]
+
+
+def range_start(range_: str, today: Optional[date] = None) -> Optional[date]:
+    today = today or date.today()
+    if range_ == "day":
+        # дневные бары: берём несколько дней, чтобы выходные не давали пустой ответ
+        return today - timedelta(days=3)
+    if range_ == "week":
+        return today - timedelta(days=7)
+    if range_ == "month":
+        return today - timedelta(days=30)
+    if range_ == "year":
+        return today - timedelta(days=365)
+    return None
+
+
+# --- прореживание ---
+
+def lttb(points: List[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets: сохраняет форму ряда при threshold точках."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    xs = [p[0].toordinal() for p in points]
+    ys = [p[1] for p in points]
+    out = [points[0]]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # среднее следующей корзины
+        nxt_start = int((i + 1) * bucket) + 1
+        nxt_end = min(int((i + 2) * bucket) + 1, n)
+        if nxt_start >= nxt_end:
+            nxt_start = nxt_end - 1
+        cnt = nxt_end - nxt_start
+        avg_x = sum(xs[nxt_start:nxt_end]) / cnt
+        avg_y = sum(ys[nxt_start:nxt_end]) / cnt
+
+        # точка текущей корзины с максимальной площадью треугольника
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area, best = area, j
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+
+def minmax(points: List[Point], threshold: int) -> List[Point]:
+    """По корзинам оставляет минимум и максимум (в порядке дат) — сохраняет экстремумы."""
+    n = len(points)
+    if threshold >= n or threshold < 4:
+        return list(points)
+    buckets = max(1, (threshold - 2) // 2)
+    size = (n - 2) / buckets
+    out = [points[0]]
+    for b in range(buckets):
+        lo = int(b * size) + 1
+        hi = min(int((b + 1) * size) + 1, n - 1)
+        if lo >= hi:
+            continue
+        chunk = points[lo:hi]
+        p_min = min(chunk, key=lambda p: p[1])
+        p_max = max(chunk, key=lambda p: p[1])
+        out.extend(sorted({p_min, p_max}, key=lambda p: p[0]))
+    out.append(points[-1])
+    return out
+
+
+def downsample(points: List[Point], n_points: int, method: str = "lttb") -> List[Point]:
+    if method == "minmax":
+        return minmax(points, n_points)
+    return lttb(points, n_points)
+
+
+def _serialize(name: str, points: List[Point], source_points: int) -> dict:
+    return {
+        "secid": name,
+        "source_points": source_points,
+        "points": [{"date": d.isoformat(), "value": v} for d, v in points],
+    }
+
+
+@router.get("/index/{secid}")
+async def index_chart(
+    secid: str,
+    range_: str = Query("month", alias="range"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_till: Optional[date] = Query(None, alias="till"),
+    points: int = Query(300, ge=10, le=5000),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    db: AsyncSession = Depends(get_read_session),
+):
+    if range_ not in RANGES:
+        raise HTTPException(status_code=400, detail=f"range must be one of {RANGES}")
+    # только настроенные индексы: произвольный secid не должен заводить ряд и ходить в ISS
+    if secid.upper() not in index_history.BENCHMARK_INDICES:
+        raise HTTPException(status_code=404, detail=f"Индекс {secid.upper()} не отслеживается")
+    try:
+        # дописывает только недостающие дни (не чаще INDEX_SYNC_MIN_INTERVAL)
+        await index_history.sync_index(secid)
+    except Exception:
+        logger.exception("index sync failed for %s, serving stored series", secid)
+    series = await index_history.get_index_points(db, secid, date_from or range_start(range_), date_till)
+    if not series:
+        raise HTTPException(status_code=404, detail=f"Нет истории для {secid.upper()}")
+    return _serialize(secid.upper(), downsample(series, points, method), len(series))
+
+
+@router.get("/bond/{bond_id}")
+async def bond_chart(
+    bond_id: int,
+    range_: str = Query("year", alias="range"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_till: Optional[date] = Query(None, alias="till"),
+    points: int = Query(300, ge=10, le=5000),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    db: AsyncSession = Depends(get_read_session),
+):
+    if range_ not in RANGES:
+        raise HTTPException(status_code=400, detail=f"range must be one of {RANGES}")
+    bond = await db.get(models.Bond, bond_id)
+    if not bond:
+        raise HTTPException(status_code=404, detail="Bond not found")
+    series = await price_history.get_series(
+        db, bond_id, date_from or range_start(range_) or date(1990, 1, 1), date_till or date.today()
+    )
+    return _serialize(bond.secid, downsample(series, points, method), len(series))
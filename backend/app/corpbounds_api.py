@@ -1,12 +1,15 @@
 # backend/app/corpbonds_api.py
 from bs4 import BeautifulSoup
-import httpx, re
+import os, re
 import logging
 from typing import Optional
 from . import other
+from app import metrics, upstream
 
 logger = logging.getLogger(__name__)
 
+CORPBONDS_BASE = os.getenv("CORPBONDS_BASE", "https://corpbonds.ru").rstrip("/")
+
 def _norm(txt: str) -> str:
     """Убираем лишние пробелы и неразрывные пробелы."""
     cleaned = txt.replace("∑", "")
@@ -23,15 +26,15 @@ def _looks_like_formula(txt: str) -> bool:
         return False
     return True
 
+@metrics.upstream("corpbonds.ru", "bond_page")
 async def fetch_ratings_from_corpbonds(code: str, is_ofz: bool = False):
     """
     code — ISIN для обычных бумаг, SECID для ОФЗ
     is_ofz — True, если это ОФЗ
     """
-    url = f"https://corpbonds.ru/bond/{code}"
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url)
-        r.raise_for_status()
+    url = f"{CORPBONDS_BASE}/bond/{code}"
+    r = await upstream.get("corpbonds.ru", url, stale_ok=True)
+    r.raise_for_status()
 
     soup = BeautifulSoup(r.text, "html.parser")
 
@@ -133,20 +136,20 @@ async def fetch_ratings_from_corpbonds(code: str, is_ofz: bool = False):
                 break
     return ratings
 
+@metrics.upstream("corpbonds.ru", "bond_page_amortization")
 async def detect_amortization_from_corpbonds(bond_code: str) -> Optional[bool]:
-    url = f"https://corpbonds.ru/bond/{bond_code}"
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        # Ищем ячейку с текстом "Амортизация"
-        rows = soup.select("article.bond-info__item table tbody tr")
-        for row in rows:
-            cells = row.find_all("td")
-            if len(cells) >= 2 and "амортизац" in cells[0].get_text(strip=True).lower():
-                val = cells[1].get_text(strip=True).lower()
-                if val == "да":
-                    return True
-                if val == "нет":
-                    return False
-        return None
\ No newline at end of file
+    url = f"{CORPBONDS_BASE}/bond/{bond_code}"
+    r = await upstream.get("corpbonds.ru", url, stale_ok=True)
+    r.raise_for_status()
+    soup = BeautifulSoup(r.text, "html.parser")
+    # Ищем ячейку с текстом "Амортизация"
+    rows = soup.select("article.bond-info__item table tbody tr")
+    for row in rows:
+        cells = row.find_all("td")
+        if len(cells) >= 2 and "амортизац" in cells[0].get_text(strip=True).lower():
+            val = cells[1].get_text(strip=True).lower()
+            if val == "да":
+                return True
+            if val == "нет":
+                return False
+    return None
\ No newline at end of file
@@ -0,0 +1,118 @@
+# backend/app/dashboard.py
+"""
+Сводная таблица облигаций для BondsPage: один агрегирующий запрос по сделкам
+(нетто-количество, вложено, выручка от продаж, последняя цена покупки),
+и курсы из таблицы fx_rates. Купонов в сводке нет — график бумаги отдают
+/bonds и /coupons.
+Вес, стоимость в RUB и P&L считаются здесь, фронтенд ничего не склеивает.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import array_agg, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
+import logging, os
+
+from app import models, schemas, metrics
+from app.cache_bus import LocalCache
+from app.database import get_read_session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["dashboard"])
+
+RUB_CODES = ("SUR", "RUB")
+# курсы в fx_rates меняются раз в день, а читаются при каждом опросе дашборда;
+# кэши сбрасываются по NOTIFY из любого воркера (app.cache_bus), TTL — страховка
+FX_CACHE_TTL = float(os.getenv("FX_CACHE_TTL", "60"))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+_fx_cache = LocalCache("fx_table", FX_CACHE_TTL, tables=("fx_rates",))
+_dashboard_cache = LocalCache("dashboard", DASHBOARD_CACHE_TTL, tables=("bonds", "trades", "fx_rates"))
+
+
+def _trade_aggregates():
+    T = models.Trade
+    last_buy = array_agg(
+        aggregate_order_by(T.buy_price, T.buy_date.desc().nulls_last(), T.id.desc())
+    ).filter(T.buy_price.isnot(None))
+    return (
+        select(
+            T.bond_id.label("bond_id"),
+            (func.coalesce(func.sum(T.buy_qty), 0) - func.coalesce(func.sum(T.sell_qty), 0)).label("net_qty"),
+            func.coalesce(
+                func.sum(func.coalesce(T.buy_price * T.buy_qty, 0.0) + func.coalesce(T.buy_commission, 0.0)), 0.0
+            ).label("invested"),
+            func.coalesce(
+                func.sum(func.coalesce(T.sell_price * T.sell_qty, 0.0) - func.coalesce(T.sell_commission, 0.0)), 0.0
+            ).label("proceeds"),
+            last_buy[1].label("last_buy_price"),
+        )
+        .group_by(T.bond_id)
+        .subquery()
+    )
+
+
+async def load_fx_table(db: AsyncSession) -> dict[str, float]:
+    async def load():
+        res = await db.execute(select(models.FxRate.currency, models.FxRate.rate))
+        return {cur.upper(): float(rate) for cur, rate in res.all() if cur and rate}
+    return dict(await _fx_cache.get_or_load(load))
+
+
+def fx_for(currency, fx: dict[str, float]):
+    cur = (currency or "SUR").upper()
+    if cur in RUB_CODES:
+        return 1.0
+    return fx.get(cur) or fx.get(cur[:3])
+
+
+@metrics.db_query("dashboard")
+async def build_dashboard(db: AsyncSession) -> schemas.DashboardOut:
+    agg = _trade_aggregates()
+    q = (
+        select(models.Bond, agg.c.net_qty, agg.c.invested, agg.c.proceeds, agg.c.last_buy_price)
+        .outerjoin(agg, agg.c.bond_id == models.Bond.id)
+        # купоны сводке не нужны (DashboardRowOut их не отдаёт) — не грузим и не читаем лениво
+        .options(noload(models.Bond.coupons))
+        .order_by(models.Bond.id)
+    )
+    res = await db.execute(q)
+    rows = res.all()
+    fx = await load_fx_table(db)
+
+    out: list[schemas.DashboardRowOut] = []
+    total_rub = 0.0
+    for bond, net_qty, invested, proceeds, last_buy_price in rows:
+        row = schemas.DashboardRowOut.model_validate(bond)
+        row.net_qty = int(net_qty or 0)
+        row.invested = float(invested or 0.0)
+        row.proceeds = float(proceeds or 0.0)
+        row.last_buy_price = float(last_buy_price) if last_buy_price is not None else None
+        row.fx_rate = fx_for(bond.currency, fx)
+
+        if bond.last_price is not None:
+            row.market_value = row.net_qty * float(bond.last_price)
+            if row.fx_rate is not None:
+                row.market_value_rub = row.market_value * row.fx_rate
+                if row.net_qty > 0:
+                    total_rub += row.market_value_rub
+            if row.invested:
+                row.pnl = row.market_value + row.proceeds - row.invested
+                row.pnl_percent = round(row.pnl / row.invested * 100, 4)
+        out.append(row)
+
+    for row in out:
+        if row.market_value_rub is not None and row.net_qty > 0 and total_rub:
+            row.weight = round(row.market_value_rub / total_rub * 100, 4)
+
+    return schemas.DashboardOut(rows=out, total_value_rub=total_rub, fx_rates=fx)
+
+
+async def load_dashboard(db: AsyncSession) -> schemas.DashboardOut:
+    """build_dashboard через кэш воркера (сбрасывается при изменении бумаг, сделок, курсов)."""
+    return await _dashboard_cache.get_or_load(lambda: build_dashboard(db))
+
+
+@router.get("/dashboard", response_model=schemas.DashboardOut)
+async def get_dashboard(db: AsyncSession = Depends(get_read_session)):
+    return await load_dashboard(db)
@@ -1,24 +1,138 @@
 # backend/app/database.py
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
-import os
+import os, time
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+# настройки пула (переопределяются через .env)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)          # секунд ожидания свободного соединения
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)        # пересоздавать соединение раз в N секунд
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# кэш prepared statements asyncpg (на соединение); 0 — отключить (нужно за pgbouncer в transaction mode)
+DB_STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE", 256)
+DB_ECHO = _env_bool("DB_ECHO", False)
+
+_connect_args = {}
+if DATABASE_URL and "asyncpg" in DATABASE_URL:
+    _connect_args["statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+
 # создаём асинхронный движок
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    future=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_connect_args,
+)
 
 # фабрика асинхронных сессий
 async_session = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
+# сессии только для чтения: транзакция открывается как READ ONLY,
+# autoflush не нужен, commit не вызывается — соединение просто возвращается в пул
+read_engine = engine.execution_options(postgresql_readonly=True)
+async_read_session = sessionmaker(
+    read_engine, expire_on_commit=False, autoflush=False, class_=AsyncSession
+)
+
 Base = declarative_base()
 
 # dependency для FastAPI
 async def get_session() -> AsyncSession:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+# dependency для GET-эндпоинтов: без commit, транзакция READ ONLY
+async def get_read_session() -> AsyncSession:
+    async with async_read_session() as session:
+        yield session
+
+
+# --- метрики пула ---
+_pool_counters = {
+    "checkouts": 0,
+    "connects": 0,
+    "invalidations": 0,
+    "max_checked_out": 0,
+    "hold_time_total": 0.0,       # суммарное время удержания соединений, сек
+}
+_checkout_started: dict[int, float] = {}
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    _pool_counters["connects"] += 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_counters["checkouts"] += 1
+    _checkout_started[id(connection_record)] = time.perf_counter()
+    checked_out = engine.sync_engine.pool.checkedout()
+    if checked_out > _pool_counters["max_checked_out"]:
+        _pool_counters["max_checked_out"] = checked_out
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    started = _checkout_started.pop(id(connection_record), None)
+    if started is not None:
+        _pool_counters["hold_time_total"] += time.perf_counter() - started
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    _pool_counters["invalidations"] += 1
+
+
+def pool_stats() -> dict:
+    """
+    Снимок состояния пула соединений.
+    saturation — доля занятых соединений от максимума (pool_size + max_overflow);
+    значения близкие к 1.0 означают, что запросы начинают ждать pool_timeout.
+    """
+    pool = engine.sync_engine.pool
+    checked_out = pool.checkedout()
+    capacity = DB_POOL_SIZE + max(DB_MAX_OVERFLOW, 0)
+    checkouts = _pool_counters["checkouts"]
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "saturation": round(checked_out / capacity, 4) if capacity else 0.0,
+        "max_checked_out": _pool_counters["max_checked_out"],
+        "checkouts": checkouts,
+        "connects": _pool_counters["connects"],
+        "invalidations": _pool_counters["invalidations"],
+        "avg_hold_ms": round(_pool_counters["hold_time_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+    }
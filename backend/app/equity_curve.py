@@ -0,0 +1,305 @@
+# backend/app/equity_curve.py
+"""
+Дневная кривая стоимости портфеля (таблица portfolio_value_daily).
+
+Для каждого календарного дня:
+  - value_rub — сумма qty * (цена + НКД) * курс по позициям, открытым на этот день;
+  - invested_rub / proceeds_rub — накопленные покупки (с комиссией) и продажи;
+  - coupon_income_rub — накопленные купоны по количеству, державшемуся на дату выплаты.
+Количество берётся из сделок по buy_date/sell_date, цена — из price_history
+(последняя известная на день или раньше; до первой цены бумага не оценивается,
+Bond.last_price — только за сегодня), НКД — app.accrued, курс — сделки для её ноги
+(leg_fx_rate) или fx_rate_history на дату (fallback fx_rates).
+
+Расчёт инкрементальный: extend_equity_curve пересчитывает последний сохранённый день
+(цены за него могли обновиться) и досчитывает следующие. Триггер на trades
+(миграция 0008_equity_dirty) пишет в equity_dirty самую раннюю дату изменённой
+сделки — тогда пересчёт начинается с неё. run_equity_curve_forever делает это
+раз в EQUITY_CURVE_INTERVAL секунд.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date, datetime
+import asyncio, logging, os
+
+import numpy as np
+
+from app import models, bulk, accrued, metrics
+from app.database import async_session, get_session, get_read_session
+from app.dashboard import RUB_CODES, load_fx_table
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
+
+EQUITY_CURVE_INTERVAL = int(os.getenv("EQUITY_CURVE_INTERVAL", "3600"))
+
+def _step_at(event_days: np.ndarray, cum: np.ndarray, days: np.ndarray, before=0.0) -> np.ndarray:
+    """Значение ступенчатой функции (cum после события event_days[i]) на каждый из days."""
+    if event_days.size == 0:
+        return np.full(days.shape, before, dtype=float)
+    idx = np.searchsorted(event_days, days, side="right") - 1
+    out = cum[np.maximum(idx, 0)].astype(float)
+    out[idx < 0] = before
+    return out
+
+
+def _cumulative(events: list[tuple[int, float]]) -> tuple[np.ndarray, np.ndarray]:
+    """[(ordinal, delta)] -> (отсортированные дни, накопленная сумма на конец дня)."""
+    if not events:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    events.sort(key=lambda e: e[0])
+    d = np.array([e[0] for e in events], dtype=np.int64)
+    v = np.cumsum([e[1] for e in events])
+    # несколько событий в один день -> берём последнее накопленное значение дня
+    last = np.r_[d[1:] != d[:-1], True]
+    return d[last], v[last]
+
+
+def leg_fx_rate(t, side: str) -> Optional[float]:
+    """
+    Курс из сделки для ноги side ("buy"/"sell") или None.
+    Trade.fx_rate — курс той ноги, с которой строка заведена: покупки, а у строки только
+    с продажей — продажи. Для второй ноги строки курс берётся по её дате из истории.
+    """
+    if not t.fx_rate:
+        return None
+    own = "buy" if t.buy_qty else "sell"
+    return float(t.fx_rate) if side == own else None
+
+
+class FxCurve:
+    """Курс валюты на дату по fx_rate_history с переносом последнего значения вперёд."""
+
+    def __init__(self, history: dict[str, list[tuple[date, float]]], current: dict[str, float]):
+        self.current = current
+        self.curves = {}
+        for cur, pts in history.items():
+            pts.sort()
+            self.curves[cur] = (
+                np.array([d.toordinal() for d, _ in pts], dtype=np.int64),
+                np.array([r for _, r in pts]),
+            )
+
+    def at(self, currency: Optional[str], days: np.ndarray) -> np.ndarray:
+        cur = (currency or "SUR").upper()
+        if cur in RUB_CODES:
+            return np.ones(days.shape)
+        fallback = self.current.get(cur) or self.current.get(cur[:3]) or np.nan
+        curve = self.curves.get(cur) or self.curves.get(cur[:3])
+        if curve is None:
+            return np.full(days.shape, fallback)
+        d, r = curve
+        # до первой записи истории — самый ранний известный курс
+        return _step_at(d, r, days, before=r[0] if r.size else fallback)
+
+
+async def load_fx_curve(db: AsyncSession, date_to: date) -> FxCurve:
+    res = await db.execute(
+        select(models.FxRateHistory.currency, models.FxRateHistory.date, models.FxRateHistory.rate)
+        .where(models.FxRateHistory.date <= date_to)
+    )
+    history: dict[str, list] = {}
+    for cur, d, rate in res.all():
+        history.setdefault(cur.upper(), []).append((d, float(rate)))
+    return FxCurve(history, await load_fx_table(db))
+
+
+async def compute_range(db: AsyncSession, date_from: date, date_to: date) -> list[dict]:
+    """Строки portfolio_value_daily за [date_from, date_to] (накопленные величины — с начала истории)."""
+    if date_to < date_from:
+        return []
+    days = np.arange(date_from.toordinal(), date_to.toordinal() + 1, dtype=np.int64)
+    n_days = days.size
+
+    trades = (await db.execute(select(models.Trade))).scalars().all()
+    bond_ids = sorted({t.bond_id for t in trades})
+    if not bond_ids:
+        zeros = [0.0] * n_days
+        return _rows(days, zeros, zeros, zeros, zeros)
+
+    bonds = {b.id: b for b in (await db.execute(select(models.Bond).where(models.Bond.id.in_(bond_ids)))).scalars().all()}
+    fx = await load_fx_curve(db, date_to)
+
+    # события по количеству и деньгам
+    qty_events: dict[int, list] = {}
+    invested_events, proceeds_events = [], []
+    for t in trades:
+        cur = bonds[t.bond_id].currency if t.bond_id in bonds else None
+        if t.buy_qty and t.buy_date:
+            d = t.buy_date.toordinal()
+            qty_events.setdefault(t.bond_id, []).append((d, float(t.buy_qty)))
+            if t.buy_price is not None:
+                rate = leg_fx_rate(t, "buy") or float(fx.at(cur, np.array([d]))[0])
+                amount = t.buy_price * t.buy_qty + (t.buy_commission or 0.0)
+                invested_events.append((d, amount * rate))
+        if t.sell_qty and t.sell_date:
+            d = t.sell_date.toordinal()
+            qty_events.setdefault(t.bond_id, []).append((d, -float(t.sell_qty)))
+            if t.sell_price is not None:
+                rate = leg_fx_rate(t, "sell") or float(fx.at(cur, np.array([d]))[0])
+                amount = t.sell_price * t.sell_qty - (t.sell_commission or 0.0)
+                proceeds_events.append((d, amount * rate))
+    qty_curves = {bid: _cumulative(ev) for bid, ev in qty_events.items()}
+
+    def qty_at(bond_id: int, at_days: np.ndarray) -> np.ndarray:
+        d, q = qty_curves.get(bond_id, (np.zeros(0, dtype=np.int64), np.zeros(0)))
+        return np.maximum(_step_at(d, q, at_days), 0.0)
+
+    # цены: последняя известная на каждый день — точки диапазона плюс последняя цена до него
+    P = models.Price
+    seed = (
+        select(P.bond_id, P.date, P.value)
+        .where(P.bond_id.in_(bond_ids), P.date < date_from)
+        .distinct(P.bond_id)
+        .order_by(P.bond_id, P.date.desc())
+    )
+    res = await db.execute(seed)
+    price_pts: dict[int, list] = {}
+    for bond_id, d, v in res.all():
+        price_pts.setdefault(bond_id, []).append((d.toordinal(), float(v)))
+    res = await db.execute(
+        select(P.bond_id, P.date, P.value)
+        .where(P.bond_id.in_(bond_ids), P.date >= date_from, P.date <= date_to)
+        .order_by(P.bond_id, P.date)
+    )
+    for bond_id, d, v in res.all():
+        price_pts.setdefault(bond_id, []).append((d.toordinal(), float(v)))
+    today = date.today().toordinal()
+
+    coupons = await accrued.load_coupon_schedules(db, bond_ids)
+    ordered = [bonds[b] for b in bond_ids if b in bonds]
+
+    # НКД [бумаги × дни]
+    nkd = np.nan_to_num(accrued.accrued_range([coupons.get(b.id, []) for b in ordered], days), nan=0.0)
+
+    value = np.zeros(n_days)
+    coupon_events = []
+    for i, b in enumerate(ordered):
+        q = qty_at(b.id, days)
+        pts = price_pts.get(b.id)
+        if pts:
+            pd_ = np.array([p[0] for p in pts], dtype=np.int64)
+            pv_ = np.array([p[1] for p in pts])
+            price = _step_at(pd_, pv_, days, before=np.nan)
+        else:
+            price = np.full(n_days, np.nan)
+        # текущая котировка подставляется только за сегодня: прошлые дни без цены не оцениваются
+        if b.last_price is not None:
+            price = np.where(np.isnan(price) & (days >= today), float(b.last_price), price)
+        rate = fx.at(b.currency, days)
+        contrib = q * (price + nkd[i]) * rate
+        value += np.nan_to_num(np.where(q > 0, contrib, 0.0), nan=0.0)
+
+        # купоны: количество на дату выплаты
+        paid = [(d, v) for d, v in coupons.get(b.id, []) if d and v and d <= date_to]
+        if paid:
+            pdays = np.array([d.toordinal() for d, _ in paid], dtype=np.int64)
+            amounts = qty_at(b.id, pdays) * np.array([float(v) for _, v in paid]) * fx.at(b.currency, pdays)
+            coupon_events.extend(zip(pdays.tolist(), np.nan_to_num(amounts).tolist()))
+
+    inv = _step_at(*_cumulative(invested_events), days)
+    proc = _step_at(*_cumulative(proceeds_events), days)
+    cpn = _step_at(*_cumulative(coupon_events), days)
+    return _rows(days, value, inv, proc, cpn)
+
+
+def _rows(days: np.ndarray, value, invested, proceeds, coupons) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "date": date.fromordinal(int(d)),
+            "value_rub": round(float(value[i]), 2),
+            "invested_rub": round(float(invested[i]), 2),
+            "proceeds_rub": round(float(proceeds[i]), 2),
+            "coupon_income_rub": round(float(coupons[i]), 2),
+            "computed_at": now,
+        }
+        for i, d in enumerate(days)
+    ]
+
+
+async def first_trade_date(db: AsyncSession) -> Optional[date]:
+    res = await db.execute(select(func.min(func.least(models.Trade.buy_date, models.Trade.sell_date))))
+    return res.scalar_one_or_none()
+
+
+@metrics.job("equity_curve_extend")
+async def extend_equity_curve(db: AsyncSession, until: Optional[date] = None) -> int:
+    """
+    Пересчитывает кривую с min(самая ранняя дата из equity_dirty, последний сохранённый день)
+    по until (по умолчанию сегодня); без сохранённых дней — с первой сделки. Возвращает число дней.
+    """
+    until = until or date.today()
+    res = await db.execute(delete(models.EquityDirty).returning(models.EquityDirty.since))
+    dirty = min(res.scalars().all(), default=None)
+    last = (await db.execute(select(func.max(models.PortfolioValueDaily.date)))).scalar_one_or_none()
+    if last is not None:
+        start = min(last, dirty) if dirty else last
+    else:
+        start = await first_trade_date(db)
+        if start is None:
+            await db.commit()
+            return 0
+    if start > until:
+        await db.commit()
+        return 0
+    rows = await compute_range(db, start, until)
+    n = await bulk.upsert_portfolio_values(db, rows)
+    await db.commit()
+    logger.info("equity curve: recomputed %s days (%s..%s)", n, start, until)
+    return n
+
+
+async def run_equity_curve_forever(interval_sec: int = EQUITY_CURVE_INTERVAL) -> None:
+    """Фоновая задача для startup: раз в interval_sec пересчитывает изменившиеся и новые дни."""
+    while True:
+        try:
+            async with async_session() as session:
+                await extend_equity_curve(session)
+        except Exception:
+            logger.exception("equity curve: extend failed")
+        await asyncio.sleep(interval_sec)
+
+
+async def invalidate_from(db: AsyncSession, since: date) -> None:
+    """Удаляет сохранённые дни начиная с since — следующий extend пересчитает их."""
+    await db.execute(delete(models.PortfolioValueDaily).where(models.PortfolioValueDaily.date >= since))
+    await db.commit()
+
+
+async def get_equity_curve(db: AsyncSession, date_from: Optional[date] = None,
+                           date_to: Optional[date] = None) -> list[dict]:
+    q = select(models.PortfolioValueDaily).order_by(models.PortfolioValueDaily.date)
+    if date_from:
+        q = q.where(models.PortfolioValueDaily.date >= date_from)
+    if date_to:
+        q = q.where(models.PortfolioValueDaily.date <= date_to)
+    rows = (await db.execute(q)).scalars().all()
+    return [
+        {
+            "date": r.date.isoformat(),
+            "value_rub": r.value_rub,
+            "invested_rub": r.invested_rub,
+            "proceeds_rub": r.proceeds_rub,
+            "coupon_income_rub": r.coupon_income_rub,
+        }
+        for r in rows
+    ]
+
+
+@router.get("/equity")
+async def get_equity(date_from: Optional[date] = None, date_to: Optional[date] = None,
+                     db: AsyncSession = Depends(get_read_session)):
+    return await get_equity_curve(db, date_from, date_to)
+
+
+@router.post("/equity/refresh")
+async def post_equity_refresh(since: Optional[date] = None, db: AsyncSession = Depends(get_session)):
+    """Дописывает новые дни; since — пересчитать начиная с даты (после правки сделок задним числом)."""
+    if since:
+        await invalidate_from(db, since)
+    appended = await extend_equity_curve(db)
+    return {"appended": appended}
@@ -0,0 +1,222 @@
+# backend/app/events.py
+"""
+Журнал событий (таблица event_logs): структурированные события (event_type,
+bond_id, payload JSONB), пакетная запись и ограниченный размер таблицы.
+
+  - emit(...) кладёт событие в очередь и сразу возвращается; фоновая задача
+    пишет очередь одним INSERT раз в EVENT_FLUSH_MS или по EVENT_BATCH_SIZE событий
+    (bond_id неизвестной бумаги перед записью переносится в payload);
+  - GET /logs — keyset-пагинация по (timestamp, id) с фильтром по типам;
+  - run_event_retention_forever — удаляет события старше EVENT_RETENTION_DAYS
+    и всё сверх EVENT_MAX_ROWS последних.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete, insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import asyncio, logging, os
+
+from app import models, schemas, metrics
+from app.database import async_session, get_read_session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["logs"])
+
+EVENT_FLUSH_MS = int(os.getenv("EVENT_FLUSH_MS", "500"))
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "200"))
+EVENT_QUEUE_MAX = int(os.getenv("EVENT_QUEUE_MAX", "10000"))
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "90"))
+EVENT_MAX_ROWS = int(os.getenv("EVENT_MAX_ROWS", "100000"))
+LOGS_PAGE_MAX = 500
+
+
+class EventWriter:
+    """Очередь событий с фоновым сбросом пачками. Запускается при первом emit или через start()."""
+
+    def __init__(self, flush_ms: int = EVENT_FLUSH_MS, batch_size: int = EVENT_BATCH_SIZE,
+                 max_queue: int = EVENT_QUEUE_MAX):
+        self.flush_sec = flush_ms / 1000.0
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = self._queue or asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="event-writer")
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и дописывает всё, что осталось в очереди."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        rest = []
+        while self._queue is not None and not self._queue.empty():
+            rest.append(self._queue.get_nowait())
+        for i in range(0, len(rest), self.batch_size):
+            await self._flush(rest[i:i + self.batch_size])
+
+    def emit(self, event_type: str, message: str, bond_id: Optional[int] = None,
+             payload: Optional[dict] = None) -> dict:
+        """Ставит событие в очередь (без ожидания БД). Вызывать из работающего event loop."""
+        row = {
+            "timestamp": datetime.now(timezone.utc),
+            "event_type": event_type,
+            "message": message,
+            "bond_id": bond_id,
+            "payload": payload,
+        }
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("event log queue full, dropped %s events", self.dropped)
+        return row
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_sec
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        try:
+            async with async_session() as session:
+                await self._drop_unknown_bonds(session, batch)
+                await session.execute(insert(models.EventLog), batch)
+                await session.commit()
+        except Exception:
+            logger.exception("event log flush failed (%s events lost)", len(batch))
+
+    @staticmethod
+    async def _drop_unknown_bonds(session: AsyncSession, batch: list[dict]) -> None:
+        """
+        bond_id несуществующей (или удалённой) бумаги нарушил бы FK и уронил всю пачку:
+        такой id переносится в payload, а ссылка обнуляется.
+        """
+        ids = {r["bond_id"] for r in batch if r["bond_id"] is not None}
+        if not ids:
+            return
+        known = set((await session.execute(select(models.Bond.id).where(models.Bond.id.in_(ids)))).scalars().all())
+        for r in batch:
+            if r["bond_id"] is not None and r["bond_id"] not in known:
+                r["payload"] = {**(r["payload"] or {}), "bond_id": r["bond_id"]}
+                r["bond_id"] = None
+
+
+writer = EventWriter()
+
+
+def emit(event_type: str, message: str, bond_id: Optional[int] = None, payload: Optional[dict] = None) -> dict:
+    return writer.emit(event_type, message, bond_id, payload)
+
+
+# --- чтение ---
+
+def encode_cursor(ts: datetime, id_: int) -> str:
+    return f"{ts.isoformat()}|{id_}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        ts, id_ = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(id_)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def list_events(db: AsyncSession, limit: int = 100, before: Optional[str] = None,
+                      types: Optional[list[str]] = None, exclude_types: Optional[list[str]] = None,
+                      bond_id: Optional[int] = None) -> schemas.EventLogPage:
+    E = models.EventLog
+    q = select(E).order_by(E.timestamp.desc(), E.id.desc()).limit(limit + 1)
+    if before:
+        q = q.where(tuple_(E.timestamp, E.id) < decode_cursor(before))
+    if types:
+        q = q.where(E.event_type.in_(types))
+    if exclude_types:
+        q = q.where(E.event_type.notin_(exclude_types))
+    if bond_id is not None:
+        q = q.where(E.bond_id == bond_id)
+    rows = list((await db.execute(q)).scalars().all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return schemas.EventLogPage(items=[schemas.EventLogOut.model_validate(r) for r in rows], next_cursor=next_cursor)
+
+
+# --- размер таблицы ---
+
+@metrics.job("event_log_retention")
+async def apply_retention(days: int = EVENT_RETENTION_DAYS, max_rows: int = EVENT_MAX_ROWS) -> int:
+    """Удаляет события старше days и всё сверх max_rows последних. Возвращает число удалённых строк."""
+    E = models.EventLog
+    removed = 0
+    async with async_session() as session:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        res = await session.execute(delete(E).where(E.timestamp < cutoff))
+        removed += res.rowcount or 0
+        # граница по max_rows-й записи от новых к старым — индекс (timestamp, id)
+        res = await session.execute(
+            select(E.timestamp, E.id).order_by(E.timestamp.desc(), E.id.desc()).offset(max_rows).limit(1)
+        )
+        edge = res.first()
+        if edge is not None:
+            res = await session.execute(delete(E).where(tuple_(E.timestamp, E.id) <= tuple(edge)))
+            removed += res.rowcount or 0
+        await session.commit()
+    if removed:
+        logger.info("event log retention: removed %s rows", removed)
+    return removed
+
+
+async def run_event_retention_forever(interval_sec: int = 3600) -> None:
+    while True:
+        try:
+            await apply_retention()
+        except Exception:
+            logger.exception("event log retention failed")
+        await asyncio.sleep(interval_sec)
+
+
+# --- API ---
+
+@router.get("/logs", response_model=schemas.EventLogPage)
+async def get_logs(
+    limit: int = Query(100, ge=1, le=LOGS_PAGE_MAX),
+    before: Optional[str] = None,
+    type: Optional[list[str]] = Query(None),
+    exclude_type: Optional[list[str]] = Query(None),
+    bond_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await list_events(db, limit, before, type, exclude_type, bond_id)
+
+
+@router.post("/logs", response_model=schemas.EventLogOut)
+async def post_log(event: schemas.EventLogIn):
+    row = emit(event.event_type, event.message, event.bond_id, event.payload)
+    return schemas.EventLogOut(**row)
@@ -0,0 +1,354 @@
+# backend/app/floaters.py
+"""
+Флоатеры: разбор формулы купона из Bond.coupon_display ("КС + 2%", "RUONIA + 1,3%",
+"Ключевая ставка + 250 б.п., но не ниже 8%"), локальная кривая справочных ставок
+(таблица reference_rates: факт + пользовательские прогнозы) и массовый прогноз
+неизвестных будущих купонов в таблицу coupons (Coupon.projected = true).
+
+Купон = номинал на начало периода * ставка / 100 * дней_в_периоде / 365, где
+ставка = max(floor, min(cap, multiplier * индекс(дата фиксации) + spread)),
+дата фиксации = начало купонного периода - lag_days.
+
+Прогноз пересчитывается после обновления купонов с ISS (app.refresh — для обновлённых
+бумаг), при замене прогноза ставки, при POST /api/rates/sync и раз в RATES_SYNC_INTERVAL
+секунд вместе с догрузкой ставок ЦБ (run_rates_sync_forever).
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from bs4 import BeautifulSoup
+from typing import NamedTuple, Optional, Sequence
+from datetime import date, datetime, timedelta
+import asyncio, logging, os, re
+
+import numpy as np
+
+from app import models, schemas, bulk, events, metrics, upstream
+from app.database import async_session, get_session, get_read_session
+from app.other import CBR_BASE
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/rates", tags=["rates"])
+
+# справочные ставки и слова, по которым они узнаются в формуле
+RATE_ALIASES = {
+    "KEYRATE": r"ключев|\bкс\b|\bkc\b|key rate",
+    "RUONIA": r"ruonia|руониа",
+}
+# страницы ЦБ с историей ставок (таблица "дата | ставка")
+CBR_URLS = {
+    "KEYRATE": f"{CBR_BASE}/hd_base/KeyRate/",
+    "RUONIA": f"{CBR_BASE}/hd_base/ruonia/dynamics/",
+}
+RATES_HISTORY_START = date(2014, 1, 1)
+HTTP_TIMEOUT = 20.0
+DEFAULT_PERIOD_DAYS = 182
+# как часто фоновая задача догружает ставки и пересчитывает прогноз купонов, сек
+RATES_SYNC_INTERVAL = int(os.getenv("RATES_SYNC_INTERVAL", "86400"))
+
+_NUM = r"(\d+(?:\.\d+)?)"
+
+
+class FloaterFormula(NamedTuple):
+    index: str                       # KEYRATE, RUONIA
+    multiplier: float = 1.0
+    spread: float = 0.0              # п.п.
+    floor: Optional[float] = None    # % годовых
+    cap: Optional[float] = None
+    lag_days: int = 0
+
+    def rate(self, index_value: np.ndarray) -> np.ndarray:
+        r = self.multiplier * np.asarray(index_value, dtype=float) + self.spread
+        if self.floor is not None:
+            r = np.maximum(r, self.floor)
+        if self.cap is not None:
+            r = np.minimum(r, self.cap)
+        return r
+
+
+def _normalize(text: str) -> str:
+    t = text.lower().replace("\xa0", " ").replace(",", ".").replace("−", "-").replace("–", "-")
+    return " ".join(t.split())
+
+
+def parse_formula(text: Optional[str]) -> Optional[FloaterFormula]:
+    """Строка формулы -> FloaterFormula; None, если справочная ставка не распознана."""
+    if not text:
+        return None
+    t = _normalize(text)
+
+    index, pos = None, -1
+    for name, pattern in RATE_ALIASES.items():
+        m = re.search(pattern, t)
+        if m and (pos < 0 or m.start() < pos):
+            index, pos = name, m.start()
+    if index is None:
+        return None
+
+    # множитель: "1.1 * кс" или "кс * 1.1"
+    multiplier = 1.0
+    m = re.search(_NUM + r"\s*[*×x]\s*\S*$", t[:pos]) or re.search(r"^\S*\s*[*×x]\s*" + _NUM, t[pos:])
+    if m:
+        multiplier = float(m.group(1))
+
+    # спред после ставки: "+ 2%", "+250 б.п.", "- 0.5 п.п."
+    spread = 0.0
+    m = re.search(r"([+-])\s*" + _NUM + r"\s*(%|п\.?\s?п|б\.?\s?п|bp|bps)?", t[pos:])
+    if m:
+        value = float(m.group(2))
+        unit = (m.group(3) or "").replace(" ", "")
+        if unit.startswith("б") or unit.startswith("bp") or (not unit and value > 20):
+            value /= 100.0
+        spread = value if m.group(1) == "+" else -value
+
+    floor = cap = None
+    m = re.search(r"(?:не ниже|не менее|мин\.?(?:имум)?|floor)\D{0,12}" + _NUM, t)
+    if m:
+        floor = float(m.group(1))
+    m = re.search(r"(?:не выше|не более|макс\.?(?:имум)?|cap)\D{0,12}" + _NUM, t)
+    if m:
+        cap = float(m.group(1))
+
+    lag_days = 0
+    m = re.search(r"(?:лаг|lag)\D{0,6}(\d+)", t) or re.search(r"(\d+)\s*(?:раб\.?\s*)?(?:дн|д\.)", t)
+    if m:
+        lag_days = int(m.group(1))
+
+    return FloaterFormula(index, multiplier, spread, floor, cap, lag_days)
+
+
+# --- кривая справочных ставок ---
+
+class RateCurve:
+    """Ступенчатая кривая: значение на дату — последнее известное (факт, затем прогноз)."""
+
+    def __init__(self, points: Sequence[tuple]):
+        pts = sorted(points)
+        self.days = np.array([d.toordinal() for d, _ in pts], dtype=np.int64)
+        self.values = np.array([float(v) for _, v in pts])
+
+    def at(self, days: np.ndarray) -> np.ndarray:
+        if self.days.size == 0:
+            return np.full(np.shape(days), np.nan)
+        idx = np.searchsorted(self.days, days, side="right") - 1
+        return self.values[np.maximum(idx, 0)]
+
+
+async def load_curves(db: AsyncSession, names: Optional[Sequence[str]] = None) -> dict[str, RateCurve]:
+    """Факт плюс прогнозы на даты после последнего факта."""
+    q = select(models.ReferenceRate.name, models.ReferenceRate.date,
+               models.ReferenceRate.rate, models.ReferenceRate.is_forecast)
+    if names:
+        q = q.where(models.ReferenceRate.name.in_([n.upper() for n in names]))
+    actual: dict[str, list] = {}
+    forecast: dict[str, list] = {}
+    for name, d, rate, is_fc in (await db.execute(q)).all():
+        (forecast if is_fc else actual).setdefault(name, []).append((d, rate))
+    curves = {}
+    for name in set(actual) | set(forecast):
+        hist = actual.get(name, [])
+        last = max((d for d, _ in hist), default=date.min)
+        curves[name] = RateCurve(hist + [(d, r) for d, r in forecast.get(name, []) if d > last])
+    return curves
+
+
+@metrics.upstream("www.cbr.ru", "hd_base")
+async def fetch_cbr_rates(name: str, date_from: date, date_to: date) -> list[tuple[date, float]]:
+    """История ставки с сайта ЦБ: первая колонка — дата, первая числовая после неё — ставка."""
+    url = CBR_URLS[name]
+    params = {
+        "UniDbQuery.Posted": "True",
+        "UniDbQuery.From": date_from.strftime("%d.%m.%Y"),
+        "UniDbQuery.To": date_to.strftime("%d.%m.%Y"),
+    }
+    r = await upstream.get("www.cbr.ru", url, params=params, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    soup = BeautifulSoup(r.text, "html.parser")
+    out = []
+    for tr in soup.select("table tr"):
+        cells = [c.get_text(strip=True).replace("\xa0", "").replace(" ", "") for c in tr.find_all("td")]
+        if len(cells) < 2:
+            continue
+        try:
+            d = datetime.strptime(cells[0], "%d.%m.%Y").date()
+            out.append((d, float(cells[1].replace(",", "."))))
+        except ValueError:
+            continue
+    return out
+
+
+async def sync_rates(db: AsyncSession, names: Optional[Sequence[str]] = None) -> dict[str, int]:
+    """Догружает факт по ставкам с даты последней сохранённой."""
+    out = {}
+    for name in names or CBR_URLS:
+        res = await db.execute(
+            select(models.ReferenceRate.date)
+            .where(models.ReferenceRate.name == name, models.ReferenceRate.is_forecast.is_(False))
+            .order_by(models.ReferenceRate.date.desc())
+            .limit(1)
+        )
+        last = res.scalar_one_or_none()
+        start = last + timedelta(days=1) if last else RATES_HISTORY_START
+        if start > date.today():
+            out[name] = 0
+            continue
+        try:
+            points = await fetch_cbr_rates(name, start, date.today())
+        except Exception:
+            logger.exception("sync_rates: fetch %s failed", name)
+            out[name] = 0
+            continue
+        out[name] = await bulk.upsert_reference_rates(db, name, points)
+    await db.commit()
+    return out
+
+
+# --- прогноз купонов ---
+
+def project_coupons(
+    formula: FloaterFormula,
+    curve: RateCurve,
+    coupons: Sequence[tuple],
+    face_value: Optional[float],
+    amortizations: Sequence[tuple],
+    settlement: date,
+    include_projected: Sequence[date] = (),
+) -> list[tuple[date, float]]:
+    """
+    [(date, value)] для будущих купонов с неизвестным значением (value is None)
+    или ранее спрогнозированных (include_projected).
+    """
+    sched = sorted((d, v) for d, v in coupons if d)
+    redo = set(include_projected)
+    targets = [i for i, (d, v) in enumerate(sched) if d > settlement and (v is None or d in redo)]
+    if not targets:
+        return []
+    starts = []
+    for i in targets:
+        if i > 0:
+            starts.append(sched[i - 1][0])
+        else:
+            step = (sched[1][0] - sched[0][0]).days if len(sched) > 1 else DEFAULT_PERIOD_DAYS
+            starts.append(sched[0][0] - timedelta(days=step))
+    ends = [sched[i][0] for i in targets]
+
+    fixing = np.array([(s - timedelta(days=formula.lag_days)).toordinal() for s in starts], dtype=np.int64)
+    rates = formula.rate(curve.at(fixing))
+    days = np.array([(e - s).days for s, e in zip(starts, ends)], dtype=float)
+
+    face = float(face_value or 1000.0)
+    principal = sorted((d, float(v)) for d, v in amortizations if d and v and d > settlement)
+    outstanding = np.array([face - sum(v for d, v in principal if d <= s) for s in starts])
+    values = np.round(outstanding * rates / 100.0 * days / 365.0, 2)
+    return [(e, float(v)) for e, v in zip(ends, values) if np.isfinite(v) and v > 0]
+
+
+@metrics.job("floater_projection")
+async def project_floater_coupons(
+    db: AsyncSession, settlement: Optional[date] = None, bond_ids: Optional[Sequence[int]] = None
+) -> int:
+    """
+    Пересчитывает прогноз будущих купонов флоатеров с распознанной формулой — всех или
+    только bond_ids. Возвращает число купонов.
+    """
+    settlement = settlement or date.today()
+    q = select(models.Bond).where(models.Bond.coupon_display.isnot(None))
+    if bond_ids is not None:
+        q = q.where(models.Bond.id.in_(bond_ids))
+    bonds = (await db.execute(q)).scalars().all()
+    formulas = {b.id: f for b in bonds if (f := parse_formula(b.coupon_display))}
+    if not formulas:
+        return 0
+    curves = await load_curves(db, {f.index for f in formulas.values()})
+
+    ids = list(formulas)
+    coupons: dict[int, list] = {}
+    projected: dict[int, list] = {}
+    res = await db.execute(
+        select(models.Coupon.bond_id, models.Coupon.date, models.Coupon.value, models.Coupon.projected)
+        .where(models.Coupon.bond_id.in_(ids))
+    )
+    for bond_id, d, v, is_proj in res.all():
+        coupons.setdefault(bond_id, []).append((d, v))
+        if is_proj:
+            projected.setdefault(bond_id, []).append(d)
+    amorts: dict[int, list] = {}
+    res = await db.execute(
+        select(models.Amortization.bond_id, models.Amortization.date, models.Amortization.value)
+        .where(models.Amortization.bond_id.in_(ids))
+    )
+    for bond_id, d, v in res.all():
+        amorts.setdefault(bond_id, []).append((d, v))
+
+    rows = []
+    for b in bonds:
+        f = formulas.get(b.id)
+        curve = curves.get(f.index) if f else None
+        if curve is None:
+            continue
+        for d, v in project_coupons(f, curve, coupons.get(b.id, []), b.face_value,
+                                    amorts.get(b.id, []), settlement, projected.get(b.id, ())):
+            rows.append({"bond_id": b.id, "date": d, "value": v})
+    n = await bulk.upsert_projected_coupons(db, rows)
+    await db.commit()
+    logger.info("floaters: projected %s coupons for %s bonds", n, len(formulas))
+    return n
+
+
+# --- API ---
+
+@router.get("/{name}")
+async def get_rate_curve(name: str, db: AsyncSession = Depends(get_read_session)):
+    res = await db.execute(
+        select(models.ReferenceRate)
+        .where(models.ReferenceRate.name == name.upper())
+        .order_by(models.ReferenceRate.date)
+    )
+    return [{"date": r.date.isoformat(), "rate": r.rate, "is_forecast": r.is_forecast} for r in res.scalars().all()]
+
+
+@router.put("/{name}/forecast")
+async def put_rate_forecast(name: str, points: list[schemas.RatePointIn], db: AsyncSession = Depends(get_session)):
+    """Заменяет прогноз ставки и пересчитывает купоны флоатеров."""
+    name = name.upper()
+    if name not in RATE_ALIASES:
+        raise HTTPException(status_code=404, detail=f"Unknown rate {name}")
+    await db.execute(delete(models.ReferenceRate).where(
+        models.ReferenceRate.name == name, models.ReferenceRate.is_forecast.is_(True)
+    ))
+    res = await db.execute(select(func.max(models.ReferenceRate.date)).where(models.ReferenceRate.name == name))
+    last_actual = res.scalar_one_or_none() or date.min
+    # прогноз не перекрывает фактические значения
+    saved = await bulk.upsert_reference_rates(
+        db, name, [(p.date, p.rate) for p in points if p.date > last_actual], is_forecast=True
+    )
+    await db.commit()
+    projected = await project_floater_coupons(db)
+    return {"saved": saved, "projected": projected}
+
+
+async def sync_and_project(db: AsyncSession) -> dict:
+    """Догружает KEYRATE/RUONIA с сайта ЦБ и пересчитывает купоны флоатеров."""
+    synced = await sync_rates(db)
+    projected = await project_floater_coupons(db)
+    events.emit("rates", f"Обновлены ставки, пересчитано купонов флоатеров: {projected}",
+                payload={"synced": synced, "projected": projected})
+    return {"synced": synced, "projected": projected}
+
+
+async def run_rates_sync_forever(interval_sec: int = RATES_SYNC_INTERVAL) -> None:
+    """Фоновая задача для startup: ставки ЦБ и прогноз купонов раз в interval_sec."""
+    while True:
+        try:
+            async with async_session() as session:
+                await sync_and_project(session)
+        except Exception:
+            logger.exception("floaters: rates sync failed")
+        await asyncio.sleep(interval_sec)
+
+
+@router.post("/sync")
+async def post_rates_sync(db: AsyncSession = Depends(get_session)):
+    """Догружает KEYRATE/RUONIA с сайта ЦБ и пересчитывает купоны флоатеров."""
+    return await sync_and_project(db)
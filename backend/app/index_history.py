@@ -0,0 +1,139 @@
+# backend/app/index_history.py
+"""
+Локальное хранилище дневной истории индексов MOEX (таблица index_history).
+Первый sync загружает всю историю, последующие — только даты после последней
+сохранённой. Список индексов: RGBI плюс бенчмарки из BENCHMARK_INDICES.
+"""
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Tuple
+from datetime import date, timedelta
+import asyncio, logging, os, time
+
+from app import models, bulk, metrics, upstream
+from app.database import async_session
+from app.moex_client import MOEX_BASE
+
+logger = logging.getLogger(__name__)
+
+INDEX_HISTORY_URL = MOEX_BASE + "/history/engines/stock/markets/index/boards/SNDX/securities/{secid}.json"
+INDEX_HISTORY_START = date(2012, 3, 1)
+HTTP_TIMEOUT = 20.0
+
+BENCHMARK_INDICES = [
+    s.strip().upper()
+    for s in os.getenv("BENCHMARK_INDICES", "RGBI,RUCBITR,RUGBITR").split(",")
+    if s.strip()
+]
+# не чаще одного обращения к ISS за индекс в N секунд из одного процесса
+INDEX_SYNC_MIN_INTERVAL = int(os.getenv("INDEX_SYNC_MIN_INTERVAL", "3600"))
+
+Point = Tuple[date, float]
+
+_last_sync: dict[str, float] = {}
+_sync_locks: dict[str, asyncio.Lock] = {}
+
+
+@metrics.upstream("iss.moex.com", "index_history")
+async def fetch_index_history(secid: str, date_from: date, date_till: date) -> List[Point]:
+    """Дневные CLOSE индекса из ISS за период, с проходом по страницам history.cursor."""
+    url = INDEX_HISTORY_URL.format(secid=secid)
+    start = 0
+    out: List[Point] = []
+    while True:
+        params = {
+            "from": date_from.isoformat(),
+            "till": date_till.isoformat(),
+            "start": start,
+            "iss.meta": "off",
+            "iss.only": "history,history.cursor",
+            "history.columns": "TRADEDATE,CLOSE",
+        }
+        r = await upstream.get("iss.moex.com", url, params=params, timeout=HTTP_TIMEOUT)
+        r.raise_for_status()
+        payload = r.json()
+        rows = payload.get("history", {}).get("data") or []
+        for trade_date, close in rows:
+            if close is None:
+                continue
+            try:
+                out.append((date.fromisoformat(trade_date), float(close)))
+            except (TypeError, ValueError):
+                continue
+        cursor = (payload.get("history.cursor", {}).get("data") or [[0, 0, 0]])[0]
+        index, total, page = cursor[0], cursor[1], cursor[2] or len(rows)
+        start = index + page
+        if not rows or start >= total:
+            break
+    return out
+
+
+async def last_stored_date(session: AsyncSession, secid: str) -> Optional[date]:
+    res = await session.execute(
+        select(func.max(models.IndexHistory.date)).where(models.IndexHistory.secid == secid.upper())
+    )
+    return res.scalar_one_or_none()
+
+
+async def sync_index(secid: str, force: bool = False) -> int:
+    """
+    Догружает недостающие дни индекса. Возвращает число записанных строк.
+    Без force повторный вызов в пределах INDEX_SYNC_MIN_INTERVAL ничего не делает.
+    """
+    secid = secid.upper()
+    lock = _sync_locks.setdefault(secid, asyncio.Lock())
+    async with lock:
+        now = time.monotonic()
+        if not force and now - _last_sync.get(secid, -INDEX_SYNC_MIN_INTERVAL) < INDEX_SYNC_MIN_INTERVAL:
+            metrics.cache_hit("index_sync")
+            return 0
+        metrics.cache_miss("index_sync")
+
+        async with async_session() as session:
+            last = await last_stored_date(session, secid)
+            since = last + timedelta(days=1) if last else INDEX_HISTORY_START
+            today = date.today()
+            written = 0
+            if since <= today:
+                points = await fetch_index_history(secid, since, today)
+                written = await bulk.upsert_index_history(session, secid, points)
+                await session.commit()
+        _last_sync[secid] = now
+        if written:
+            logger.info("index_history: %s +%s rows since %s", secid, written, since)
+        return written
+
+
+@metrics.job("index_sync")
+async def sync_all_indices(indices: Optional[List[str]] = None, force: bool = False) -> dict:
+    """Синхронизирует RGBI и бенчмарки; ошибка по одному индексу не мешает остальным."""
+    out = {}
+    for secid in indices or BENCHMARK_INDICES:
+        try:
+            out[secid] = await sync_index(secid, force=force)
+        except Exception:
+            logger.exception("index_history: sync failed for %s", secid)
+            out[secid] = None
+    return out
+
+
+async def run_index_sync_forever(interval_sec: int = 6 * 3600) -> None:
+    """Фоновая задача для startup: раз в interval_sec дописывает новые дни всех индексов."""
+    while True:
+        await sync_all_indices(force=True)
+        await asyncio.sleep(interval_sec)
+
+
+async def get_index_points(
+    session: AsyncSession,
+    secid: str,
+    date_from: Optional[date] = None,
+    date_till: Optional[date] = None,
+) -> List[Point]:
+    q = select(models.IndexHistory.date, models.IndexHistory.close).where(models.IndexHistory.secid == secid.upper())
+    if date_from is not None:
+        q = q.where(models.IndexHistory.date >= date_from)
+    if date_till is not None:
+        q = q.where(models.IndexHistory.date <= date_till)
+    res = await session.execute(q.order_by(models.IndexHistory.date))
+    return [(d, float(v)) for d, v in res.all()]
@@ -0,0 +1,340 @@
+# backend/app/lots.py
+"""
+Учёт лотов по сделкам: открытые лоты и реализованный P&L по каждой бумаге
+двумя методами — FIFO и по средней цене (avg).
+
+Строка trades содержит ногу покупки (buy_*) и/или ногу продажи (sell_*); replay
+разворачивает их в отдельные события и проигрывает по дате (в один день покупки
+раньше продаж). Для каждого события:
+  - стоимость покупки = цена * кол-во + комиссия (комиссия входит в себестоимость лота);
+  - выручка продажи = цена * кол-во - комиссия;
+  - НКД уплаченный/полученный учитывается отдельно от цены (nkd_income);
+  - курс — на дату ноги: Trade.fx_rate для ноги, с которой заведена строка
+    (equity_curve.leg_fx_rate), иначе fx_rate_history (fallback fx_rates).
+Продажа сверх позиции закрывает только имеющееся количество, остаток — unmatched_qty.
+
+Результат материализован в lot_positions / position_lots / realized_pnl и
+пересчитывается только для изменившихся бумаг: строковый триггер на trades
+(миграция 0004_lots) пишет bond_id в lots_dirty при любом способе записи,
+refresh_dirty забирает эти бумаги и пересобирает их в той же транзакции.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, delete, insert, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Optional
+import logging, math
+
+import numpy as np
+
+from app import models, metrics
+from app.dashboard import RUB_CODES, fx_for
+from app.database import get_session
+from app.equity_curve import FxCurve, leg_fx_rate, load_fx_curve
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
+
+METHODS = ("fifo", "avg")
+_METHOD_PATTERN = "^(fifo|avg)$"
+
+
+@dataclass
+class Leg:
+    trade_id: int
+    side: str                   # "buy" | "sell"
+    date: Optional[date]
+    qty: int
+    price: float
+    nkd: float                  # НКД за всю ногу
+    commission: float
+    fx: float                   # рублей за 1 unit валюты на дату сделки
+
+    def sort_key(self):
+        # без даты: покупки — в начало истории, продажи — в конец
+        d = self.date or (date.min if self.side == "buy" else date.max)
+        return d, self.side != "buy", self.trade_id
+
+
+@dataclass
+class Lot:
+    trade_id: Optional[int]
+    open_date: Optional[date]
+    qty: int
+    gross: float                # цена * кол-во, без комиссии
+    cost: float                 # gross + комиссия
+    cost_rub: float
+    nkd: float
+    nkd_rub: float
+
+    def take(self, qty: int) -> "Lot":
+        """Отрезает qty бумаг от лота пропорционально и возвращает отрезанную часть."""
+        share = qty / self.qty
+        part = Lot(self.trade_id, self.open_date, qty, self.gross * share, self.cost * share,
+                   self.cost_rub * share, self.nkd * share, self.nkd_rub * share)
+        self.qty -= qty
+        self.gross -= part.gross
+        self.cost -= part.cost
+        self.cost_rub -= part.cost_rub
+        self.nkd -= part.nkd
+        self.nkd_rub -= part.nkd_rub
+        return part
+
+
+@dataclass
+class Replay:
+    lots: list[Lot] = field(default_factory=list)
+    realized: list[dict] = field(default_factory=list)
+    unmatched_qty: int = 0
+
+
+def replay(legs: Iterable[Leg], method: str) -> Replay:
+    """Проигрывает ноги одной бумаги: открытые лоты и закрытия продажами."""
+    if method not in METHODS:
+        raise ValueError(f"unknown lot method: {method}")
+    out = Replay()
+    for leg in sorted(legs, key=Leg.sort_key):
+        if leg.side == "buy":
+            gross = leg.price * leg.qty
+            cost = gross + leg.commission
+            lot = Lot(leg.trade_id, leg.date, leg.qty, gross, cost, cost * leg.fx, leg.nkd, leg.nkd * leg.fx)
+            if method == "avg" and out.lots:
+                pool = out.lots[0]
+                pool.trade_id = None
+                pool.qty += lot.qty
+                pool.gross += lot.gross
+                pool.cost += lot.cost
+                pool.cost_rub += lot.cost_rub
+                pool.nkd += lot.nkd
+                pool.nkd_rub += lot.nkd_rub
+            else:
+                out.lots.append(lot)
+            continue
+
+        # продажа: закрываем лоты с начала очереди (для avg очередь — один общий лот)
+        need, closed = leg.qty, []
+        while need and out.lots:
+            head = out.lots[0]
+            closed.append(head.take(min(need, head.qty)))
+            need -= closed[-1].qty
+            if head.qty == 0:
+                out.lots.pop(0)
+        if need:
+            out.unmatched_qty += need
+            logger.warning("lots: trade %s sells %s more than held", leg.trade_id, need)
+        matched = leg.qty - need
+        if not matched:
+            continue
+        share = matched / leg.qty
+        proceeds = (leg.price * leg.qty - leg.commission) * share
+        nkd_received = leg.nkd * share
+        cost = sum(c.cost for c in closed)
+        cost_rub = sum(c.cost_rub for c in closed)
+        nkd_paid = sum(c.nkd for c in closed)
+        nkd_paid_rub = sum(c.nkd_rub for c in closed)
+        out.realized.append({
+            "trade_id": leg.trade_id,
+            "date": leg.date,
+            "qty": matched,
+            "proceeds": proceeds,
+            "cost": cost,
+            "pnl": proceeds - cost,
+            "proceeds_rub": proceeds * leg.fx,
+            "cost_rub": cost_rub,
+            "pnl_rub": proceeds * leg.fx - cost_rub,
+            "nkd_income": nkd_received - nkd_paid,
+            "nkd_income_rub": nkd_received * leg.fx - nkd_paid_rub,
+        })
+    return out
+
+
+def trade_legs(trades: Iterable, rate_at) -> list[Leg]:
+    """Строки trades одной бумаги -> ноги; rate_at(trade, нога, дата) — курс ноги на её дату."""
+    legs = []
+    for t in trades:
+        if t.buy_qty and t.buy_price is not None:
+            d = t.buy_date or t.date
+            legs.append(Leg(t.id, "buy", d, int(t.buy_qty), float(t.buy_price), float(t.buy_nkd or 0.0),
+                            float(t.buy_commission or 0.0), rate_at(t, "buy", d)))
+        if t.sell_qty and t.sell_price is not None:
+            d = t.sell_date or t.date
+            legs.append(Leg(t.id, "sell", d, int(t.sell_qty), float(t.sell_price), float(t.sell_nkd or 0.0),
+                            float(t.sell_commission or 0.0), rate_at(t, "sell", d)))
+    return legs
+
+
+def _rate_lookup(currencies: dict[int, Optional[str]], fx: Optional[FxCurve]):
+    def rate_at(t, side: str, d: Optional[date]) -> float:
+        own = leg_fx_rate(t, side)
+        if own:
+            return own
+        cur = currencies.get(t.bond_id)
+        if fx is None or (cur or "SUR").upper() in RUB_CODES:
+            return 1.0
+        rate = float(fx.at(cur, np.array([d.toordinal()]))[0]) if d else fx_for(cur, fx.current)
+        if rate is None or math.isnan(rate):
+            logger.warning("lots: no FX rate for %s on %s (trade %s), using 1.0", cur, d, t.id)
+            return 1.0
+        return rate
+    return rate_at
+
+
+async def rebuild_bonds(db: AsyncSession, bond_ids: Iterable[int]) -> int:
+    """Пересобирает лоты, закрытия и позиции указанных бумаг (без commit). Возвращает число бумаг."""
+    bond_ids = sorted(set(bond_ids))
+    if not bond_ids:
+        return 0
+    for model in (models.PositionLot, models.RealizedPnl, models.LotPosition):
+        await db.execute(delete(model).where(model.bond_id.in_(bond_ids)))
+
+    trades = (await db.execute(
+        select(models.Trade).where(models.Trade.bond_id.in_(bond_ids)).order_by(models.Trade.id)
+    )).scalars().all()
+    if not trades:
+        return len(bond_ids)
+    res = await db.execute(select(models.Bond.id, models.Bond.currency).where(models.Bond.id.in_(bond_ids)))
+    currencies = dict(res.all())
+    # история курсов нужна, только если у ноги валютной бумаги нет своего курса в сделке
+    need_fx = any(
+        (currencies.get(t.bond_id) or "SUR").upper() not in RUB_CODES
+        and any(qty and not leg_fx_rate(t, side) for side, qty in (("buy", t.buy_qty), ("sell", t.sell_qty)))
+        for t in trades
+    )
+    rate_at = _rate_lookup(currencies, await load_fx_curve(db, date.today()) if need_fx else None)
+
+    by_bond: dict[int, list] = {}
+    for t in trades:
+        by_bond.setdefault(t.bond_id, []).append(t)
+
+    now = datetime.utcnow()
+    lot_rows, realized_rows, position_rows = [], [], []
+    for bond_id, bond_trades in by_bond.items():
+        legs = trade_legs(bond_trades, rate_at)
+        for method in METHODS:
+            r = replay(legs, method)
+            for lot in r.lots:
+                lot_rows.append({
+                    "bond_id": bond_id, "method": method, "trade_id": lot.trade_id, "open_date": lot.open_date,
+                    "qty": lot.qty, "price": lot.gross / lot.qty, "cost": lot.cost, "cost_rub": lot.cost_rub,
+                    "nkd_paid": lot.nkd, "nkd_paid_rub": lot.nkd_rub,
+                })
+            for row in r.realized:
+                realized_rows.append({"bond_id": bond_id, "method": method, **row})
+            qty = sum(lot.qty for lot in r.lots)
+            position_rows.append({
+                "bond_id": bond_id, "method": method, "qty": qty,
+                "avg_price": sum(lot.gross for lot in r.lots) / qty if qty else None,
+                "cost": sum(lot.cost for lot in r.lots),
+                "cost_rub": sum(lot.cost_rub for lot in r.lots),
+                "realized_pnl": sum(x["pnl"] for x in r.realized),
+                "realized_pnl_rub": sum(x["pnl_rub"] for x in r.realized),
+                "nkd_income": sum(x["nkd_income"] for x in r.realized),
+                "nkd_income_rub": sum(x["nkd_income_rub"] for x in r.realized),
+                "unmatched_qty": r.unmatched_qty,
+                "computed_at": now,
+            })
+    for model, rows in ((models.PositionLot, lot_rows), (models.RealizedPnl, realized_rows),
+                        (models.LotPosition, position_rows)):
+        if rows:
+            await db.execute(insert(model), rows)
+    return len(bond_ids)
+
+
+@metrics.job("lots_refresh")
+async def refresh_dirty(db: AsyncSession) -> int:
+    """Пересчитывает бумаги, помеченные триггером в lots_dirty, и делает commit. Возвращает число бумаг."""
+    res = await db.execute(delete(models.LotsDirty).returning(models.LotsDirty.bond_id))
+    bond_ids = res.scalars().all()
+    if not bond_ids:
+        await db.rollback()
+        return 0
+    n = await rebuild_bonds(db, bond_ids)
+    await db.commit()
+    logger.info("lots: rebuilt %s bonds", n)
+    return n
+
+
+@metrics.job("lots_rebuild_all")
+async def rebuild_all(db: AsyncSession) -> int:
+    """Полный пересчёт (например, после загрузки истории курсов задним числом)."""
+    ids = union(select(models.Trade.bond_id), select(models.LotPosition.bond_id))
+    bond_ids = (await db.execute(ids)).scalars().all()
+    await db.execute(delete(models.LotsDirty))
+    n = await rebuild_bonds(db, bond_ids)
+    await db.commit()
+    return n
+
+
+def _round(v):
+    return round(v, 2) if isinstance(v, float) else v
+
+
+@router.get("/positions")
+async def get_positions(method: str = Query("fifo", pattern=_METHOD_PATTERN), db: AsyncSession = Depends(get_session)):
+    """Позиции по бумагам: количество, себестоимость открытых лотов и накопленный реализованный P&L."""
+    await refresh_dirty(db)
+    P = models.LotPosition
+    res = await db.execute(
+        select(P, models.Bond.secid, models.Bond.name, models.Bond.currency)
+        .join(models.Bond, models.Bond.id == P.bond_id)
+        .where(P.method == method)
+        .order_by(P.bond_id)
+    )
+    return [
+        {
+            "bond_id": p.bond_id, "secid": secid, "name": name, "currency": currency,
+            **{c: _round(getattr(p, c)) for c in (
+                "qty", "avg_price", "cost", "cost_rub", "realized_pnl", "realized_pnl_rub",
+                "nkd_income", "nkd_income_rub", "unmatched_qty",
+            )},
+        }
+        for p, secid, name, currency in res.all()
+    ]
+
+
+@router.get("/lots")
+async def get_lots(method: str = Query("fifo", pattern=_METHOD_PATTERN), bond_id: Optional[int] = None,
+                   db: AsyncSession = Depends(get_session)):
+    await refresh_dirty(db)
+    L = models.PositionLot
+    q = select(L).where(L.method == method).order_by(L.bond_id, L.id)
+    if bond_id is not None:
+        q = q.where(L.bond_id == bond_id)
+    return [
+        {
+            "bond_id": lot.bond_id, "trade_id": lot.trade_id, "open_date": lot.open_date,
+            **{c: _round(getattr(lot, c)) for c in ("qty", "price", "cost", "cost_rub", "nkd_paid", "nkd_paid_rub")},
+        }
+        for lot in (await db.execute(q)).scalars().all()
+    ]
+
+
+@router.get("/realized")
+async def get_realized(method: str = Query("fifo", pattern=_METHOD_PATTERN), bond_id: Optional[int] = None,
+                       date_from: Optional[date] = None, date_to: Optional[date] = None,
+                       db: AsyncSession = Depends(get_session)):
+    await refresh_dirty(db)
+    R = models.RealizedPnl
+    q = select(R).where(R.method == method).order_by(R.date, R.id)
+    if bond_id is not None:
+        q = q.where(R.bond_id == bond_id)
+    if date_from:
+        q = q.where(R.date >= date_from)
+    if date_to:
+        q = q.where(R.date <= date_to)
+    return [
+        {
+            "bond_id": r.bond_id, "trade_id": r.trade_id, "date": r.date,
+            **{c: _round(getattr(r, c)) for c in (
+                "qty", "proceeds", "cost", "pnl", "proceeds_rub", "cost_rub", "pnl_rub", "nkd_income", "nkd_income_rub",
+            )},
+        }
+        for r in (await db.execute(q)).scalars().all()
+    ]
+
+
+@router.post("/lots/rebuild")
+async def post_lots_rebuild(db: AsyncSession = Depends(get_session)):
+    return {"bonds": await rebuild_all(db)}
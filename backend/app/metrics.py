@@ -0,0 +1,207 @@
+# backend/app/metrics.py
+"""
+Метрики Prometheus и инструментирование горячих путей (GET /metrics).
+
+  - upstream_request_seconds{host, endpoint}  — внешние вызовы (MOEX ISS, corpbonds, ЦБ);
+  - db_query_seconds{query}                    — именованные запросы к БД (функции, внутри
+                                                 которых есть внешний вызов, меряются как job);
+  - cache_requests_total{cache, result}        — попадания/промахи кэшей;
+  - job_duration_seconds{job}                  — фоновые и массовые задачи обновления;
+  - event_loop_lag_seconds                     — задержка event loop (run_loop_lag_monitor);
+  - db_pool{stat}                               — состояние пула (database.pool_stats) на момент scrape;
+  - upstream_concurrency_limit / upstream_inflight / upstream_breaker_state / upstream_retry_tokens
+    {host} — состояние app.upstream на момент scrape; upstream_resilience_total{host, event} —
+    повторы, отказы открытого хоста, исчерпанный бюджет повторов, отданные из кэша ответы.
+
+Декораторы upstream/db_query/job и одноимённые контекстные менеджеры (*_timer).
+При METRICS_ENABLED=0 или без prometheus_client декораторы возвращают функцию
+без обёртки, а менеджеры — общий nullcontext, так что накладных расходов нет.
+Исключение — включённое профилирование (app.profiling): тогда те же обёртки
+пишут интервалы в отчёт профилируемого запроса.
+"""
+from fastapi import APIRouter, Response
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+import asyncio, functools, logging, os, time
+
+from app import profiling
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+    )
+except ImportError:  # prometheus_client не установлен — метрики выключены
+    CollectorRegistry = None
+
+METRICS_ENABLED = CollectorRegistry is not None and os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+# обёртки нужны и для метрик, и для waterfall профилировщика
+INSTRUMENTED = METRICS_ENABLED or profiling.PROFILING_ENABLED
+LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "1.0"))
+
+router = APIRouter(tags=["metrics"])
+
+_NULL = nullcontext()
+
+UPSTREAM_SECONDS = DB_QUERY_SECONDS = JOB_SECONDS = None
+
+if METRICS_ENABLED:
+    REGISTRY = CollectorRegistry()
+    _LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    UPSTREAM_SECONDS = Histogram(
+        "upstream_request_seconds", "Latency of upstream HTTP calls",
+        ("host", "endpoint", "outcome"), buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+    )
+    DB_QUERY_SECONDS = Histogram(
+        "db_query_seconds", "Duration of named database queries",
+        ("query",), buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+    )
+    CACHE_REQUESTS = Counter(
+        "cache_requests_total", "Cache lookups", ("cache", "result"), registry=REGISTRY,
+    )
+    JOB_SECONDS = Histogram(
+        "job_duration_seconds", "Duration of refresh/maintenance jobs",
+        ("job", "outcome"), buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600), registry=REGISTRY,
+    )
+    LOOP_LAG = Histogram(
+        "event_loop_lag_seconds", "Event loop scheduling lag",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5), registry=REGISTRY,
+    )
+    POOL = Gauge("db_pool", "DB connection pool stats (database.pool_stats)", ("stat",), registry=REGISTRY)
+    UPSTREAM_LIMIT = Gauge("upstream_concurrency_limit", "AIMD concurrency limit per upstream host",
+                           ("host",), registry=REGISTRY)
+    UPSTREAM_INFLIGHT = Gauge("upstream_inflight", "Upstream requests in flight", ("host",), registry=REGISTRY)
+    UPSTREAM_BREAKER = Gauge("upstream_breaker_state", "Circuit breaker: 0 closed, 1 half-open, 2 open",
+                             ("host",), registry=REGISTRY)
+    UPSTREAM_RETRY_TOKENS = Gauge("upstream_retry_tokens", "Retry budget tokens", ("host",), registry=REGISTRY)
+    UPSTREAM_EVENTS = Counter("upstream_resilience_total", "Retries, rejections and stale responses",
+                              ("host", "event"), registry=REGISTRY)
+
+
+# --- контекстные менеджеры ---
+
+@contextmanager
+def _observe(hist, labels: tuple, kind: str, with_outcome: bool = True):
+    trace = profiling.current()
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        t1 = time.perf_counter()
+        if hist is not None:
+            hist.labels(*labels, *((outcome,) if with_outcome else ())).observe(t1 - t0)
+        if trace is not None:
+            trace.add_span(kind, " ".join(labels), t0, t1, outcome)
+
+
+def _timer(hist, labels: tuple, kind: str, with_outcome: bool = True):
+    if METRICS_ENABLED or profiling.active():
+        return _observe(hist, labels, kind, with_outcome)
+    return _NULL
+
+
+def upstream_timer(host: str, endpoint: str):
+    return _timer(UPSTREAM_SECONDS, (host, endpoint), "upstream")
+
+
+def db_timer(query: str):
+    return _timer(DB_QUERY_SECONDS, (query,), "db", with_outcome=False)
+
+
+def job_timer(job: str):
+    return _timer(JOB_SECONDS, (job,), "job")
+
+
+def cache_hit(cache: str) -> None:
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels(cache=cache, result="hit").inc()
+
+
+def cache_miss(cache: str) -> None:
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels(cache=cache, result="miss").inc()
+
+
+def upstream_event(host: str, event: str) -> None:
+    if METRICS_ENABLED:
+        UPSTREAM_EVENTS.labels(host=host, event=event).inc()
+
+
+# --- декораторы (для async и обычных функций) ---
+
+def _decorator(timer_factory, *args):
+    def wrap(fn):
+        if not INSTRUMENTED:
+            return fn
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_inner(*a, **kw):
+                with timer_factory(*args):
+                    return await fn(*a, **kw)
+            return async_inner
+
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            with timer_factory(*args):
+                return fn(*a, **kw)
+        return inner
+    return wrap
+
+
+def upstream(host: str, endpoint: str):
+    """@metrics.upstream("iss.moex.com", "bondization") — время внешнего вызова."""
+    return _decorator(upstream_timer, host, endpoint)
+
+
+def db_query(name: str):
+    """@metrics.db_query("calc_trades_sum") — время именованного запроса."""
+    return _decorator(db_timer, name)
+
+
+def job(name: str):
+    """@metrics.job("fx_refresh") — длительность задачи обновления."""
+    return _decorator(job_timer, name)
+
+
+# --- event loop ---
+
+async def run_loop_lag_monitor(interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Фоновая задача: насколько позже запланированного просыпается sleep(interval)."""
+    if not METRICS_ENABLED:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - t0 - interval))
+
+
+# --- экспорт ---
+
+def render() -> Optional[bytes]:
+    if not METRICS_ENABLED:
+        return None
+    from app import database, upstream
+    for stat, value in database.pool_stats().items():
+        if isinstance(value, (int, float)):
+            POOL.labels(stat=stat).set(value)
+    breaker = {"closed": 0, "half_open": 1, "open": 2}
+    for host, st in upstream.host_stats().items():
+        UPSTREAM_LIMIT.labels(host=host).set(st["limit"])
+        UPSTREAM_INFLIGHT.labels(host=host).set(st["inflight"])
+        UPSTREAM_BREAKER.labels(host=host).set(breaker[st["state"]])
+        UPSTREAM_RETRY_TOKENS.labels(host=host).set(st["retry_tokens"])
+    return generate_latest(REGISTRY)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    body = render()
+    if body is None:
+        return Response("metrics disabled\n", status_code=404, media_type="text/plain")
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
@@ -1,12 +1,17 @@
 # backend/app/models.py
-from sqlalchemy import Column, String, Date, Float, Integer, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, String, Date, Float, Integer, ForeignKey, Boolean, DateTime, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 from datetime import datetime
 
 class Bond(Base):
     __tablename__ = "bonds"
+    __table_args__ = (
+        # сортировка и фильтр по сводному рейтингу с keyset-пагинацией
+        Index("ix_bonds_rating_notch_id", "rating_notch", "id"),
+    )
 
     id            = Column(Integer, primary_key=True, autoincrement=True)
     secid         = Column(String, unique=True, index=True, nullable=True)
@@ -25,13 +30,16 @@ class Bond(Base):
     amortization = Column(Boolean, nullable=True)     
     offer_date = Column(Date, nullable=True)  
     # связь с таблицей цен
-    prices = relationship("Price", back_populates="bond", cascade="all, delete-orphan")
+    prices = relationship("Price", back_populates="bond", cascade="all, delete-orphan", passive_deletes=True)
     akra_rating = Column(String, nullable=True)
     akra_forecast = Column(String, nullable=True)
     raexpert_rating = Column(String, nullable=True)
     raexpert_forecast = Column(String, nullable=True)
     nkr_rating = Column(String, nullable=True)
     nkr_forecast = Column(String, nullable=True)
+    # сводный рейтинг по трём агентствам (app.ratings): ступень 1 = AAA ... 21 = D и её запись
+    rating_notch = Column(Integer, nullable=True)
+    rating_composite = Column(String(8), nullable=True)
     currency = Column(String, nullable=True)         # код или название валюты
     currency_symbol = Column(String, nullable=True)  # ₽, $, €, ¥
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -44,28 +52,76 @@ class Bond(Base):
     year_open = Column(Float, nullable=True)
     stale_reason = Column(String, nullable=True) 
     nkd = Column(Float, nullable=True) 
+    face_value = Column(Float, nullable=True)        # текущий (непогашенный) номинал
+    amortizations = relationship("Amortization", back_populates="bond", cascade="all, delete-orphan")
+    # аналитика, рассчитанная локально (app.analytics)
+    duration = Column(Float, nullable=True)           # дюрация Маколея, лет
+    modified_duration = Column(Float, nullable=True)
+    convexity = Column(Float, nullable=True)
+    current_yield = Column(Float, nullable=True)      # %, годовой купон / чистая цена
 
+# История цен: секционирована по годам (RANGE по date), ключ (bond_id, date) без суррогатного id.
+# Секции price_history_yYYYY создаёт app.price_history.ensure_price_partitions,
+# строки вне созданных секций попадают в price_history_default.
 class Price(Base):
-    __tablename__ = "prices"
+    __tablename__ = "price_history"
+    __table_args__ = (
+        Index("ix_price_history_date_brin", "date", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
-    id      = Column(Integer, primary_key=True, autoincrement=True)
-    bond_id = Column(Integer, ForeignKey("bonds.id"), nullable=False)
-    date    = Column(Date, nullable=False)
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), primary_key=True)
+    date    = Column(Date, primary_key=True)
     value   = Column(Float, nullable=False)
 
     # обратная связь
     bond = relationship("Bond", back_populates="prices")
 
+# Недельные бары для старых лет (после свёртки дневной истории)
+class PriceWeekly(Base):
+    __tablename__ = "price_weekly"
+
+    bond_id    = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    open       = Column(Float, nullable=True)
+    high       = Column(Float, nullable=True)
+    low        = Column(Float, nullable=True)
+    close      = Column(Float, nullable=True)
+    # первый и последний день, вошедшие в бар: повторная свёртка недели дополняет его
+    first_date = Column(Date, nullable=True)
+    last_date  = Column(Date, nullable=True)
+
+# Дневная история индексов MOEX (RGBI, RUCBITR, RUGBITR, ...), дополняется только новыми датами
+class IndexHistory(Base):
+    __tablename__ = "index_history"
+
+    secid = Column(String(16), primary_key=True)
+    date  = Column(Date, primary_key=True)
+    close = Column(Float, nullable=False)
+
 # Хранить логи в БД
 class EventLog(Base):
     __tablename__ = "event_logs"
+    # keyset-пагинация по (timestamp, id) и фильтр по типу на сервере
+    __table_args__ = (
+        Index("ix_event_logs_ts_id", "timestamp", "id"),
+        Index("ix_event_logs_type_ts", "event_type", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     message = Column(String, nullable=False)
+    event_type = Column(String(32), nullable=False, default="ui", server_default="ui")
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="SET NULL"), nullable=True)
+    payload = Column(JSONB, nullable=True)
 
 class Trade(Base):
     __tablename__ = "trades"
+    # последняя цена покупки по бумаге (app.bonds): одна строка индекса на бумагу
+    __table_args__ = (
+        Index("ix_trades_bond_last_buy", "bond_id", text("buy_date DESC NULLS LAST"), text("id DESC"),
+              postgresql_where=text("buy_price IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bond_id = Column(Integer, ForeignKey("bonds.id"), nullable=False)
@@ -89,15 +145,32 @@ class Trade(Base):
 
 class Coupon(Base):
     __tablename__ = "coupons"
+    # ключ для INSERT ... ON CONFLICT в app.bulk
+    __table_args__ = (UniqueConstraint("bond_id", "date", name="uq_coupons_bond_date"),)
 
     id = Column(Integer, primary_key=True)
     bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"))
     date = Column(Date, nullable=False)
     value = Column(Float, nullable=True)
     currency = Column(String, nullable=True)
+    # значение рассчитано app.floaters по формуле флоатера, а не опубликовано MOEX
+    projected = Column(Boolean, nullable=False, default=False, server_default="false")
 
     bond = relationship("Bond", back_populates="coupons")
 
+# График погашения номинала (amortizations из bondization MOEX, включая погашение в дату MATURITY)
+class Amortization(Base):
+    __tablename__ = "amortizations"
+    __table_args__ = (UniqueConstraint("bond_id", "date", name="uq_amortizations_bond_date"),)
+
+    id = Column(Integer, primary_key=True)
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    value = Column(Float, nullable=True)        # сумма погашения на одну бумагу
+    value_prc = Column(Float, nullable=True)    # % от первоначального номинала
+
+    bond = relationship("Bond", back_populates="amortizations")
+
 class PortfolioSummaryDB(Base):
     __tablename__ = "portfolio_summary"
 
@@ -113,4 +186,162 @@ class FxRate(Base):
     __tablename__ = "fx_rates"
     currency = Column(String(8), primary_key=True)   # например "USD", "EUR"
     rate = Column(Float, nullable=False)             # рублей за 1 unit валюты
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Курсы по датам (для оценки портфеля в прошлом); fx_rates хранит только последний
+class FxRateHistory(Base):
+    __tablename__ = "fx_rate_history"
+    currency = Column(String(8), primary_key=True)
+    date = Column(Date, primary_key=True)
+    rate = Column(Float, nullable=False)             # рублей за 1 unit валюты
+
+# Материализованная дневная кривая портфеля (app.equity_curve), дополняется только новыми днями
+class PortfolioValueDaily(Base):
+    __tablename__ = "portfolio_value_daily"
+
+    date = Column(Date, primary_key=True)
+    value_rub = Column(Float, nullable=False)           # рыночная стоимость позиций с НКД
+    invested_rub = Column(Float, nullable=False)        # накопленные покупки с комиссиями
+    proceeds_rub = Column(Float, nullable=False)        # накопленная выручка от продаж
+    coupon_income_rub = Column(Float, nullable=False)   # накопленный купонный доход
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Самая ранняя дата изменённых сделок (триггер на trades, миграция 0008_equity_dirty):
+# extend_equity_curve пересчитывает кривую с неё
+class EquityDirty(Base):
+    __tablename__ = "equity_dirty"
+
+    since = Column(Date, primary_key=True)
+    marked_at = Column(DateTime, nullable=False, server_default=func.now())
+
+# Справочные ставки для флоатеров: KEYRATE (ключевая ставка ЦБ), RUONIA, ...
+# is_forecast — пользовательские допущения на будущие даты (после последнего факта)
+class ReferenceRate(Base):
+    __tablename__ = "reference_rates"
+
+    name = Column(String(16), primary_key=True)
+    date = Column(Date, primary_key=True)
+    rate = Column(Float, nullable=False)                 # % годовых
+    is_forecast = Column(Boolean, nullable=False, default=False, server_default="false")
+
+
+# Учёт лотов (app.lots): материализуется по бумаге, method — "fifo" или "avg"
+class LotPosition(Base):
+    __tablename__ = "lot_positions"
+
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), primary_key=True)
+    method = Column(String(8), primary_key=True)
+    qty = Column(Integer, nullable=False)                # в открытых лотах
+    avg_price = Column(Float, nullable=True)             # средняя цена открытых лотов без комиссий
+    cost = Column(Float, nullable=False)                 # себестоимость открытых лотов с комиссиями, в валюте бумаги
+    cost_rub = Column(Float, nullable=False)             # то же по курсам на даты покупок
+    realized_pnl = Column(Float, nullable=False)         # накопленный по закрытиям, в валюте бумаги
+    realized_pnl_rub = Column(Float, nullable=False)
+    nkd_income = Column(Float, nullable=False)           # НКД полученный минус уплаченный по закрытым лотам
+    nkd_income_rub = Column(Float, nullable=False)
+    unmatched_qty = Column(Integer, nullable=False, default=0)  # продано сверх позиции
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class PositionLot(Base):
+    __tablename__ = "position_lots"
+    __table_args__ = (Index("ix_position_lots_bond_method", "bond_id", "method"),)
+
+    id = Column(Integer, primary_key=True)
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), nullable=False)
+    method = Column(String(8), nullable=False)
+    trade_id = Column(Integer, nullable=True)            # сделка покупки; для avg — NULL (общий лот)
+    open_date = Column(Date, nullable=True)
+    qty = Column(Integer, nullable=False)                # остаток
+    price = Column(Float, nullable=False)
+    cost = Column(Float, nullable=False)                 # остаток себестоимости с комиссией
+    cost_rub = Column(Float, nullable=False)
+    nkd_paid = Column(Float, nullable=False)             # уплаченный НКД, приходящийся на остаток
+    nkd_paid_rub = Column(Float, nullable=False)
+
+class RealizedPnl(Base):
+    __tablename__ = "realized_pnl"
+    __table_args__ = (Index("ix_realized_pnl_bond_method", "bond_id", "method"),)
+
+    id = Column(Integer, primary_key=True)
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), nullable=False)
+    method = Column(String(8), nullable=False)
+    trade_id = Column(Integer, nullable=False)           # сделка продажи
+    date = Column(Date, nullable=True)
+    qty = Column(Integer, nullable=False)
+    proceeds = Column(Float, nullable=False)             # выручка за вычетом комиссии
+    cost = Column(Float, nullable=False)                 # себестоимость закрытых лотов
+    pnl = Column(Float, nullable=False)
+    proceeds_rub = Column(Float, nullable=False)
+    cost_rub = Column(Float, nullable=False)
+    pnl_rub = Column(Float, nullable=False)              # включая курсовую разницу
+    nkd_income = Column(Float, nullable=False)
+    nkd_income_rub = Column(Float, nullable=False)
+
+# Бумаги, по которым изменились сделки (триггер на trades), — очередь для app.lots.refresh_dirty
+class LotsDirty(Base):
+    __tablename__ = "lots_dirty"
+
+    bond_id = Column(Integer, primary_key=True)
+    marked_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+# Каталог всех облигаций MOEX для скринера (app.screener), обновляется из поискового каталога ISS
+class BondCatalog(Base):
+    __tablename__ = "bond_catalog"
+    __table_args__ = (
+        # сортировки с keyset-пагинацией: (значение, secid) в обе стороны
+        Index("ix_bond_catalog_ytm_secid", "ytm", "secid"),
+        Index("ix_bond_catalog_duration_secid", "duration", "secid"),
+        Index("ix_bond_catalog_maturity_secid", "maturity_date", "secid"),
+        # частые фильтры: валюта + рейтинговая корзина + срок
+        Index("ix_bond_catalog_currency_rating_maturity", "currency", "rating_bucket", "maturity_date"),
+    )
+
+    secid = Column(String, primary_key=True)
+    isin = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    emitent = Column(String, nullable=True)
+    market = Column(String, nullable=True)
+    currency = Column(String(8), nullable=True)
+    coupon = Column(Float, nullable=True)                # % годовых
+    coupon_period = Column(Integer, nullable=True)       # дней
+    maturity_date = Column(Date, nullable=True)
+    offer_date = Column(Date, nullable=True)
+    amortization = Column(Boolean, nullable=True)
+    rating = Column(String, nullable=True)
+    rating_bucket = Column(Integer, nullable=True)       # 1 = AAA ... 7 = CCC и ниже, NULL — нет рейтинга
+    face_value = Column(Float, nullable=True)
+    price = Column(Float, nullable=True)                 # % от номинала
+    accrued = Column(Float, nullable=True)
+    ytm = Column(Float, nullable=True)                   # %, к оферте или погашению, рассчитана локально
+    duration = Column(Float, nullable=True)              # лет, Маколея
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Изменения рейтингов агентств (app.ratings): строка на каждую смену рейтинга или прогноза,
+# последняя строка по (bond_id, agency) — текущее состояние
+class RatingHistory(Base):
+    __tablename__ = "rating_history"
+    __table_args__ = (
+        Index("ix_rating_history_bond_agency_changed", "bond_id", "agency", "changed_at"),
+        Index("ix_rating_history_changed_at", "changed_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bond_id = Column(Integer, ForeignKey("bonds.id", ondelete="CASCADE"), nullable=False)
+    agency = Column(String(16), nullable=False)          # akra, raexpert, nkr
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    rating = Column(String, nullable=True)               # None — рейтинг отозван
+    forecast = Column(String, nullable=True)
+    notch = Column(Integer, nullable=True)
+    prev_rating = Column(String, nullable=True)
+    prev_forecast = Column(String, nullable=True)
+    prev_notch = Column(Integer, nullable=True)
+
+
+# Бумаги, у которых изменились рейтинговые колонки (триггер на bonds), — очередь для app.ratings.refresh_dirty
+class RatingsDirty(Base):
+    __tablename__ = "ratings_dirty"
+
+    bond_id = Column(Integer, primary_key=True)
+    marked_at = Column(DateTime, nullable=False, server_default=func.now())
\ No newline at end of file
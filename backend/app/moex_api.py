@@ -1,100 +1,151 @@
 # backend/app/moex_api.py
-import httpx, hashlib, requests, logging
+import httpx, hashlib, requests, logging, asyncio, os, time
 from fastapi import APIRouter, Query
 from typing import Optional, Any, Dict, Tuple, List, Iterable
 from datetime import date, datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas import BondOut
 from statistics import median
+from app import metrics, upstream
+from app.moex_client import MOEX_BASE
 
-BASE_MARKET_URL = "https://iss.moex.com/iss/engines/stock/markets/{market}/securities.json"
+BASE_MARKET_URL = MOEX_BASE + "/engines/stock/markets/{market}/securities.json"
 logger = logging.getLogger("app.moex_open")
 
+# Поисковый индекс: все облигации рынков ISS в памяти процесса, обновляется раз в
+# SEARCH_CATALOG_TTL секунд (или прогревом на старте, app.startup). Раньше каждый
+# поисковый запрос заново выкачивал все рынки.
+SEARCH_MARKETS = ("bonds", "corporate_bonds", "municipal_bonds", "subfederal_bonds", "ofz")
+SEARCH_CATALOG_TTL = int(os.getenv("SEARCH_CATALOG_TTL", "21600"))
+_catalog: Dict[str, Any] = {"rows": None, "loaded_at": 0.0}
+_catalog_lock = asyncio.Lock()
+
+
+def _parse_iso_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+@metrics.upstream("iss.moex.com", "securities_search")
+async def _fetch_search_catalog() -> List[Tuple[str, Dict]]:
+    """Выкачивает все рынки SEARCH_MARKETS: [(blob для поиска, карточка)], без дублей по SECID."""
+    seen = set()
+    rows_out = []
+
+    for market in SEARCH_MARKETS:
+        start = 0
+        limit = 5000
+
+        while True:
+            url = BASE_MARKET_URL.format(market=market)
+            params = {
+                "limit": limit,
+                "start": start,
+                "iss.meta": "off",
+                "iss.only": "securities"
+            }
+            logger.debug("search: fetching market=%s start=%s", market, start)
+            resp = await upstream.get("iss.moex.com", url, params=params, timeout=60)
+            resp.raise_for_status()
+            tbl = resp.json().get("securities", {})
+            cols = tbl.get("columns", [])
+            rows = tbl.get("data", [])
+
+            if not rows:
+                break
+
+            idx = {name: i for i, name in enumerate(cols)}
+
+            for r in rows:
+                secid   = r[idx["SECID"]]
+                if secid in seen:
+                    continue
+                seen.add(secid)
+                isin    = r[idx["ISIN"]]
+                shortnm = r[idx.get("SHORTNAME", -1)] or ""
+                secname = r[idx.get("SECNAME", -1)] or ""
+                emitent = r[idx["emitent_title"]] if "emitent_title" in idx else ""
+                coupon = r[idx["COUPONPERCENT"]] if "COUPONPERCENT" in idx else None
+                mat_col = "MATURITYDATE" if "MATURITYDATE" in idx else "MATDATE"
+                maturity_date = _parse_iso_date(r[idx[mat_col]]) if mat_col in idx else None
+                rating = r[idx["RATING"]] if "RATING" in idx else None
+                currency = r[idx["FACEUNIT"]] if "FACEUNIT" in idx else None
+                amortization = r[idx["AMORTIZATION"]] if "AMORTIZATION" in idx else None
+                offer_date = _parse_iso_date(r[idx["OFFERDATE"]]) if "OFFERDATE" in idx else None
+                # для скринера (app.screener): цена в % номинала, номинал, купон в деньгах и период, НКД
+                num = lambda col: r[idx[col]] if col in idx else None
+                price = num("PREVWAPRICE") or num("PREVPRICE")
+                # Собираем все поля для поиска
+                blob_parts = [
+                    emitent or "",
+                    shortnm or "",
+                    secname or "",
+                    isin or "",
+                    secid or ""
+                ]
+                blob = " ".join(blob_parts).lower()
+                rows_out.append((blob, {
+                    "secid": secid,
+                    "isin": isin,
+                    "name": shortnm or secname,
+                    "emitent": emitent,
+                    "market": market,
+                    "coupon": coupon or 0.0,
+                    "maturity_date": maturity_date,
+                    "rating": rating,
+                    "currency": currency,
+                    "amortization": amortization,
+                    "offer_date": offer_date,
+                    "price": price,
+                    "face_value": num("FACEVALUE"),
+                    "coupon_value": num("COUPONVALUE"),
+                    "coupon_period": num("COUPONPERIOD"),
+                    "accrued": num("ACCRUEDINT"),
+                }))
+
+            if len(rows) < limit:
+                break
+            start += limit
+
+    logger.debug("search: catalog loaded, %s bonds", len(rows_out))
+    return rows_out
+
+
+async def get_search_catalog(force: bool = False) -> List[Tuple[str, Dict]]:
+    """Каталог из памяти; при истёкшем TTL перезагружается одним запросом (остальные ждут его)."""
+    rows = _catalog["rows"]
+    if not force and rows is not None and time.monotonic() - _catalog["loaded_at"] < SEARCH_CATALOG_TTL:
+        metrics.cache_hit("search_catalog")
+        return rows
+    async with _catalog_lock:
+        rows = _catalog["rows"]
+        if not force and rows is not None and time.monotonic() - _catalog["loaded_at"] < SEARCH_CATALOG_TTL:
+            metrics.cache_hit("search_catalog")
+            return rows
+        metrics.cache_miss("search_catalog")
+        try:
+            fresh = await _fetch_search_catalog()
+        except Exception as exc:
+            if rows is None:
+                raise
+            # ISS недоступен — ищем по прежнему каталогу, следующая попытка через минуту
+            logger.warning("search: catalog refresh failed (%s), serving previous", exc)
+            _catalog["loaded_at"] = time.monotonic() - SEARCH_CATALOG_TTL + 60
+            return rows
+        _catalog.update(rows=fresh, loaded_at=time.monotonic())
+        return fresh
+
+
 async def _search_bonds_by_markets(query: str) -> List[Dict]:
-    markets = ["bonds", "corporate_bonds", "municipal_bonds", "subfederal_bonds", "ofz"]
     q_lower = (query or "").strip().lower()
-    seen = set()
-    results = []
-
-    async with httpx.AsyncClient(timeout=60) as client:
-        for market in markets:
-            start = 0
-            limit = 5000
-
-            while True:
-                url = BASE_MARKET_URL.format(market=market)
-                params = {
-                    "limit": limit,
-                    "start": start,
-                    "iss.meta": "off",
-                    "iss.only": "securities"
-                }
-                print(f"DEBUG: fetching market='{market}' start={start}")
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                tbl = resp.json().get("securities", {})
-                cols = tbl.get("columns", [])
-                rows = tbl.get("data", [])
-
-                if not rows:
-                    break
-
-                idx = {name: i for i, name in enumerate(cols)}
-
-                for r in rows:
-                    secid   = r[idx["SECID"]]
-                    isin    = r[idx["ISIN"]]
-                    shortnm = r[idx.get("SHORTNAME", -1)] or ""
-                    secname = r[idx.get("SECNAME", -1)] or ""
-                    emitent = r[idx["emitent_title"]] if "emitent_title" in idx else ""
-                    coupon = r[idx["COUPONPERCENT"]] if "COUPONPERCENT" in idx else None
-                    maturity_date = None
-                    if "MATURITYDATE" in idx and r[idx["MATURITYDATE"]]:
-                        try:
-                            maturity_date = datetime.strptime(r[idx["MATURITYDATE"]], "%Y-%m-%d").date()
-                        except ValueError:
-                            pass
-                    rating = r[idx["RATING"]] if "RATING" in idx else None
-                    currency = r[idx["FACEUNIT"]] if "FACEUNIT" in idx else None
-                    amortization = r[idx["AMORTIZATION"]] if "AMORTIZATION" in idx else None
-                    offer_date = None
-                    if "OFFERDATE" in idx and r[idx["OFFERDATE"]]:
-                        try:
-                            offer_date = datetime.strptime(r[idx["OFFERDATE"]], "%Y-%m-%d").date()
-                        except ValueError:
-                            pass
-                    # Собираем все поля для поиска
-                    blob_parts = [
-                        emitent or "",
-                        shortnm or "",
-                        secname or "",
-                        isin or "",
-                        secid or ""
-                    ]
-                    blob = " ".join(blob_parts).lower()
-
-                    # Если query пустой — берём всё, иначе фильтруем
-                    if (not q_lower or q_lower in blob) and secid not in seen:
-                        seen.add(secid)
-                        results.append({
-                            "secid": secid,
-                            "isin": isin,
-                            "name": shortnm or secname,
-                            "emitent": emitent,
-                            "market": market,
-                            "coupon": coupon or 0.0,
-                            "maturity_date": maturity_date,
-                            "rating": rating,
-                            "currency": currency,
-                            "amortization": amortization,
-                            "offer_date": offer_date
-                        })
-
-                if len(rows) < limit:
-                    break
-                start += limit
-
-    print(f"DEBUG: found {len(results)} bonds total")
+    catalog = await get_search_catalog()
+    # Если query пустой — берём всё, иначе фильтруем; копии — вызывающий код может менять карточки
+    results = [dict(item) for blob, item in catalog if not q_lower or q_lower in blob]
+    logger.debug("search: found %s bonds total", len(results))
     return results
 
 # поиск значения НКД
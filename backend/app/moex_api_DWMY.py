@@ -6,6 +6,8 @@ from datetime import date, datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas import BondOut
 from statistics import median
+from app import metrics, price_history, upstream
+from app.moex_client import MOEX_BASE
 
 logger = logging.getLogger("app.moex_open")
 
@@ -13,12 +15,12 @@ logger = logging.getLogger("app.moex_open")
 HTTP_TIMEOUT = 10.0
 LOOKAHEAD_DAYS = 5  # для week/month пробуем следующие N дней
 
+@metrics.upstream("iss.moex.com", "dwmy_history")
 async def fetch_json(url: str, timeout: float = HTTP_TIMEOUT) -> Optional[dict]:
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            return r.json()
+        r = await upstream.get("iss.moex.com", url, timeout=timeout, stale_ok=True)
+        r.raise_for_status()
+        return r.json()
     except Exception:
         return None
 
@@ -29,7 +31,7 @@ async def get_day_open_from_securities(secid: str) -> Optional[float]:
     If OPEN is missing in the first marketdata row, scan following rows
     and pick the first row with a valid OPEN and a usable FACE value.
     """
-    url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/securities/{secid}.json"
+    url = f"{MOEX_BASE}/engines/stock/markets/bonds/securities/{secid}.json"
     data = await fetch_json(url)
     if not data:
         return None
@@ -125,7 +127,7 @@ async def get_day_open_from_securities(secid: str) -> Optional[float]:
 
 # Получение history OPEN для конкретной даты (history.data[0][14], history.data[0][31])
 async def get_history_open_for_date(secid: str, date_iso: str) -> Optional[float]:
-    url = f"https://iss.moex.com/iss/history/engines/stock/markets/bonds/securities/{secid}.json?from={date_iso}&till={date_iso}"
+    url = f"{MOEX_BASE}/history/engines/stock/markets/bonds/securities/{secid}.json?from={date_iso}&till={date_iso}"
     data = await fetch_json(url)
     if not data:
         return None
@@ -199,23 +201,43 @@ async def _find_history_with_lookahead(secid: str, date_ref: datetime, lookahead
     #                 secid, lookahead_days, date_ref.date().isoformat(), ",".join(checked_dates))
     return found
 
-async def get_week_open(secid: str, today: Optional[datetime] = None) -> Optional[float]:
+async def _open_on_or_after(
+    secid: str, target: datetime, session: Optional[AsyncSession], bond_id: Optional[int]
+) -> Optional[float]:
+    """
+    Цена на дату target (или в следующие LOOKAHEAD_DAYS дней): сначала из price_history —
+    если передана сессия и бумага есть в БД, — и только если там пусто, с ISS.
+    """
+    if session is not None and bond_id is not None:
+        val = await price_history.get_price_on_or_after(session, bond_id, target.date(), LOOKAHEAD_DAYS)
+        if val is not None:
+            return val
+    return await _find_history_with_lookahead(secid, target, LOOKAHEAD_DAYS)
+
+async def get_week_open(
+    secid: str, today: Optional[datetime] = None,
+    session: Optional[AsyncSession] = None, bond_id: Optional[int] = None,
+) -> Optional[float]:
     if today is None:
         today = datetime.utcnow()
     target = today - timedelta(days=7)
-    return await _find_history_with_lookahead(secid, target, LOOKAHEAD_DAYS)
+    return await _open_on_or_after(secid, target, session, bond_id)
 
-async def get_month_open(secid: str, today: Optional[datetime] = None) -> Optional[float]:
+async def get_month_open(
+    secid: str, today: Optional[datetime] = None,
+    session: Optional[AsyncSession] = None, bond_id: Optional[int] = None,
+) -> Optional[float]:
     if today is None:
         today = datetime.utcnow()
     target = today - timedelta(days=30)
-    return await _find_history_with_lookahead(secid, target, LOOKAHEAD_DAYS)
+    return await _open_on_or_after(secid, target, session, bond_id)
 
-async def get_year_open(secid: str, today: Optional[datetime] = None) -> Optional[float]:
+async def get_year_open(
+    secid: str, today: Optional[datetime] = None,
+    session: Optional[AsyncSession] = None, bond_id: Optional[int] = None,
+) -> Optional[float]:
     if today is None:
         today = datetime.utcnow()
     # look for exact date one year ago, but allow lookahead scanning similar to week/month logic
     target = today - timedelta(days=365)
-    val = await _find_history_with_lookahead(secid, target, LOOKAHEAD_DAYS)
-    return val
-
+    return await _open_on_or_after(secid, target, session, bond_id)
@@ -1,14 +1,16 @@
 # backend/app/moex_client.py
-import httpx, logging, re
+import logging, os, re
 from pydantic import BaseModel, Field
 from typing import Any, Dict, List, Optional
 from datetime import datetime, date, timedelta
 from types import SimpleNamespace
 from bs4 import BeautifulSoup
+from app import metrics, upstream
 
 _ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
 
-MOEX_BASE = "https://iss.moex.com/iss"
+# MOEX_ISS_BASE переопределяет адрес ISS (например, локальный стаб для бенчмарков)
+MOEX_BASE = os.getenv("MOEX_ISS_BASE", "https://iss.moex.com/iss").rstrip("/")
 
 MARKETS = [
     "bonds",
@@ -24,90 +26,90 @@ class BondMoex(BaseModel):
     record: Dict[str, Any]
 
 
+@metrics.upstream("iss.moex.com", "securities")
 async def fetch_bond_from_moex(secid_or_isin: str):
     secid_or_isin = (secid_or_isin or "").strip().upper()
     if not secid_or_isin:
         return None
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        # Попытка считать как SECID: прямо по странице бумаги в каждом рынке
-        for market in MARKETS:
-            url = f"{MOEX_BASE}/engines/stock/markets/{market}/securities/{secid_or_isin}.json"
-            try:
-                r = await client.get(url, params={"iss.meta": "off"})
-            except Exception:
-                # сетевые ошибки — пробуем следующий рынок
-                continue
-
-            # если ресурс не найден на этом рынке — идём дальше
-            if r.status_code == 404:
-                continue
-
-            try:
-                r.raise_for_status()
-            except Exception:
-                # другие ошибки статуса — пробуем следующий рынок
-                continue
+    # Попытка считать как SECID: прямо по странице бумаги в каждом рынке.
+    # UpstreamUnavailable (ISS открыт breaker'ом, кэша нет) не глотаем: это не "не найдено"
+    for market in MARKETS:
+        url = f"{MOEX_BASE}/engines/stock/markets/{market}/securities/{secid_or_isin}.json"
+        r = await upstream.get("iss.moex.com", url, params={"iss.meta": "off"}, stale_ok=True)
 
-            try:
-                data = r.json()
-            except Exception:
-                continue
+        # если ресурс не найден на этом рынке — идём дальше
+        if r.status_code == 404:
+            continue
 
-            # данные секьюрити могут быть в data["securities"] или в других секциях,
-            # но в странице конкретной бумаги обычно есть "securities" и "marketdata"
-            rec = {}
-            if data.get("securities") and data["securities"].get("data"):
-                cols = data["securities"].get("columns", [])
-                row = data["securities"]["data"][0]
-                rec.update(dict(zip(cols, row)))
-
-            # подтягиваем marketdata если есть
-            if data.get("marketdata"):
-                md_cols = data["marketdata"].get("columns", [])
-                md_data = data["marketdata"].get("data") or []
-                if md_data:
-                    md_row = dict(zip(md_cols, md_data[0]))
-                    rec.update(md_row)
-
-                    # пересчёт LAST и LCURRENTPRICE в абсолют (умножаем на FACEVALUE/100)
-                    try:
-                        facevalue = float(rec.get("FACEVALUE") or 1000)
-                    except Exception:
-                        facevalue = 1000.0
-                    try:
-                        if md_row.get("LAST") is not None:
-                            rec["LAST_ABS"] = float(md_row["LAST"]) * facevalue / 100.0
-                    except Exception:
-                        pass
-                    try:
-                        if md_row.get("LCURRENTPRICE") is not None:
-                            rec["LCURRENTPRICE_ABS"] = float(md_row["LCURRENTPRICE"]) * facevalue / 100.0
-                    except Exception:
-                        pass
-
-            # Если у нас есть хотя бы SECID или ISIN — считаем результат найденным
-            if rec:
-                return SimpleNamespace(record=rec)
-
-        # Fallback: поиск по ISIN на общем endpoint
-        # Если входной идентификатор уже был SECID, но не найден — всё равно пробуем поиск по isin
         try:
-            url = f"{MOEX_BASE}/securities.json"
-            params = {"isin": secid_or_isin, "iss.meta": "off"}
-            r = await client.get(url, params=params)
             r.raise_for_status()
+        except Exception:
+            # другие ошибки статуса — пробуем следующий рынок
+            continue
+
+        try:
             data = r.json()
-            sec_data = data.get("securities", {})
-            if sec_data.get("data"):
-                rec = dict(zip(sec_data.get("columns", []), sec_data["data"][0]))
-                return SimpleNamespace(record=rec)
         except Exception:
-            pass
+            continue
+
+        # данные секьюрити могут быть в data["securities"] или в других секциях,
+        # но в странице конкретной бумаги обычно есть "securities" и "marketdata"
+        rec = {}
+        if data.get("securities") and data["securities"].get("data"):
+            cols = data["securities"].get("columns", [])
+            row = data["securities"]["data"][0]
+            rec.update(dict(zip(cols, row)))
+
+        # подтягиваем marketdata если есть
+        if data.get("marketdata"):
+            md_cols = data["marketdata"].get("columns", [])
+            md_data = data["marketdata"].get("data") or []
+            if md_data:
+                md_row = dict(zip(md_cols, md_data[0]))
+                rec.update(md_row)
+
+                # пересчёт LAST и LCURRENTPRICE в абсолют (умножаем на FACEVALUE/100)
+                try:
+                    facevalue = float(rec.get("FACEVALUE") or 1000)
+                except Exception:
+                    facevalue = 1000.0
+                try:
+                    if md_row.get("LAST") is not None:
+                        rec["LAST_ABS"] = float(md_row["LAST"]) * facevalue / 100.0
+                except Exception:
+                    pass
+                try:
+                    if md_row.get("LCURRENTPRICE") is not None:
+                        rec["LCURRENTPRICE_ABS"] = float(md_row["LCURRENTPRICE"]) * facevalue / 100.0
+                except Exception:
+                    pass
+
+        # Если у нас есть хотя бы SECID или ISIN — считаем результат найденным
+        if rec:
+            return SimpleNamespace(record=rec)
+
+    # Fallback: поиск по ISIN на общем endpoint
+    # Если входной идентификатор уже был SECID, но не найден — всё равно пробуем поиск по isin
+    try:
+        url = f"{MOEX_BASE}/securities.json"
+        params = {"isin": secid_or_isin, "iss.meta": "off"}
+        r = await upstream.get("iss.moex.com", url, params=params, stale_ok=True)
+        r.raise_for_status()
+        data = r.json()
+        sec_data = data.get("securities", {})
+        if sec_data.get("data"):
+            rec = dict(zip(sec_data.get("columns", []), sec_data["data"][0]))
+            return SimpleNamespace(record=rec)
+    except upstream.UpstreamUnavailable:
+        raise
+    except Exception:
+        pass
 
     return 
 
 
+@metrics.upstream("iss.moex.com", "bondization_coupons")
 async def fetch_coupons_from_moex(secid: str) -> list[dict]:
     """
     Возвращает список купонов в формате:
@@ -115,11 +117,10 @@ async def fetch_coupons_from_moex(secid: str) -> list[dict]:
     - Берём все купоны начиная с года назад и до будущего
     - Добавляем флаг is_past (True если купон <= сегодня)
     """
-    url = f"https://iss.moex.com/iss/securities/{secid}/bondization.json"
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        data = r.json()
+    url = f"{MOEX_BASE}/securities/{secid}/bondization.json"
+    r = await upstream.get("iss.moex.com", url, stale_ok=True)
+    r.raise_for_status()
+    data = r.json()
 
     coupons = []
     cols = data["coupons"]["columns"]
@@ -167,24 +168,67 @@ async def fetch_coupons_from_moex(secid: str) -> list[dict]:
     return coupons
 
 
+@metrics.upstream("iss.moex.com", "bondization_amortizations")
+async def fetch_amortizations_from_moex(secid: str) -> list[dict]:
+    """
+    График погашения номинала из bondization:
+    [{"date": date, "value": float|None, "value_prc": float|None}, ...]
+    Последняя запись — погашение остатка в дату MATURITY.
+    """
+    url = f"{MOEX_BASE}/securities/{secid}/bondization.json"
+    r = await upstream.get("iss.moex.com", url, stale_ok=True,
+                           params={"iss.meta": "off", "iss.only": "amortizations", "limit": "unlimited"})
+    r.raise_for_status()
+    data = r.json()
+
+    section = data.get("amortizations") or {}
+    cols = section.get("columns") or []
+    out = []
+    for row in section.get("data") or []:
+        row_dict = dict(zip(cols, row))
+        try:
+            d = date.fromisoformat(row_dict.get("amortdate") or "")
+        except ValueError:
+            continue
+
+        def _num(v):
+            if v in (None, ""):
+                return None
+            try:
+                return float(str(v).replace(",", "."))
+            except (TypeError, ValueError):
+                return None
+
+        out.append({"date": d, "value": _num(row_dict.get("value")), "value_prc": _num(row_dict.get("valueprc"))})
+    out.sort(key=lambda a: a["date"])
+    return out
+
+
 HTTP_TIMEOUT = 10.0
 
 async def compute_last_price_from_iss(secid: str, timeout: float = HTTP_TIMEOUT) -> Optional[float]:
+    """Последняя цена бумаги в валюте номинала (FACEVALUE * цена% / 100) или None."""
+    quote = await fetch_quote_from_iss(secid, timeout)
+    return quote["last_price"] if quote else None
+
+
+@metrics.upstream("iss.moex.com", "securities_last_price")
+async def fetch_quote_from_iss(secid: str, timeout: float = HTTP_TIMEOUT) -> Optional[dict]:
     """
+    {"last_price", "face_value", "nkd"} со страницы бумаги или None (нет ответа или номинала).
     Логика:
     - Запрос: https://iss.moex.com/iss/engines/stock/markets/bonds/securities/[secid].json
     - Ищем FACEVALUE в секции securities; если в первой строке значение None/0 ищем в следующей строке
     - Ищем LAST в секции marketdata; проходим строки по порядку и берём первый ненулевой непустой LAST
     - Если LAST пуст/0 для всех строк, берём PREVPRICE из секции securities (по строкам, первой найденной)
-    - Вычисляем last_price = FACEVALUE * (price_percent / 100)
-    - Возвращаем float или None
+    - Вычисляем last_price = FACEVALUE * (price_percent / 100); без цены — None
+    - face_value — FACEVALUE (текущий непогашенный номинал), nkd — ACCRUEDINT
     """
-    url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/securities/{secid}.json"
+    url = f"{MOEX_BASE}/engines/stock/markets/bonds/securities/{secid}.json"
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            payload = r.json()
+        r = await upstream.get("iss.moex.com", url, timeout=timeout, stale_ok=True)
+        r.raise_for_status()
+        payload = r.json()
     except Exception:
         return None
 
@@ -269,10 +313,16 @@ async def compute_last_price_from_iss(secid: str, timeout: float = HTTP_TIMEOUT)
                 last_pct = pvf
                 break
 
-    if last_pct is None:
-        return None
+    nkd = None
+    nkd_idx = sec_map.get("ACCRUEDINT")
+    if nkd_idx is not None:
+        for row in sec_rows:
+            if row and nkd_idx < len(row) and row[nkd_idx] is not None:
+                try:
+                    nkd = float(row[nkd_idx])
+                except (TypeError, ValueError):
+                    continue
+                break
 
-    try:
-        return round((last_pct * face) / 100.0, 6)
-    except Exception:
-        return None
\ No newline at end of file
+    last_price = round((last_pct * face) / 100.0, 6) if last_pct is not None else None
+    return {"last_price": last_price, "face_value": face, "nkd": nkd}
\ No newline at end of file
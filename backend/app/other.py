@@ -3,31 +3,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, literal
 from sqlalchemy.sql import case
 from app.models import Bond, Trade
-from app import models, schemas
+from app import models, schemas, bulk, metrics, upstream
 from app.database import async_session
 from urllib.parse import urlencode
 import xml.etree.ElementTree as ET
 from typing import Sequence, Optional
 from datetime import datetime
-import asyncio, logging, json 
+import asyncio, logging, json, os
 
 logger = logging.getLogger(__name__)
 
+@metrics.db_query("bonds_with_weights")
 async def get_bonds_with_weights(db: AsyncSession):
-    # 1. Считаем общую стоимость портфеля — защищённо, используем COALESCE чтобы не получить None
-    total_value_result = await db.execute(
-        select(func.coalesce(func.sum(Trade.buy_qty * Bond.last_price), 0.0))
-        .select_from(Trade)
-        .join(Bond, Bond.id == Trade.bond_id)
-    )
-    total_value = float(total_value_result.scalar() or 0.0)
-
-    # 2. Считаем позиции по каждой бумаге — также защищённо: COALESCE для сумм
+    # 1. Позиции по каждой бумаге: нетто-количество (покупки минус продажи), закрытые не попадают
+    net_qty = func.coalesce(func.sum(Trade.buy_qty), 0) - func.coalesce(func.sum(Trade.sell_qty), 0)
     portfolio_result = await db.execute(
         select(
             Trade.bond_id,
-            func.coalesce(func.sum(Trade.buy_qty), 0).label("total_qty"),
-            func.coalesce(func.sum(Trade.buy_qty * Bond.last_price), 0.0).label("bond_value"),
+            net_qty.label("total_qty"),
+            (net_qty * func.coalesce(Bond.last_price, 0.0)).label("bond_value"),
             Bond.secid,
             Bond.name,
             func.coalesce(Bond.last_price, 0.0).label("last_price")
@@ -35,9 +29,13 @@ async def get_bonds_with_weights(db: AsyncSession):
         .select_from(Trade)
         .join(Bond, Bond.id == Trade.bond_id)
         .group_by(Trade.bond_id, Bond.secid, Bond.name, Bond.last_price)
+        .having(net_qty > 0)
     )
     portfolio = portfolio_result.all()
 
+    # 2. Общая стоимость портфеля — сумма по тем же позициям
+    total_value = sum(float(bond_value or 0.0) for _, _, bond_value, *_ in portfolio)
+
     # 3. Формируем результат, защищаясь от None и конвертируя типы
     result = []
     for bond_id, total_qty, bond_value, secid, name, last_price in portfolio:
@@ -60,8 +58,10 @@ async def get_bonds_with_weights(db: AsyncSession):
 
     return result
 
-CBR_URL = "https://www.cbr.ru/scripts/XML_daily.asp"
+CBR_BASE = os.getenv("CBR_BASE", "https://www.cbr.ru").rstrip("/")
+CBR_URL = f"{CBR_BASE}/scripts/XML_daily.asp"
 
+@metrics.upstream("www.cbr.ru", "xml_daily")
 async def fetch_fx_rates(currencies: Sequence[str]) -> dict:
     """
     Возвращает mapping currency -> rate (RUB per 1 unit of currency) или None.
@@ -72,15 +72,12 @@ async def fetch_fx_rates(currencies: Sequence[str]) -> dict:
 
     currencies = [c.upper() for c in currencies]
 
-    def _sync_get():
-        import requests
-        # запрос без параметра date_req возвращает актуальную на сегодня таблицу
-        r = requests.get(CBR_URL, timeout=10)
-        r.raise_for_status()
-        return r.content
-
     try:
-        xml_bytes = await asyncio.to_thread(_sync_get)
+        # запрос без параметра date_req возвращает актуальную на сегодня таблицу;
+        # если ЦБ недоступен — последняя успешно полученная
+        r = await upstream.get("www.cbr.ru", CBR_URL, stale_ok=True)
+        r.raise_for_status()
+        xml_bytes = r.content
     except Exception as e:
         raise RuntimeError("Failed to fetch CBR rates: " + str(e))
 
@@ -110,6 +107,7 @@ async def fetch_fx_rates(currencies: Sequence[str]) -> dict:
 
     return rates
 
+@metrics.job("fx_refresh")
 async def update_fx_rates_for_currencies(currencies: list[str] | None, async_session):
     # собрать currencies если None
     if not currencies:
@@ -126,19 +124,11 @@ async def update_fx_rates_for_currencies(currencies: list[str] | None, async_ses
     rates = await fetch_fx_rates(currencies)
 
     now = datetime.utcnow()
-    saved = []
     async with async_session() as session:
-        for cur, rate in rates.items():
-            if rate is None:
-                continue
-            obj = await session.get(models.FxRate, cur)
-            if obj:
-                obj.rate = rate
-                obj.updated_at = now
-            else:
-                obj = models.FxRate(currency=cur, rate=rate, updated_at=now)
-                session.add(obj)
-            saved.append(obj)
+        # один INSERT ... ON CONFLICT DO UPDATE на все валюты
+        saved = await bulk.upsert_fx_rates(session, rates, now)
+        # и в историю — для оценки портфеля на прошлые даты
+        await bulk.upsert_fx_history(session, rates, now.date())
         await session.commit()
     return saved
 
@@ -158,6 +148,8 @@ async def _get_name_from_db_by_isin(isin: str) -> Optional[str]:
     return None
 
 # функция расчёта разбивки и сумм в рублях
+# job, а не db_query: внутри — запрос к ЦБ за курсами (fetch_fx_rates)
+@metrics.job("trades_sum_breakdown")
 async def calc_trades_sum_breakdown(db_session: AsyncSession) -> dict:
     """
     Возвращает {"by_currency": {CUR: amt, ...}, "trades_sum_in_rub": number}
@@ -260,6 +252,7 @@ async def calc_trades_sum_breakdown(db_session: AsyncSession) -> dict:
         logger.exception("calc_trades_sum_breakdown failed")
         return {"by_currency": {}, "trades_sum_in_rub": 0.0}
 
+@metrics.job("positions_with_amounts")
 async def build_positions_with_amounts(db: AsyncSession) -> dict:
     out_positions = []
     by_currency = {}
@@ -2,10 +2,12 @@
 from sqlalchemy import select, func, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import models
+from app import metrics
 from . import other
 import logging
 
 # Сумма сделок
+@metrics.db_query("calc_trades_sum")
 async def calc_trades_sum(session: AsyncSession) -> float:
     result = await session.execute(
         select(func.coalesce(func.sum(models.Trade.total_amount), 0.0))
@@ -13,6 +15,7 @@ async def calc_trades_sum(session: AsyncSession) -> float:
     return result.scalar_one()
 
 # Прибыль от купонов (с учётом даты покупки)
+@metrics.db_query("calc_coupon_profit")
 async def calc_coupon_profit(session: AsyncSession) -> float:
     from datetime import date
     today = date.today()
@@ -26,6 +29,8 @@ async def calc_coupon_profit(session: AsyncSession) -> float:
     return result.scalar_one()
 
 # Текущая стоимость портфеля (по последней цене из Price)
+# job, а не db_query: внутри — запрос к ЦБ за курсами (fetch_fx_rates)
+@metrics.job("calc_current_value")
 async def calc_current_value(db_session: AsyncSession) -> float:
     """
     Считает текущую стоимость всех облигаций в портфеле в RUB.
@@ -129,3 +134,72 @@ async def calc_current_value(db_session: AsyncSession) -> float:
         logger.exception("calc_current_value failed")
         return 0.0
 
+
+
+# Нетто-количество по бумагам на дату (только открытые позиции)
+@metrics.db_query("net_positions")
+async def net_positions(db_session: AsyncSession, as_of=None) -> dict[int, int]:
+    T = models.Trade
+    if as_of is None:
+        bought = func.coalesce(func.sum(T.buy_qty), 0)
+        sold = func.coalesce(func.sum(T.sell_qty), 0)
+    else:
+        bought = func.coalesce(func.sum(T.buy_qty).filter(T.buy_date <= as_of), 0)
+        sold = func.coalesce(func.sum(T.sell_qty).filter(T.sell_date <= as_of), 0)
+    res = await db_session.execute(
+        select(T.bond_id, (bought - sold).label("qty")).group_by(T.bond_id)
+    )
+    return {bond_id: int(qty) for bond_id, qty in res.all() if qty and qty > 0}
+
+
+# Стоимость портфеля на дату — без обращений к MOEX
+@metrics.job("value_as_of")
+async def calc_value_as_of(db_session: AsyncSession, as_of=None) -> dict:
+    """
+    Оценка портфеля на дату as_of (по умолчанию — сегодня) только по локальным данным:
+      - количество: нетто по сделкам с buy_date/sell_date <= as_of;
+      - цена: последняя из price_history не позже as_of; Bond.last_price — только если
+        as_of сегодня, иначе бумага без цены не оценивается и попадает в missing_prices;
+      - НКД: из графика купонов (app.accrued), а не ACCRUEDINT с MOEX;
+      - курсы: fx_rate_history на as_of или раньше (equity_curve.FxCurve, fallback FxRate).
+    Возвращает {"by_currency": {cur: amt}, "total_rub": float, "missing_prices": [bond_id]}.
+    """
+    from datetime import date
+    import numpy as np
+    from app import accrued, price_history, equity_curve
+    today = date.today()
+    as_of = as_of or today
+
+    positions = await net_positions(db_session, as_of)
+    if not positions:
+        return {"by_currency": {}, "total_rub": 0.0, "missing_prices": []}
+
+    bond_ids = list(positions)
+    bonds = (await db_session.execute(
+        select(models.Bond.id, models.Bond.currency, models.Bond.last_price).where(models.Bond.id.in_(bond_ids))
+    )).all()
+    prices = await price_history.get_prices_on_or_before(db_session, bond_ids, as_of)
+    nkd = await accrued.accrued_for_bonds(db_session, as_of, bond_ids)
+    fx = await equity_curve.load_fx_curve(db_session, as_of)
+
+    by_currency: dict[str, float] = {}
+    missing: list[int] = []
+    for bond_id, currency, last_price in bonds:
+        price = prices.get(bond_id, last_price if as_of >= today else None)
+        if price is None:
+            missing.append(bond_id)
+            continue
+        cur = (currency or "SUR").upper()
+        amt = (float(price) + (nkd.get(bond_id) or 0.0)) * positions[bond_id]
+        by_currency[cur] = by_currency.get(cur, 0.0) + amt
+
+    total_rub = 0.0
+    for cur, amt in by_currency.items():
+        rate = float(fx.at(cur, np.array([as_of.toordinal()]))[0])
+        if not rate or np.isnan(rate):
+            logging.getLogger(__name__).warning("calc_value_as_of: missing FX rate for %s on %s, skipping", cur, as_of)
+            continue
+        total_rub += amt * rate
+    if missing:
+        logging.getLogger(__name__).warning("calc_value_as_of: no price on or before %s for bonds %s", as_of, missing)
+    return {"by_currency": by_currency, "total_rub": total_rub, "missing_prices": missing}
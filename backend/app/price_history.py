@@ -0,0 +1,237 @@
+# backend/app/price_history.py
+"""
+Обслуживание истории цен (models.Price -> таблица price_history):
+  - создание годовых секций заранее (ensure_price_partitions): строки года, уже
+    попавшие в секцию по умолчанию, переносятся в новую секцию до ATTACH;
+  - свёртка старых лет в недельные бары price_weekly и удаление их дневных секций
+    (rollup_old_years); бар недели на стыке лет или после догрузки задним числом
+    дополняется, а не перезаписывается;
+  - обе задачи выполняются при прогреве (app.startup) и раз в сутки
+    (run_price_maintenance_forever); воркеры сериализуются advisory lock'ом;
+  - чтение ряда за период и поиск цены "на дату" — запросы с фильтром по date
+    затрагивают только нужные секции (partition pruning).
+"""
+from sqlalchemy import select, text, union_all, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date, timedelta
+import asyncio, logging, os
+
+from app import models, metrics
+from app.database import async_session
+
+logger = logging.getLogger(__name__)
+
+TABLE = models.Price.__tablename__
+# сколько последних лет хранить дневные цены; более старые сворачиваются в недели
+PRICE_DAILY_RETENTION_YEARS = int(os.getenv("PRICE_DAILY_RETENTION_YEARS", "3"))
+# сколько лет вперёд создавать секции
+PARTITIONS_AHEAD = 1
+# ключ pg_advisory_xact_lock: DDL секций и свёртку выполняет один воркер за раз
+MAINTENANCE_LOCK = 280028
+
+
+def _partition_name(year: int) -> str:
+    return f"{TABLE}_y{year}"
+
+
+async def list_partition_years(session: AsyncSession) -> list[int]:
+    res = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ),
+        {"parent": TABLE},
+    )
+    years = []
+    prefix = f"{TABLE}_y"
+    for (name,) in res.all():
+        if name.startswith(prefix) and name[len(prefix):].isdigit():
+            years.append(int(name[len(prefix):]))
+    return sorted(years)
+
+
+async def ensure_price_partitions(session: AsyncSession, first_year: Optional[int] = None) -> list[int]:
+    """
+    Создаёт секции price_history_yYYYY с first_year (по умолчанию — окно хранения)
+    по текущий год + PARTITIONS_AHEAD и секцию по умолчанию. Идемпотентно.
+
+    PARTITION OF ... FOR VALUES падает, если в секции по умолчанию уже есть строки
+    этого года, поэтому секция создаётся отдельной таблицей, строки года переносятся
+    в неё из default и только потом она присоединяется (ATTACH PARTITION).
+    """
+    this_year = date.today().year
+    if first_year is None:
+        first_year = this_year - PRICE_DAILY_RETENTION_YEARS
+    await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK})
+    await session.execute(text(f'CREATE TABLE IF NOT EXISTS "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT'))
+    existing = set(await list_partition_years(session))
+    created, moved = [], 0
+    for year in range(first_year, this_year + PARTITIONS_AHEAD + 1):
+        if year in existing:
+            continue
+        name = _partition_name(year)
+        await session.execute(text(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+        res = await session.execute(
+            text(
+                f'WITH moved AS (DELETE FROM "{TABLE}_default" WHERE date >= :d_from AND date < :d_to '
+                f"RETURNING bond_id, date, value) "
+                f'INSERT INTO "{name}" (bond_id, date, value) SELECT bond_id, date, value FROM moved'
+            ),
+            {"d_from": date(year, 1, 1), "d_to": date(year + 1, 1, 1)},
+        )
+        moved += res.rowcount or 0
+        await session.execute(text(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+        created.append(year)
+    await session.commit()
+    if created:
+        logger.info("price_history: created partitions %s, moved %s rows from default", created, moved)
+    return created
+
+
+async def rollup_year(session: AsyncSession, year: int) -> int:
+    """
+    Сворачивает дневные цены года в недельные бары (open/high/low/close). Возвращает число баров.
+    Уже записанный бар дополняется: open — от более ранней первой даты, close — от более
+    поздней последней, high/low — экстремумы обоих (неделя на стыке лет сворачивается дважды).
+    """
+    res = await session.execute(
+        text(
+            f"""
+            INSERT INTO price_weekly AS w (bond_id, week_start, open, high, low, close, first_date, last_date)
+            SELECT bond_id,
+                   date_trunc('week', date)::date AS week_start,
+                   (array_agg(value ORDER BY date))[1],
+                   max(value),
+                   min(value),
+                   (array_agg(value ORDER BY date DESC))[1],
+                   min(date),
+                   max(date)
+            FROM "{TABLE}"
+            WHERE date >= :d_from AND date < :d_to
+            GROUP BY bond_id, week_start
+            ON CONFLICT (bond_id, week_start) DO UPDATE
+               SET open = CASE WHEN w.first_date IS NULL OR EXCLUDED.first_date < w.first_date
+                               THEN EXCLUDED.open ELSE w.open END,
+                   close = CASE WHEN w.last_date IS NULL OR EXCLUDED.last_date >= w.last_date
+                                THEN EXCLUDED.close ELSE w.close END,
+                   high = greatest(w.high, EXCLUDED.high),
+                   low = least(w.low, EXCLUDED.low),
+                   first_date = least(w.first_date, EXCLUDED.first_date),
+                   last_date = greatest(w.last_date, EXCLUDED.last_date)
+            """
+        ),
+        {"d_from": date(year, 1, 1), "d_to": date(year + 1, 1, 1)},
+    )
+    return res.rowcount or 0
+
+
+@metrics.job("price_rollup")
+async def rollup_old_years(keep_years: int = PRICE_DAILY_RETENTION_YEARS) -> dict:
+    """
+    Задача обслуживания: для лет старше keep_years сворачивает дневные цены в недели
+    и удаляет дневную секцию (DROP секции мгновенный, в отличие от DELETE).
+    Строки этих лет из секции по умолчанию удаляются обычным DELETE.
+    """
+    cutoff_year = date.today().year - keep_years
+    out = {"rolled_up": {}, "dropped": []}
+    async with async_session() as session:
+        await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK})
+        years = [y for y in await list_partition_years(session) if y < cutoff_year]
+        # default-секция может содержать старые строки — сворачиваем и их
+        res = await session.execute(
+            text(f'SELECT DISTINCT extract(year FROM date)::int FROM "{TABLE}_default" WHERE date < :cutoff'),
+            {"cutoff": date(cutoff_year, 1, 1)},
+        )
+        default_years = {r[0] for r in res.all()}
+        for year in sorted(set(years) | default_years):
+            out["rolled_up"][year] = await rollup_year(session, year)
+        await session.execute(
+            text(f'DELETE FROM "{TABLE}_default" WHERE date < :cutoff'),
+            {"cutoff": date(cutoff_year, 1, 1)},
+        )
+        for year in years:
+            await session.execute(text(f'DROP TABLE IF EXISTS "{_partition_name(year)}"'))
+            out["dropped"].append(year)
+        await session.commit()
+    logger.info("price_history retention: %s", out)
+    return out
+
+
+async def run_price_maintenance_forever(interval_sec: int = 24 * 3600) -> None:
+    """Фоновая задача: секции на следующий год и свёртка лет старше окна хранения."""
+    while True:
+        try:
+            async with async_session() as session:
+                await ensure_price_partitions(session)
+            await rollup_old_years()
+        except Exception:
+            logger.exception("price_history: maintenance failed")
+        await asyncio.sleep(interval_sec)
+
+
+async def get_series(session: AsyncSession, bond_id: int, date_from: date, date_to: date) -> list[tuple[date, float]]:
+    """
+    Ряд цен за период: дневные точки из price_history плюс close недельных баров
+    для свёрнутых лет (там, где дневных данных уже нет).
+    """
+    daily = (
+        select(models.Price.date.label("d"), models.Price.value.label("v"))
+        .where(models.Price.bond_id == bond_id)
+        .where(models.Price.date >= date_from, models.Price.date <= date_to)
+    )
+    weekly = (
+        select(models.PriceWeekly.week_start.label("d"), models.PriceWeekly.close.label("v"))
+        .where(models.PriceWeekly.bond_id == bond_id)
+        .where(models.PriceWeekly.week_start >= date_from, models.PriceWeekly.week_start <= date_to)
+        .where(models.PriceWeekly.close.isnot(None))
+        .where(~select(literal(1)).where(
+            models.Price.bond_id == bond_id,
+            models.Price.date >= models.PriceWeekly.week_start,
+            models.Price.date < models.PriceWeekly.week_start + timedelta(days=7),
+        ).exists())
+    )
+    q = union_all(daily, weekly).subquery()
+    res = await session.execute(select(q.c.d, q.c.v).order_by(q.c.d))
+    return [(d, float(v)) for d, v in res.all()]
+
+
+async def get_price_on_or_after(session: AsyncSession, bond_id: int, target: date, lookahead_days: int = 5) -> Optional[float]:
+    """
+    Первая цена в окне [target, target + lookahead_days) — локальный источник для
+    moex_api_DWMY.get_week_open/get_month_open/get_year_open (ISS — только если здесь
+    пусто). Окно узкое, поэтому читается одна секция.
+    """
+    res = await session.execute(
+        select(models.Price.value)
+        .where(models.Price.bond_id == bond_id)
+        .where(models.Price.date >= target, models.Price.date < target + timedelta(days=lookahead_days))
+        .order_by(models.Price.date)
+        .limit(1)
+    )
+    v = res.scalar_one_or_none()
+    return float(v) if v is not None else None
+
+
+async def get_prices_on_or_before(
+    session: AsyncSession, bond_ids: list[int], as_of: date, lookback_days: int = 31
+) -> dict[int, float]:
+    """
+    Последняя известная цена каждой бумаги не позже as_of (в окне lookback_days,
+    чтобы запрос не выходил за пределы одной-двух секций). {bond_id: value}.
+    """
+    if not bond_ids:
+        return {}
+    res = await session.execute(
+        select(models.Price.bond_id, models.Price.value)
+        .where(models.Price.bond_id.in_(bond_ids))
+        .where(models.Price.date <= as_of, models.Price.date > as_of - timedelta(days=lookback_days))
+        .order_by(models.Price.bond_id, models.Price.date.desc())
+        .distinct(models.Price.bond_id)
+    )
+    return {bond_id: float(v) for bond_id, v in res.all()}
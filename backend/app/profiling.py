@@ -0,0 +1,354 @@
+# backend/app/profiling.py
+"""
+Профилирование одного запроса по требованию (только для администратора).
+
+Включается, если задан PROFILE_TOKEN. Запрос профилируется, когда токен передан
+заголовком X-Profile или параметром ?profile=<токен>:
+  - сэмплирующий профиль (pyinstrument, если установлен, иначе cProfile);
+  - журнал SQL: текст, параметры, время и число строк каждого запроса;
+  - waterfall внешних вызовов, задач и именованных запросов — всё, что
+    обёрнуто декораторами app.metrics (upstream/db_query/job).
+
+Отчёт хранится в памяти (последние PROFILE_KEEP) и, если задан PROFILE_DIR, на диске.
+Ответ получает заголовки X-Profile-Id и X-Profile-Url; отчёт отдаёт
+GET /api/profiles/{id}?format=json|text|html.
+
+POST /api/profiles/run/{target} выполняет функцию из portfolio/other (или массовое
+обновление) под профилировщиком и сразу возвращает отчёт.
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from sqlalchemy import event
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+import hmac, importlib, io, json, logging, os, time, uuid
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:  # pyinstrument не установлен — используем cProfile
+    _Pyinstrument = None
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILING_ENABLED = bool(PROFILE_TOKEN)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_SQL_MAX = 2000          # запросов в журнале одного отчёта
+PROFILE_PARAMS_MAX = 200        # символов параметров запроса
+
+router = APIRouter(prefix="/api/profiles", tags=["profiling"])
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("profile_trace", default=None)
+_reports: "OrderedDict[str, dict]" = OrderedDict()
+
+
+class Trace:
+    """Данные одного профилируемого запроса: SQL и интервалы инструментированных вызовов."""
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.t0 = time.perf_counter()
+        self.sql: list[dict] = []
+        self.sql_dropped = 0
+        self.spans: list[dict] = []
+
+    def offset_ms(self, t: float) -> float:
+        return round((t - self.t0) * 1000, 3)
+
+    def add_span(self, kind: str, name: str, t_start: float, t_end: float, outcome: str) -> None:
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": self.offset_ms(t_start),
+            "duration_ms": round((t_end - t_start) * 1000, 3),
+            "outcome": outcome,
+        })
+
+    def add_sql(self, statement: str, params, t_start: float, t_end: float, rowcount: Optional[int]) -> None:
+        if len(self.sql) >= PROFILE_SQL_MAX:
+            self.sql_dropped += 1
+            return
+        p = repr(params)
+        self.sql.append({
+            "start_ms": self.offset_ms(t_start),
+            "duration_ms": round((t_end - t_start) * 1000, 3),
+            "statement": " ".join(statement.split()),
+            "params": p if len(p) <= PROFILE_PARAMS_MAX else p[:PROFILE_PARAMS_MAX] + "...",
+            "rowcount": rowcount if rowcount is not None and rowcount >= 0 else None,
+        })
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def active() -> bool:
+    return PROFILING_ENABLED and _current.get() is not None
+
+
+# --- SQL: события движка (контекст запроса доходит сюда через greenlet SQLAlchemy) ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    if trace is None:
+        return
+    stack = conn.info.get("profile_t0")
+    if not stack:
+        return
+    t_start = stack.pop()
+    trace.add_sql(statement, parameters, t_start, time.perf_counter(), getattr(cursor, "rowcount", None))
+
+
+_sql_hooked = False
+
+
+def _hook_engine() -> None:
+    global _sql_hooked
+    if _sql_hooked:
+        return
+    from app.database import engine
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _sql_hooked = True
+
+
+# --- профилировщик ---
+
+class _Sampler:
+    def __init__(self):
+        if _Pyinstrument is not None:
+            self.kind = "pyinstrument"
+            self._p = _Pyinstrument(async_mode="enabled")
+        else:
+            import cProfile
+            self.kind = "cProfile"
+            self._p = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._p.start()
+            return
+        try:
+            self._p.enable()
+        except ValueError:
+            # cProfile один на поток: параллельный профилируемый запрос остаётся без профиля
+            self.kind = "none"
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._p.stop()
+        elif self.kind == "cProfile":
+            self._p.disable()
+
+    def text(self) -> str:
+        if self.kind == "none":
+            return "profiler busy: another profiled request was running"
+        if self.kind == "pyinstrument":
+            return self._p.output_text(unicode=True, show_all=False)
+        import pstats
+        buf = io.StringIO()
+        # cProfile видит весь поток, включая чужие корутины в том же event loop
+        pstats.Stats(self._p, stream=buf).sort_stats("cumulative").print_stats(60)
+        return buf.getvalue()
+
+    def html(self) -> Optional[str]:
+        return self._p.output_html() if self.kind == "pyinstrument" else None
+
+
+@asynccontextmanager
+async def trace(name: str):
+    """
+    async with profiling.trace("calc_current_value") as t: ...
+    Собирает профиль, SQL и интервалы; после выхода отчёт лежит в get_report(t.id).
+    """
+    _hook_engine()
+    t = Trace(name)
+    token = _current.set(t)
+    sampler = _Sampler()
+    sampler.start()
+    error = None
+    try:
+        yield t
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        sampler.stop()
+        _current.reset(token)
+        _store(_build_report(t, sampler, error))
+
+
+def _build_report(t: Trace, sampler: _Sampler, error: Optional[str]) -> dict:
+    total_ms = round((time.perf_counter() - t.t0) * 1000, 3)
+    sql_ms = sum(q["duration_ms"] for q in t.sql)
+    by_kind: dict[str, float] = {}
+    for s in t.spans:
+        by_kind[s["kind"]] = round(by_kind.get(s["kind"], 0.0) + s["duration_ms"], 3)
+    return {
+        "id": t.id,
+        "name": t.name,
+        "started_at": t.started_at.isoformat(),
+        "total_ms": total_ms,
+        "error": error,
+        "profiler": sampler.kind,
+        "summary": {
+            "sql_count": len(t.sql) + t.sql_dropped,
+            "sql_ms": round(sql_ms, 3),
+            "span_ms_by_kind": by_kind,
+        },
+        "spans": sorted(t.spans, key=lambda s: s["start_ms"]),
+        "sql": t.sql,
+        "profile_text": sampler.text(),
+        "profile_html": sampler.html(),
+    }
+
+
+def _store(report: dict) -> None:
+    _reports[report["id"]] = report
+    while len(_reports) > PROFILE_KEEP:
+        _reports.popitem(last=False)
+    if PROFILE_DIR:
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, f"{report['id']}.json"), "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False)
+        except OSError:
+            logger.exception("failed to store profile %s", report["id"])
+    logger.info("profile %s (%s): %.1f ms, %s SQL", report["id"], report["name"],
+                report["total_ms"], report["summary"]["sql_count"])
+
+
+def get_report(profile_id: str) -> Optional[dict]:
+    report = _reports.get(profile_id)
+    if report is None and PROFILE_DIR and profile_id.isalnum():
+        try:
+            with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            return None
+    return report
+
+
+# --- доступ ---
+
+def is_admin(token: Optional[str]) -> bool:
+    return PROFILING_ENABLED and bool(token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+async def require_admin(x_profile: Optional[str] = Header(None), profile: Optional[str] = Query(None)):
+    if not is_admin(x_profile or profile):
+        raise HTTPException(status_code=404, detail="Not found")
+
+
+# --- ASGI middleware: app.add_middleware(ProfilingMiddleware) ---
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        name = f"{scope['method']} {scope['path']}"
+        async with trace(name) as t:
+            async def send_with_header(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", t.id.encode()))
+                    headers.append((b"x-profile-url", f"{router.prefix}/{t.id}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+            await self.app(scope, receive, send_with_header)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for k, v in scope.get("headers", []):
+            if k == b"x-profile":
+                return is_admin(v.decode("latin-1"))
+        from urllib.parse import parse_qs
+        qs = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return is_admin((qs.get("profile") or [None])[0])
+
+
+# --- профилирование функций portfolio / other ---
+
+# цель -> (модуль app, функция); функции принимают сессию, кроме fx_refresh
+TARGETS = {
+    "calc_trades_sum": ("portfolio", "calc_trades_sum"),
+    "calc_coupon_profit": ("portfolio", "calc_coupon_profit"),
+    "calc_current_value": ("portfolio", "calc_current_value"),
+    "calc_value_as_of": ("portfolio", "calc_value_as_of"),
+    "net_positions": ("portfolio", "net_positions"),
+    "bonds_with_weights": ("other", "get_bonds_with_weights"),
+    "trades_sum_breakdown": ("other", "calc_trades_sum_breakdown"),
+    "positions_with_amounts": ("other", "build_positions_with_amounts"),
+    "refresh_bond_analytics": ("analytics", "refresh_bond_analytics"),
+    "fx_refresh": ("other", "update_fx_rates_for_currencies"),
+}
+
+
+async def _run_target(target: str):
+    from app.database import async_session
+    module, attr = TARGETS[target]
+    fn = getattr(importlib.import_module(f"app.{module}"), attr)
+    if target == "fx_refresh":
+        return await fn(None, async_session)
+    async with async_session() as session:
+        result = await fn(session)
+        await session.commit()
+        return result
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return [
+        {"id": r["id"], "name": r["name"], "started_at": r["started_at"], "total_ms": r["total_ms"],
+         "sql_count": r["summary"]["sql_count"]}
+        for r in reversed(_reports.values())
+    ]
+
+
+@router.post("/run/{target}", dependencies=[Depends(require_admin)])
+async def run_profile(target: str, format: str = Query("json", pattern="^(json|text)$")):
+    if target not in TARGETS:
+        raise HTTPException(status_code=404, detail=f"Unknown target; available: {', '.join(TARGETS)}")
+    async with trace(target) as t:
+        await _run_target(target)
+    return _render(get_report(t.id), format)
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, format: str = Query("json", pattern="^(json|text|html)$")):
+    report = get_report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _render(report, format)
+
+
+def _render(report: dict, format: str):
+    if format == "text":
+        lines = [f"{report['name']}: {report['total_ms']} ms, profiler={report['profiler']}", "", "-- waterfall --"]
+        for s in report["spans"]:
+            lines.append(f"{s['start_ms']:>10.1f} +{s['duration_ms']:>9.1f} ms  {s['kind']:<8} {s['name']} [{s['outcome']}]")
+        lines += ["", "-- sql --"]
+        for q in report["sql"]:
+            lines.append(f"{q['start_ms']:>10.1f} +{q['duration_ms']:>9.1f} ms  {q['statement'][:300]}")
+        lines += ["", "-- profile --", report["profile_text"]]
+        return PlainTextResponse("\n".join(lines))
+    if format == "html":
+        if not report.get("profile_html"):
+            raise HTTPException(status_code=404, detail="HTML report requires pyinstrument")
+        return HTMLResponse(report["profile_html"])
+    return {k: v for k, v in report.items() if k != "profile_html"}
@@ -0,0 +1,312 @@
+# backend/app/ratings.py
+"""
+Кредитные рейтинги в числовой шкале.
+
+Рейтинги хранятся в bonds свободным текстом по трём агентствам (akra_*, raexpert_*,
+nkr_*), в записи каждого агентства своя: "AA+(RU)" у АКРА, "ruAA+" у Эксперт РА,
+"AA+.ru" или "AA+|ru|" у НКР. normalize() сводит их к единой шкале ступеней
+(notch): 1 = AAA, 2 = AA+ ... 16 = B-, затем CCC, CC, C, RD (SD), D. Прогноз
+на ступень не влияет.
+
+Сводный рейтинг бумаги (composite) — консервативный, по правилу Базеля: один
+рейтинг — он и есть, два — худший, три — второй по качеству (худший из двух
+лучших). Он хранится в bonds.rating_notch (индекс (rating_notch, id) под сортировку
+и фильтр) и bonds.rating_composite ("AA-").
+
+Изменение рейтинговых колонок bonds помечает бумагу в ratings_dirty (триггер),
+refresh_dirty пересчитывает помеченные бумаги и пишет в rating_history строку на
+каждое изменение рейтинга или прогноза агентства (старое и новое значение).
+
+GET /api/ratings/bonds — бумаги по сводному рейтингу (фильтр min/max, keyset по
+(rating_notch, id)); GET /api/ratings/portfolio — средний рейтинг портфеля,
+взвешенный по стоимости в RUB, и распределение по корзинам; GET /api/ratings/history.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete, insert, update, bindparam, tuple_, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Optional
+from datetime import date, datetime
+import logging, re
+
+from app import models, schemas, metrics
+from app.dashboard import build_dashboard, load_dashboard
+from app.database import get_session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/ratings", tags=["ratings"])
+
+AGENCIES = ("akra", "raexpert", "nkr")
+# ступень = позиция в шкале + 1
+SCALE = (
+    "AAA", "AA+", "AA", "AA-", "A+", "A", "A-", "BBB+", "BBB", "BBB-",
+    "BB+", "BB", "BB-", "B+", "B", "B-", "CCC", "CC", "C", "RD", "D",
+)
+_NOTCH = {r: i for i, r in enumerate(SCALE, 1)}
+# корзины скринера: AAA, AA, A, BBB, BB, B и всё ниже B- в CCC
+BUCKETS = ("AAA", "AA", "A", "BBB", "BB", "B", "CCC")
+_BUCKET_UPPER = (1, 4, 7, 10, 13, 16)
+# кириллические А, В, С в записи рейтинга встречаются наравне с латинскими
+_LOOKALIKES = str.maketrans("АВС−–", "ABC--")
+# после рейтинга не должно идти буквы — ни латинской, ни оставшейся кириллической:
+# иначе "Снят", "Аннулирован", "Вывод" читались бы как C, A, B
+_RATING_RE = re.compile(r"^(AAA|AA|A|BBB|BB|B|CCC|CC|C|RD|SD|D)([+-]?)(?![A-ZА-ЯЁ])")
+CHUNK = 2000
+MAX_LIMIT = 500
+
+
+def normalize(rating: Optional[str]) -> Optional[int]:
+    """'AA+(RU)', 'ruAA+', 'AA+.ru', 'AA+|ru|' -> 2; отозванный, пустой или нераспознанный — None."""
+    if not rating:
+        return None
+    s = re.sub(r"RU|[().|\s]", "", str(rating).upper().translate(_LOOKALIKES))
+    m = _RATING_RE.match(s)
+    if not m:
+        return None
+    letters, modifier = m.groups()
+    if letters == "SD":
+        letters = "RD"
+    # модификаторы есть только у AA ... B
+    return _NOTCH.get(letters + modifier) or _NOTCH[letters]
+
+
+def notch_to_rating(notch: Optional[float]) -> Optional[str]:
+    """Ступень (в том числе средняя, дробная) -> ближайший рейтинг шкалы."""
+    if notch is None:
+        return None
+    return SCALE[min(max(int(round(notch)), 1), len(SCALE)) - 1]
+
+
+def bucket(notch: Optional[int]) -> Optional[int]:
+    """Ступень -> номер корзины BUCKETS (1 = AAA ... 7 = CCC и ниже)."""
+    if notch is None:
+        return None
+    for i, upper in enumerate(_BUCKET_UPPER, 1):
+        if notch <= upper:
+            return i
+    return len(BUCKETS)
+
+
+def composite(notches: Iterable[Optional[int]]) -> Optional[int]:
+    """Сводная ступень: один рейтинг — он, два — худший, три — второй лучший."""
+    ranked = sorted(n for n in notches if n)
+    if not ranked:
+        return None
+    return ranked[min(1, len(ranked) - 1)]
+
+
+def parse_bound(value: Optional[str]) -> Optional[int]:
+    """Граница фильтра: рейтинг ('A-', 'ruA-') или номер ступени."""
+    if not value:
+        return None
+    notch = int(value) if value.isdigit() else normalize(value)
+    if not notch or notch > len(SCALE):
+        raise HTTPException(status_code=400, detail=f"rating must be one of {SCALE} or 1..{len(SCALE)}")
+    return notch
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    return value or None
+
+
+# --- пересчёт ---
+
+async def _last_states(db: AsyncSession, bond_ids: list[int]) -> dict[tuple[int, str], tuple]:
+    """Последняя записанная в rating_history пара (рейтинг, прогноз) по (бумага, агентство)."""
+    H = models.RatingHistory
+    q = (
+        select(H.bond_id, H.agency, H.rating, H.forecast)
+        .where(H.bond_id.in_(bond_ids))
+        .distinct(H.bond_id, H.agency)
+        .order_by(H.bond_id, H.agency, H.changed_at.desc(), H.id.desc())
+    )
+    return {(b, a): (r, f) for b, a, r, f in (await db.execute(q)).all()}
+
+
+async def rebuild_bonds(db: AsyncSession, bond_ids: Iterable[int]) -> int:
+    """Пересчитывает сводный рейтинг бумаг и дописывает историю изменений; без commit.
+    Возвращает число бумаг, у которых изменился сводный рейтинг."""
+    B = models.Bond
+    bond_ids = list(bond_ids)
+    cols = [B.__table__.c[f"{a}_{k}"] for a in AGENCIES for k in ("rating", "forecast")]
+    # updated_at — время обновления котировок, пересчёт рейтинга его не двигает
+    stmt = (
+        update(B.__table__)
+        .where(B.__table__.c.id == bindparam("b_id"))
+        .values(rating_notch=bindparam("b_notch"), rating_composite=bindparam("b_composite"),
+                updated_at=B.__table__.c.updated_at)
+    )
+    now = datetime.utcnow()
+    changed = 0
+    for i in range(0, len(bond_ids), CHUNK):
+        ids = bond_ids[i:i + CHUNK]
+        rows = (await db.execute(select(B.id, B.rating_notch, B.rating_composite, *cols).where(B.id.in_(ids)))).mappings().all()
+        last = await _last_states(db, ids)
+        history, updates = [], []
+        for r in rows:
+            notches = []
+            for agency in AGENCIES:
+                rating, forecast = _clean(r[f"{agency}_rating"]), _clean(r[f"{agency}_forecast"])
+                notch = normalize(rating)
+                notches.append(notch)
+                prev = last.get((r["id"], agency))
+                if prev is None and rating is None and forecast is None:
+                    continue
+                if prev != (rating, forecast):
+                    prev_rating, prev_forecast = prev or (None, None)
+                    history.append({
+                        "bond_id": r["id"], "agency": agency, "changed_at": now,
+                        "rating": rating, "forecast": forecast, "notch": notch,
+                        "prev_rating": prev_rating, "prev_forecast": prev_forecast,
+                        "prev_notch": normalize(prev_rating),
+                    })
+            notch = composite(notches)
+            if (notch, notch_to_rating(notch)) != (r["rating_notch"], r["rating_composite"]):
+                updates.append({"b_id": r["id"], "b_notch": notch, "b_composite": notch_to_rating(notch)})
+        if history:
+            await db.execute(insert(models.RatingHistory), history)
+        if updates:
+            await db.execute(stmt, updates)
+        changed += len(updates)
+    return changed
+
+
+@metrics.job("ratings_refresh")
+async def refresh_dirty(db: AsyncSession) -> int:
+    """Пересчитывает бумаги, помеченные триггером в ratings_dirty, и делает commit. Возвращает число бумаг."""
+    res = await db.execute(delete(models.RatingsDirty).returning(models.RatingsDirty.bond_id))
+    bond_ids = res.scalars().all()
+    if not bond_ids:
+        await db.rollback()
+        return 0
+    await rebuild_bonds(db, bond_ids)
+    await db.commit()
+    logger.info("ratings: refreshed %s bonds", len(bond_ids))
+    return len(bond_ids)
+
+
+@metrics.job("ratings_rebuild_all")
+async def rebuild_all(db: AsyncSession) -> int:
+    """Полный пересчёт (например, после изменения шкалы или правила сводного рейтинга)."""
+    bond_ids = (await db.execute(select(models.Bond.id))).scalars().all()
+    await db.execute(delete(models.RatingsDirty))
+    n = await rebuild_bonds(db, bond_ids)
+    await db.commit()
+    return n
+
+
+# --- выборки ---
+
+def encode_cursor(notch: int, bond_id: int) -> str:
+    return f"{notch}|{bond_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        notch, bond_id = cursor.split("|", 1)
+        return int(notch), int(bond_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@metrics.db_query("ratings_bonds")
+async def rated_bonds(db: AsyncSession, min_rating: Optional[str] = None, max_rating: Optional[str] = None,
+                      order: str = "asc", cursor: Optional[str] = None, limit: int = 100) -> schemas.RatedBondsPage:
+    """Бумаги со сводным рейтингом не хуже min_rating и не лучше max_rating; без рейтинга не попадают."""
+    B = models.Bond
+    best, worst = parse_bound(max_rating), parse_bound(min_rating)
+    desc = order == "desc"
+    q = select(*(B.__table__.c[f] for f in schemas.RatedBondOut.model_fields)).where(B.rating_notch.isnot(None))
+    q = q.order_by(B.rating_notch.desc(), B.id.desc()) if desc else q.order_by(B.rating_notch, B.id)
+    if best:
+        q = q.where(B.rating_notch >= best)
+    if worst:
+        q = q.where(B.rating_notch <= worst)
+    if cursor:
+        key = decode_cursor(cursor)
+        q = q.where(tuple_(B.rating_notch, B.id) < key if desc else tuple_(B.rating_notch, B.id) > key)
+    rows = (await db.execute(q.limit(limit + 1))).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["rating_notch"], rows[-1]["id"])
+    return schemas.RatedBondsPage(items=[schemas.RatedBondOut(**r) for r in rows], next_cursor=next_cursor)
+
+
+def portfolio_rating(rows: Iterable[schemas.DashboardRowOut]) -> schemas.PortfolioRatingOut:
+    """Средняя ступень открытых позиций, взвешенная по стоимости в RUB; бумаги без рейтинга — отдельной долей."""
+    total = rated = weighted = 0.0
+    by_bucket = dict.fromkeys(BUCKETS + ("NR",), 0.0)
+    for row in rows:
+        value = row.market_value_rub
+        if row.net_qty <= 0 or not value:
+            continue
+        total += value
+        if row.rating_notch:
+            rated += value
+            weighted += value * row.rating_notch
+            by_bucket[BUCKETS[bucket(row.rating_notch) - 1]] += value
+        else:
+            by_bucket["NR"] += value
+    avg = weighted / rated if rated else None
+    return schemas.PortfolioRatingOut(
+        average_notch=round(avg, 2) if avg is not None else None,
+        average_rating=notch_to_rating(avg),
+        rated_weight=round(rated / total * 100, 2) if total else 0.0,
+        by_bucket={k: round(v / total * 100, 2) for k, v in by_bucket.items() if v} if total else {},
+        total_value_rub=total,
+    )
+
+
+@router.get("/bonds", response_model=schemas.RatedBondsPage)
+async def get_rated_bonds(
+    min_rating: Optional[str] = Query(None, alias="min", description="не хуже, например A- или 7"),
+    max_rating: Optional[str] = Query(None, alias="max", description="не лучше, например AA"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_session),
+):
+    await refresh_dirty(db)
+    return await rated_bonds(db, min_rating=min_rating, max_rating=max_rating, order=order, cursor=cursor, limit=limit)
+
+
+@router.get("/portfolio", response_model=schemas.PortfolioRatingOut)
+async def get_portfolio_rating(db: AsyncSession = Depends(get_session)):
+    # после пересчёта bonds изменилась, а кэш дашборда сбрасывается по NOTIFY асинхронно — строим заново
+    if await refresh_dirty(db):
+        return portfolio_rating((await build_dashboard(db)).rows)
+    return portfolio_rating((await load_dashboard(db)).rows)
+
+
+@router.get("/history", response_model=list[schemas.RatingChangeOut])
+async def get_rating_history(
+    bond_id: Optional[int] = None,
+    agency: Optional[str] = Query(None, pattern="^(akra|raexpert|nkr)$"),
+    since: Optional[date] = None,
+    direction: Optional[str] = Query(None, pattern="^(up|down)$"),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_session),
+):
+    """Изменения рейтингов, новые сверху; direction=up|down — только повышения / понижения ступени."""
+    await refresh_dirty(db)
+    H = models.RatingHistory
+    q = select(H).order_by(H.changed_at.desc(), H.id.desc()).limit(limit)
+    if bond_id is not None:
+        q = q.where(H.bond_id == bond_id)
+    if agency:
+        q = q.where(H.agency == agency)
+    if since:
+        q = q.where(H.changed_at >= since)
+    if direction == "up":
+        q = q.where(H.notch < H.prev_notch)
+    elif direction == "down":
+        q = q.where(or_(H.notch > H.prev_notch, and_(H.notch.is_(None), H.prev_notch.isnot(None))))
+    return (await db.execute(q)).scalars().all()
+
+
+@router.post("/refresh")
+async def post_ratings_refresh(full: bool = False, db: AsyncSession = Depends(get_session)):
+    """full=true — пересчитать все бумаги, иначе только помеченные в ratings_dirty."""
+    return {"bonds": await (rebuild_all(db) if full else refresh_dirty(db))}
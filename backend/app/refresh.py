@@ -0,0 +1,116 @@
+# backend/app/refresh.py
+"""
+Обновление бумаг с ISS одним проходом:
+  - котировка со страницы бумаги (moex_client.fetch_quote_from_iss): last_price,
+    face_value — текущий непогашенный номинал (FACEVALUE), НКД;
+  - купоны и график погашения номинала из bondization;
+  - цена дня — в price_history (для кривой портфеля и графиков).
+
+Запросы к ISS идут параллельно (не больше REFRESH_CONCURRENCY бумаг), транзакция
+на это время не держится; запись — через app.bulk одним набором statement'ов на
+все бумаги. Купоны флоатеров, которые ISS ещё не объявила, сразу прогнозируются
+по кривой ставки (app.floaters). После записи пересчитывается аналитика (app.analytics): доходности и
+дюрации амортизируемых бумаг и бумаг с номиналом не 1000 без номинала и графика
+погашений считались неверно.
+
+POST /api/bonds/refresh?bond_id= — обновить все бумаги или выбранные;
+run_bond_refresh_forever — то же раз в BOND_REFRESH_INTERVAL секунд.
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Sequence
+from datetime import date
+import asyncio, logging, os
+
+from app import models, bulk, analytics, floaters, metrics, moex_client
+from app.database import async_session, get_session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/bonds", tags=["bonds"])
+
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "8"))
+BOND_REFRESH_INTERVAL = int(os.getenv("BOND_REFRESH_INTERVAL", "900"))
+
+
+async def _fetch_one(secid: str, sem: asyncio.Semaphore) -> tuple[Optional[dict], Optional[list], Optional[list]]:
+    """(котировка, купоны, амортизации) бумаги; то, что не удалось получить, — None."""
+    async with sem:
+        results = await asyncio.gather(
+            moex_client.fetch_quote_from_iss(secid),
+            moex_client.fetch_coupons_from_moex(secid),
+            moex_client.fetch_amortizations_from_moex(secid),
+            return_exceptions=True,
+        )
+    out = []
+    for part, res in zip(("quote", "coupons", "amortizations"), results):
+        if isinstance(res, Exception):
+            logger.warning("refresh: %s %s failed: %s: %s", secid, part, type(res).__name__, res)
+            res = None
+        out.append(res)
+    return tuple(out)
+
+
+@metrics.job("bonds_refresh")
+async def refresh_bonds(db: AsyncSession, bond_ids: Optional[Sequence[int]] = None) -> dict:
+    """Котировки, номинал, НКД, купоны и амортизации бумаг с ISS; commit и пересчёт аналитики."""
+    B = models.Bond
+    q = select(B.id, B.secid).where(B.secid.isnot(None)).order_by(B.id)
+    if bond_ids:
+        q = q.where(B.id.in_(bond_ids))
+    bonds = (await db.execute(q)).all()
+    # соединение не держим, пока идут запросы к ISS
+    await db.rollback()
+    sem = asyncio.Semaphore(REFRESH_CONCURRENCY)
+    results = await asyncio.gather(*(_fetch_one(secid, sem) for _, secid in bonds))
+
+    today = date.today()
+    quotes, prices, coupons, amorts, failed = [], [], {}, {}, []
+    for (bond_id, secid), (quote, cps, ams) in zip(bonds, results):
+        if quote is None and cps is None and ams is None:
+            failed.append(secid)
+        if quote:
+            row = {"id": bond_id, "face_value": quote["face_value"]}
+            if quote["last_price"] is not None:
+                row["last_price"] = quote["last_price"]
+                prices.append({"bond_id": bond_id, "date": today, "value": quote["last_price"]})
+            if quote["nkd"] is not None:
+                row["nkd"] = quote["nkd"]
+            quotes.append(row)
+        if cps is not None:
+            coupons[bond_id] = cps
+        if ams is not None:
+            amorts[bond_id] = ams
+
+    out = {
+        "bonds": len(bonds),
+        "quotes": await bulk.update_bond_quotes(db, quotes),
+        "prices": await bulk.upsert_prices(db, prices),
+        "coupons": await bulk.upsert_coupons_bulk(db, coupons),
+        "amortizations": await bulk.upsert_amortizations_bulk(db, amorts),
+        "failed": failed,
+    }
+    await db.commit()
+    # ISS отдаёт будущие купоны флоатеров пустыми — прогноз по кривой ставки для обновлённых бумаг
+    out["projected"] = await floaters.project_floater_coupons(db, bond_ids=list(coupons)) if coupons else 0
+    if quotes or amorts or out["projected"]:
+        await analytics.refresh_bond_analytics(db)
+    logger.info("refresh: %s", {k: v if k != "failed" else len(v) for k, v in out.items()})
+    return out
+
+
+async def run_bond_refresh_forever(interval_sec: int = BOND_REFRESH_INTERVAL) -> None:
+    """Фоновая задача для startup: обновляет все бумаги раз в interval_sec."""
+    while True:
+        try:
+            async with async_session() as session:
+                await refresh_bonds(session)
+        except Exception:
+            logger.exception("refresh: bonds refresh failed")
+        await asyncio.sleep(interval_sec)
+
+
+@router.post("/refresh")
+async def post_bonds_refresh(bond_id: Optional[list[int]] = Query(None), db: AsyncSession = Depends(get_session)):
+    return await refresh_bonds(db, bond_id)
@@ -0,0 +1,214 @@
+# backend/app/scenarios.py
+"""
+Сценарный анализ портфеля: переоценка всех позиций при сдвигах кривой доходности,
+изменении ключевой ставки (КС) для флоатеров и валютных шоках.
+
+Сценарий — dict:
+    {"name": "+100bp", "parallel_bp": 100, "key_rate_bp": {2: 50, 5: -25},
+     "ks_bp": 0, "fx_pct": {"USD": -10}}
+  - parallel_bp — параллельный сдвиг доходности;
+  - key_rate_bp — сдвиги в ключевых сроках (годы из KEY_TENORS), между сроками —
+    линейная интерполяция (треугольные базисные функции);
+  - ks_bp — изменение КС: будущие купоны флоатеров (кроме ближайшего, уже
+    зафиксированного) меняются на ks * номинал * длина периода;
+  - fx_pct — изменение курса валюты бумаги к рублю, %.
+
+Переоценка: грязная цена = sum(CF_k / (1 + y0 + s_k(T))^T) по тензору
+[сценарии × бумаги × платежи], где y0 — текущая YTM из app.analytics.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Sequence
+from datetime import date
+import logging
+
+import numpy as np
+
+from app import schemas, analytics, portfolio, floaters
+from app.database import get_read_session
+from app.dashboard import load_fx_table, fx_for
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+KEY_TENORS = np.array([0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 15.0, 20.0])
+FLOATER_MARKERS = ("mosprime", "плава", "float")
+
+
+def is_floater(bond) -> bool:
+    if floaters.parse_formula(bond.coupon_display) is not None:
+        return True
+    text = f"{bond.coupon_type or ''} {bond.coupon_display or ''}".lower()
+    return any(m in text for m in FLOATER_MARKERS)
+
+
+def default_scenarios(currencies: Sequence[str] = ()) -> list[dict]:
+    out = [{"name": "base"}]
+    for bp in (50, 100, 200):
+        out.append({"name": f"+{bp}bp", "parallel_bp": bp})
+        out.append({"name": f"-{bp}bp", "parallel_bp": -bp})
+    for t in KEY_TENORS:
+        label = f"{t:g}y"
+        out.append({"name": f"KR {label} +100bp", "key_rate_bp": {float(t): 100}})
+        out.append({"name": f"KR {label} -100bp", "key_rate_bp": {float(t): -100}})
+    # изменение КС сдвигает и кривую, и купоны флоатеров
+    for bp in (100, 200):
+        out.append({"name": f"КС +{bp}bp", "parallel_bp": bp, "ks_bp": bp})
+        out.append({"name": f"КС -{bp}bp", "parallel_bp": -bp, "ks_bp": -bp})
+    for cur in currencies:
+        for pct in (10, 20):
+            out.append({"name": f"{cur} +{pct}%", "fx_pct": {cur: pct}})
+            out.append({"name": f"{cur} -{pct}%", "fx_pct": {cur: -pct}})
+    return out
+
+
+# --- ядро ---
+
+def key_rate_basis(T: np.ndarray) -> np.ndarray:
+    """Веса [n, m, len(KEY_TENORS)]: вклад каждого ключевого срока в сдвиг для срока T."""
+    n_t = KEY_TENORS.size
+    W = np.empty(T.shape + (n_t,))
+    eye = np.eye(n_t)
+    flat = T.ravel()
+    for j in range(n_t):
+        W[..., j] = np.interp(flat, KEY_TENORS, eye[j]).reshape(T.shape)
+    return W
+
+
+def shift_tensor(scenarios: Sequence[dict], T: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(S [k, n, m] — сдвиг доходности в долях, ks [k] — изменение КС в долях)."""
+    k = len(scenarios)
+    parallel = np.array([s.get("parallel_bp", 0.0) for s in scenarios], dtype=float) / 1e4
+    bumps = np.zeros((k, KEY_TENORS.size))
+    for i, s in enumerate(scenarios):
+        for tenor, bp in (s.get("key_rate_bp") or {}).items():
+            j = int(np.argmin(np.abs(KEY_TENORS - float(tenor))))
+            bumps[i, j] += float(bp) / 1e4
+    S = parallel[:, None, None] + np.zeros((1,) + T.shape)
+    if bumps.any():
+        S = S + np.moveaxis(key_rate_basis(T) @ bumps.T, -1, 0)
+    ks = np.array([s.get("ks_bp", 0.0) for s in scenarios], dtype=float) / 1e4
+    return S, ks
+
+
+def reprice(y0: np.ndarray, T: np.ndarray, CF: np.ndarray, A: np.ndarray,
+            S: np.ndarray, ks: np.ndarray) -> np.ndarray:
+    """Грязные цены [k, n] при доходности y0 + S и потоках CF + ks * A."""
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        disc = np.power(1.0 + y0[None, :, None] + S, -T[None])
+        flows = CF[None] + ks[:, None, None] * A[None]
+        return (flows * disc).sum(axis=2)
+
+
+def floater_sensitivity(schedule: list, coupons: Sequence[tuple], face: Optional[float], settlement: date) -> np.ndarray:
+    """
+    Прирост каждого платежа schedule на единицу изменения ставки (номинал * длина периода в годах).
+    Ближайший будущий купон считается зафиксированным.
+    """
+    out = np.zeros(len(schedule))
+    dates = sorted(d for d, _ in coupons if d)
+    future = [d for d in dates if d > settlement]
+    if len(future) < 2:
+        return out
+    pos = {d: i for i, (d, _) in enumerate(schedule)}
+    f = float(face or analytics.DEFAULT_FACE)
+    for prev, cur in zip(future[:-1], future[1:]):
+        if cur in pos:
+            out[pos[cur]] += f * (cur - prev).days / analytics.DAYS_IN_YEAR
+    return out
+
+
+def run_scenarios(bonds: Sequence, coupons: dict, amorts: dict, qty: dict[int, float],
+                  fx: dict[int, float], scenarios: Sequence[dict], settlement: date,
+                  nkd: Optional[dict] = None, detail: bool = False) -> list[dict]:
+    """
+    Чистая функция: bonds/coupons/amorts — как в analytics.load_schedules,
+    qty/fx — {bond_id: количество}, {bond_id: курс к RUB}.
+    """
+    nkd = nkd or {}
+    schedules, dirty, A_rows, currencies = [], [], [], []
+    for b in bonds:
+        sched = analytics.build_cashflows(coupons.get(b.id, []), amorts.get(b.id, []),
+                                          b.face_value, b.maturity_date, settlement)
+        schedules.append(sched)
+        a = floater_sensitivity(sched, coupons.get(b.id, []), b.face_value, settlement) if is_floater(b) else np.zeros(len(sched))
+        A_rows.append(a)
+        p = b.last_price
+        acc = nkd.get(b.id, b.nkd)
+        dirty.append(float(p) + float(acc or 0.0) if p is not None else np.nan)
+        currencies.append((b.currency or "SUR").upper())
+
+    T, CF = analytics.to_matrices(schedules, settlement)
+    A = np.zeros_like(CF)
+    for i, a in enumerate(A_rows):
+        A[i, :a.size] = a
+    dirty = np.array(dirty)
+    y0 = analytics.solve_ytm(dirty, T, CF)
+    priced = np.isfinite(y0)
+
+    S, ks = shift_tensor(scenarios, T)
+    P = reprice(np.nan_to_num(y0), T, CF, A, S, ks)
+    base = reprice(np.nan_to_num(y0), T, CF, A, np.zeros((1,) + T.shape), np.zeros(1))[0]
+    # цена в сценарии = рыночная грязная цена * относительное изменение PV
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(priced[None, :] & (base[None, :] > 0), P / base[None, :], 1.0)
+    prices = np.nan_to_num(dirty)[None, :] * ratio
+
+    q = np.array([float(qty.get(b.id, 0.0)) for b in bonds])
+    rate0 = np.array([float(fx.get(b.id) or np.nan) for b in bonds])
+    fx_mult = np.ones((len(scenarios), len(bonds)))
+    for k, s in enumerate(scenarios):
+        for cur, pct in (s.get("fx_pct") or {}).items():
+            mask = np.array([c == cur.upper() for c in currencies])
+            fx_mult[k, mask] *= 1.0 + float(pct) / 100.0
+
+    value0 = np.nan_to_num(q * np.nan_to_num(dirty) * rate0)
+    values = np.nan_to_num(q[None, :] * prices * rate0[None, :] * fx_mult)
+    total0 = float(value0.sum())
+
+    out = []
+    for k, s in enumerate(scenarios):
+        total = float(values[k].sum())
+        row = {
+            "name": s.get("name") or f"scenario {k}",
+            "value_rub": round(total, 2),
+            "pnl_rub": round(total - total0, 2),
+            "pnl_percent": round((total - total0) / total0 * 100, 4) if total0 else None,
+        }
+        if detail:
+            row["by_bond"] = {
+                b.id: round(float(values[k, i] - value0[i]), 2) for i, b in enumerate(bonds) if q[i]
+            }
+        out.append(row)
+    return out
+
+
+# --- загрузка из БД ---
+
+async def portfolio_scenarios(db: AsyncSession, scenarios: Optional[Sequence[dict]] = None,
+                              settlement: Optional[date] = None, detail: bool = False) -> list[dict]:
+    settlement = settlement or date.today()
+    qty = await portfolio.net_positions(db)
+    if not qty:
+        return []
+    bonds, coupons, amorts = await analytics.load_schedules(db, list(qty))
+    fx_table = await load_fx_table(db)
+    fx = {b.id: fx_for(b.currency, fx_table) for b in bonds}
+    if scenarios is None:
+        foreign = sorted({(b.currency or "SUR").upper() for b in bonds} - {"SUR", "RUB"})
+        scenarios = default_scenarios(foreign)
+    nkd = analytics.local_nkd(bonds, coupons, settlement)
+    return run_scenarios(bonds, coupons, amorts, qty, fx, scenarios, settlement, nkd=nkd, detail=detail)
+
+
+@router.get("/scenarios", response_model=list[schemas.ScenarioResultOut])
+async def get_scenarios(detail: bool = False, db: AsyncSession = Depends(get_read_session)):
+    """Стандартная сетка: ±50/100/200bp, ключевые сроки ±100bp, КС ±100/200bp, валюты ±10/20%."""
+    return await portfolio_scenarios(db, detail=detail)
+
+
+@router.post("/scenarios", response_model=list[schemas.ScenarioResultOut])
+async def post_scenarios(payload: list[schemas.ScenarioIn], detail: bool = False,
+                         db: AsyncSession = Depends(get_read_session)):
+    return await portfolio_scenarios(db, [s.model_dump() for s in payload], detail=detail)
@@ -1,10 +1,9 @@
 # backend/app/schemas.py
-from pydantic import BaseModel, ConfigDict, computed_field
+from pydantic import BaseModel, ConfigDict, Field, computed_field
 from typing import Optional
 from datetime import date, datetime
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Входная схема — только secid
@@ -22,6 +21,22 @@ class BondSearchOut(BaseModel):
     maturity_date: Optional[str] = None
     rating: Optional[str] = None
 
+def format_rating(akra_rating, akra_forecast, raexpert_rating, raexpert_forecast, nkr_rating, nkr_forecast) -> str:
+    """Строка рейтингов для таблицы; общая для BondOut.rating и быстрого списка app.bonds."""
+    parts = []
+    if akra_rating:
+        parts.append(f"АКРА: {akra_rating}" + (f" ({akra_forecast})" if akra_forecast else ""))
+    if raexpert_rating:
+        parts.append(f"ЭкспРА: {raexpert_rating}" + (f" ({raexpert_forecast})" if raexpert_forecast else ""))
+    if nkr_rating:
+        parts.append(f"НКР: {nkr_rating}" + (f" ({nkr_forecast})" if nkr_forecast else ""))
+    return "\n".join(parts) if parts else "Нет рейтинга"
+
+
+def format_amortization(amortization) -> str:
+    return "Есть" if amortization else "-"
+
+
 class CouponOut(BaseModel):
     date: date
     value: Optional[float] = None
@@ -54,6 +69,8 @@ class BondOut(BaseModel):
     raexpert_forecast: Optional[str] = None
     nkr_rating: Optional[str] = None
     nkr_forecast: Optional[str] = None
+    rating_notch: Optional[int] = None       # сводный рейтинг (app.ratings): 1 = AAA ... 21 = D
+    rating_composite: Optional[str] = None
     currency: Optional[str] = None
     currency_symbol: Optional[str] = None
     updated_at: datetime | None = None
@@ -66,33 +83,43 @@ class BondOut(BaseModel):
     stale: bool = False
     stale_reason: Optional[str] = None
     nkd: Optional[float] = None
+    face_value: Optional[float] = None
+    duration: Optional[float] = None
+    modified_duration: Optional[float] = None
+    convexity: Optional[float] = None
+    current_yield: Optional[float] = None
     
     @computed_field
     @property
     def rating(self) -> str:
-        parts = []
-        if self.akra_rating:
-            parts.append(f"АКРА: {self.akra_rating}" + (f" ({self.akra_forecast})" if self.akra_forecast else ""))
-        if self.raexpert_rating:
-            parts.append(f"ЭкспРА: {self.raexpert_rating}" + (f" ({self.raexpert_forecast})" if self.raexpert_forecast else ""))
-        if self.nkr_rating:
-            parts.append(f"НКР: {self.nkr_rating}" + (f" ({self.nkr_forecast})" if self.nkr_forecast else ""))
-        return "\n".join(parts) if parts else "Нет рейтинга"
+        return format_rating(self.akra_rating, self.akra_forecast, self.raexpert_rating,
+                             self.raexpert_forecast, self.nkr_rating, self.nkr_forecast)
 
     @computed_field
     @property
     def amortization_display(self) -> str:
-        return "Есть" if self.amortization else "-"
+        return format_amortization(self.amortization)
     
 class EventLogOut(BaseModel):
-    id: int
+    id: Optional[int] = None                 # None — событие ещё в очереди app.events
     timestamp: datetime
     message: str
+    event_type: str = "ui"
+    bond_id: Optional[int] = None
+    payload: Optional[dict] = None
     # Pydantic v2
     model_config = ConfigDict(from_attributes=True)
 
 class EventLogIn(BaseModel):
     message: str
+    event_type: str = "ui"
+    bond_id: Optional[int] = None
+    payload: Optional[dict] = None
+
+# Страница логов: next_cursor передаётся в ?before= для следующей страницы
+class EventLogPage(BaseModel):
+    items: list[EventLogOut]
+    next_cursor: Optional[str] = None
 
 class BondShort(BaseModel):
     id: int
@@ -190,4 +217,101 @@ class BondWithWeightOut(BaseModel):
 class FxRateOut(BaseModel):
     currency: str
     rate: float
-    updated_at: Optional[datetime]
\ No newline at end of file
+    updated_at: Optional[datetime]
+
+# Строка сводной таблицы облигаций (/api/dashboard): поля BondOut + позиция и оценка
+class DashboardRowOut(BondOut):
+    coupons: list[CouponOut] = Field(default=[], exclude=True)   # сводке не нужны, не загружаются
+    net_qty: int = 0
+    invested: float = 0.0                    # покупки: цена * кол-во + комиссии (в валюте бумаги)
+    proceeds: float = 0.0                    # продажи: цена * кол-во - комиссии
+    market_value: Optional[float] = None     # net_qty * last_price, в валюте бумаги
+    market_value_rub: Optional[float] = None
+    fx_rate: Optional[float] = None          # RUB за 1 единицу валюты бумаги
+    weight: Optional[float] = None           # % от стоимости портфеля в RUB
+    pnl: Optional[float] = None              # market_value + proceeds - invested
+    pnl_percent: Optional[float] = None
+
+class DashboardOut(BaseModel):
+    rows: list[DashboardRowOut]
+    total_value_rub: float
+    fx_rates: dict[str, float]
+
+# Сценарий переоценки (/api/analytics/scenarios), см. app.scenarios
+class ScenarioIn(BaseModel):
+    name: str
+    parallel_bp: float = 0.0
+    key_rate_bp: dict[float, float] = {}     # {срок в годах: сдвиг в bp}
+    ks_bp: float = 0.0                       # изменение ключевой ставки для флоатеров
+    fx_pct: dict[str, float] = {}            # {валюта: изменение курса, %}
+
+class ScenarioResultOut(BaseModel):
+    name: str
+    value_rub: float
+    pnl_rub: float
+    pnl_percent: Optional[float] = None
+    by_bond: Optional[dict[int, float]] = None
+
+# Точка прогноза справочной ставки (PUT /api/rates/{name}/forecast)
+class RatePointIn(BaseModel):
+    date: date
+    rate: float                              # % годовых
+
+
+# Скринер каталога MOEX (GET /api/screener), см. app.screener
+class ScreenerItem(BaseModel):
+    secid: str
+    isin: Optional[str] = None
+    name: Optional[str] = None
+    emitent: Optional[str] = None
+    market: Optional[str] = None
+    currency: Optional[str] = None
+    coupon: Optional[float] = None
+    maturity_date: Optional[date] = None
+    offer_date: Optional[date] = None
+    amortization: Optional[bool] = None
+    rating: Optional[str] = None
+    rating_bucket: Optional[str] = None      # AAA, AA, A, BBB, BB, B, CCC; None — нет рейтинга
+    price: Optional[float] = None            # % от номинала
+    ytm: Optional[float] = None              # %, к оферте или погашению
+    duration: Optional[float] = None         # лет
+
+class ScreenerPage(BaseModel):
+    items: list[ScreenerItem]
+    next_cursor: Optional[str] = None
+
+
+# Сводный рейтинг (app.ratings)
+class RatedBondOut(BaseModel):
+    id: int
+    secid: Optional[str] = None
+    name: str
+    rating_composite: Optional[str] = None
+    rating_notch: int                        # 1 = AAA ... 21 = D
+    akra_rating: Optional[str] = None
+    raexpert_rating: Optional[str] = None
+    nkr_rating: Optional[str] = None
+
+class RatedBondsPage(BaseModel):
+    items: list[RatedBondOut]
+    next_cursor: Optional[str] = None
+
+class PortfolioRatingOut(BaseModel):
+    average_notch: Optional[float] = None    # средняя ступень, взвешенная по стоимости в RUB
+    average_rating: Optional[str] = None
+    rated_weight: float                      # % стоимости портфеля с рейтингом
+    by_bucket: dict[str, float]              # {AAA ... CCC, NR: % стоимости}
+    total_value_rub: float
+
+class RatingChangeOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    bond_id: int
+    agency: str
+    changed_at: datetime
+    rating: Optional[str] = None
+    forecast: Optional[str] = None
+    notch: Optional[int] = None
+    prev_rating: Optional[str] = None
+    prev_forecast: Optional[str] = None
+    prev_notch: Optional[int] = None
\ No newline at end of file
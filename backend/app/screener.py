@@ -0,0 +1,277 @@
+# backend/app/screener.py
+"""
+Скринер по всем облигациям MOEX: таблица bond_catalog строится из поискового
+каталога ISS (app.moex_api.get_search_catalog) и хранит поля, которые поиск
+раньше отбрасывал: купон, погашение, оферта, амортизация, валюта, рейтинг.
+
+При обновлении (refresh_catalog, раз в SEARCH_CATALOG_TTL) для каждой бумаги
+по цене, номиналу, купону и периоду строится упрощённый график (постоянный купон
+до оферты или погашения, номинал в конце) и векторизованно (app.analytics)
+считаются доходность и дюрация Маколея. Рейтинг — из каталога, иначе сводный
+рейтинг локальной таблицы bonds (app.ratings); для фильтра он сводится к корзине AAA ... CCC.
+
+GET /api/screener — фильтры по сроку, купону, валюте, амортизации, наличию оферты,
+рейтинговой корзине и доходности; сортировка по ytm / duration / maturity с
+keyset-пагинацией (cursor = "значение|secid"), каждая сортировка идёт по своему
+индексу (значение, secid). Бумаги без значения поля сортировки в выдачу не попадают.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete, tuple_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Optional, Sequence
+from datetime import date, datetime, timedelta
+import asyncio, logging
+
+import numpy as np
+
+from app import models, schemas, bulk, analytics, metrics, moex_api, ratings
+from app.database import async_session, get_session, get_read_session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/screener", tags=["screener"])
+
+RATING_BUCKETS = ratings.BUCKETS
+DEFAULT_COUPON_PERIOD = 182
+# графики строятся пачками: матрицы [бумаги × платежи] не растут на всю вселенную
+CHUNK = 2000
+MAX_LIMIT = 500
+
+SORTS = {
+    "ytm": (models.BondCatalog.ytm, float, "desc"),
+    "duration": (models.BondCatalog.duration, float, "asc"),
+    "maturity": (models.BondCatalog.maturity_date, date.fromisoformat, "asc"),
+}
+
+
+def rating_bucket(rating: Optional[str]) -> Optional[int]:
+    """'AA+(RU)', 'ruAA-', 'A.ru' -> номер корзины (1 = AAA ... 7 = CCC и ниже), None — нет рейтинга."""
+    return ratings.bucket(ratings.normalize(rating))
+
+
+def _float(v) -> Optional[float]:
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if np.isfinite(v) else None
+
+
+def _schedule(card: dict, settlement: date) -> list[tuple[date, float]]:
+    """Постоянный купон с шагом coupon_period до оферты/погашения, номинал в конце."""
+    horizon = card.get("offer_date")
+    if not horizon or horizon <= settlement:
+        horizon = card.get("maturity_date")
+    if not horizon or horizon <= settlement:
+        return []
+    face = _float(card.get("face_value")) or analytics.DEFAULT_FACE
+    period = int(_float(card.get("coupon_period")) or DEFAULT_COUPON_PERIOD)
+    value = _float(card.get("coupon_value"))
+    if value is None:
+        value = (_float(card.get("coupon")) or 0.0) / 100.0 * face * period / analytics.DAYS_IN_YEAR
+    flows = []
+    d = horizon
+    while d > settlement:
+        flows.append((d, value))
+        d -= timedelta(days=period)
+    flows.reverse()
+    flows[-1] = (horizon, flows[-1][1] + face)
+    return flows
+
+
+def compute_rows(cards: Sequence[dict], local_ratings: dict[str, str], settlement: date) -> list[dict]:
+    """Карточки поискового каталога -> строки bond_catalog с доходностью и дюрацией."""
+    now = datetime.utcnow()
+    out = []
+    for i in range(0, len(cards), CHUNK):
+        chunk = cards[i:i + CHUNK]
+        schedules, dirty, clean, annual = [], [], [], []
+        for c in chunk:
+            face = _float(c.get("face_value")) or analytics.DEFAULT_FACE
+            price = _float(c.get("price"))
+            schedules.append(_schedule(c, settlement))
+            clean.append(price * face / 100.0 if price else np.nan)
+            dirty.append(clean[-1] + (_float(c.get("accrued")) or 0.0))
+            annual.append((_float(c.get("coupon")) or 0.0) / 100.0 * face)
+        T, CF = analytics.to_matrices(schedules, settlement)
+        m = analytics.compute_metrics(np.array(dirty), np.array(clean), np.array(annual), T, CF)
+        for j, c in enumerate(chunk):
+            ytm = _float(m["ytm"][j])
+            rating = c.get("rating") or local_ratings.get(c["secid"])
+            currency = (c.get("currency") or "").upper() or None
+            out.append({
+                "secid": c["secid"],
+                "isin": c.get("isin"),
+                "name": c.get("name"),
+                "emitent": c.get("emitent") or None,
+                "market": c.get("market"),
+                "currency": "SUR" if currency == "RUB" else currency,
+                "coupon": _float(c.get("coupon")),
+                "coupon_period": int(_float(c.get("coupon_period")) or 0) or None,
+                "maturity_date": c.get("maturity_date"),
+                "offer_date": c.get("offer_date"),
+                "amortization": bool(c["amortization"]) if c.get("amortization") is not None else None,
+                "rating": rating,
+                "rating_bucket": rating_bucket(rating),
+                "face_value": _float(c.get("face_value")),
+                "price": _float(c.get("price")),
+                "accrued": _float(c.get("accrued")),
+                "ytm": round(ytm * 100, 4) if ytm is not None else None,
+                "duration": _float(m["duration"][j]),
+                "updated_at": now,
+            })
+    return out
+
+
+async def _local_ratings(db: AsyncSession) -> dict[str, str]:
+    """Сводный рейтинг (app.ratings) по бумагам локальной таблицы bonds."""
+    B = models.Bond
+    await ratings.refresh_dirty(db)
+    res = await db.execute(select(B.secid, B.rating_composite).where(B.secid.isnot(None), B.rating_composite.isnot(None)))
+    return dict(res.all())
+
+
+@metrics.job("screener_refresh")
+async def refresh_catalog(db: AsyncSession, force: bool = False) -> int:
+    """Перестраивает bond_catalog из поискового каталога ISS; бумаги, пропавшие из ISS, удаляются."""
+    started = datetime.utcnow()
+    cards = [item for _, item in await moex_api.get_search_catalog(force=force) if item.get("secid")]
+    # ~30k бумаг считаются секунды — не в event loop
+    rows = await asyncio.to_thread(compute_rows, cards, await _local_ratings(db), date.today())
+    n = await bulk.upsert_bond_catalog(db, rows)
+    if rows:
+        await db.execute(delete(models.BondCatalog).where(models.BondCatalog.updated_at < started))
+    await db.commit()
+    logger.info("screener: catalog refreshed, %s bonds", n)
+    return n
+
+
+async def run_screener_refresh_forever(interval_sec: int = moex_api.SEARCH_CATALOG_TTL) -> None:
+    """Фоновая задача для startup: пересобирает bond_catalog вслед за поисковым каталогом."""
+    while True:
+        try:
+            async with async_session() as session:
+                await refresh_catalog(session, force=True)
+        except Exception:
+            logger.exception("screener: catalog refresh failed")
+        await asyncio.sleep(interval_sec)
+
+
+# --- выборка ---
+
+def encode_cursor(value: Any, secid: str) -> str:
+    return f"{value.isoformat() if isinstance(value, date) else value}|{secid}"
+
+
+def decode_cursor(cursor: str, parse) -> tuple[Any, str]:
+    try:
+        value, secid = cursor.split("|", 1)
+        return parse(value), secid
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _csv(value: Optional[str]) -> list[str]:
+    return [v.strip().upper() for v in (value or "").split(",") if v.strip()]
+
+
+def build_query(*, sort: str = "ytm", order: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100,
+                maturity_from: Optional[date] = None, maturity_to: Optional[date] = None,
+                coupon_min: Optional[float] = None, coupon_max: Optional[float] = None,
+                currency: Optional[str] = None, amortization: Optional[bool] = None,
+                has_offer: Optional[bool] = None, rating: Optional[str] = None, rating_min: Optional[str] = None,
+                ytm_min: Optional[float] = None, ytm_max: Optional[float] = None,
+                duration_max: Optional[float] = None):
+    C = models.BondCatalog
+    col, parse, default_order = SORTS[sort]
+    desc = (order or default_order) == "desc"
+    q = select(*(C.__table__.c[f] for f in schemas.ScreenerItem.model_fields)).where(col.isnot(None))
+    q = q.order_by(col.desc(), C.secid.desc()) if desc else q.order_by(col, C.secid)
+    if cursor:
+        key = decode_cursor(cursor, parse)
+        q = q.where(tuple_(col, C.secid) < key if desc else tuple_(col, C.secid) > key)
+
+    if maturity_from:
+        q = q.where(C.maturity_date >= maturity_from)
+    if maturity_to:
+        q = q.where(C.maturity_date <= maturity_to)
+    if coupon_min is not None:
+        q = q.where(C.coupon >= coupon_min)
+    if coupon_max is not None:
+        q = q.where(C.coupon <= coupon_max)
+    currencies = ["SUR" if c == "RUB" else c for c in _csv(currency)]
+    if currencies:
+        q = q.where(C.currency.in_(currencies))
+    if amortization is not None:
+        q = q.where(C.amortization.is_(True) if amortization else or_(C.amortization.is_(False), C.amortization.is_(None)))
+    if has_offer is not None:
+        q = q.where(C.offer_date.isnot(None) if has_offer else C.offer_date.is_(None))
+    buckets = _csv(rating)
+    if buckets:
+        unknown = set(buckets) - set(RATING_BUCKETS) - {"NR"}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"rating must be of {RATING_BUCKETS + ('NR',)}")
+        ranks = [RATING_BUCKETS.index(b) + 1 for b in buckets if b != "NR"]
+        cond = C.rating_bucket.in_(ranks)
+        q = q.where(or_(cond, C.rating_bucket.is_(None)) if "NR" in buckets else cond)
+    if rating_min:
+        if rating_min.upper() not in RATING_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"rating_min must be one of {RATING_BUCKETS}")
+        q = q.where(C.rating_bucket <= RATING_BUCKETS.index(rating_min.upper()) + 1)
+    if ytm_min is not None:
+        q = q.where(C.ytm >= ytm_min)
+    if ytm_max is not None:
+        q = q.where(C.ytm <= ytm_max)
+    if duration_max is not None:
+        q = q.where(C.duration <= duration_max)
+    return q.limit(limit + 1)
+
+
+@metrics.db_query("screener")
+async def screen(db: AsyncSession, limit: int = 100, sort: str = "ytm", **filters) -> schemas.ScreenerPage:
+    rows = (await db.execute(build_query(limit=limit, sort=sort, **filters))).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        field = SORTS[sort][0].key
+        next_cursor = encode_cursor(rows[-1][field], rows[-1]["secid"])
+    items = []
+    for r in rows:
+        item = dict(r)
+        bucket = item["rating_bucket"]
+        item["rating_bucket"] = RATING_BUCKETS[bucket - 1] if bucket else None
+        items.append(schemas.ScreenerItem(**item))
+    return schemas.ScreenerPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("", response_model=schemas.ScreenerPage)
+async def get_screener(
+    sort: str = Query("ytm", pattern="^(ytm|duration|maturity)$"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    maturity_from: Optional[date] = None,
+    maturity_to: Optional[date] = None,
+    coupon_min: Optional[float] = None,
+    coupon_max: Optional[float] = None,
+    currency: Optional[str] = Query(None, description="через запятую: SUR,USD,CNY"),
+    amortization: Optional[bool] = None,
+    has_offer: Optional[bool] = None,
+    rating: Optional[str] = Query(None, description="корзины через запятую: AAA,AA,A,BBB,BB,B,CCC,NR"),
+    rating_min: Optional[str] = Query(None, description="не ниже корзины, например A"),
+    ytm_min: Optional[float] = None,
+    ytm_max: Optional[float] = None,
+    duration_max: Optional[float] = None,
+    db: AsyncSession = Depends(get_read_session),
+):
+    return await screen(
+        db, limit=limit, sort=sort, order=order, cursor=cursor, maturity_from=maturity_from, maturity_to=maturity_to,
+        coupon_min=coupon_min, coupon_max=coupon_max, currency=currency, amortization=amortization,
+        has_offer=has_offer, rating=rating, rating_min=rating_min, ytm_min=ytm_min, ytm_max=ytm_max,
+        duration_max=duration_max,
+    )
+
+
+@router.post("/refresh")
+async def post_screener_refresh(db: AsyncSession = Depends(get_session)):
+    return {"bonds": await refresh_catalog(db, force=True)}
@@ -0,0 +1,299 @@
+# backend/app/startup.py
+"""
+Быстрый и предсказуемый старт.
+
+Миграции — только зафиксированные в migrations/versions, один раз до запуска сервера:
+
+    python -m app.startup migrate
+
+Если БД уже на head, команда выходит после одного SELECT из alembic_version, не
+загружая alembic env. Базы, созданные прежним autogenerate-on-boot (ревизия "auto",
+которой нет в versions, или таблицы без alembic_version), помечаются базовой
+ревизией BASELINE — схемой исходной версии — и дальше мигрируют обычным порядком;
+следующая ревизия (0001_series_schema) смотрит, что уже есть в БД, и создаёт только
+недостающее, если autogenerate успел применить часть изменений. Новая миграция — вручную:
+`alembic revision --autogenerate -m "..."`, проверить и закоммитить.
+
+Прогрев (run_warmup, запускается фоновой задачей при старте приложения):
+  - пул соединений: открываются DB_POOL_SIZE соединений;
+  - курсы fx_rates (кэш app.dashboard.load_fx_table);
+  - каталог облигаций: сводка BondsPage (кэш app.dashboard.load_dashboard);
+  - поисковый индекс ISS (app.moex_api.get_search_catalog) — ждём не дольше
+    WARMUP_UPSTREAM_TIMEOUT; недоступность MOEX не держит сервис в состоянии "не готов",
+    каталог догрузится при первом поиске;
+  - годовые секции price_history (app.price_history.ensure_price_partitions);
+  - лоты (app.lots.refresh_dirty): бумаги, помеченные после изменения сделок;
+  - сводные рейтинги (app.ratings.refresh_dirty): бумаги, у которых изменились рейтинги.
+
+Фоновые задачи запускает start_background_tasks() — его вызывает startup-обработчик
+приложения. В каждом воркере идут прогрев, LISTEN кэшей и замер лага event loop.
+Общие циклы (LEADER_JOBS: обслуживание price_history, обновление бумаг с ISS, кривая
+портфеля, синхронизация индексов, ставки ЦБ и прогноз купонов флоатеров, каталог
+скринера, ретенция журнала) идут только в ведущем воркере — том, что держит сессионную advisory-блокировку LEADER_LOCK
+(run_leader_forever); при его падении их подхватывает другой воркер.
+
+GET /health — процесс жив; GET /health/ready — 200 после прогрева, до этого 503.
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from pathlib import Path
+from typing import Awaitable, Callable
+import argparse, asyncio, logging, os, sys, time
+
+import asyncpg
+
+from app import cache_bus, dashboard, equity_curve, events, floaters, index_history, lots, metrics, moex_api, price_history, ratings, refresh, screener
+from app.database import engine, async_session, async_read_session, DB_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE = "0001_initial"
+# сколько ждать поисковый индекс ISS при прогреве, сек
+WARMUP_UPSTREAM_TIMEOUT = float(os.getenv("WARMUP_UPSTREAM_TIMEOUT", "30"))
+
+router = APIRouter(tags=["health"])
+
+_state = {
+    "started_at": time.monotonic(),
+    "ready": False,
+    "ready_after_s": None,
+    "steps": {},        # шаг -> {"seconds": ..., "ok": ..., "error": ...}
+    "leader": False,    # держит ли воркер LEADER_LOCK
+}
+
+
+# --- миграции ---
+
+def _alembic_config():
+    from alembic.config import Config
+    cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    return cfg
+
+
+async def _db_revisions() -> tuple[set[str], bool]:
+    """(ревизии из alembic_version, есть ли уже таблицы приложения)."""
+    try:
+        async with engine.connect() as conn:
+            has_version = await conn.scalar(text("SELECT to_regclass('alembic_version') IS NOT NULL"))
+            current = set()
+            if has_version:
+                current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+            has_tables = await conn.scalar(text("SELECT to_regclass('bonds') IS NOT NULL"))
+    finally:
+        # соединения этого event loop не должны остаться в пуле
+        await engine.dispose()
+    return current, bool(has_tables)
+
+
+def migrate() -> dict:
+    """Привести БД к head; возвращает, что было сделано и сколько заняло."""
+    from alembic import command
+    from alembic.script import ScriptDirectory
+
+    t0 = time.perf_counter()
+    cfg = _alembic_config()
+    script = ScriptDirectory.from_config(cfg)
+    heads = set(script.get_heads())
+    known = {rev.revision for rev in script.walk_revisions()}
+
+    current, has_tables = asyncio.run(_db_revisions())
+    result = {"from": sorted(current), "to": sorted(heads), "stamped": False}
+    if current == heads:
+        result.update(action="skip", seconds=round(time.perf_counter() - t0, 3))
+        return result
+
+    if (current and not current <= known) or (not current and has_tables):
+        # схема создана autogenerate-on-boot: не раньше базовой ревизии, остальное
+        # 0001_series_schema досоздаёт по факту
+        logger.warning("migrate: unknown revision %s, stamping %s", sorted(current) or None, BASELINE)
+        command.stamp(cfg, BASELINE, purge=True)
+        result["stamped"] = True
+
+    command.upgrade(cfg, "head")
+    result.update(action="upgrade", seconds=round(time.perf_counter() - t0, 3))
+    return result
+
+
+# --- прогрев ---
+
+async def _step(name: str, coro, timeout: float | None = None) -> bool:
+    t0 = time.perf_counter()
+    try:
+        await asyncio.wait_for(coro, timeout)
+        ok, error = True, None
+    except Exception as exc:
+        ok, error = False, f"{type(exc).__name__}: {exc}"
+        logger.warning("warmup: %s failed: %s", name, error)
+    _state["steps"][name] = {"seconds": round(time.perf_counter() - t0, 3), "ok": ok, "error": error}
+    return ok
+
+
+async def _warm_pool() -> None:
+    async def one():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(one() for _ in range(DB_POOL_SIZE)))
+
+
+async def _warm_fx() -> None:
+    async with async_read_session() as session:
+        await dashboard.load_fx_table(session)
+
+
+async def _warm_bond_catalog() -> None:
+    async with async_read_session() as session:
+        await dashboard.load_dashboard(session)
+
+
+async def _warm_price_partitions() -> None:
+    async with async_session() as session:
+        await price_history.ensure_price_partitions(session)
+
+
+async def _warm_lots() -> None:
+    async with async_session() as session:
+        await lots.refresh_dirty(session)
+
+
+async def _warm_ratings() -> None:
+    async with async_session() as session:
+        await ratings.refresh_dirty(session)
+
+
+async def run_warmup() -> dict:
+    """
+    Прогреть пул и кэши. Готовность — когда все шаги завершились (поисковый индекс
+    ждём не дольше WARMUP_UPSTREAM_TIMEOUT) и шаги БД прошли успешно.
+    """
+    t0 = time.perf_counter()
+    await _step("db_pool", _warm_pool())
+    await asyncio.gather(
+        _step("fx_table", _warm_fx()),
+        _step("bond_catalog", _warm_bond_catalog()),
+        _step("price_partitions", _warm_price_partitions()),
+        _step("lots", _warm_lots()),
+        _step("ratings", _warm_ratings()),
+        _step("search_index", moex_api.get_search_catalog(), WARMUP_UPSTREAM_TIMEOUT),
+    )
+    _state["ready"] = all(_state["steps"][s]["ok"] for s in ("db_pool", "fx_table", "bond_catalog"))
+    _state["ready_after_s"] = round(time.monotonic() - _state["started_at"], 3)
+    logger.info("warmup: ready=%s in %.2fs %s", _state["ready"], time.perf_counter() - t0, _state["steps"])
+    return dict(_state)
+
+
+# --- фоновые задачи ---
+
+# ключ сессионной advisory-блокировки ведущего воркера
+LEADER_LOCK = 280029
+# как часто воркер без блокировки пробует её взять и как часто ведущий проверяет соединение, сек
+LEADER_RETRY_SEC = float(os.getenv("LEADER_RETRY_SEC", "30"))
+LEADER_KEEPALIVE_SEC = float(os.getenv("LEADER_KEEPALIVE_SEC", "30"))
+
+# общие для всех воркеров циклы: ходят в ISS и пишут в общие таблицы, поэтому идут
+# в одном процессе — в том, что держит LEADER_LOCK
+LEADER_JOBS: dict[str, Callable[[], Awaitable[None]]] = {
+    "price-maintenance": price_history.run_price_maintenance_forever,
+    "bonds-refresh": refresh.run_bond_refresh_forever,
+    "equity-curve": equity_curve.run_equity_curve_forever,
+    "index-sync": index_history.run_index_sync_forever,
+    "rates-sync": floaters.run_rates_sync_forever,
+    "screener-refresh": screener.run_screener_refresh_forever,
+    "event-retention": events.run_event_retention_forever,
+}
+
+_tasks: list[asyncio.Task] = []
+
+
+async def run_leader_forever(retry_sec: float = LEADER_RETRY_SEC) -> None:
+    """
+    Фоновая задача воркера: берёт pg_try_advisory_lock(LEADER_LOCK) на отдельном
+    соединении и, пока держит его, крутит LEADER_JOBS. Блокировка сессионная —
+    если воркер умер или соединение оборвалось, PostgreSQL её снимает и задачи
+    подхватывает следующий воркер, взявший блокировку.
+    """
+    while True:
+        conn = None
+        leader_tasks: list[asyncio.Task] = []
+        try:
+            conn = await asyncpg.connect(cache_bus.asyncpg_dsn())
+            if await conn.fetchval("SELECT pg_try_advisory_lock($1)", LEADER_LOCK):
+                _state["leader"] = True
+                logger.info("leader: lock taken, starting %s", ", ".join(LEADER_JOBS))
+                loop = asyncio.get_running_loop()
+                leader_tasks = [loop.create_task(job(), name=name) for name, job in LEADER_JOBS.items()]
+                while True:
+                    await asyncio.sleep(LEADER_KEEPALIVE_SEC)
+                    await conn.fetchval("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("leader: lock connection failed: %s; retry in %.0fs", exc, retry_sec)
+        finally:
+            for task in leader_tasks:
+                task.cancel()
+            if leader_tasks:
+                await asyncio.gather(*leader_tasks, return_exceptions=True)
+            _state["leader"] = False
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(retry_sec)
+
+
+def start_background_tasks() -> list[asyncio.Task]:
+    """
+    Запускает задачи воркера: прогрев, LISTEN кэшей, замер лага и выбор ведущего
+    (run_leader_forever); повторный вызов ничего не делает.
+    """
+    if _tasks:
+        return _tasks
+    loop = asyncio.get_running_loop()
+    events.writer.start()
+    jobs = {
+        "warmup": run_warmup(),
+        "cache-listener": cache_bus.run_cache_listener_forever(),
+        "leader": run_leader_forever(),
+        "loop-lag": metrics.run_loop_lag_monitor(),
+    }
+    _tasks.extend(loop.create_task(coro, name=name) for name, coro in jobs.items())
+    return _tasks
+
+
+def is_ready() -> bool:
+    return _state["ready"]
+
+
+@router.get("/health")
+async def health():
+    return {"status": "ok", "uptime_s": round(time.monotonic() - _state["started_at"], 3)}
+
+
+@router.get("/health/ready")
+async def health_ready():
+    body = {
+        "ready": _state["ready"],
+        "ready_after_s": _state["ready_after_s"],
+        "steps": _state["steps"],
+        "leader": _state["leader"],
+    }
+    return JSONResponse(body, status_code=200 if _state["ready"] else 503)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.startup")
+    parser.add_argument("command", choices=["migrate", "warmup"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "migrate":
+        result = migrate()
+    else:
+        result = asyncio.run(run_warmup())
+    print(result)
+    if args.command == "warmup" and not result["ready"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,615 @@
+# backend/app/trade_import.py
+"""
+Импорт сделок из отчёта брокера (CSV / XLSX / XML) одним запросом.
+
+POST /api/trades/import — тело запроса: сам файл (не multipart). Тело пишется во
+временный файл (в памяти до IMPORT_SPOOL_BYTES, дальше на диск), затем читается
+построчно: csv.reader, openpyxl в режиме read_only, lxml.iterparse с очисткой
+разобранных элементов. Строки обрабатываются пачками по IMPORT_BATCH_ROWS:
+  1) чтение и разбор пачки — в рабочем потоке (asyncio.to_thread), event loop
+     не блокируется даже на больших XLSX/XML; проверка: бумага (SECID или ISIN), направление, дата, количество, цена,
+     необязательные НКД / комиссия / курс / сумма;
+  2) бумаги ищутся в bonds одним запросом на пачку; неизвестные запрашиваются
+     fetch_bond_from_moex параллельно (не больше IMPORT_MOEX_CONCURRENCY) и
+     добавляются с основными полями — остальное заполнит обычное обновление;
+  3) сделки, которые уже есть в trades (та же бумага, направление, дата, количество
+     и цена), не дублируются — повторный импорт того же отчёта ничего не добавит;
+  4) новые сделки пишутся COPY в той же транзакции, commit — один в конце.
+Память ограничена пачкой и справочниками по бумагам, а не размером отчёта.
+
+dry_run=true ничего не пишет и возвращает ту же сводку: сколько строк, ошибки,
+какие бумаги будут добавлены, новые и уже существующие сделки по каждой бумаге.
+Ошибка в любой строке откатывает импорт (422 со сводкой), если не указан skip_invalid.
+Неизвестная кодировка — 400; ISS недоступен при поиске новых бумаг — 503.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, or_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Iterator, Optional
+import asyncio, codecs, csv, io, itertools, logging, os, re, tempfile, time
+
+from app import models, metrics, upstream
+from app.database import get_session
+from app.moex_client import fetch_bond_from_moex
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl не установлен — XLSX не принимается
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/trades", tags=["trades"])
+
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "5000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+IMPORT_SPOOL_BYTES = int(os.getenv("IMPORT_SPOOL_BYTES", str(4 * 1024 * 1024)))
+IMPORT_MOEX_CONCURRENCY = int(os.getenv("IMPORT_MOEX_CONCURRENCY", "8"))
+# в сводке — не больше стольких ошибок и идентификаторов, остальное только счётчиками
+REPORT_LIMIT = 100
+# заголовок ищется в первых строках (у брокерских отчётов бывает шапка)
+HEADER_SCAN_ROWS = 50
+# разделители CSV и сколько символов начала файла смотреть при выборе
+CSV_DELIMITERS = ";,\t"
+CSV_SNIFF_CHARS = 64 * 1024
+XML_ROW_TAGS = ("trade", "deal", "row", "record", "item")
+
+# поле -> варианты заголовка (в нижнем регистре, ё -> е); берётся первый найденный
+FIELD_ALIASES = {
+    "secid": ("secid", "тикер", "код инструмента", "код бумаги", "инструмент", "ticker", "symbol"),
+    "isin": ("isin", "код isin", "isin код"),
+    "side": ("side", "direction", "operation", "вид сделки", "направление", "операция", "тип сделки",
+             "покупка/продажа"),
+    "date": ("date", "trade_date", "дата сделки", "дата заключения", "дата"),
+    "qty": ("qty", "quantity", "количество", "количество, шт", "кол-во"),
+    "price": ("price", "цена", "цена сделки"),
+    "price_pct": ("price_pct", "цена, %", "цена %", "цена в % от номинала", "цена (% от номинала)"),
+    "nkd": ("nkd", "accrued_interest", "accrued", "нкд", "накопленный купонный доход"),
+    "commission": ("commission", "fee", "комиссия", "комиссия брокера"),
+    "fx_rate": ("fx_rate", "курс", "курс валюты"),
+    "amount": ("amount", "total_amount", "сумма", "сумма сделки"),
+}
+CURRENCY_SYMBOLS = {"SUR": "₽", "RUB": "₽", "USD": "$", "EUR": "€", "CNY": "¥"}
+TRADE_COLUMNS = ("bond_id", "date", "buy_date", "buy_price", "buy_qty", "buy_nkd", "buy_commission",
+                 "sell_date", "sell_price", "sell_qty", "sell_nkd", "sell_commission", "total_amount", "fx_rate")
+
+_DMY = re.compile(r"(\d{1,2})[./](\d{1,2})[./](\d{2}|\d{4})$")
+_SPACES = re.compile(r"\s")
+
+
+class RowError(ValueError):
+    """Ошибка в строке отчёта."""
+
+
+@dataclass
+class ImportRow:
+    line: int
+    ident: str
+    side: str                   # "buy" | "sell"
+    date: date
+    qty: int
+    price: Optional[float]
+    price_pct: Optional[float]
+    nkd: Optional[float]
+    commission: Optional[float]
+    fx_rate: Optional[float]
+    amount: Optional[float]
+
+
+# --- разбор значений ---
+
+def _norm_header(name) -> str:
+    return " ".join(str(name or "").strip().lower().replace("ё", "е").split())
+
+
+def map_header(names: Iterable) -> dict[str, str]:
+    """Поле -> исходное имя колонки."""
+    by_norm = {}
+    for name in names:
+        by_norm.setdefault(_norm_header(name), name)
+    out = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in by_norm:
+                out[field] = by_norm[alias]
+                break
+    return out
+
+
+def _is_header(mapping: dict) -> bool:
+    return ("secid" in mapping or "isin" in mapping) and "qty" in mapping and (
+        "price" in mapping or "price_pct" in mapping)
+
+
+def _num(v) -> Optional[float]:
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = _SPACES.sub("", str(v)).replace(",", ".")
+    if not s or s == "-":
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        raise RowError(f"не число: {v!r}")
+
+
+def _date(v) -> Optional[date]:
+    if v is None or v == "":
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    s = str(v).strip()[:10]
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        pass
+    # strptime на каждую строку заметно медленнее регулярки
+    m = _DMY.match(s)
+    try:
+        if m:
+            d, mo, y = map(int, m.groups())
+            return date(y + 2000 if y < 100 else y, mo, d)
+    except ValueError:
+        pass
+    raise RowError(f"не дата: {v!r}")
+
+
+def _side(v) -> str:
+    s = str(v or "").strip().lower()
+    if s in ("buy", "b") or s.startswith(("пок", "куп")):
+        return "buy"
+    if s in ("sell", "s") or s.startswith("прод"):
+        return "sell"
+    raise RowError(f"направление не распознано: {v!r}")
+
+
+def parse_row(line: int, raw: dict, mapping: dict[str, str], price_unit: str = "abs") -> ImportRow:
+    """Строка отчёта -> ImportRow; RowError с описанием, если строка некорректна."""
+    get = lambda f: raw.get(mapping[f]) if f in mapping else None
+    ident = str(get("secid") or get("isin") or "").strip().upper()
+    if not ident:
+        raise RowError("нет SECID/ISIN")
+    d = _date(get("date"))
+    if d is None:
+        raise RowError("нет даты")
+    qty = _num(get("qty"))
+    if not qty:
+        raise RowError("нет количества")
+    side = _side(get("side")) if "side" in mapping else ("sell" if qty < 0 else "buy")
+    qty = abs(qty)
+    if qty != int(qty):
+        raise RowError(f"дробное количество: {qty}")
+    price, price_pct = _num(get("price")), _num(get("price_pct"))
+    if price_unit == "pct" and price_pct is None:
+        price, price_pct = None, price
+    if price is None and price_pct is None:
+        raise RowError("нет цены")
+    if (price or 0) < 0 or (price_pct or 0) < 0:
+        raise RowError("отрицательная цена")
+    fx_rate = _num(get("fx_rate"))
+    if fx_rate is not None and fx_rate <= 0:
+        raise RowError(f"некорректный курс: {fx_rate}")
+    nkd, commission = _num(get("nkd")), _num(get("commission"))
+    return ImportRow(line, ident, side, d, int(qty), price, price_pct,
+                     abs(nkd) if nkd is not None else None, abs(commission) if commission is not None else None,
+                     fx_rate, _num(get("amount")))
+
+
+# --- чтение форматов (синхронные генераторы (номер строки, dict)) ---
+
+def _table_rows(rows: Iterator[tuple[int, list]]) -> Iterator[tuple[int, dict, dict]]:
+    """Строки таблицы -> (номер, {колонка: значение}, mapping) после найденного заголовка."""
+    header = mapping = None
+    for n, values in rows:
+        if header is None:
+            m = map_header(values)
+            if _is_header(m):
+                header, mapping = [str(v) if v is not None else "" for v in values], m
+            elif n > HEADER_SCAN_ROWS:
+                raise HTTPException(status_code=400, detail="Не найден заголовок: нужны SECID/ISIN, количество и цена")
+            continue
+        if not any(v not in (None, "") for v in values):
+            continue
+        yield n, dict(zip(header, values)), mapping
+    if header is None:
+        raise HTTPException(status_code=400, detail="Не найден заголовок: нужны SECID/ISIN, количество и цена")
+
+
+def _csv_delimiter(lines: list[str]) -> str:
+    """
+    Разделитель, с которым одна из первых строк читается как заголовок: строки-титулы
+    вроде "Отчёт брокера, 2024 год" над таблицей с ";" не сбивают выбор. Заголовка
+    нет — csv.Sniffer по тем же строкам, затем самый частый из CSV_DELIMITERS.
+    """
+    for line in lines:
+        found = [
+            (len(cells), d) for d in CSV_DELIMITERS
+            if _is_header(map_header(cells := next(csv.reader([line], delimiter=d), [])))
+        ]
+        if found:
+            return max(found)[1]
+    sample = "".join(lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return max(CSV_DELIMITERS, key=sample.count)
+
+
+def iter_csv(f, encoding: str = "utf-8-sig") -> Iterator[tuple[int, dict, dict]]:
+    text = io.TextIOWrapper(f, encoding=encoding, errors="replace", newline="")
+    try:
+        head, size = [], 0
+        while len(head) < HEADER_SCAN_ROWS and size < CSV_SNIFF_CHARS:
+            line = text.readline()
+            if not line:
+                break
+            head.append(line)
+            size += len(line)
+        reader = csv.reader(itertools.chain(head, text), delimiter=_csv_delimiter(head))
+        yield from _table_rows((reader.line_num, row) for row in reader)
+    finally:
+        # файл закрывает вызывающий код, обёртка не должна
+        text.detach()
+
+
+def iter_xlsx(f) -> Iterator[tuple[int, dict, dict]]:
+    if openpyxl is None:
+        raise HTTPException(status_code=415, detail="XLSX не поддерживается: не установлен openpyxl")
+    wb = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        yield from _table_rows((n, list(r)) for n, r in enumerate(rows, 1))
+    finally:
+        wb.close()
+
+
+def iter_xml(f, row_tag: Optional[str] = None) -> Iterator[tuple[int, dict, dict]]:
+    from lxml import etree
+
+    tags = {row_tag.lower()} if row_tag else set(XML_ROW_TAGS)
+    mappings: dict[frozenset, dict] = {}
+    for _, el in etree.iterparse(f, events=("end",), huge_tree=True):
+        if not isinstance(el.tag, str) or etree.QName(el).localname.lower() not in tags:
+            continue
+        raw = dict(el.attrib)
+        for child in el:
+            if isinstance(child.tag, str):
+                raw[etree.QName(child).localname] = (child.text or "").strip()
+        key = frozenset(raw)
+        if key not in mappings:
+            mappings[key] = map_header(raw)
+        line = el.sourceline or 0
+        # разобранные элементы больше не нужны: дерево не растёт
+        el.clear()
+        parent = el.getparent()
+        while parent is not None and el.getprevious() is not None:
+            del parent[0]
+        yield line, raw, mappings[key]
+
+
+def detect_format(head: bytes, content_type: str = "") -> str:
+    ct = content_type.lower()
+    if head.startswith(b"PK") or "spreadsheet" in ct:
+        return "xlsx"
+    if head.lstrip(codecs.BOM_UTF8 + b" \t\r\n").startswith(b"<") or ct.endswith("/xml"):
+        return "xml"
+    return "csv"
+
+
+def iter_rows(f, fmt: str, encoding: str = "utf-8-sig", row_tag: Optional[str] = None):
+    if fmt == "xlsx":
+        return iter_xlsx(f)
+    if fmt == "xml":
+        return iter_xml(f, row_tag)
+    return iter_csv(f, encoding)
+
+
+# --- бумаги ---
+
+def _rec(rec: dict, *keys):
+    for k in keys:
+        v = rec.get(k)
+        if v is None:
+            v = rec.get(k.lower())
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def bond_from_record(rec: dict) -> Optional[dict]:
+    """Запись ISS (страница бумаги или /securities.json) -> поля новой строки bonds."""
+    secid = _rec(rec, "SECID")
+    if not secid:
+        return None
+    currency = _rec(rec, "FACEUNIT", "CURRENCYID")
+    try:
+        maturity = _date(_rec(rec, "MATDATE"))
+    except RowError:
+        maturity = None
+    return {
+        "secid": secid,
+        "isin": _rec(rec, "ISIN"),
+        "name": _rec(rec, "SHORTNAME", "SECNAME", "NAME") or secid,
+        "emitent": _rec(rec, "EMITENT_TITLE"),
+        "coupon": _rec(rec, "COUPONPERCENT"),
+        "maturity_date": maturity,
+        "currency": currency,
+        "currency_symbol": CURRENCY_SYMBOLS.get((currency or "").upper()),
+        "face_value": _rec(rec, "FACEVALUE"),
+        "last_price": _rec(rec, "LAST_ABS", "LCURRENTPRICE_ABS"),
+        "nkd": _rec(rec, "ACCRUEDINT"),
+    }
+
+
+@dataclass
+class BondRef:
+    id: Optional[int]           # None — будет добавлена (dry_run)
+    secid: str
+    face_value: Optional[float]
+
+
+class Resolver:
+    """SECID/ISIN -> BondRef; один запрос к bonds на пачку, неизвестные — в ISS."""
+
+    def __init__(self, db: AsyncSession, add_missing: bool, dry_run: bool):
+        self.db = db
+        self.add_missing = add_missing
+        self.dry_run = dry_run
+        self.known: dict[str, Optional[BondRef]] = {}
+        self.added: list[str] = []
+
+    async def resolve(self, idents: set[str]) -> None:
+        todo = idents - self.known.keys()
+        if not todo:
+            return
+        B = models.Bond
+        res = await self.db.execute(
+            select(B.id, B.secid, B.isin, B.face_value)
+            .where(or_(func.upper(B.secid).in_(todo), func.upper(B.isin).in_(todo)))
+        )
+        for bond_id, secid, isin, face in res.all():
+            ref = BondRef(bond_id, secid, face)
+            for key in (secid, isin):
+                if key and key.upper() in todo:
+                    self.known[key.upper()] = ref
+        missing = todo - self.known.keys()
+        if missing and self.add_missing:
+            await self._fetch_missing(missing)
+        for ident in missing - self.known.keys():
+            self.known[ident] = None
+
+    async def _fetch_missing(self, idents: set[str]) -> None:
+        sem = asyncio.Semaphore(IMPORT_MOEX_CONCURRENCY)
+
+        async def one(ident: str):
+            async with sem:
+                try:
+                    found = await fetch_bond_from_moex(ident)
+                except upstream.UpstreamUnavailable:
+                    raise
+                except Exception as exc:
+                    logger.warning("import: ISS lookup of %s failed: %s", ident, exc)
+                    return ident, None
+            return ident, bond_from_record(found.record) if found else None
+
+        found = {ident: row for ident, row in await asyncio.gather(*(one(i) for i in sorted(idents))) if row}
+        if not found:
+            return
+        rows = list({row["secid"]: row for row in found.values()}.values())
+        ids: dict[str, int] = {}
+        if not self.dry_run:
+            B = models.Bond
+            await self.db.execute(pg_insert(B).values(rows).on_conflict_do_nothing(index_elements=["secid"]))
+            res = await self.db.execute(select(B.id, B.secid).where(B.secid.in_([r["secid"] for r in rows])))
+            ids = dict((secid, bond_id) for bond_id, secid in res.all())
+        self.added.extend(r["secid"] for r in rows)
+        for ident, row in found.items():
+            self.known[ident] = BondRef(ids.get(row["secid"]), row["secid"], _num(row["face_value"]))
+
+
+# --- импорт ---
+
+def _key(side: str, d: Optional[date], qty, price) -> tuple:
+    return side, d, int(qty or 0), round(float(price or 0.0), 4)
+
+
+def to_trade(row: ImportRow, bond: BondRef) -> dict:
+    price = row.price
+    if price is None:
+        price = row.price_pct * (bond.face_value or 1000.0) / 100.0
+    sign = 1.0 if row.side == "buy" else -1.0
+    amount = row.amount
+    if amount is None:
+        amount = price * row.qty + (row.nkd or 0.0) + sign * (row.commission or 0.0)
+    p = row.side + "_"
+    trade = dict.fromkeys(TRADE_COLUMNS)
+    trade.update({"bond_id": bond.id, "date": row.date, p + "date": row.date, p + "price": price,
+                  p + "qty": row.qty, p + "nkd": row.nkd, p + "commission": row.commission,
+                  "total_amount": abs(amount), "fx_rate": row.fx_rate})
+    return trade
+
+
+class Importer:
+    def __init__(self, db: AsyncSession, dry_run: bool, skip_invalid: bool, add_missing: bool):
+        self.db = db
+        self.dry_run = dry_run
+        self.skip_invalid = skip_invalid
+        self.resolver = Resolver(db, add_missing, dry_run)
+        self.existing: dict[str, Counter] = {}
+        self.rows = self.invalid = self.new = self.duplicates = 0
+        self.errors: list[dict] = []
+        self.by_bond: dict[str, dict] = {}
+
+    def error(self, line: int, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < REPORT_LIMIT:
+            self.errors.append({"line": line, "error": message})
+
+    async def _load_existing(self, bonds: list[BondRef]) -> None:
+        """Ключи уже сохранённых сделок по бумагам (один раз на бумагу)."""
+        todo = {b.id: b.secid for b in bonds if b.id is not None and b.secid not in self.existing}
+        for b in bonds:
+            self.existing.setdefault(b.secid, Counter())
+        if not todo:
+            return
+        T = models.Trade
+        res = await self.db.execute(
+            select(T.bond_id, T.buy_date, T.buy_qty, T.buy_price, T.sell_date, T.sell_qty, T.sell_price, T.date)
+            .where(T.bond_id.in_(todo))
+        )
+        for bond_id, bd, bq, bp, sd, sq, sp, d in res.all():
+            counter = self.existing[todo[bond_id]]
+            if bq:
+                counter[_key("buy", bd or d, bq, bp)] += 1
+            if sq:
+                counter[_key("sell", sd or d, sq, sp)] += 1
+
+    async def add_batch(self, batch: list[ImportRow]) -> None:
+        await self.resolver.resolve({r.ident for r in batch})
+        refs = [self.resolver.known[r.ident] for r in batch]
+        await self._load_existing([b for b in refs if b is not None])
+        records = []
+        for row, bond in zip(batch, refs):
+            if bond is None:
+                self.error(row.line, f"бумага {row.ident} не найдена")
+                continue
+            trade = to_trade(row, bond)
+            p = row.side + "_"
+            stats = self.by_bond.setdefault(bond.secid, {"new": 0, "existing": 0, "buy_qty": 0, "sell_qty": 0})
+            existing = self.existing[bond.secid]
+            key = _key(row.side, row.date, row.qty, trade[p + "price"])
+            if existing[key] > 0:
+                existing[key] -= 1
+                self.duplicates += 1
+                stats["existing"] += 1
+                continue
+            self.new += 1
+            stats["new"] += 1
+            stats[p + "qty"] += row.qty
+            records.append(tuple(trade[c] for c in TRADE_COLUMNS))
+        if records and not self.dry_run and not self.failed:
+            conn = await self.db.connection()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table("trades", records=records, columns=list(TRADE_COLUMNS))
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.invalid) and not self.skip_invalid
+
+    @staticmethod
+    def parse_batch(rows: Iterator[tuple[int, dict, dict]], price_unit: str) -> tuple[list, list, int]:
+        """Следующие IMPORT_BATCH_ROWS строк -> (разобранные, [(строка, ошибка)], прочитано); синхронно."""
+        batch, errors, n = [], [], 0
+        for line, raw, mapping in itertools.islice(rows, IMPORT_BATCH_ROWS):
+            n += 1
+            try:
+                batch.append(parse_row(line, raw, mapping, price_unit))
+            except RowError as exc:
+                errors.append((line, str(exc)))
+        return batch, errors, n
+
+    async def run(self, rows: Iterator[tuple[int, dict, dict]], price_unit: str) -> None:
+        while True:
+            # чтение файла и разбор — CPU-bound, вне event loop; генератор продолжается в следующем вызове
+            batch, errors, n = await asyncio.to_thread(self.parse_batch, rows, price_unit)
+            self.rows += n
+            for line, message in errors:
+                self.error(line, message)
+            if batch:
+                await self.add_batch(batch)
+            if n < IMPORT_BATCH_ROWS:
+                break
+
+    def report(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "new_trades": self.new,
+            "existing_trades": self.duplicates,
+            "bonds_added": self.resolver.added[:REPORT_LIMIT],
+            "bonds_added_count": len(self.resolver.added),
+            "by_bond": self.by_bond,
+        }
+
+
+async def _spool(request: Request):
+    f = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > IMPORT_MAX_BYTES:
+            f.close()
+            raise HTTPException(status_code=413, detail=f"Файл больше {IMPORT_MAX_BYTES} байт")
+        f.write(chunk)
+    f.seek(0)
+    return f
+
+
+@metrics.job("trade_import")
+async def import_trades(db: AsyncSession, f, fmt: str, *, dry_run: bool = False, skip_invalid: bool = False,
+                        add_missing: bool = True, price_unit: str = "abs", encoding: str = "utf-8-sig",
+                        row_tag: Optional[str] = None) -> dict:
+    """Импорт из файла f; без dry_run и ошибок — commit, иначе rollback. Возвращает сводку."""
+    t0 = time.perf_counter()
+    importer = Importer(db, dry_run, skip_invalid, add_missing)
+    try:
+        await importer.run(iter_rows(f, fmt, encoding, row_tag), price_unit)
+        if dry_run or importer.failed:
+            await db.rollback()
+        else:
+            # кривую портфеля с самой ранней импортированной даты пометит триггер equity_dirty
+            await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    out = importer.report()
+    out["format"] = fmt
+    out["written"] = 0 if dry_run or importer.failed else importer.new
+    out["seconds"] = round(time.perf_counter() - t0, 3)
+    logger.info("import: %s rows, %s new, %s existing, %s invalid, written=%s in %.2fs",
+                out["rows"], out["new_trades"], out["existing_trades"], out["invalid"], out["written"], out["seconds"])
+    return out
+
+
+@router.post("/import")
+async def post_trades_import(
+    request: Request,
+    format: str = Query("auto", pattern="^(auto|csv|xlsx|xml)$"),
+    dry_run: bool = False,
+    skip_invalid: bool = False,
+    add_missing: bool = True,
+    price_unit: str = Query("abs", pattern="^(abs|pct)$"),
+    encoding: str = "utf-8-sig",
+    row_tag: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Тело — файл отчёта. format=auto определяет формат по содержимому;
+    price_unit=pct — колонка "Цена" в % от номинала; row_tag — тег строки сделки в XML.
+    """
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Неизвестная кодировка: {encoding}")
+    f = await _spool(request)
+    try:
+        fmt = format if format != "auto" else detect_format(f.read(64), request.headers.get("content-type", ""))
+        f.seek(0)
+        out = await import_trades(db, f, fmt, dry_run=dry_run, skip_invalid=skip_invalid, add_missing=add_missing,
+                                  price_unit=price_unit, encoding=encoding, row_tag=row_tag)
+    except upstream.UpstreamUnavailable as exc:
+        raise HTTPException(status_code=503, detail=f"Не удалось найти новые бумаги: {exc}")
+    finally:
+        f.close()
+    return JSONResponse(out, status_code=422 if out["invalid"] and not skip_invalid and not dry_run else 200)
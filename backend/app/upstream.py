@@ -0,0 +1,326 @@
+# backend/app/upstream.py
+"""
+Устойчивость внешних вызовов (MOEX ISS, corpbonds, ЦБ): все GET идут через get(host, url, ...).
+
+На каждый хост:
+  - AIMD-лимит параллельных запросов: +1/limit за успешный быстрый ответ, ×UPSTREAM_BACKOFF
+    на 429/5xx/таймаут или ответ медленнее UPSTREAM_LATENCY_TARGET (не чаще раза в
+    UPSTREAM_DECREASE_INTERVAL); Retry-After из 429/503 приостанавливает хост целиком;
+  - circuit breaker: после UPSTREAM_BREAKER_FAILURES подряд перегрузок хост "открыт" на
+    UPSTREAM_BREAKER_COOLDOWN секунд — запросы сразу получают UpstreamUnavailable
+    (или закэшированный ответ, см. stale_ok); затем один пробный запрос (half-open);
+  - бюджет повторов (как retry throttling в gRPC): токены UPSTREAM_RETRY_TOKENS, −1 за
+    перегрузку, +UPSTREAM_RETRY_TOKEN_RATIO за успех; повтор разрешён, пока токенов
+    больше половины — при массовых отказах повторы прекращаются сами;
+  - stale_ok=True: последний успешный ответ на тот же URL хранится в памяти
+    (UPSTREAM_STALE_MAX_MB) и отдаётся, когда хост открыт или запрос не удался.
+
+Перегрузкой считаются 429, 5xx, таймауты и сетевые ошибки; 404 и прочие 4xx — нормальный
+ответ. Повторяются только перегрузки, с экспоненциальной задержкой и jitter.
+Состояние хостов — в метриках (app.metrics: upstream_concurrency_limit, upstream_inflight,
+upstream_breaker_state, upstream_retry_tokens, upstream_resilience_total).
+"""
+from collections import OrderedDict, deque
+from typing import Optional
+import asyncio, logging, os, random, time
+
+import httpx
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_INITIAL_CONCURRENCY = float(os.getenv("UPSTREAM_INITIAL_CONCURRENCY", "8"))
+UPSTREAM_MIN_CONCURRENCY = float(os.getenv("UPSTREAM_MIN_CONCURRENCY", "1"))
+UPSTREAM_MAX_CONCURRENCY = float(os.getenv("UPSTREAM_MAX_CONCURRENCY", "32"))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", "0.5"))
+UPSTREAM_LATENCY_TARGET = float(os.getenv("UPSTREAM_LATENCY_TARGET", "2.0"))
+UPSTREAM_DECREASE_INTERVAL = float(os.getenv("UPSTREAM_DECREASE_INTERVAL", "1.0"))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+UPSTREAM_RETRY_TOKENS = float(os.getenv("UPSTREAM_RETRY_TOKENS", "10"))
+UPSTREAM_RETRY_TOKEN_RATIO = float(os.getenv("UPSTREAM_RETRY_TOKEN_RATIO", "0.1"))
+UPSTREAM_STALE_MAX_MB = float(os.getenv("UPSTREAM_STALE_MAX_MB", "64"))
+RETRY_BASE_DELAY = 0.2          # сек, первая пауза перед повтором
+RETRY_AFTER_MAX = 30.0          # Retry-After больше этого не соблюдаем
+
+# corpbonds — HTML-страницы сайта, а не API: стартуем осторожнее
+HOST_DEFAULTS = {
+    "corpbonds.ru": {"initial": 4, "max": 8},
+}
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+_STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+
+class UpstreamUnavailable(httpx.HTTPError):
+    """Хост открыт circuit breaker'ом или недоступен после повторов; кэша нет."""
+
+    def __init__(self, host: str, reason: str):
+        super().__init__(f"{host} unavailable: {reason}")
+        self.host = host
+        self.reason = reason
+
+
+class HostState:
+    def __init__(self, host: str):
+        opts = HOST_DEFAULTS.get(host, {})
+        self.host = host
+        self.max_limit = float(opts.get("max", UPSTREAM_MAX_CONCURRENCY))
+        self.limit = min(float(opts.get("initial", UPSTREAM_INITIAL_CONCURRENCY)), self.max_limit)
+        self.inflight = 0
+        self._waiters: deque = deque()
+        self._last_decrease = 0.0
+        self.paused_until = 0.0
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe = False
+        self.retry_tokens = UPSTREAM_RETRY_TOKENS
+
+    # --- лимит параллельности ---
+
+    async def acquire(self) -> None:
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self.inflight < int(self.limit):
+                break
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._wake()      # слот был отдан нам — передать следующему
+                raise
+            finally:
+                if not fut.done():
+                    fut.cancel()
+        self.inflight += 1
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.inflight
+        while free > 0 and self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                free -= 1
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < UPSTREAM_DECREASE_INTERVAL:
+            return
+        self._last_decrease = now
+        self.limit = max(UPSTREAM_MIN_CONCURRENCY, self.limit * UPSTREAM_BACKOFF)
+        metrics.upstream_event(self.host, "limit_decrease")
+
+    # --- circuit breaker ---
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= UPSTREAM_BREAKER_COOLDOWN:
+            self.state = HALF_OPEN
+            self._probe = False
+        if self.state == HALF_OPEN and not self._probe:
+            self._probe = True
+            return True
+        return False
+
+    def _open(self) -> None:
+        if self.state != OPEN:
+            logger.warning("upstream: %s circuit open for %.0fs", self.host, UPSTREAM_BREAKER_COOLDOWN)
+            metrics.upstream_event(self.host, "breaker_open")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probe = False
+
+    def abort_probe(self) -> None:
+        """Пробный запрос не дошёл до исхода (отмена, не сетевая ошибка) — как перегрузка: снова OPEN."""
+        if self.state == HALF_OPEN:
+            self._open()
+
+    # --- исходы ---
+
+    def on_success(self, latency: float) -> None:
+        self.retry_tokens = min(UPSTREAM_RETRY_TOKENS, self.retry_tokens + UPSTREAM_RETRY_TOKEN_RATIO)
+        if self.state != CLOSED:
+            logger.info("upstream: %s circuit closed", self.host)
+        self.state = CLOSED
+        self.failures = 0
+        self._probe = False
+        if latency > UPSTREAM_LATENCY_TARGET:
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_overload(self, retry_after: Optional[float] = None) -> None:
+        self.retry_tokens = max(0.0, self.retry_tokens - 1.0)
+        self.failures += 1
+        self._decrease()
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(retry_after, RETRY_AFTER_MAX))
+        if self.state == HALF_OPEN or self.failures >= UPSTREAM_BREAKER_FAILURES:
+            self._open()
+
+    def can_retry(self) -> bool:
+        return self.retry_tokens > UPSTREAM_RETRY_TOKENS / 2
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "waiting": len(self._waiters),
+            "state": _STATE_NAMES[self.state],
+            "failures": self.failures,
+            "retry_tokens": round(self.retry_tokens, 2),
+        }
+
+
+_hosts: dict[str, HostState] = {}
+
+
+def host_state(host: str) -> HostState:
+    state = _hosts.get(host)
+    if state is None:
+        state = _hosts[host] = HostState(host)
+    return state
+
+
+def host_stats() -> dict[str, dict]:
+    """Состояние всех хостов (для метрик и отладки)."""
+    return {host: state.stats() for host, state in _hosts.items()}
+
+
+# --- последний успешный ответ ---
+
+class _StaleCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, httpx.Response] = OrderedDict()
+
+    def get(self, key: str) -> Optional[httpx.Response]:
+        r = self._items.get(key)
+        if r is not None:
+            self._items.move_to_end(key)
+        return r
+
+    def put(self, key: str, r: httpx.Response) -> None:
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old.content)
+        if len(r.content) > self.max_bytes:
+            return
+        self._items[key] = r
+        self.size += len(r.content)
+        while self.size > self.max_bytes and self._items:
+            _, dropped = self._items.popitem(last=False)
+            self.size -= len(dropped.content)
+
+
+_stale = _StaleCache(int(UPSTREAM_STALE_MAX_MB * 1024 * 1024))
+
+
+# --- общий клиент ---
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop = None
+
+
+def client() -> httpx.AsyncClient:
+    """Один AsyncClient (пул keep-alive соединений) на event loop вместо клиента на вызов."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(limits=httpx.Limits(max_connections=200, max_keepalive_connections=50))
+        _client_loop = loop
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def _retry_after(r: httpx.Response) -> Optional[float]:
+    try:
+        return float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def _overloaded(r: httpx.Response) -> bool:
+    return r.status_code == 429 or r.status_code >= 500
+
+
+async def get(host: str, url: str, params: Optional[dict] = None, timeout: float = 10.0,
+              stale_ok: bool = False) -> httpx.Response:
+    """
+    GET с лимитом, breaker'ом и повторами. Возвращает ответ как есть (raise_for_status —
+    на вызывающем). Если повторы не помогли: закэшированный ответ (stale_ok), иначе
+    последний ответ 429/5xx, а без ответа вовсе (сеть, открытый хост) — UpstreamUnavailable.
+    """
+    state = host_state(host)
+    key = str(httpx.URL(url, params=params)) if stale_ok else ""
+    last_error = "breaker open"
+    last_response = None
+    for attempt in range(UPSTREAM_MAX_ATTEMPTS):
+        if attempt and not state.can_retry():
+            metrics.upstream_event(host, "retry_budget_exhausted")
+            break
+        if not state.allow():
+            metrics.upstream_event(host, "rejected_open")
+            last_error = "breaker open"
+            break
+        probe = state.state == HALF_OPEN
+        try:
+            if attempt:
+                metrics.upstream_event(host, "retry")
+                await asyncio.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+            await state.acquire()
+            t0 = time.monotonic()
+            try:
+                r = await client().get(url, params=params, timeout=timeout)
+            finally:
+                state.release()
+        except httpx.TransportError as exc:
+            state.on_overload()
+            last_error = f"{type(exc).__name__}: {exc}"
+            continue
+        except BaseException:
+            # отмена (wait_for, разрыв клиента) или не сетевое исключение: без этого
+            # пробный запрос оставил бы хост в HALF_OPEN и все вызовы получали бы "breaker open"
+            if probe:
+                state.abort_probe()
+            raise
+        if _overloaded(r):
+            state.on_overload(_retry_after(r))
+            last_error = f"HTTP {r.status_code}"
+            last_response = r
+            continue
+        state.on_success(time.monotonic() - t0)
+        if stale_ok and r.status_code == 200:
+            _stale.put(key, r)
+        return r
+
+    if stale_ok:
+        cached = _stale.get(key)
+        if cached is not None:
+            metrics.upstream_event(host, "stale_served")
+            logger.info("upstream: %s %s (%s), serving cached response", host, url, last_error)
+            return cached
+    if last_response is not None:
+        return last_response
+    raise UpstreamUnavailable(host, last_error)
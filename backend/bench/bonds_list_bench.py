@@ -0,0 +1,120 @@
+# backend/bench/bonds_list_bench.py
+"""
+GET /bonds: сборка и сериализация списка облигаций, цель — 1000 бумаг быстрее 20 мс.
+
+    python -m bench.bonds_list_bench                       # синтетика без БД: только сериализация
+    python -m bench.bonds_list_bench --bonds 1000 --coupons 8 --repeats 50
+    python -m bench.bonds_list_bench --db                  # + запросы к БД (DATABASE_URL, например после synth_data)
+
+Сравниваются:
+  - fast       — app.bonds: dict'ы + TypeAdapter.dump_json (то, что отдаёт эндпоинт);
+  - pydantic   — list[BondOut] через TypeAdapter: валидация + computed-поля + dump_json;
+  - fastapi    — BondOut.model_validate на каждый объект + jsonable_encoder + json.dumps
+                 (путь response_model по умолчанию);
+  - db_fast    — load_bonds (2 запроса) + dump, с --db;
+  - db_orm     — select(Bond) + selectinload(coupons) + BondOut + jsonable_encoder, с --db.
+"""
+import argparse, asyncio, json, random, statistics, time
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import bonds, schemas
+
+RATINGS = ("AAA(RU)", "AA+(RU)", "A-(RU)", "BBB(RU)", None)
+
+
+def synth_rows(n: int, coupons: int, seed: int = 1):
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows, by_bond = [], {}
+    for i in range(1, n + 1):
+        r = {c: None for c in bonds._BOND_COLUMNS}
+        r.update(
+            id=i, secid=f"RU000B{i:05d}", isin=f"RU000B{i:05d}", name=f"Облигация {i}", emitent=f"Эмитент{i % 300}",
+            market="bonds", coupon=round(rnd.uniform(5, 20), 2), maturity_date=date(2027, 1, 1) + timedelta(days=i),
+            ytm=round(rnd.uniform(10, 25), 2), last_price=round(rnd.uniform(800, 1100), 2), amortization=rnd.random() < 0.2,
+            akra_rating=rnd.choice(RATINGS), akra_forecast="Стабильный", currency="SUR", currency_symbol="₽",
+            updated_at=now, day_open=1000.0, week_open=998.0, month_open=990.0, year_open=950.0, nkd=12.5, face_value=1000.0,
+            last_buy_price=round(rnd.uniform(800, 1100), 2),
+        )
+        rows.append(r)
+        by_bond[i] = [{"date": date(2025, 1, 1) + timedelta(days=91 * k), "value": 35.0, "currency": "SUR"}
+                      for k in range(coupons)]
+    return rows, by_bond
+
+
+def timeit(fn, repeats: int) -> list[float]:
+    out = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+async def atimeit(fn, repeats: int) -> list[float]:
+    out = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        await fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def row(name: str, samples: list[float], size: int | None = None) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    print(f"{name:<12}{statistics.median(ms):>10.2f}{p95:>10.2f}{(size or 0) / 1024:>12.0f}")
+
+
+async def db_scenarios(args) -> None:
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from app import models
+    from app.database import async_read_session
+
+    async def fast():
+        async with async_read_session() as session:
+            bonds.dump(await bonds.load_bonds(session, with_coupons=not args.no_coupons))
+
+    async def orm():
+        async with async_read_session() as session:
+            res = await session.execute(select(models.Bond).options(selectinload(models.Bond.coupons)))
+            items = [schemas.BondOut.model_validate(b) for b in res.scalars().all()]
+            json.dumps(jsonable_encoder(items))
+
+    await fast()
+    row("db_fast", await atimeit(fast, args.repeats))
+    row("db_orm", await atimeit(orm, max(3, args.repeats // 10)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bonds", type=int, default=1000)
+    parser.add_argument("--coupons", type=int, default=8, help="купонов на бумагу в синтетике")
+    parser.add_argument("--no-coupons", action="store_true", help="как /bonds?coupons=false")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+
+    rows, by_bond = synth_rows(args.bonds, args.coupons)
+    coupons = None if args.no_coupons else by_bond
+    items = bonds.build_items(rows, coupons)
+    payload = bonds.dump(items)
+
+    full = [dict(r, coupons=by_bond[r["id"]] if coupons else []) for r in rows]
+    adapter = TypeAdapter(list[schemas.BondOut])
+
+    print(f"{'path':<12}{'p50 ms':>10}{'p95 ms':>10}{'size KiB':>12}")
+    row("fast", timeit(lambda: bonds.dump(bonds.build_items(rows, coupons)), args.repeats), len(payload))
+    row("pydantic", timeit(lambda: adapter.dump_json(adapter.validate_python(full)), args.repeats))
+    row("fastapi", timeit(lambda: json.dumps(jsonable_encoder([schemas.BondOut.model_validate(r) for r in full])),
+                          max(3, args.repeats // 10)))
+    if args.db:
+        asyncio.run(db_scenarios(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/bench/cold_start.py
+"""
+Время холодного старта backend: миграции при старте и время до готовности.
+
+    python -m bench.cold_start                       # миграции: прежний путь vs app.startup migrate
+    python -m bench.cold_start --serve --repeats 5   # + uvicorn до 200 на /health/ready
+    python -m bench.cold_start --serve --app app.main:app --port 8011
+
+Прежний путь (dev-entrypoint.sh до перехода на зафиксированные миграции):
+`alembic revision --autogenerate` + `alembic upgrade head` — каждый шаг загружает env.py,
+модели и подключается к БД; сгенерированный файл ревизии удаляется после замера.
+Новый путь: `python -m app.startup migrate` — при БД на head один SELECT из alembic_version.
+
+С --serve поднимается uvicorn и опрашиваются /health (процесс принимает запросы)
+и /health/ready (прогрев пула и кэшей завершён). Нужны DATABASE_URL и БД на head.
+"""
+import argparse, os, statistics, subprocess, sys, time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+VERSIONS_DIR = BACKEND_DIR / "migrations" / "versions"
+
+
+def _run(cmd: list[str]) -> float:
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def legacy_migrate() -> float:
+    before = set(VERSIONS_DIR.glob("*.py"))
+    try:
+        return (_run(["alembic", "revision", "--autogenerate", "-m", "auto"])
+                + _run(["alembic", "upgrade", "head"]))
+    finally:
+        for path in set(VERSIONS_DIR.glob("*.py")) - before:
+            path.unlink()
+
+
+def new_migrate() -> float:
+    return _run([sys.executable, "-m", "app.startup", "migrate"])
+
+
+def serve(app: str, port: int, timeout: float) -> tuple[float, float]:
+    """(секунд до первого 200 на /health, секунд до 200 на /health/ready)."""
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    alive = ready = None
+    try:
+        with httpx.Client(base_url=base, timeout=1.0) as client:
+            while ready is None and time.perf_counter() - t0 < timeout:
+                try:
+                    if alive is None and client.get("/health").status_code == 200:
+                        alive = time.perf_counter() - t0
+                    if alive is not None and client.get("/health/ready").status_code == 200:
+                        ready = time.perf_counter() - t0
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    if ready is None:
+        raise TimeoutError(f"{app} not ready after {timeout}s")
+    return alive, ready
+
+
+def _row(name: str, values: list[float]) -> None:
+    print(f"{name:<28}{len(values):>4}{statistics.median(values):>10.2f}{min(values):>10.2f}{max(values):>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="не замерять autogenerate + upgrade")
+    parser.add_argument("--serve", action="store_true", help="замерить время до /health/ready")
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    if not os.getenv("DATABASE_URL"):
+        sys.exit("DATABASE_URL is not set")
+
+    print(f"{'step':<28}{'n':>4}{'median s':>10}{'min s':>10}{'max s':>10}")
+    if not args.skip_legacy:
+        _row("autogenerate+upgrade", [legacy_migrate() for _ in range(args.repeats)])
+    _row("startup migrate (at head)", [new_migrate() for _ in range(args.repeats)])
+    if args.serve:
+        runs = [serve(args.app, args.port, args.timeout) for _ in range(args.repeats)]
+        _row("uvicorn -> /health", [a for a, _ in runs])
+        _row("uvicorn -> /health/ready", [r for _, r in runs])
+
+
+if __name__ == "__main__":
+    main()
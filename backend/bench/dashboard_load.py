@@ -0,0 +1,119 @@
+# backend/bench/dashboard_load.py
+"""
+Профиль нагрузки "много открытых дашбордов" (в духе Locust/k6, без внешних зависимостей):
+каждый виртуальный пользователь при открытии грузит страницу, а затем раз в --interval
+секунд повторяет опрос, как это делает фронтенд:
+
+  открытие: /bonds?coupons=false, /positions, /coupons, /logs, /trades, /api/trades_breakdown,
+            /api/dashboard, /api/portfolio_summary, /fxrates, /api/chart/index/RGBI
+  каждые 60 с: /api/dashboard, /api/portfolio_summary, /fxrates x3 (три панели)
+               и PUT /bonds {"ids": []} + POST /logs — "обновить всё" (только с --refresh,
+               ходит во внешние источники — запускать против bench.stub_server).
+
+    python -m bench.dashboard_load --base-url http://localhost:8010 --users 50 200 --duration 300
+    python -m bench.dashboard_load --users 500 --interval 5 --duration 60     # ускоренный прогон
+
+Пользователи стартуют равномерно в течение --ramp секунд, первый опрос — со случайным
+сдвигом внутри интервала (как вкладки, открытые в разное время). Печатается латентность
+по эндпоинтам (p50/p95/p99), ошибки и итоговый RPS.
+"""
+import argparse, asyncio, random, statistics, time
+from collections import defaultdict
+
+import httpx
+
+PAGE_LOAD = ("/bonds?coupons=false", "/positions", "/coupons", "/logs?limit=100&exclude_type=refresh&exclude_type=refresh_error",
+             "/trades", "/api/trades_breakdown", "/api/dashboard", "/api/portfolio_summary", "/fxrates",
+             "/api/chart/index/RGBI?range=year&points=300")
+POLL = ("/api/dashboard", "/api/portfolio_summary", "/fxrates", "/fxrates", "/fxrates")
+
+
+class Stats:
+    def __init__(self):
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def observe(self, key: str, seconds: float, ok: bool) -> None:
+        if ok:
+            self.latency[key].append(seconds)
+        else:
+            self.errors[key] += 1
+
+
+async def call(client: httpx.AsyncClient, stats: Stats, method: str, path: str, **kw) -> None:
+    key = f"{method} {path.split('?')[0]}"
+    t0 = time.perf_counter()
+    try:
+        r = await client.request(method, path, **kw)
+        ok = r.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    stats.observe(key, time.perf_counter() - t0, ok)
+
+
+async def user(client: httpx.AsyncClient, stats: Stats, start_delay: float, interval: float,
+               deadline: float, refresh: bool) -> None:
+    await asyncio.sleep(start_delay)
+    if time.perf_counter() >= deadline:
+        return
+    await asyncio.gather(*(call(client, stats, "GET", p) for p in PAGE_LOAD))
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        tasks = [call(client, stats, "GET", p) for p in POLL]
+        if refresh:
+            tasks.append(call(client, stats, "PUT", "/bonds", json={"ids": []}))
+            tasks.append(call(client, stats, "POST", "/logs",
+                              json={"message": "Обновлены все облигации", "event_type": "refresh"}))
+        await asyncio.gather(*tasks)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] * 1000 if values else 0.0
+
+
+def report(users: int, stats: Stats, elapsed: float) -> None:
+    total = sum(len(v) for v in stats.latency.values())
+    errors = sum(stats.errors.values())
+    print(f"\nusers={users} requests={total} errors={errors} rps={total / elapsed:.1f} elapsed={elapsed:.0f}s")
+    print(f"{'endpoint':<36}{'n':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for key in sorted(set(stats.latency) | set(stats.errors)):
+        lat = stats.latency.get(key, [])
+        mean = statistics.fmean(lat) * 1000 if lat else 0.0
+        print(f"{key:<36}{len(lat):>8}{stats.errors.get(key, 0):>6}"
+              f"{_pct(lat, 0.5):>10.1f}{_pct(lat, 0.95):>10.1f}{_pct(lat, 0.99):>10.1f}{mean:>10.1f}")
+
+
+async def run(args, users: int) -> None:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        await asyncio.gather(*(
+            user(client, stats, args.ramp * i / users, args.interval, deadline, args.refresh)
+            for i in range(users)
+        ))
+        report(users, stats, time.perf_counter() - t0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8010")
+    parser.add_argument("--users", type=int, nargs="+", default=[50])
+    parser.add_argument("--interval", type=float, default=60.0, help="период опроса фронтенда, сек")
+    parser.add_argument("--duration", type=float, default=300.0)
+    parser.add_argument("--ramp", type=float, default=30.0, help="за сколько секунд открываются все дашборды")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--refresh", action="store_true", help="включить PUT /bonds (обновление из внешних источников)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    for n in args.users:
+        asyncio.run(run(args, n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# backend/bench/db_pool_load.py
+"""
+Нагрузочный прогон пула соединений: N конкурентных "клиентов" в течение
+заданного времени выполняют типичный read-запрос (позиции портфеля) через
+get_read_session и get_session, печатают throughput, латентность и состояние пула.
+
+Запуск внутри контейнера backend:
+    python -m bench.db_pool_load --clients 50 200 --seconds 15
+Параметры пула берутся из .env (DB_POOL_SIZE, DB_MAX_OVERFLOW, ...).
+"""
+import argparse, asyncio, statistics, time
+
+from sqlalchemy import select, func
+
+from app import models
+from app.database import async_session, async_read_session, engine, pool_stats
+
+
+async def _query(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(
+            select(models.Trade.bond_id, func.sum(models.Trade.buy_qty))
+            .join(models.Bond, models.Bond.id == models.Trade.bond_id)
+            .group_by(models.Trade.bond_id)
+        )
+
+
+async def _client(session_factory, deadline: float, latencies: list, errors: list) -> None:
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            await _query(session_factory)
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(clients: int, seconds: float, session_factory) -> dict:
+    latencies: list[float] = []
+    errors: list[str] = []
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*[_client(session_factory, deadline, latencies, errors) for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+
+    lat_ms = sorted(x * 1000 for x in latencies)
+
+    def pct(p: float) -> float:
+        if not lat_ms:
+            return 0.0
+        return lat_ms[min(len(lat_ms) - 1, int(len(lat_ms) * p))]
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(lat_ms), 2) if lat_ms else 0.0,
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+        "pool": pool_stats(),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--seconds", type=float, default=15.0)
+    args = parser.parse_args()
+
+    for label, factory in (("read-only", async_read_session), ("read-write", async_session)):
+        for n in args.clients:
+            res = await run(n, args.seconds, factory)
+            pool = res.pop("pool")
+            print(
+                f"[{label}] clients={res['clients']:>4} rps={res['rps']:>8} "
+                f"p50={res['p50_ms']}ms p95={res['p95_ms']}ms p99={res['p99_ms']}ms "
+                f"errors={res['errors']} max_checked_out={pool['max_checked_out']} "
+                f"saturation={pool['saturation']}"
+            )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,319 @@
+# backend/bench/golden.py
+"""
+Офлайн-сверка расчётной математики с зафиксированными значениями — без БД и сети.
+
+    python -m bench.golden                  # все секции
+    python -m bench.golden --only ratings   # выбранные секции
+
+Секции:
+  - analytics — YTM, дюрация, выпуклость и текущая доходность на бумагах с решением
+    в замкнутой форме (бескупонная, купонная по номиналу, амортизируемая);
+  - accrued — НКД по соглашениям act/period, act/365, 30/360; accrued_range против
+    accrued_bulk на каждую дату;
+  - lots — FIFO/avg: реализованный результат, остаток лотов, валютная переоценка, НКД;
+  - floaters — разбор формул купона и прогноз купонов по кривой ставки (спред, floor,
+    лаг фиксации, амортизация);
+  - iss — YIELD/DURATION, опубликованные MOEX, для бумаг из фикстур, записанных
+    `python -m bench.stub_server --record` (bench/fixtures/iss); без фикстур секция пуста.
+
+Каждая секция — набор случаев (название, получено, ожидается, допуск). Расхождение
+печатается построчно; при любом расхождении или исключении код выхода 1.
+"""
+import argparse, json, math, sys
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from app import accrued, analytics, floaters, lots, ratings
+
+Case = tuple[str, object, object, float]
+
+
+# --- ratings ---
+
+# записи агентств и то, что встречается в колонках вместо рейтинга
+RATING_CASES = (
+    ("AAA(RU)", 1), ("AA+(RU)", 2), ("A-(RU)", 7), ("BBB(RU)", 9), ("B-(RU)", 16),   # АКРА
+    ("ruAA+", 2), ("ruA", 6), ("ruBB-", 13), ("ruCCC", 17), ("ruC", 19),            # Эксперт РА
+    ("AA+.ru", 2), ("AA+|ru|", 2), ("BBB-.ru", 10), ("RD|ru|", 20),                 # НКР
+    ("АА+(RU)", 2), ("ВВВ-(RU)", 10), ("С(RU)", 19), ("A−(RU)", 7),                  # кириллица и минус
+    ("SD", 20), ("D", 21), ("ruD", 21),
+    ("Снят", None), ("Снят с рейтинга", None), ("Аннулирован", None), ("Вывод", None),
+    ("Отозван", None), ("Нет рейтинга", None), ("withdrawn", None), ("", None), (None, None),
+)
+
+
+def check_ratings() -> Iterator[Case]:
+    for text, notch in RATING_CASES:
+        yield f"normalize({text!r})", ratings.normalize(text), notch, 0.0
+    yield "composite(2, 5, 9)", ratings.composite([2, 5, 9]), 5, 0.0
+    yield "composite(2, 9)", ratings.composite([2, None, 9]), 9, 0.0
+    yield "notch_to_rating(5.4)", ratings.notch_to_rating(5.4), "A+", 0.0
+    yield "bucket(17)", ratings.bucket(17), 7, 0.0
+
+
+# --- analytics ---
+
+SETTLEMENT = date(2024, 1, 1)
+
+
+def _years(n: float) -> date:
+    # analytics считает время как дни / 365, поэтому "год" здесь — ровно 365 дней
+    return SETTLEMENT + timedelta(days=round(365 * n))
+
+
+def _bond(bond_id: int, price: float, maturity: date, coupon: Optional[float] = None) -> SimpleNamespace:
+    return SimpleNamespace(id=bond_id, secid=f"G{bond_id}", face_value=1000.0, maturity_date=maturity,
+                           last_price=price, nkd=0.0, coupon=coupon)
+
+
+def check_analytics() -> Iterator[Case]:
+    y = 0.12
+    zero = _bond(1, 1000.0 / (1 + y) ** 2, _years(2))
+    # купонная по номиналу: YTM = ставка купона, дюрация Маколея = (1+y)/y * (1 - (1+y)^-n)
+    par = _bond(2, 1000.0, _years(5), coupon=10.0)
+    # амортизация 500 + 500, купон 10% на остаток: по номиналу YTM тоже 10%
+    amort = _bond(3, 1000.0, _years(2))
+    unpriced = _bond(4, 0.0, _years(1))
+    coupons = {
+        2: [(_years(k), 100.0) for k in range(1, 6)],
+        3: [(_years(1), 100.0), (_years(2), 50.0)],
+        4: [(_years(1), 100.0)],
+    }
+    amorts = {3: [(_years(1), 500.0), (_years(2), 500.0)]}
+    res = {r["id"]: r for r in analytics.analyze_bonds([zero, par, amort, unpriced], coupons, amorts, SETTLEMENT)}
+
+    yield "zero ytm", res[1]["ytm"], 12.0, 1e-4
+    yield "zero duration", res[1]["duration"], 2.0, 1e-9
+    yield "zero modified_duration", res[1]["modified_duration"], 2 / (1 + y), 1e-9
+    yield "zero convexity", res[1]["convexity"], 2 * 3 / (1 + y) ** 2, 1e-9
+    yield "par ytm", res[2]["ytm"], 10.0, 1e-4
+    yield "par duration", res[2]["duration"], 1.1 / 0.1 * (1 - 1.1 ** -5), 1e-9
+    yield "par current_yield", res[2]["current_yield"], 10.0, 1e-4
+    yield "amortizing ytm", res[3]["ytm"], 10.0, 1e-4
+    yield "amortizing duration", res[3]["duration"], (1 * 600 / 1.1 + 2 * 550 / 1.21) / 1000, 1e-9
+    yield "zero price ytm", res[4]["ytm"], None, 0.0
+
+
+# --- accrued ---
+
+def _nan_to_none(v) -> Optional[float]:
+    v = float(v)
+    return v if math.isfinite(v) else None
+
+
+def check_accrued() -> Iterator[Case]:
+    jan, apr, jul, dec = date(2024, 1, 1), date(2024, 4, 1), date(2024, 7, 1), date(2024, 12, 30)
+    half = [(jan, 50.0), (jul, 50.0)]                   # 182 дня, к 1 апреля прошло 91
+    cases = (
+        ("act/period mid-period", [half], apr, "act/period", None, 25.0),
+        ("act/period unknown next coupon", [[(jan, 40.0), (jul, None)]], apr, "act/period", None, 20.0),
+        ("act/period before first coupon", [[(jul, 50.0), (dec, 50.0)]], apr, "act/period", None, 25.0),
+        ("act/period on coupon date", [half], jan, "act/period", None, 0.0),
+        ("act/period after maturity", [half], dec, "act/period", None, None),
+        ("act/365 by rate", [half], apr, "act/365", [10.0], round(1000 * 0.10 * 91 / 365, 2)),
+        ("act/365 implied rate", [half], apr, "act/365", None, round(1000 * (50 / 1000 * 365 / 182) * 91 / 365, 2)),
+        # 31.01 -> 01.03 по 30/360: 30 * 2 + (1 - 30) = 31 день
+        ("30/360 end of month", [[(date(2024, 1, 31), 50.0), (date(2024, 7, 31), 50.0)]], date(2024, 3, 1),
+         "30/360", [10.0], round(1000 * 0.10 * 31 / 360, 2)),
+    )
+    for label, schedules, settlement, convention, rates, expected in cases:
+        got = accrued.accrued_bulk(schedules, settlement, convention, coupon_rates=rates)[0]
+        yield label, _nan_to_none(got), expected, 0.005
+
+    schedules = [half, [(jan, 40.0), (jul, None), (dec, None)], [(jul, 50.0), (dec, 50.0)], []]
+    days = np.arange(date(2023, 12, 1).toordinal(), date(2025, 1, 31).toordinal())
+    matrix = accrued.accrued_range(schedules, days)
+    bad = 0
+    for j, d in enumerate(days):
+        bulk = accrued.accrued_bulk(schedules, date.fromordinal(int(d)))
+        bad += int(not np.array_equal(matrix[:, j], bulk, equal_nan=True))
+    yield f"accrued_range == accrued_bulk over {days.size} days", bad, 0, 0.0
+
+
+# --- lots ---
+
+def _leg(trade_id: int, side: str, day: int, qty: int, price: float, nkd: float = 0.0,
+         commission: float = 0.0, fx: float = 1.0) -> lots.Leg:
+    return lots.Leg(trade_id, side, date(2024, 1, day), qty, price, nkd, commission, fx)
+
+
+def check_lots() -> Iterator[Case]:
+    legs = [
+        _leg(1, "buy", 10, 10, 100.0, commission=1.0),
+        _leg(2, "buy", 11, 10, 110.0, commission=1.0),
+        _leg(3, "sell", 12, 15, 120.0, commission=1.5),
+    ]
+    # FIFO: закрыт лот 1 целиком (1001) и половина лота 2 (550.5); выручка 1800 - 1.5
+    fifo = lots.replay(legs, "fifo")
+    yield "fifo cost", fifo.realized[0]["cost"], 1001.0 + 550.5, 1e-9
+    yield "fifo pnl", fifo.realized[0]["pnl"], 1798.5 - 1551.5, 1e-9
+    yield "fifo open qty", sum(l.qty for l in fifo.lots), 5, 0.0
+    yield "fifo open cost", fifo.lots[0].cost, 550.5, 1e-9
+    yield "fifo open lot", fifo.lots[0].trade_id, 2, 0.0
+    # avg: общий лот 20 шт. за 2102, продано 3/4
+    avg = lots.replay(legs, "avg")
+    yield "avg cost", avg.realized[0]["cost"], 2102.0 * 0.75, 1e-9
+    yield "avg pnl", avg.realized[0]["pnl"], 1798.5 - 1576.5, 1e-9
+    yield "avg open cost", avg.lots[0].cost, 525.5, 1e-9
+
+    # валюта: результат в валюте 0, в рублях — переоценка 90 -> 100; НКД 10 уплачен, 30 получен
+    fx = lots.replay([_leg(1, "buy", 10, 1, 1000.0, nkd=10.0, fx=90.0),
+                      _leg(2, "sell", 20, 1, 1000.0, nkd=30.0, fx=100.0)], "fifo")
+    yield "fx pnl", fx.realized[0]["pnl"], 0.0, 1e-9
+    yield "fx pnl_rub", fx.realized[0]["pnl_rub"], 10000.0, 1e-6
+    yield "nkd_income", fx.realized[0]["nkd_income"], 20.0, 1e-9
+    yield "nkd_income_rub", fx.realized[0]["nkd_income_rub"], 30 * 100.0 - 10 * 90.0, 1e-6
+
+    # продажа больше позиции: закрывается то, что есть, остаток — unmatched
+    over = lots.replay([_leg(1, "buy", 10, 3, 100.0), _leg(2, "sell", 11, 5, 110.0)], "fifo")
+    yield "oversell matched", over.realized[0]["qty"], 3, 0.0
+    yield "oversell unmatched", over.unmatched_qty, 2, 0.0
+    yield "oversell pnl", over.realized[0]["pnl"], 110.0 * 5 * 3 / 5 - 300.0, 1e-9
+
+
+# --- floaters ---
+
+FORMULA_CASES = (
+    ("КС + 2%", ("KEYRATE", 1.0, 2.0, None, None, 0)),
+    ("RUONIA + 1,3%", ("RUONIA", 1.0, 1.3, None, None, 0)),
+    ("Ключевая ставка + 250 б.п., но не ниже 8%", ("KEYRATE", 1.0, 2.5, 8.0, None, 0)),
+    ("1.1 * КС", ("KEYRATE", 1.1, 0.0, None, None, 0)),
+    ("КС - 0,5 п.п., не выше 20%", ("KEYRATE", 1.0, -0.5, None, 20.0, 0)),
+    ("КС + 1,5% (лаг 5 дней)", ("KEYRATE", 1.0, 1.5, None, None, 5)),
+    ("Фиксированный 10%", None),
+    ("", None),
+)
+
+
+def check_floaters() -> Iterator[Case]:
+    for text, expected in FORMULA_CASES:
+        got = floaters.parse_formula(text)
+        yield f"parse_formula({text!r})", tuple(got) if got else None, expected, 0.0
+
+    jan, jul, dec = date(2024, 1, 1), date(2024, 7, 1), date(2024, 12, 30)     # периоды по 182 дня
+    # ключевая 16% до 28.06, затем 18%
+    curve = floaters.RateCurve([(date(2023, 12, 1), 16.0), (date(2024, 6, 28), 18.0)])
+    coupons = [(jan, 40.0), (jul, None), (dec, None)]
+    settlement = date(2024, 2, 1)
+
+    def project(text, amorts=()):
+        return dict(floaters.project_coupons(floaters.parse_formula(text), curve, coupons, 1000.0,
+                                             list(amorts), settlement))
+
+    plain = project("КС + 2%")
+    yield "KC+2 first period", plain.get(jul), round(1000 * 0.18 * 182 / 365, 2), 0.0
+    yield "KC+2 second period", plain.get(dec), round(1000 * 0.20 * 182 / 365, 2), 0.0
+    # фиксация за 5 дней до начала второго периода (26.06) — ещё 16%
+    lagged = project("КС + 2% (лаг 5 дней)")
+    yield "KC+2 lag 5 second period", lagged.get(dec), round(1000 * 0.18 * 182 / 365, 2), 0.0
+    floored = project("КС + 1%, но не ниже 19%")
+    yield "floor first period", floored.get(jul), round(1000 * 0.19 * 182 / 365, 2), 0.0
+    # половина номинала погашена 01.07 — второй купон на остаток 500
+    amortized = project("КС + 2%", [(jul, 500.0)])
+    yield "amortized second period", amortized.get(dec), round(500 * 0.20 * 182 / 365, 2), 0.0
+
+
+# --- iss: записанные ответы MOEX ---
+
+ISS_FIXTURES = Path(__file__).parent / "fixtures" / "iss"
+ISS_YIELD_TOLERANCE = 0.15          # п.п.
+ISS_DURATION_TOLERANCE = 5.0        # дней
+
+
+def _iss_json(pattern: str) -> dict:
+    """Секции ISS ({имя: [dict строк]}) из всех фикстур по шаблону имени."""
+    out: dict[str, list] = {}
+    for p in sorted(ISS_FIXTURES.glob(pattern)):
+        if p.suffix == ".meta":
+            continue
+        for name, block in json.loads(p.read_text(encoding="utf-8")).items():
+            if isinstance(block, dict) and "columns" in block:
+                out.setdefault(name, []).extend(dict(zip(block["columns"], row)) for row in block.get("data") or [])
+    return out
+
+
+def _iso(v) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(v)[:10])
+    except ValueError:
+        return None
+
+
+def check_iss() -> Iterator[Case]:
+    prefix = "engines__stock__markets__bonds__securities__"
+    secids = sorted({p.name[len(prefix):].split(".json")[0] for p in ISS_FIXTURES.glob(prefix + "*.json*")})
+    for secid in secids:
+        page = _iss_json(f"{prefix}{secid}.json*")
+        md = next((r for r in page.get("marketdata", []) if r.get("YIELD") and r.get("LAST")), None)
+        sec = next(iter(page.get("securities", [])), None)
+        if md is None or sec is None or not sec.get("FACEVALUE"):
+            continue
+        sched = _iss_json(f"securities__{secid}__bondization.json*")
+        coupons = [(d, r.get("value")) for r in sched.get("coupons", []) if (d := _iso(r.get("coupondate")))]
+        amorts = [(d, r.get("value")) for r in sched.get("amortizations", []) if (d := _iso(r.get("amortdate")))]
+        settlement = _iso(sec.get("SETTLEDATE")) or _iso(md.get("SYSTIME"))
+        if not coupons or settlement is None:
+            continue
+        face = float(sec["FACEVALUE"])
+        bond = SimpleNamespace(id=0, secid=secid, face_value=face, maturity_date=_iso(sec.get("MATDATE")),
+                               last_price=float(md["LAST"]) * face / 100, nkd=sec.get("ACCRUEDINT"), coupon=None)
+        r = analytics.analyze_bonds([bond], {0: coupons}, {0: amorts}, settlement)[0]
+        yield f"{secid} YIELD", r["ytm"], float(md["YIELD"]), ISS_YIELD_TOLERANCE
+        if md.get("DURATION"):
+            duration = r["duration"] * 365 if r["duration"] is not None else None
+            yield f"{secid} DURATION", duration, float(md["DURATION"]), ISS_DURATION_TOLERANCE
+
+
+SECTIONS: dict[str, Callable[[], Iterator[Case]]] = {
+    "analytics": check_analytics,
+    "accrued": check_accrued,
+    "lots": check_lots,
+    "floaters": check_floaters,
+    "ratings": check_ratings,
+    "iss": check_iss,
+}
+
+
+def _matches(got, expected, tol: float) -> bool:
+    if expected is None or got is None:
+        return got is expected
+    if isinstance(expected, float) or tol:
+        return got is not None and math.isfinite(float(got)) and abs(float(got) - float(expected)) <= tol
+    return got == expected
+
+
+def run(only: Optional[list[str]] = None) -> int:
+    failed = total = 0
+    for name, section in SECTIONS.items():
+        if only and name not in only:
+            continue
+        checked = bad = 0
+        try:
+            for label, got, expected, tol in section():
+                checked += 1
+                if not _matches(got, expected, tol):
+                    bad += 1
+                    print(f"  {name}: {label}: got={got!r} expected={expected!r} tol={tol}")
+        except Exception as exc:
+            bad += 1
+            print(f"  {name}: raised {type(exc).__name__}: {exc}")
+        print(f"{name:<10} checked={checked} mismatched={bad}")
+        total += checked
+        failed += bad
+    print(f"total checked={total} mismatched={failed}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", nargs="+", choices=sorted(SECTIONS))
+    args = parser.parse_args()
+    sys.exit(run(args.only))
+
+
+if __name__ == "__main__":
+    main()
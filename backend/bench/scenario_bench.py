@@ -0,0 +1,46 @@
+# backend/bench/scenario_bench.py
+"""
+Бенчмарк app.scenarios на синтетическом портфеле (без БД):
+
+    python -m bench.scenario_bench --bonds 500 --scenarios 50
+"""
+import argparse, random, time
+from datetime import date
+
+from app import scenarios
+from bench.ytm_bench import synthetic_portfolio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bonds", type=int, nargs="+", default=[500])
+    parser.add_argument("--scenarios", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    settlement = date.today()
+    grid = scenarios.default_scenarios(["USD", "CNY"])
+    rnd = random.Random(7)
+    while len(grid) < args.scenarios:
+        grid.append({"name": f"mix {len(grid)}", "parallel_bp": rnd.uniform(-300, 300), "ks_bp": rnd.uniform(-200, 200)})
+    grid = grid[:args.scenarios]
+
+    for n in args.bonds:
+        bonds, coupons = synthetic_portfolio(n, settlement)
+        for i, b in enumerate(bonds):
+            b.currency = ("SUR", "SUR", "USD", "CNY")[i % 4]
+            b.coupon_type = "Плавающий" if i % 5 == 0 else "Фиксированный"
+            b.coupon_display = "КС + 2%" if i % 5 == 0 else None
+        qty = {b.id: 10 for b in bonds}
+        fx = {b.id: {"SUR": 1.0, "USD": 90.0, "CNY": 12.5}[b.currency] for b in bonds}
+        best = float("inf")
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            res = scenarios.run_scenarios(bonds, coupons, {}, qty, fx, grid, settlement)
+            best = min(best, time.perf_counter() - t0)
+        worst = min(res, key=lambda r: r["pnl_rub"])
+        print(f"bonds={n:>6} scenarios={len(grid)} best={best * 1000:8.2f}ms worst={worst['name']} {worst['pnl_percent']}%")
+
+
+if __name__ == "__main__":
+    main()
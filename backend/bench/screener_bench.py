@@ -0,0 +1,103 @@
+# backend/bench/screener_bench.py
+"""
+Скринер (app.screener): расчёт доходности/дюрации при обновлении каталога и
+латентность выборок по bond_catalog. Цель — выборка по 30k бумаг за миллисекунды.
+
+    python -m bench.screener_bench                        # compute_rows на синтетике, без БД
+    python -m bench.screener_bench --db --seed            # заполнить bond_catalog синтетикой и замерить запросы
+    python -m bench.screener_bench --db --repeats 200     # замерить на текущем каталоге
+
+Запросы — типичные фильтры экрана: рублёвые A и выше до 3 лет по доходности,
+валютные без амортизации по дюрации, оферта + купон 10–15%, вторая страница по курсору.
+"""
+import argparse, asyncio, random, statistics, time
+from datetime import date, timedelta
+
+from app import screener
+
+RATINGS = ("AAA(RU)", "AA+(RU)", "AA(RU)", "A+(RU)", "A-(RU)", "BBB(RU)", "BB+(RU)", "B(RU)", None)
+
+
+def synth_cards(n: int, seed: int = 1) -> list[dict]:
+    rnd = random.Random(seed)
+    today = date.today()
+    cards = []
+    for i in range(n):
+        maturity = today + timedelta(days=rnd.randint(30, 5400))
+        cards.append({
+            "secid": f"RU000S{i:06d}", "isin": f"RU000S{i:06d}", "name": f"Облигация {i}", "emitent": f"Эмитент{i % 2000}",
+            "market": "bonds", "currency": rnd.choices(("SUR", "USD", "CNY", "EUR"), (85, 6, 7, 2))[0],
+            "coupon": round(rnd.uniform(0, 22), 2), "coupon_period": rnd.choice((30, 91, 182, 182, 365)),
+            "maturity_date": maturity,
+            "offer_date": maturity - timedelta(days=rnd.randint(90, 700)) if rnd.random() < 0.2 else None,
+            "amortization": rnd.random() < 0.12, "rating": rnd.choice(RATINGS), "face_value": 1000.0,
+            "price": round(rnd.uniform(70, 106), 2), "accrued": round(rnd.uniform(0, 40), 2),
+        })
+    return cards
+
+
+QUERIES = {
+    "rub_A+_3y_by_ytm": dict(sort="ytm", currency="SUR", rating_min="A", maturity_to=date.today() + timedelta(days=1095)),
+    "fx_no_amort_by_dur": dict(sort="duration", currency="USD,CNY,EUR", amortization=False),
+    "offer_coupon_10_15": dict(sort="ytm", has_offer=True, coupon_min=10, coupon_max=15),
+    "all_by_maturity": dict(sort="maturity"),
+    "bbb_nr_ytm_20_30": dict(sort="ytm", rating="BBB,NR", ytm_min=20, ytm_max=30),
+}
+
+
+async def with_db(args, rows: list[dict]) -> None:
+    from sqlalchemy import delete, text
+    from app import bulk, models
+    from app.database import async_read_session, async_session, engine
+
+    if args.seed:
+        async with async_session() as session:
+            await session.execute(delete(models.BondCatalog))
+            await bulk.upsert_bond_catalog(session, rows)
+            await session.commit()
+            await session.execute(text("ANALYZE bond_catalog"))
+            await session.commit()
+        print(f"seeded bond_catalog with {len(rows):,} rows")
+
+    print(f"{'query':<22}{'p50 ms':>10}{'p95 ms':>10}{'items':>8}")
+    async with async_read_session() as session:
+        for name, filters in QUERIES.items():
+            for page in (1, 2):
+                samples, out, cursor = [], None, None
+                if page == 2:
+                    first = await screener.screen(session, limit=args.limit, **filters)
+                    cursor = first.next_cursor
+                    if not cursor:
+                        continue
+                for _ in range(args.repeats):
+                    t0 = time.perf_counter()
+                    out = await screener.screen(session, limit=args.limit, cursor=cursor, **filters)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                samples.sort()
+                p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+                label = name if page == 1 else "  page 2"
+                print(f"{label:<22}{statistics.median(samples):>10.2f}{p95:>10.2f}{len(out.items):>8}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bonds", type=int, default=30_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--db", action="store_true")
+    parser.add_argument("--seed", action="store_true", help="заменить bond_catalog синтетикой (--bonds бумаг)")
+    args = parser.parse_args()
+
+    cards = synth_cards(args.bonds)
+    t0 = time.perf_counter()
+    rows = screener.compute_rows(cards, {}, date.today())
+    dt = time.perf_counter() - t0
+    solved = sum(r["ytm"] is not None for r in rows)
+    print(f"compute_rows: {len(rows):,} bonds in {dt:.2f}s, ytm solved for {solved:,}")
+    if args.db:
+        asyncio.run(with_db(args, rows))
+
+
+if __name__ == "__main__":
+    main()
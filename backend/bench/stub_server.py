@@ -0,0 +1,524 @@
+# backend/bench/stub_server.py
+"""
+Локальный стаб внешних источников для бенчмарков: MOEX ISS, ЦБ (XML_daily,
+hd_base) и corpbonds.ru на одном порту.
+
+    python -m bench.stub_server --port 8099 --latency-ms 40 --jitter-ms 15 --error-rate 0.01
+
+Бэкенд направляется на стаб переменными окружения:
+    MOEX_ISS_BASE=http://127.0.0.1:8099/iss
+    CBR_BASE=http://127.0.0.1:8099/cbr
+    CORPBONDS_BASE=http://127.0.0.1:8099/corpbonds
+
+Ответы:
+  - из записанных фикстур (bench/fixtures/<источник>/...), если файл есть;
+    записать их можно режимом --record (проксирует на настоящие хосты и сохраняет ответ);
+  - иначе — синтетика в формате источника, детерминированная по SECID
+    (вселенная из --universe бумаг RU000B000000..., каждая 10-я — ОФЗ SU26xxxRMFS).
+
+Задержка и ошибки меняются на лету: POST /_stub/config {"latency_ms": 40 | {"iss": 40, "cbr": 80},
+"jitter_ms": 10, "error_rate": 0.05, "timeout_rate": 0.0}; GET /_stub/stats — счётчики запросов.
+"""
+import argparse, asyncio, hashlib, json, random, zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+from aiohttp import web, ClientSession, ClientTimeout
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+UPSTREAMS = {
+    "iss": "https://iss.moex.com/iss",
+    "cbr": "https://www.cbr.ru",
+    "corpbonds": "https://corpbonds.ru",
+}
+FX = {"USD": (1, 92.41), "EUR": (1, 99.87), "CNY": (1, 12.68), "KZT": (100, 18.35)}
+
+
+# --- синтетические бумаги ---
+
+def secid_for(i: int) -> str:
+    return f"SU{26000 + i:05d}RMFS" if i % 10 == 0 else f"RU000B{i:05d}0"
+
+
+def universe(n: int) -> list[str]:
+    return [secid_for(i) for i in range(n)]
+
+
+def bond_params(secid: str) -> dict:
+    rnd = random.Random(zlib.crc32(secid.encode()))
+    today = date.today()
+    ofz = secid.startswith("SU")
+    period = 182 if ofz else rnd.choice((30, 91, 91, 182))
+    maturity = today + timedelta(days=rnd.randint(120, 3650))
+    issue = maturity - timedelta(days=period * rnd.randint(6, 40))
+    currency = "SUR" if ofz else rnd.choices(("SUR", "USD", "CNY"), (85, 8, 7))[0]
+    floater = not ofz and rnd.random() < 0.15
+    return {
+        "secid": secid,
+        "isin": secid if not ofz else f"RU000A{zlib.crc32(secid.encode()) % 100000:05d}1",
+        "name": (f"ОФЗ {secid[2:7]}" if ofz else f"Эмитент{rnd.randint(1, 400)} БО-{rnd.randint(1, 9):02d}"),
+        "emitent": "Минфин России" if ofz else f"ПАО Эмитент{rnd.randint(1, 400)}",
+        "ofz": ofz,
+        "face": 1000.0,
+        "currency": currency,
+        "coupon_pct": round(rnd.uniform(5, 20), 2),
+        "period": period,
+        "issue": issue,
+        "maturity": maturity,
+        "price_pct": round(rnd.uniform(82, 104), 2),
+        "floater": floater,
+        "amortizing": not ofz and rnd.random() < 0.1,
+        "rating": None if ofz else rnd.choice(("AAA(RU)", "AA+(RU)", "AA(RU)", "A+(RU)", "A(RU)", "BBB+(RU)", "BB(RU)")),
+    }
+
+
+def coupon_dates(p: dict) -> list[date]:
+    out, d = [], p["issue"]
+    while d < p["maturity"]:
+        d = min(d + timedelta(days=p["period"]), p["maturity"])
+        out.append(d)
+    return out
+
+
+def coupon_value(p: dict) -> float:
+    return round(p["face"] * p["coupon_pct"] / 100 * p["period"] / 365, 2)
+
+
+def amortizations(p: dict) -> list[tuple[date, float, float]]:
+    """(дата, сумма, % от номинала): для амортизируемых — 4 равные части в последний год."""
+    if not p["amortizing"]:
+        return [(p["maturity"], p["face"], 100.0)]
+    dates = coupon_dates(p)[-4:]
+    part = p["face"] / len(dates)
+    return [(d, round(part, 2), round(100 / len(dates), 2)) for d in dates]
+
+
+def accrued(p: dict, today: date) -> float:
+    prev = p["issue"]
+    for d in coupon_dates(p):
+        if d > today:
+            return round(coupon_value(p) * (today - prev).days / p["period"], 2)
+        prev = d
+    return 0.0
+
+
+def _table(columns: list[str], rows: list[list]) -> dict:
+    return {"columns": columns, "data": rows}
+
+
+def _weekdays(d_from: date, d_till: date):
+    d = d_from
+    while d <= d_till:
+        if d.weekday() < 5:
+            yield d
+        d += timedelta(days=1)
+
+
+def _price_on(p: dict, d: date) -> float:
+    rnd = random.Random(zlib.crc32(f"{p['secid']}{d.toordinal()}".encode()))
+    return round(p["price_pct"] + rnd.uniform(-1.5, 1.5), 2)
+
+
+# --- MOEX ISS ---
+
+SEC_COLUMNS = ["SECID", "BOARDID", "SHORTNAME", "SECNAME", "ISIN", "FACEVALUE", "FACEUNIT", "CURRENCYID",
+               "COUPONPERCENT", "COUPONVALUE", "COUPONPERIOD", "NEXTCOUPON", "ACCRUEDINT", "PREVPRICE",
+               "MATDATE", "OFFERDATE", "LOTSIZE", "LOTVALUE", "ISSUESIZE", "SECTYPE", "STATUS"]
+MD_COLUMNS = ["SECID", "BOARDID", "BID", "OFFER", "OPEN", "LOW", "HIGH", "LAST", "LCURRENTPRICE",
+              "YIELD", "DURATION", "NUMTRADES", "UPDATETIME", "SYSTIME"]
+
+
+def _sec_row(p: dict) -> list:
+    today = date.today()
+    nxt = next((d for d in coupon_dates(p) if d > today), None)
+    return [p["secid"], "TQOB" if p["ofz"] else "TQCB", p["name"], p["name"], p["isin"], p["face"],
+            p["currency"], p["currency"], None if p["floater"] else p["coupon_pct"], coupon_value(p),
+            p["period"], nxt.isoformat() if nxt else None, accrued(p, today), p["price_pct"],
+            p["maturity"].isoformat(), None, 1, p["face"], 10_000_000, "3" if p["ofz"] else "6", "A"]
+
+
+def _md_row(p: dict) -> list:
+    today = date.today()
+    last = _price_on(p, today)
+    return [p["secid"], "TQOB" if p["ofz"] else "TQCB", round(last - 0.1, 2), round(last + 0.1, 2),
+            _price_on(p, today - timedelta(days=1)), round(last - 0.5, 2), round(last + 0.5, 2), last, last,
+            round(p["coupon_pct"] + (100 - last) / 5, 2), (p["maturity"] - today).days // 2,
+            random.randint(10, 500), "18:39:59", datetime.now().isoformat(sep=" ", timespec="seconds")]
+
+
+def iss_security(secid: str, known: set) -> dict | None:
+    if secid not in known:
+        return None
+    p = bond_params(secid)
+    return {"securities": _table(SEC_COLUMNS, [_sec_row(p)]), "marketdata": _table(MD_COLUMNS, [_md_row(p)])}
+
+
+def iss_market_list(market: str, secids: list[str], start: int, limit: int) -> dict:
+    # вся вселенная отдаётся рынком bonds; остальные рынки пустые
+    chunk = secids[start:start + limit] if market == "bonds" else []
+    cols = ["SECID", "SHORTNAME", "SECNAME", "ISIN", "FACEUNIT", "COUPONPERCENT", "MATURITYDATE",
+            "OFFERDATE", "AMORTIZATION", "RATING", "emitent_title", "FACEVALUE", "COUPONVALUE",
+            "COUPONPERIOD", "ACCRUEDINT", "PREVPRICE"]
+    rows = []
+    today = date.today()
+    for s in chunk:
+        p = bond_params(s)
+        rows.append([s, p["name"], p["name"], p["isin"], p["currency"], p["coupon_pct"],
+                     p["maturity"].isoformat(), None, p["amortizing"], p["rating"], p["emitent"],
+                     p["face"], coupon_value(p), p["period"], accrued(p, today), p["price_pct"]])
+    return {"securities": _table(cols, rows)}
+
+
+def iss_isin_lookup(isin: str, secids: list[str]) -> dict:
+    cols = ["secid", "shortname", "name", "isin", "emitent_title", "type", "primary_boardid"]
+    rows = []
+    for s in secids:
+        p = bond_params(s)
+        if p["isin"] == isin:
+            rows.append([s, p["name"], p["name"], p["isin"], p["emitent"], "corporate_bond", "TQCB"])
+            break
+    return {"securities": _table(cols, rows)}
+
+
+def iss_bondization(secid: str, only: str) -> dict:
+    p = bond_params(secid)
+    today = date.today()
+    out = {}
+    if not only or "coupons" in only:
+        cols = ["isin", "name", "issuevalue", "coupondate", "recorddate", "startdate", "initialfacevalue",
+                "facevalue", "faceunit", "value", "valueprc", "value_rub", "secid", "primary_boardid"]
+        rows, prev, fixed_next = [], p["issue"], False
+        for d in coupon_dates(p):
+            value = coupon_value(p)
+            if p["floater"] and d > today:
+                # у флоатера известен только ближайший купон
+                value = value if not fixed_next else None
+                fixed_next = True
+            rows.append([p["isin"], p["name"], 10_000_000, d.isoformat(), (d - timedelta(days=1)).isoformat(),
+                         prev.isoformat(), p["face"], p["face"], p["currency"], value,
+                         p["coupon_pct"] if value is not None else None, value, secid, "TQCB"])
+            prev = d
+        out["coupons"] = _table(cols, rows)
+    if not only or "amortizations" in only:
+        cols = ["isin", "name", "issuevalue", "amortdate", "facevalue", "initialfacevalue", "faceunit",
+                "valueprc", "value", "value_rub", "data_source", "secid", "primary_boardid"]
+        rows = [[p["isin"], p["name"], 10_000_000, d.isoformat(), p["face"], p["face"], p["currency"],
+                 prc, v, v, "maturity" if d == p["maturity"] else "amortization", secid, "TQCB"]
+                for d, v, prc in amortizations(p)]
+        out["amortizations"] = _table(cols, rows)
+    return out
+
+
+def iss_bond_history(secid: str, d_from: date, d_till: date) -> dict:
+    p = bond_params(secid)
+    cols = ["BOARDID", "TRADEDATE", "SHORTNAME", "SECID", "NUMTRADES", "VALUE", "LOW", "HIGH", "CLOSE",
+            "WAPRICE", "YIELDCLOSE", "OPEN", "VOLUME", "FACEVALUE", "FACEUNIT"]
+    rows = []
+    for d in _weekdays(d_from, d_till):
+        c = _price_on(p, d)
+        rows.append(["TQCB", d.isoformat(), p["name"], secid, 100, 1e6, c - 0.4, c + 0.4, c, c,
+                     p["coupon_pct"], round(c - 0.2, 2), 1000, p["face"], p["currency"]])
+    return {"history": _table(cols, rows)}
+
+
+def iss_index_history(secid: str, d_from: date, d_till: date, start: int, columns: str) -> dict:
+    page = 100
+    days = list(_weekdays(d_from, d_till))
+    rnd = random.Random(zlib.crc32(secid.encode()))
+    level = rnd.uniform(100, 700)
+    closes = []
+    for _ in days:
+        level *= 1 + rnd.gauss(0.0002, 0.004)
+        closes.append(round(level, 2))
+    all_cols = ["BOARDID", "SECID", "TRADEDATE", "OPEN", "CLOSE", "HIGH", "LOW"]
+    cols = [c for c in columns.split(",") if c] if columns else all_cols
+    rows = []
+    for d, c in list(zip(days, closes))[start:start + page]:
+        rec = {"BOARDID": "SNDX", "SECID": secid, "TRADEDATE": d.isoformat(), "OPEN": c, "CLOSE": c,
+               "HIGH": c, "LOW": c}
+        rows.append([rec[k] for k in cols])
+    return {
+        "history": _table(cols, rows),
+        "history.cursor": _table(["INDEX", "TOTAL", "PAGESIZE"], [[start, len(days), page]]),
+    }
+
+
+# --- ЦБ ---
+
+def cbr_xml_daily() -> bytes:
+    today = date.today().strftime("%d.%m.%Y")
+    items = []
+    for i, (code, (nominal, value)) in enumerate(FX.items()):
+        items.append(
+            f'<Valute ID="R0{i}"><NumCode>{840 + i}</NumCode><CharCode>{code}</CharCode>'
+            f"<Nominal>{nominal}</Nominal><Name>{code}</Name>"
+            f"<Value>{value:.4f}</Value><VunitRate>{value / nominal:.6f}</VunitRate></Valute>".replace(".", ",")
+        )
+    xml = f'<?xml version="1.0" encoding="windows-1251"?><ValCurs Date="{today}" name="Foreign Currency Market">{"".join(items)}</ValCurs>'
+    return xml.encode("cp1251")
+
+
+def cbr_rate_table(name: str, d_from: date, d_till: date) -> str:
+    base = 16.0 if name == "KEYRATE" else 15.8
+    rows = []
+    for d in sorted(_weekdays(d_from, d_till), reverse=True):
+        # ступенчатая ставка: меняется раз в ~полтора месяца
+        step = (d.toordinal() // 45) % 7
+        rate = base + (step - 3) * 0.5 + (0 if name == "KEYRATE" else -0.15)
+        value = f"{rate:.2f}".replace(".", ",")
+        rows.append(f"<tr><td>{d.strftime('%d.%m.%Y')}</td><td>{value}</td></tr>")
+    return f"<html><body><table class=\"data\"><tr><th>Дата</th><th>Ставка</th></tr>{''.join(rows)}</table></body></html>"
+
+
+# --- corpbonds ---
+
+def corpbonds_page(code: str, known: dict) -> str | None:
+    secid = known.get(code)
+    if secid is None:
+        return None
+    p = bond_params(secid)
+    price = p["face"] * _price_on(p, date.today()) / 100
+    ytm = p["coupon_pct"] + (100 - p["price_pct"]) / 5
+    coupon_type = "Плавающий" if p["floater"] else "Фиксированный"
+    coupon_rate = "КС + 2,5%" if p["floater"] else f"{p['coupon_pct']}%"
+    currency = {"SUR": "RUB"}.get(p["currency"], p["currency"])
+    ratings = "" if p["ofz"] else f"<p>АКРА {p['rating']}</p><p>Эксперт РА ru{p['rating'].replace('(RU)', '')}</p>"
+    info_rows = [
+        ("Название", p["name"]), ("Доходность", f"<span>{ytm:.2f}%</span>".replace(".", ",")),
+        ("ISIN", p["isin"]), ("Номинал", f"{p['face']:.0f}"), ("Дата погашения", p["maturity"].strftime("%d.%m.%Y")),
+        ("Цена", f"{price:.2f} ₽".replace(".", ",")),
+    ]
+    params_rows = [
+        ("Тип купона", coupon_type), ("Ставка купона", coupon_rate), ("Валюта", currency),
+        ("Амортизация", "Да" if p["amortizing"] else "Нет"),
+    ]
+
+    def rows(items):
+        return "".join(f"<tr><td><p>{k}</p></td><td><p>{v}</p></td></tr>" for k, v in items)
+
+    return (
+        "<html><body><div id=\"root\"><main><section><main>"
+        f"<article class=\"bond-info__item\"><table><tbody>{rows(info_rows)}</tbody></table></article>"
+        f"<article class=\"bond-info__item\"><table><tbody>{rows(params_rows)}</tbody></table></article>"
+        f"<div class=\"text-rating\">{ratings}</div>"
+        "</main></section></main></div></body></html>"
+    )
+
+
+# --- сервер ---
+
+class Stub:
+    def __init__(self, universe_size: int, latency_ms=0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, record: bool = False, fixtures_dir: Path = FIXTURES_DIR, seed: int = 1):
+        self.secids = universe(universe_size)
+        self.known = set(self.secids)
+        self.by_code = {}
+        for s in self.secids:
+            self.by_code[s] = s
+            self.by_code[bond_params(s)["isin"]] = s
+        self.config = {"latency_ms": latency_ms, "jitter_ms": jitter_ms,
+                       "error_rate": error_rate, "timeout_rate": timeout_rate}
+        self.record = record
+        self.fixtures_dir = fixtures_dir
+        self.rnd = random.Random(seed)
+        self.stats: dict[str, int] = {}
+        self._client: ClientSession | None = None
+
+    # -- фикстуры --
+
+    def fixture_path(self, source: str, path: str, query: dict) -> Path:
+        q = urlencode(sorted(query.items()))
+        suffix = "__" + hashlib.sha1(q.encode()).hexdigest()[:10] if q else ""
+        safe = path.strip("/").replace("/", "__") or "index"
+        return self.fixtures_dir / source / f"{safe}{suffix}"
+
+    def load_fixture(self, source: str, path: str, query: dict) -> tuple[bytes, str] | None:
+        for p in (self.fixture_path(source, path, query), self.fixture_path(source, path, {})):
+            if p.exists():
+                meta = p.with_suffix(".meta")
+                ctype = meta.read_text().strip() if meta.exists() else "application/octet-stream"
+                return p.read_bytes(), ctype
+        return None
+
+    async def record_upstream(self, source: str, path: str, query: dict) -> web.Response:
+        if self._client is None:
+            self._client = ClientSession(timeout=ClientTimeout(total=60))
+        url = UPSTREAMS[source] + path
+        async with self._client.get(url, params=query) as r:
+            body = await r.read()
+            ctype = r.headers.get("Content-Type", "application/octet-stream")
+            if r.status == 200:
+                p = self.fixture_path(source, path, query)
+                p.parent.mkdir(parents=True, exist_ok=True)
+                p.write_bytes(body)
+                p.with_suffix(".meta").write_text(ctype)
+            return web.Response(body=body, status=r.status, headers={"Content-Type": ctype})
+
+    # -- задержки и ошибки --
+
+    def _latency(self, source: str) -> float:
+        lat = self.config["latency_ms"]
+        base = float(lat.get(source, 0.0)) if isinstance(lat, dict) else float(lat or 0.0)
+        jitter = float(self.config["jitter_ms"] or 0.0)
+        return max(0.0, self.rnd.gauss(base, jitter) if jitter else base) / 1000.0
+
+    async def inject(self, source: str) -> web.Response | None:
+        delay = self._latency(source)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.config["timeout_rate"] and self.rnd.random() < self.config["timeout_rate"]:
+            await asyncio.sleep(60)
+        if self.config["error_rate"] and self.rnd.random() < self.config["error_rate"]:
+            return web.Response(status=503, text="stub: injected error")
+        return None
+
+    # -- маршрутизация --
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        source, _, rest = request.path.lstrip("/").partition("/")
+        if source not in UPSTREAMS:
+            raise web.HTTPNotFound()
+        path = "/" + rest
+        query = dict(request.query)
+        key = f"{source}:{path.split('/')[1] if path.count('/') > 1 else path}"
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+        injected = await self.inject(source)
+        if injected is not None:
+            return injected
+        if self.record:
+            return await self.record_upstream(source, path, query)
+        fixture = self.load_fixture(source, path, query)
+        if fixture is not None:
+            return web.Response(body=fixture[0], headers={"Content-Type": fixture[1]})
+        return self.synthesize(source, path, query)
+
+    def synthesize(self, source: str, path: str, q: dict) -> web.Response:
+        parts = [x for x in path.split("/") if x]
+        if source == "iss":
+            return self._iss(parts, q)
+        if source == "cbr":
+            if path.startswith("/scripts/XML_daily.asp"):
+                return web.Response(body=cbr_xml_daily(), content_type="application/xml", charset="windows-1251")
+            name = "KEYRATE" if "KeyRate" in path else "RUONIA" if "ruonia" in path else None
+            if name:
+                d_from = _parse_ru(q.get("UniDbQuery.From")) or date.today() - timedelta(days=365)
+                d_till = _parse_ru(q.get("UniDbQuery.To")) or date.today()
+                return web.Response(text=cbr_rate_table(name, d_from, d_till), content_type="text/html")
+        if source == "corpbonds" and len(parts) == 2 and parts[0] == "bond":
+            html = corpbonds_page(parts[1], self.by_code)
+            if html is not None:
+                return web.Response(text=html, content_type="text/html")
+        raise web.HTTPNotFound()
+
+    def _iss(self, parts: list[str], q: dict) -> web.Response:
+        def js(payload):
+            return web.json_response(payload, dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+        name = parts[-1].removesuffix(".json") if parts else ""
+        # /engines/stock/markets/{market}/securities[/{secid}].json
+        if parts[:3] == ["engines", "stock", "markets"] and len(parts) == 6:
+            payload = iss_security(name, self.known)
+            if payload is None:
+                raise web.HTTPNotFound()
+            return js(payload)
+        if parts[:3] == ["engines", "stock", "markets"] and len(parts) == 5:
+            return js(iss_market_list(parts[3], self.secids, int(q.get("start", 0)), int(q.get("limit", 100))))
+        if parts == ["securities.json"]:
+            return js(iss_isin_lookup(q.get("isin", ""), self.secids))
+        if len(parts) == 3 and parts[0] == "securities" and parts[2] == "bondization.json":
+            if parts[1] not in self.known:
+                return js({"coupons": _table([], []), "amortizations": _table([], [])})
+            return js(iss_bondization(parts[1], q.get("iss.only", "")))
+        if parts[:2] == ["history", "engines"]:
+            d_from = date.fromisoformat(q.get("from") or (date.today() - timedelta(days=30)).isoformat())
+            d_till = date.fromisoformat(q.get("till") or date.today().isoformat())
+            if "index" in parts:
+                return js(iss_index_history(name, d_from, d_till, int(q.get("start", 0)),
+                                            q.get("history.columns", "")))
+            if name not in self.known:
+                return js({"history": _table([], [])})
+            return js(iss_bond_history(name, d_from, d_till))
+        raise web.HTTPNotFound()
+
+    # -- управление --
+
+    async def get_config(self, request: web.Request) -> web.Response:
+        return web.json_response(self.config)
+
+    async def set_config(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.config.update({k: v for k, v in body.items() if k in self.config})
+        return web.json_response(self.config)
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        self.stats.clear()
+        return web.json_response({})
+
+    async def close(self, app: web.Application) -> None:
+        if self._client is not None:
+            await self._client.close()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stub/config", self.get_config)
+        app.router.add_post("/_stub/config", self.set_config)
+        app.router.add_get("/_stub/stats", self.get_stats)
+        app.router.add_delete("/_stub/stats", self.reset_stats)
+        app.router.add_get("/{tail:.*}", self.handle)
+        app.on_cleanup.append(self.close)
+        return app
+
+
+def _parse_ru(s: str | None) -> date | None:
+    try:
+        return datetime.strptime(s, "%d.%m.%Y").date() if s else None
+    except ValueError:
+        return None
+
+
+async def start(stub: Stub, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+    """Запуск в текущем event loop (для бенчмарков). Возвращает (runner, base_url)."""
+    runner = web.AppRunner(stub.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    sock = site._server.sockets[0]
+    return runner, f"http://{host}:{sock.getsockname()[1]}"
+
+
+def env_for(base_url: str) -> dict[str, str]:
+    return {
+        "MOEX_ISS_BASE": f"{base_url}/iss",
+        "CBR_BASE": f"{base_url}/cbr",
+        "CORPBONDS_BASE": f"{base_url}/corpbonds",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--universe", type=int, default=2000, help="число синтетических бумаг")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--record", action="store_true", help="проксировать на настоящие хосты и сохранять фикстуры")
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR))
+    args = parser.parse_args()
+
+    stub = Stub(args.universe, args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate,
+                record=args.record, fixtures_dir=Path(args.fixtures))
+    base = f"http://{args.host}:{args.port}"
+    for k, v in env_for(base).items():
+        print(f"{k}={v}")
+    web.run_app(stub.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# backend/bench/synth_data.py
+"""
+Синтетический крупный портфель для нагрузочных прогонов: bonds, trades, coupons,
+amortizations, price_history, fx_rates / fx_rate_history, event_logs.
+
+    python -m bench.synth_data --truncate                         # 10k бумаг, 1M сделок, 3 года цен
+    python -m bench.synth_data --truncate --bonds 2000 --trades 100000 --price-years 1
+    python -m bench.synth_data --dry-run                           # только генерация, без БД
+
+Распределения:
+  - валюты: SUR 85%, CNY 7%, USD 6%, EUR 2%; ~15% флоатеров (КС + спред), ~10% с амортизацией,
+    часть бумаг погашена внутри окна истории;
+  - цены: случайное блуждание вокруг номинала (дневные, рабочие дни);
+  - сделки: активность по бумагам ~ Zipf (немного "любимых" бумаг, длинный хвост),
+    количество — логнормальное, ~35% сделок с частичной или полной продажей позже покупки;
+  - купоны: по графику от выпуска до погашения, будущие купоны флоатеров без значения;
+  - журнал событий: refresh/trade/coupon/error за последние 90 дней.
+
+Загрузка идёт через COPY (asyncpg copy_records_to_table) пачками по --batch строк.
+Таблицы должны быть созданы миграциями; без --truncate генератор не пишет в непустую bonds.
+"""
+import argparse, asyncio, json, random, time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+CURRENCIES = ("SUR", "CNY", "USD", "EUR")
+CURRENCY_WEIGHTS = (0.85, 0.07, 0.06, 0.02)
+CURRENCY_SYMBOLS = {"SUR": "₽", "CNY": "¥", "USD": "$", "EUR": "€"}
+FX_BASE = {"CNY": 12.7, "USD": 92.0, "EUR": 99.5}
+RATINGS = ("AAA(RU)", "AA+(RU)", "AA(RU)", "AA-(RU)", "A+(RU)", "A(RU)", "A-(RU)", "BBB+(RU)", "BBB(RU)", "BB(RU)")
+EVENT_TYPES = ("refresh", "trade", "coupon", "ui", "refresh_error")
+EVENT_WEIGHTS = (0.55, 0.15, 0.15, 0.1, 0.05)
+TABLES = ("event_logs", "trades", "coupons", "amortizations", "price_history", "price_weekly",
+          "fx_rate_history", "fx_rates", "portfolio_value_daily", "bonds")
+
+
+def business_days(start: date, end: date) -> list[date]:
+    out, d = [], start
+    while d <= end:
+        if d.weekday() < 5:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+class Synth:
+    def __init__(self, n_bonds: int, n_trades: int, price_years: int, coupon_years: int,
+                 n_events: int, seed: int = 42):
+        self.n_bonds = n_bonds
+        self.n_trades = n_trades
+        self.n_events = n_events
+        self.today = date.today()
+        self.rng = np.random.default_rng(seed)
+        self.rnd = random.Random(seed)
+        self.days = business_days(self.today - timedelta(days=365 * price_years), self.today)
+        self.coupon_start = self.today - timedelta(days=365 * coupon_years)
+        self._bonds()
+        self._prices()
+
+    # --- бумаги ---
+
+    def _bonds(self) -> None:
+        n, rng = self.n_bonds, self.rng
+        self.ids = np.arange(1, n + 1)
+        self.currency = rng.choice(len(CURRENCIES), n, p=CURRENCY_WEIGHTS)
+        self.floater = rng.random(n) < 0.15
+        self.amortizing = rng.random(n) < 0.10
+        self.period = rng.choice([30, 91, 91, 182, 182], n)
+        self.coupon_pct = np.round(rng.uniform(5, 20, n), 2)
+        # ~8% бумаг погашены внутри окна истории, остальные — в ближайшие 10 лет
+        horizon = rng.integers(60, 3650, n)
+        matured = rng.random(n) < 0.08
+        horizon[matured] = -rng.integers(1, max(2, len(self.days)), matured.sum())
+        self.maturity = [self.today + timedelta(days=int(h)) for h in horizon]
+        tenor = rng.integers(6, 40, n) * self.period
+        self.issue = [m - timedelta(days=int(t)) for m, t in zip(self.maturity, tenor)]
+        self.face = np.full(n, 1000.0)
+
+    def bond_records(self) -> tuple[list[str], list[tuple]]:
+        cols = ["id", "secid", "isin", "name", "emitent", "market", "coupon", "coupon_display", "coupon_type",
+                "maturity_date", "last_price", "amortization", "akra_rating", "currency", "currency_symbol",
+                "nkd", "face_value", "day_open"]
+        rows = []
+        last = self.prices[:, -1]
+        for i, bond_id in enumerate(self.ids.tolist()):
+            ofz = i % 10 == 0
+            secid = f"SU{26000 + i:05d}RMFS" if ofz else f"RU000S{i:05d}0"
+            cur = CURRENCIES[self.currency[i]]
+            issuer = "Минфин России" if ofz else f"ПАО Эмитент{self.rnd.randint(1, max(10, self.n_bonds // 8))}"
+            alive = self.maturity[i] > self.today
+            rows.append((
+                int(bond_id), secid, secid if not ofz else f"RU000Z{i:05d}1",
+                f"ОФЗ {26000 + i}" if ofz else f"{issuer[4:]} БО-{self.rnd.randint(1, 9):02d}",
+                issuer, "ofz" if ofz else "bonds",
+                None if self.floater[i] else float(self.coupon_pct[i]),
+                f"КС + {self.rnd.choice((1.5, 2, 2.5, 3))}%" if self.floater[i] else f"{self.coupon_pct[i]}%",
+                "Плавающий" if self.floater[i] else "Фиксированный",
+                self.maturity[i], float(last[i]) if alive else None, bool(self.amortizing[i]),
+                None if ofz else self.rnd.choice(RATINGS), cur, CURRENCY_SYMBOLS[cur],
+                round(float(self.coupon_value(i)) * self.rnd.random(), 2), 1000.0, float(self.prices[i, -2]),
+            ))
+        return cols, rows
+
+    def coupon_value(self, i: int) -> float:
+        return round(self.face[i] * self.coupon_pct[i] / 100 * self.period[i] / 365, 2)
+
+    # --- цены: [бумаги × рабочие дни], блуждание вокруг номинала ---
+
+    def _prices(self) -> None:
+        n, m = self.n_bonds, len(self.days)
+        steps = self.rng.normal(0.0, 0.0035, (n, m)).astype(np.float32)
+        level = self.rng.uniform(0.86, 1.03, (n, 1)).astype(np.float32)
+        pct = level * np.exp(np.cumsum(steps, axis=1))
+        self.prices = np.round(np.clip(pct, 0.3, 1.3).astype(np.float64) * 1000.0, 2)
+        # индекс первого дня после погашения (цены дальше не пишутся)
+        self.last_day = np.searchsorted(np.array([d.toordinal() for d in self.days]),
+                                        np.array([d.toordinal() for d in self.maturity]), side="right")
+
+    def price_batches(self, batch: int):
+        buf = []
+        for i, bond_id in enumerate(self.ids.tolist()):
+            k = int(self.last_day[i])
+            if k <= 0:
+                continue
+            buf.extend(zip([bond_id] * k, self.days[:k], self.prices[i, :k].tolist()))
+            if len(buf) >= batch:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+    # --- купоны и погашения ---
+
+    def coupon_batches(self, batch: int):
+        buf, cid = [], 0
+        for i, bond_id in enumerate(self.ids.tolist()):
+            cur = CURRENCIES[self.currency[i]]
+            value = self.coupon_value(i)
+            step = timedelta(days=int(self.period[i]))
+            d, fixed_ahead = self.issue[i], False
+            while d < self.maturity[i]:
+                d = min(d + step, self.maturity[i])
+                if d < self.coupon_start:
+                    continue
+                v = value
+                if self.floater[i] and d > self.today:
+                    # у флоатера известен только ближайший купон
+                    v = None if fixed_ahead else value
+                    fixed_ahead = True
+                cid += 1
+                buf.append((cid, bond_id, d, v, cur, False))
+            if len(buf) >= batch:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+    def amortization_records(self) -> list[tuple]:
+        rows, aid = [], 0
+        for i, bond_id in enumerate(self.ids.tolist()):
+            if self.amortizing[i]:
+                step = timedelta(days=int(self.period[i]))
+                dates = [self.maturity[i] - step * k for k in range(3, -1, -1)]
+                parts = [(d, 250.0, 25.0) for d in dates]
+            else:
+                parts = [(self.maturity[i], 1000.0, 100.0)]
+            for d, v, prc in parts:
+                aid += 1
+                rows.append((aid, bond_id, d, v, prc))
+        return rows
+
+    # --- курсы ---
+
+    def fx_history(self) -> tuple[dict, list[tuple]]:
+        rows, current = [], {}
+        for cur, base in FX_BASE.items():
+            walk = base * np.exp(np.cumsum(self.rng.normal(0, 0.006, len(self.days))))
+            walk = walk / walk[-1] * base
+            rows.extend((cur, d, round(float(r), 4)) for d, r in zip(self.days, walk))
+            current[cur] = round(float(walk[-1]), 4)
+        self.fx_by_day = {cur: {} for cur in FX_BASE}
+        for cur, d, r in rows:
+            self.fx_by_day[cur][d] = r
+        return current, rows
+
+    # --- сделки ---
+
+    def trade_batches(self, batch: int):
+        n, rng = self.n_trades, self.rng
+        m = len(self.days)
+        # Zipf-подобная активность: ранг r получает вес 1/r^0.9
+        weights = np.empty(self.n_bonds)
+        weights[rng.permutation(self.n_bonds)] = 1.0 / np.arange(1, self.n_bonds + 1) ** 0.9
+        weights[self.last_day == 0] = 0.0   # погашены до начала окна — сделок нет
+        bond_idx = rng.choice(self.n_bonds, n, p=weights / weights.sum())
+
+        limit = np.maximum(self.last_day[bond_idx], 1)
+        buy_day = np.minimum((rng.random(n) * limit).astype(np.int64), limit - 1)
+        qty = np.maximum(1, np.round(rng.lognormal(2.5, 1.2, n))).astype(np.int64)
+        buy_price = self.prices[bond_idx, buy_day]
+        coupon = np.array([self.coupon_value(i) for i in range(self.n_bonds)])[bond_idx]
+        buy_nkd = np.round(coupon * rng.random(n), 2)
+        buy_comm = np.round(qty * buy_price * 0.0003, 2)
+        total = np.round(qty * (buy_price + buy_nkd) + buy_comm, 2)
+
+        sold = (rng.random(n) < 0.35) & (buy_day < limit - 1)
+        sell_day = buy_day + 1 + (rng.random(n) * np.maximum(limit - buy_day - 1, 1)).astype(np.int64)
+        sell_day = np.minimum(sell_day, m - 1)
+        sell_frac = np.where(rng.random(n) < 0.4, 1.0, rng.uniform(0.1, 0.9, n))
+        sell_qty = np.maximum(1, np.floor(qty * sell_frac)).astype(np.int64)
+        sell_price = self.prices[bond_idx, sell_day]
+        sell_nkd = np.round(coupon * rng.random(n), 2)
+        sell_comm = np.round(sell_qty * sell_price * 0.0003, 2)
+
+        # дальше — обычные списки: индексация numpy-скаляров в цикле на 1M строк заметно медленнее
+        cur_idx, bond_ids = self.currency[bond_idx].tolist(), self.ids[bond_idx].tolist()
+        buy_day, sell_day, sold = buy_day.tolist(), sell_day.tolist(), sold.tolist()
+        buy_price, qty, buy_nkd, buy_comm, total = (a.tolist() for a in (buy_price, qty, buy_nkd, buy_comm, total))
+        sell_price, sell_qty, sell_nkd, sell_comm = (a.tolist() for a in (sell_price, sell_qty, sell_nkd, sell_comm))
+        no_sell = (None, None, None, None, None)
+        buf = []
+        for k in range(n):
+            bd = self.days[buy_day[k]]
+            cur = CURRENCIES[cur_idx[k]]
+            fx = None if cur == "SUR" else self.fx_by_day[cur].get(bd)
+            sell = (self.days[sell_day[k]], sell_price[k], sell_qty[k], sell_nkd[k], sell_comm[k]) if sold[k] else no_sell
+            buf.append((k + 1, bond_ids[k], bd, bd, buy_price[k], qty[k], buy_nkd[k], buy_comm[k], *sell, total[k], fx))
+            if len(buf) >= batch:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+    # --- журнал событий ---
+
+    def event_batches(self, batch: int):
+        rng = self.rng
+        now = datetime.now(timezone.utc)
+        offsets = np.sort(rng.uniform(0, 90 * 86400, self.n_events))[::-1]
+        types = rng.choice(len(EVENT_TYPES), self.n_events, p=EVENT_WEIGHTS)
+        bonds = rng.integers(1, self.n_bonds + 1, self.n_events)
+        buf = []
+        for k in range(self.n_events):
+            t = EVENT_TYPES[types[k]]
+            bond_id = int(bonds[k]) if t in ("trade", "coupon") else None
+            payload = json.dumps({"bond_id": bond_id, "source": "synth"}) if bond_id else None
+            buf.append((k + 1, now - timedelta(seconds=float(offsets[k])), f"{t}: synthetic event {k}", t, bond_id, payload))
+            if len(buf) >= batch:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+
+TRADE_COLUMNS = ["id", "bond_id", "date", "buy_date", "buy_price", "buy_qty", "buy_nkd", "buy_commission",
+                 "sell_date", "sell_price", "sell_qty", "sell_nkd", "sell_commission", "total_amount", "fx_rate"]
+COUPON_COLUMNS = ["id", "bond_id", "date", "value", "currency", "projected"]
+EVENT_COLUMNS = ["id", "timestamp", "message", "event_type", "bond_id", "payload"]
+
+
+# --- загрузка ---
+
+class Loader:
+    """COPY в таблицы через asyncpg-соединение из пула приложения."""
+
+    def __init__(self, conn, dry_run: bool):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.report: list[tuple[str, int, float]] = []
+
+    async def copy(self, table: str, columns: list[str], batches) -> int:
+        t0 = time.perf_counter()
+        total = 0
+        for rows in batches:
+            if not self.dry_run:
+                await self.conn.copy_records_to_table(table, records=rows, columns=columns)
+            total += len(rows)
+        dt = time.perf_counter() - t0
+        self.report.append((table, total, dt))
+        print(f"{table:<18}{total:>12,} rows {dt:8.2f}s {total / dt if dt else 0:>12,.0f} rows/s", flush=True)
+        return total
+
+
+async def load(args) -> None:
+    synth_t0 = time.perf_counter()
+    s = Synth(args.bonds, args.trades, args.price_years, args.coupon_years, args.events, args.seed)
+    print(f"generated base series in {time.perf_counter() - synth_t0:.2f}s "
+          f"({args.bonds} bonds x {len(s.days)} days)", flush=True)
+
+    if args.dry_run:
+        await _fill(Loader(None, True), s, args)
+        return
+
+    from sqlalchemy import text
+    from app import price_history
+    from app.database import engine, async_session
+
+    async with async_session() as session:
+        if args.truncate:
+            await session.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+        elif (await session.execute(text("SELECT EXISTS (SELECT 1 FROM bonds)"))).scalar():
+            raise SystemExit("bonds is not empty; use --truncate to replace the data")
+        await session.commit()
+        await price_history.ensure_price_partitions(session, s.days[0].year)
+
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        loader = Loader(raw.driver_connection, False)
+        t0 = time.perf_counter()
+        await _fill(loader, s, args)
+        # последовательности id после вставки с явными ключами
+        for table in ("bonds", "trades", "coupons", "amortizations", "event_logs"):
+            await loader.conn.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT max(id) FROM {table}), 1))"
+            )
+        await loader.conn.execute("ANALYZE")
+        total = sum(r[1] for r in loader.report)
+        print(f"loaded {total:,} rows in {time.perf_counter() - t0:.1f}s")
+    await engine.dispose()
+
+
+async def _fill(loader: Loader, s: Synth, args) -> None:
+    cols, rows = s.bond_records()
+    await loader.copy("bonds", cols, [rows])
+    current, fx_rows = s.fx_history()
+    now = datetime.utcnow()
+    await loader.copy("fx_rates", ["currency", "rate", "updated_at"], [[(c, r, now) for c, r in current.items()]])
+    await loader.copy("fx_rate_history", ["currency", "date", "rate"], [fx_rows])
+    await loader.copy("price_history", ["bond_id", "date", "value"], s.price_batches(args.batch))
+    await loader.copy("coupons", COUPON_COLUMNS, s.coupon_batches(args.batch))
+    await loader.copy("amortizations", ["id", "bond_id", "date", "value", "value_prc"], [s.amortization_records()])
+    await loader.copy("trades", TRADE_COLUMNS, s.trade_batches(args.batch))
+    await loader.copy("event_logs", EVENT_COLUMNS, s.event_batches(args.batch))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bonds", type=int, default=10_000)
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--price-years", type=int, default=3)
+    parser.add_argument("--coupon-years", type=int, default=5, help="сколько лет прошлых купонов")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=200_000, help="строк в одном COPY")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы портфеля перед загрузкой")
+    parser.add_argument("--dry-run", action="store_true", help="только сгенерировать данные, без БД")
+    args = parser.parse_args()
+    asyncio.run(load(args))
+
+
+if __name__ == "__main__":
+    main()
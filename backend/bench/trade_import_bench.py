@@ -0,0 +1,124 @@
+# backend/bench/trade_import_bench.py
+"""
+Импорт сделок (app.trade_import): скорость разбора и пиковая память на синтетическом
+отчёте брокера. Цель — 100k строк с памятью, не зависящей от размера файла.
+
+    python -m bench.trade_import_bench                          # CSV и XML, 10k и 100k строк, без БД
+    python -m bench.trade_import_bench --memory                 # + пиковая память
+    python -m bench.trade_import_bench --rows 100000 --format csv
+    python -m bench.trade_import_bench --db --rows 100000       # + import_trades dry_run по бумагам из bonds
+
+Без --db считаются разбор файла, проверка строк и сборка записей для COPY
+(--memory: tracemalloc — пик по Python-объектам). С --db берутся SECID из bonds, импорт идёт
+целиком через Importer в режиме dry_run (запросы к bonds/trades, без записи).
+"""
+import argparse, asyncio, random, tempfile, time, tracemalloc
+from datetime import date, timedelta
+
+from app import trade_import
+
+SIDES = ("Покупка", "Продажа")
+
+
+def synth_file(fmt: str, rows: int, secids: list[str], seed: int = 1):
+    rnd = random.Random(seed)
+    f = tempfile.TemporaryFile()
+    start = date(2024, 1, 1)
+    if fmt == "csv":
+        f.write("Отчёт брокера за период\n\n".encode())
+        f.write("Дата сделки;Тикер;Вид сделки;Количество;Цена, %;НКД;Комиссия\n".encode())
+    else:
+        f.write(b'<?xml version="1.0" encoding="utf-8"?>\n<report><trades>\n')
+    for i in range(rows):
+        d = start + timedelta(days=rnd.randrange(365))
+        secid, side = rnd.choice(secids), rnd.choice(SIDES)
+        qty, pct, nkd, fee = rnd.randint(1, 100), rnd.uniform(85, 105), rnd.uniform(0, 50), rnd.uniform(0, 5)
+        if fmt == "csv":
+            line = f"{d:%d.%m.%Y};{secid};{side};{qty};{pct:.2f};{nkd:.2f};{fee:.2f}\n"
+            f.write(line.encode())
+        else:
+            f.write((f'<trade date="{d.isoformat()}" secid="{secid}" side="{side}" qty="{qty}" '
+                     f'price_pct="{pct:.2f}" nkd="{nkd:.2f}" commission="{fee:.2f}"/>\n').encode())
+    if fmt == "xml":
+        f.write(b"</trades></report>\n")
+    f.seek(0)
+    return f
+
+
+def _parse(f, fmt: str, refs: dict) -> tuple[int, int]:
+    n = errors = 0
+    for line, raw, mapping in trade_import.iter_rows(f, fmt):
+        try:
+            row = trade_import.parse_row(line, raw, mapping)
+        except trade_import.RowError:
+            errors += 1
+            continue
+        trade = trade_import.to_trade(row, refs[row.ident])
+        tuple(trade[c] for c in trade_import.TRADE_COLUMNS)
+        n += 1
+    return n, errors
+
+
+def parse_only(fmt: str, rows: int, memory: bool) -> None:
+    secids = [f"RU000B{i:05d}" for i in range(500)]
+    refs = {s: trade_import.BondRef(i, s, 1000.0) for i, s in enumerate(secids, 1)}
+    f = synth_file(fmt, rows, secids)
+    size = f.seek(0, 2)
+    f.seek(0)
+    t0 = time.perf_counter()
+    n, errors = _parse(f, fmt, refs)
+    dt = time.perf_counter() - t0
+    peak = float("nan")
+    if memory:
+        # отдельный проход: tracemalloc замедляет разбор в разы
+        f.seek(0)
+        tracemalloc.start()
+        _parse(f, fmt, refs)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    f.close()
+    print(f"{fmt:<6}{rows:>10,}{size / 2**20:>10.1f}{dt:>10.2f}{n / dt:>12,.0f}{peak:>12.2f}{errors:>8}")
+
+
+async def with_db(args) -> None:
+    from sqlalchemy import select
+    from app import models
+    from app.database import async_session, engine
+
+    async with async_session() as session:
+        secids = (await session.execute(select(models.Bond.secid).where(models.Bond.secid.isnot(None)).limit(500))).scalars().all()
+    if not secids:
+        raise SystemExit("bonds is empty; load data first (python -m bench.synth_data)")
+    f = synth_file(args.format, args.rows, list(secids))
+    tracemalloc.start()
+    async with async_session() as session:
+        out = await trade_import.import_trades(session, f, args.format, dry_run=True, add_missing=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    f.close()
+    print(f"db dry_run: {out['rows']:,} rows, {out['new_trades']:,} new, {out['existing_trades']:,} existing, "
+          f"{out['invalid']} invalid in {out['seconds']:.2f}s, peak {peak / 2**20:.1f} MiB")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="*", default=[10_000, 100_000])
+    parser.add_argument("--format", choices=["csv", "xml"], default=None, help="по умолчанию оба")
+    parser.add_argument("--memory", action="store_true", help="пиковая память (tracemalloc, отдельный проход)")
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+
+    if args.db:
+        args.rows = args.rows[-1]
+        args.format = args.format or "csv"
+        asyncio.run(with_db(args))
+        return
+    print(f"{'format':<6}{'rows':>10}{'MiB':>10}{'sec':>10}{'rows/s':>12}{'peak MiB':>12}{'errors':>8}")
+    for fmt in ([args.format] if args.format else ["csv", "xml"]):
+        for rows in args.rows:
+            parse_only(fmt, rows, args.memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# backend/bench/upstream_bench.py
+"""
+Воспроизводимый бенчмарк путей, которые ходят во внешние источники, — против
+bench.stub_server (поднимается в том же процессе, реальные хосты не трогаются).
+
+    python -m bench.upstream_bench
+    python -m bench.upstream_bench --latency-ms 40 --jitter-ms 10 --error-rate 0.01 --bulk 50 200 1000
+    python -m bench.upstream_bench --stub-url http://127.0.0.1:8099   # стаб отдельным процессом
+    python -m bench.upstream_bench --db            # + сводка портфеля из локальной БД (DATABASE_URL)
+    python -m bench.upstream_bench --save          # результат в bench/results/<git sha>.json
+    python -m bench.upstream_bench --baseline bench/results/<sha>.json --threshold 0.15
+        — сравнение с прошлым прогоном; код выхода 1, если p50 или throughput хуже порога.
+
+Сценарии:
+  - add_bond        — карточка + купоны + амортизации + corpbonds + последняя цена, по одной бумаге;
+  - bulk_refresh_N  — цена + купоны + corpbonds для N бумаг с ограничением --concurrency;
+  - search          — поиск по всем рынкам ISS;
+  - fx              — курсы ЦБ и пересчёт позиций в рубли;
+  - portfolio_*     — агрегаты portfolio/other по локальной БД (только с --db).
+"""
+import argparse, asyncio, json, os, platform, statistics, subprocess, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bench import stub_server
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SEARCH_QUERIES = ("RU000B0001", "ОФЗ", "Эмитент12", "su26")
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(name: str, latencies: list[float], wall: float, ops: int, errors: int) -> dict:
+    return {
+        "name": name,
+        "ops": ops,
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "throughput_ops": round(ops / wall, 2) if wall else None,
+        "p50_ms": round(_pct(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(_pct(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_pct(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+async def measure(name: str, items: list, fn, concurrency: int) -> dict:
+    """fn(item) для всех items с не более чем concurrency одновременными вызовами."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(item):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await fn(item)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in items))
+    return summarize(name, latencies, time.perf_counter() - t0, len(items), errors)
+
+
+# --- сценарии (модули app импортируются после настройки окружения на стаб) ---
+
+async def add_bond(secid: str) -> None:
+    from app import moex_client, corpbounds_api
+    rec = await moex_client.fetch_bond_from_moex(secid)
+    if rec is None:
+        raise LookupError(secid)
+    isin = rec.record.get("ISIN") or secid
+    await asyncio.gather(
+        moex_client.fetch_coupons_from_moex(secid),
+        moex_client.fetch_amortizations_from_moex(secid),
+        corpbounds_api.fetch_ratings_from_corpbonds(isin, is_ofz=secid.startswith("SU")),
+        moex_client.compute_last_price_from_iss(secid),
+    )
+
+
+async def refresh_bond(secid: str) -> None:
+    from app import moex_client, corpbounds_api
+    price, coupons, ratings = await asyncio.gather(
+        moex_client.compute_last_price_from_iss(secid),
+        moex_client.fetch_coupons_from_moex(secid),
+        corpbounds_api.fetch_ratings_from_corpbonds(secid, is_ofz=secid.startswith("SU")),
+    )
+    if price is None:
+        raise ValueError(f"no price for {secid}")
+
+
+async def search(query: str) -> None:
+    from app import moex_api
+    await moex_api._search_bonds_by_markets(query)
+
+
+async def fx_convert(positions: int) -> None:
+    from app import other
+    from app.dashboard import fx_for
+    rates = await other.fetch_fx_rates(["USD", "EUR", "CNY"])
+    table = {k: v for k, v in rates.items() if v}
+    currencies = ("SUR", "USD", "CNY", "EUR", "RUB")
+    total = 0.0
+    for i in range(positions):
+        total += 1000.0 * (fx_for(currencies[i % len(currencies)], table) or 0.0)
+
+
+async def portfolio_scenarios(repeats: int) -> list[dict]:
+    from app import portfolio, other
+    from app.database import async_read_session
+    out = []
+    for name, fn in (
+        ("portfolio_current_value", portfolio.calc_current_value),
+        ("portfolio_trades_breakdown", other.calc_trades_sum_breakdown),
+        ("portfolio_positions", other.build_positions_with_amounts),
+        ("portfolio_weights", other.get_bonds_with_weights),
+    ):
+        async def call(_):
+            async with async_read_session() as session:
+                await fn(session)
+        out.append(await measure(name, list(range(repeats)), call, 1))
+    return out
+
+
+async def run(args) -> dict:
+    stub = stub_server.Stub(args.universe, args.latency_ms, args.jitter_ms, args.error_rate)
+    runner = None
+    if args.stub_url:
+        # стаб в отдельном процессе: его CPU не попадает в замеры
+        base_url = args.stub_url.rstrip("/")
+    else:
+        runner, base_url = await stub_server.start(stub)
+    os.environ.update(stub_server.env_for(base_url))
+    try:
+        secids = stub.secids
+        results = []
+        results.append(await measure("add_bond", secids[:args.add], add_bond, 1))
+        for n in args.bulk:
+            results.append(await measure(f"bulk_refresh_{n}", secids[:n], refresh_bond, args.concurrency))
+        queries = [SEARCH_QUERIES[i % len(SEARCH_QUERIES)] for i in range(args.searches)]
+        results.append(await measure("search", queries, search, 1))
+        results.append(await measure("fx", [args.fx_positions] * args.repeats, fx_convert, 1))
+        if args.db:
+            results.extend(await portfolio_scenarios(args.repeats))
+        return {"results": results, "upstream_requests": dict(stub.stats)}
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+# --- отчёт и регрессии ---
+
+def git_sha() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(results: list[dict]) -> None:
+    print(f"{'scenario':<28}{'ops':>6}{'err':>5}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['name']:<28}{r['ops']:>6}{r['errors']:>5}{r['throughput_ops'] or 0:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+def compare(current: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Строки с регрессиями: p50 вырос или throughput упал больше чем на threshold."""
+    base = {r["name"]: r for r in baseline}
+    out = []
+    for r in current:
+        b = base.get(r["name"])
+        if b is None:
+            continue
+        if b["p50_ms"] and r["p50_ms"] > b["p50_ms"] * (1 + threshold):
+            out.append(f"{r['name']}: p50 {b['p50_ms']} -> {r['p50_ms']} ms")
+        if b.get("throughput_ops") and (r["throughput_ops"] or 0) < b["throughput_ops"] * (1 - threshold):
+            out.append(f"{r['name']}: throughput {b['throughput_ops']} -> {r['throughput_ops']} ops/s")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", type=int, default=2000)
+    parser.add_argument("--stub-url", help="уже запущенный bench.stub_server (та же --universe)")
+    parser.add_argument("--add", type=int, default=20, help="бумаг в сценарии add_bond")
+    parser.add_argument("--bulk", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--searches", type=int, default=3)
+    parser.add_argument("--fx-positions", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--db", action="store_true", help="добавить сценарии по локальной БД")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    out = asyncio.run(run(args))
+    report = {
+        "sha": git_sha(),
+        "at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("save", "baseline")},
+        **out,
+    }
+    print_table(report["results"])
+
+    if args.save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{report['sha']}.json"
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"saved {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        if regressions:
+            print(f"regressions vs {baseline.get('sha')} (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"no regressions vs {baseline.get('sha')}")
+
+
+if __name__ == "__main__":
+    main()
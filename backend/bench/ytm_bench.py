@@ -0,0 +1,115 @@
+# backend/bench/ytm_bench.py
+"""
+Бенчмарк и сверка app.analytics.
+
+    python -m bench.ytm_bench --bonds 500 1000 5000
+        — синтетический портфель, время расчёта YTM/дюрации для всех бумаг;
+    python -m bench.ytm_bench --golden
+        — офлайн-сверка: секции analytics и iss из bench.golden (замкнутые формулы и
+          YIELD/DURATION MOEX из записанных фикстур); при расхождении код выхода 1;
+    python -m bench.ytm_bench --live
+        — сверка с YIELD/DURATION, публикуемыми MOEX (marketdata), для бумаг из локальной БД.
+          Расхождение > --tolerance п.п. печатается построчно, при расхождениях код выхода 1.
+"""
+import argparse, asyncio, random, sys, time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import httpx
+
+from app import analytics
+from bench import golden
+
+
+def synthetic_portfolio(n: int, settlement: date, seed: int = 42):
+    rnd = random.Random(seed)
+    bonds, coupons = [], {}
+    for i in range(n):
+        periods = rnd.randint(2, 40)
+        step = rnd.choice((91, 182, 30))
+        maturity = settlement + timedelta(days=step * periods)
+        bonds.append(SimpleNamespace(
+            id=i, secid=f"SYN{i}", face_value=1000.0, maturity_date=maturity,
+            last_price=rnd.uniform(800, 1050), nkd=rnd.uniform(0, 30), coupon=None,
+        ))
+        value = rnd.uniform(5, 60)
+        coupons[i] = [(settlement + timedelta(days=step * k), value) for k in range(1, periods + 1)]
+    return bonds, coupons
+
+
+def run_synthetic(sizes, repeats: int) -> None:
+    settlement = date.today()
+    for n in sizes:
+        bonds, coupons = synthetic_portfolio(n, settlement)
+        best = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            res = analytics.analyze_bonds(bonds, coupons, {}, settlement)
+            best = min(best, time.perf_counter() - t0)
+        unsolved = sum(1 for r in res if r["ytm"] is None)
+        print(f"bonds={n:>6} best={best * 1000:8.2f}ms per_bond={best / n * 1e6:7.2f}us unsolved={unsolved}")
+
+
+async def _moex_marketdata(client: httpx.AsyncClient, secid: str) -> dict:
+    url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/securities/{secid}.json"
+    r = await client.get(url, params={"iss.meta": "off", "iss.only": "marketdata"})
+    r.raise_for_status()
+    md = r.json().get("marketdata", {})
+    cols = md.get("columns") or []
+    for row in md.get("data") or []:
+        rec = dict(zip(cols, row))
+        if rec.get("YIELD"):
+            return rec
+    return {}
+
+
+async def run_live(tolerance: float) -> int:
+    from app.database import async_read_session, engine
+
+    async with async_read_session() as db:
+        computed = await analytics.portfolio_analytics(db)
+    await engine.dispose()
+
+    checked = mismatched = 0
+    async with httpx.AsyncClient(timeout=10) as client:
+        for r in computed:
+            if r["ytm"] is None or not r["secid"]:
+                continue
+            try:
+                rec = await _moex_marketdata(client, r["secid"])
+            except Exception as e:
+                print(f"{r['secid']}: fetch failed: {e}")
+                continue
+            moex_ytm = rec.get("YIELD")
+            if moex_ytm is None:
+                continue
+            checked += 1
+            diff = r["ytm"] - float(moex_ytm)
+            moex_dur = rec.get("DURATION")
+            dur_days = r["duration"] * 365 if r["duration"] is not None else None
+            if abs(diff) > tolerance:
+                mismatched += 1
+                print(f"{r['secid']:>14} local={r['ytm']:7.3f}% moex={float(moex_ytm):7.3f}% diff={diff:+.3f} "
+                      f"dur_local={dur_days and round(dur_days)}d dur_moex={moex_dur}d")
+    print(f"checked={checked} mismatched={mismatched} tolerance={tolerance}pp")
+    return 1 if mismatched else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bonds", type=int, nargs="+", default=[500, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--golden", action="store_true")
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    if args.golden:
+        sys.exit(golden.run(["analytics", "iss"]))
+    elif args.live:
+        sys.exit(asyncio.run(run_live(args.tolerance)))
+    else:
+        run_synthetic(args.bonds, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,9 @@ until pg_isready -h db -p 5432 -U "$POSTGRES_USER"; do
   sleep 1
 done
 
-echo "🚀 Проверяем миграции..."
-# Генерируем миграцию, если есть изменения в моделях
-alembic revision --autogenerate -m "auto" || true
-
 echo "📦 Применяем миграции..."
-alembic upgrade head
+# только зафиксированные ревизии из migrations/versions; на head — один SELECT и выход
+python -m app.startup migrate
 
 echo "▶ Запускаем сервер..."
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file
@@ -0,0 +1,19 @@
+# backend/gunicorn.conf.py
+"""
+Продакшен-запуск в несколько процессов:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+У каждого воркера свой пул соединений и свои кэши в памяти; согласованность кэшей —
+через LISTEN/NOTIFY (app.cache_bus), одно дополнительное соединение на воркер.
+Соединений с БД до WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW + 1) — сверить
+с max_connections PostgreSQL.
+"""
+import multiprocessing, os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * int(os.getenv("WORKERS_PER_CORE", "1"))))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
@@ -18,10 +18,20 @@ if url:
 
 target_metadata = Base.metadata
 
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # годовые секции price_history создаются в рантайме (app.price_history) и в моделях
+    # не описаны — autogenerate не должен предлагать их удалить
+    if type_ == "table" and reflected and compare_to is None and name.startswith("price_history_"):
+        return False
+    return True
+
+
 def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -36,12 +46,10 @@ async def run_migrations_online():
 
 
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
-asyncio.run(run_migrations_online())
-
 if context.is_offline_mode():
     run_migrations_offline()
 else:
@@ -0,0 +1,154 @@
+"""initial schema
+
+Базовая ревизия: схема, которую создавал прежний `alembic revision --autogenerate`
+в entrypoint по моделям исходной версии (bonds, prices, event_logs, trades, coupons,
+portfolio_summary, fx_rates). Такие базы помечаются этой ревизией
+(`python -m app.startup migrate` делает stamp сам) и дальше мигрируют обычным порядком.
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_initial"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "bonds",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("secid", sa.String(), nullable=True),
+        sa.Column("isin", sa.String(), nullable=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("emitent", sa.String(), nullable=True),
+        sa.Column("market", sa.String(), nullable=True),
+        sa.Column("coupon", sa.Float(), nullable=True),
+        sa.Column("coupon_display", sa.String(), nullable=True),
+        sa.Column("coupon_type", sa.String(), nullable=True),
+        sa.Column("maturity_date", sa.Date(), nullable=True),
+        sa.Column("ytm", sa.Float(), nullable=True),
+        sa.Column("ytm_date", sa.Date(), nullable=True),
+        sa.Column("last_price", sa.Float(), nullable=True),
+        sa.Column("amortization", sa.Boolean(), nullable=True),
+        sa.Column("offer_date", sa.Date(), nullable=True),
+        sa.Column("akra_rating", sa.String(), nullable=True),
+        sa.Column("akra_forecast", sa.String(), nullable=True),
+        sa.Column("raexpert_rating", sa.String(), nullable=True),
+        sa.Column("raexpert_forecast", sa.String(), nullable=True),
+        sa.Column("nkr_rating", sa.String(), nullable=True),
+        sa.Column("nkr_forecast", sa.String(), nullable=True),
+        sa.Column("currency", sa.String(), nullable=True),
+        sa.Column("currency_symbol", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("day_open", sa.Float(), nullable=True),
+        sa.Column("week_open", sa.Float(), nullable=True),
+        sa.Column("month_open", sa.Float(), nullable=True),
+        sa.Column("year_open", sa.Float(), nullable=True),
+        sa.Column("stale_reason", sa.String(), nullable=True),
+        sa.Column("nkd", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_bonds_secid", "bonds", ["secid"], unique=True)
+    op.create_index("ix_bonds_emitent", "bonds", ["emitent"])
+    op.create_index("ix_bonds_market", "bonds", ["market"])
+    op.create_index("ix_bonds_maturity_date", "bonds", ["maturity_date"])
+
+    op.create_table(
+        "prices",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "event_logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("message", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "trades",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=True),
+        sa.Column("buy_date", sa.Date(), nullable=True),
+        sa.Column("buy_price", sa.Float(), nullable=True),
+        sa.Column("buy_qty", sa.Integer(), nullable=True),
+        sa.Column("buy_nkd", sa.Float(), nullable=True),
+        sa.Column("buy_commission", sa.Float(), nullable=True),
+        sa.Column("sell_date", sa.Date(), nullable=True),
+        sa.Column("sell_price", sa.Float(), nullable=True),
+        sa.Column("sell_qty", sa.Integer(), nullable=True),
+        sa.Column("sell_nkd", sa.Float(), nullable=True),
+        sa.Column("sell_commission", sa.Float(), nullable=True),
+        sa.Column("total_amount", sa.Float(), nullable=True),
+        sa.Column("fx_rate", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_trades_id", "trades", ["id"])
+
+    op.create_table(
+        "coupons",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=True),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=True),
+        sa.Column("currency", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "portfolio_summary",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("invested", sa.Float(), nullable=True),
+        sa.Column("trades_sum", sa.Float(), nullable=True),
+        sa.Column("coupon_profit", sa.Float(), nullable=True),
+        sa.Column("current_value", sa.Float(), nullable=True),
+        sa.Column("total_value", sa.Float(), nullable=True),
+        sa.Column("profit_percent", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_portfolio_summary_id", "portfolio_summary", ["id"])
+
+    op.create_table(
+        "fx_rates",
+        sa.Column("currency", sa.String(length=8), nullable=False),
+        sa.Column("rate", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("currency"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("fx_rates")
+    op.drop_index("ix_portfolio_summary_id", table_name="portfolio_summary")
+    op.drop_table("portfolio_summary")
+    op.drop_table("coupons")
+    op.drop_index("ix_trades_id", table_name="trades")
+    op.drop_table("trades")
+    op.drop_table("event_logs")
+    op.drop_table("prices")
+    op.drop_index("ix_bonds_maturity_date", table_name="bonds")
+    op.drop_index("ix_bonds_market", table_name="bonds")
+    op.drop_index("ix_bonds_emitent", table_name="bonds")
+    op.drop_index("ix_bonds_secid", table_name="bonds")
+    op.drop_table("bonds")
@@ -0,0 +1,202 @@
+"""price history, analytics, fx history, structured events
+
+Всё, что модели получили после базовой ревизии:
+  - bonds: номинал и локальная аналитика (face_value, duration, modified_duration,
+    convexity, current_yield);
+  - prices -> секционированная по годам price_history (ключ (bond_id, date), BRIN по
+    date, секция по умолчанию), строки prices переносятся, дубли по дате — последняя
+    запись; недельные бары price_weekly;
+  - index_history, amortizations, fx_rate_history, portfolio_value_daily, reference_rates;
+  - event_logs: event_type, bond_id, payload и индексы под пагинацию журнала;
+  - coupons: projected и уникальный ключ (bond_id, date) — цель ON CONFLICT в app.bulk,
+    дубли купонов перед этим удаляются (остаётся последняя запись).
+
+Базы, созданные autogenerate при старте на промежуточных версиях, частично уже
+содержат эти объекты: онлайн-миграция создаёт только недостающее.
+
+Revision ID: 0001_series_schema
+Revises: 0001_initial
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_series_schema"
+down_revision: Union[str, Sequence[str], None] = "0001_initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BOND_COLUMNS = ("face_value", "duration", "modified_duration", "convexity", "current_yield")
+
+
+class _Schema:
+    """Что уже есть в БД; в offline-режиме (--sql) считается, что база на базовой ревизии."""
+
+    def __init__(self):
+        self.insp = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+
+    def table(self, name: str) -> bool:
+        return self.insp is not None and self.insp.has_table(name)
+
+    def column(self, table: str, name: str) -> bool:
+        return self.table(table) and any(c["name"] == name for c in self.insp.get_columns(table))
+
+    def index(self, table: str, name: str) -> bool:
+        return self.table(table) and any(i["name"] == name for i in self.insp.get_indexes(table))
+
+    def unique(self, table: str, name: str) -> bool:
+        return self.table(table) and any(u["name"] == name for u in self.insp.get_unique_constraints(table))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    db = _Schema()
+
+    for name in BOND_COLUMNS:
+        if not db.column("bonds", name):
+            op.add_column("bonds", sa.Column(name, sa.Float(), nullable=True))
+
+    # секционированная история цен; годовые секции создаёт app.price_history.ensure_price_partitions
+    if not db.table("price_history"):
+        op.create_table(
+            "price_history",
+            sa.Column("bond_id", sa.Integer(), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("value", sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("bond_id", "date"),
+            postgresql_partition_by="RANGE (date)",
+        )
+        op.create_index("ix_price_history_date_brin", "price_history", ["date"], postgresql_using="brin")
+    op.execute('CREATE TABLE IF NOT EXISTS "price_history_default" PARTITION OF "price_history" DEFAULT')
+    if db.insp is None or db.table("prices"):
+        op.execute(
+            "INSERT INTO price_history (bond_id, date, value) "
+            "SELECT DISTINCT ON (bond_id, date) bond_id, date, value FROM prices "
+            "ORDER BY bond_id, date, id DESC ON CONFLICT DO NOTHING"
+        )
+        op.drop_table("prices")
+
+    if not db.table("price_weekly"):
+        op.create_table(
+            "price_weekly",
+            sa.Column("bond_id", sa.Integer(), nullable=False),
+            sa.Column("week_start", sa.Date(), nullable=False),
+            sa.Column("open", sa.Float(), nullable=True),
+            sa.Column("high", sa.Float(), nullable=True),
+            sa.Column("low", sa.Float(), nullable=True),
+            sa.Column("close", sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("bond_id", "week_start"),
+        )
+
+    if not db.table("index_history"):
+        op.create_table(
+            "index_history",
+            sa.Column("secid", sa.String(length=16), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("close", sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint("secid", "date"),
+        )
+
+    if not db.column("event_logs", "event_type"):
+        op.add_column("event_logs", sa.Column("event_type", sa.String(length=32), server_default="ui", nullable=False))
+    if not db.column("event_logs", "bond_id"):
+        op.add_column("event_logs", sa.Column("bond_id", sa.Integer(), nullable=True))
+        op.create_foreign_key("event_logs_bond_id_fkey", "event_logs", "bonds", ["bond_id"], ["id"], ondelete="SET NULL")
+    if not db.column("event_logs", "payload"):
+        op.add_column("event_logs", sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    if not db.index("event_logs", "ix_event_logs_ts_id"):
+        op.create_index("ix_event_logs_ts_id", "event_logs", ["timestamp", "id"])
+    if not db.index("event_logs", "ix_event_logs_type_ts"):
+        op.create_index("ix_event_logs_type_ts", "event_logs", ["event_type", "timestamp"])
+
+    if not db.column("coupons", "projected"):
+        op.add_column("coupons", sa.Column("projected", sa.Boolean(), server_default="false", nullable=False))
+    if not db.unique("coupons", "uq_coupons_bond_date"):
+        op.execute(
+            "DELETE FROM coupons a USING coupons b "
+            "WHERE a.bond_id = b.bond_id AND a.date = b.date AND a.id < b.id"
+        )
+        op.create_unique_constraint("uq_coupons_bond_date", "coupons", ["bond_id", "date"])
+
+    if not db.table("amortizations"):
+        op.create_table(
+            "amortizations",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("bond_id", sa.Integer(), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("value", sa.Float(), nullable=True),
+            sa.Column("value_prc", sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("bond_id", "date", name="uq_amortizations_bond_date"),
+        )
+
+    if not db.table("fx_rate_history"):
+        op.create_table(
+            "fx_rate_history",
+            sa.Column("currency", sa.String(length=8), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("rate", sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint("currency", "date"),
+        )
+
+    if not db.table("portfolio_value_daily"):
+        op.create_table(
+            "portfolio_value_daily",
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("value_rub", sa.Float(), nullable=False),
+            sa.Column("invested_rub", sa.Float(), nullable=False),
+            sa.Column("proceeds_rub", sa.Float(), nullable=False),
+            sa.Column("coupon_income_rub", sa.Float(), nullable=False),
+            sa.Column("computed_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("date"),
+        )
+
+    if not db.table("reference_rates"):
+        op.create_table(
+            "reference_rates",
+            sa.Column("name", sa.String(length=16), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("rate", sa.Float(), nullable=False),
+            sa.Column("is_forecast", sa.Boolean(), server_default="false", nullable=False),
+            sa.PrimaryKeyConstraint("name", "date"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("reference_rates")
+    op.drop_table("portfolio_value_daily")
+    op.drop_table("fx_rate_history")
+    op.drop_table("amortizations")
+    op.drop_constraint("uq_coupons_bond_date", "coupons", type_="unique")
+    op.drop_column("coupons", "projected")
+    op.drop_index("ix_event_logs_type_ts", table_name="event_logs")
+    op.drop_index("ix_event_logs_ts_id", table_name="event_logs")
+    op.drop_column("event_logs", "payload")
+    op.drop_column("event_logs", "bond_id")
+    op.drop_column("event_logs", "event_type")
+    op.drop_table("index_history")
+    op.drop_table("price_weekly")
+    op.create_table(
+        "prices",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO prices (bond_id, date, value) SELECT bond_id, date, value FROM price_history ORDER BY bond_id, date")
+    # секции удаляются вместе с родительской таблицей
+    op.drop_table("price_history")
+    for name in reversed(BOND_COLUMNS):
+        op.drop_column("bonds", name)
@@ -0,0 +1,49 @@
+"""cache invalidation notify triggers
+
+Statement-level триггеры на bonds, trades, coupons, fx_rates: после изменения
+pg_notify('cache_invalidate', <таблица>); слушает app.cache_bus в каждом воркере.
+
+Revision ID: 0002_cache_notify
+Revises: 0001_series_schema
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_cache_notify"
+down_revision: Union[str, Sequence[str], None] = "0001_series_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("bonds", "trades", "coupons", "fx_rates")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_cache_invalidate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('cache_invalidate', TG_TABLE_NAME);
+            RETURN NULL;
+        END
+        $$
+    """)
+    for table in TABLES:
+        op.execute(
+            f'CREATE TRIGGER "{table}_cache_invalidate" '
+            f'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}" '
+            f"FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidate()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS "{table}_cache_invalidate" ON "{table}"')
+    op.execute("DROP FUNCTION IF EXISTS notify_cache_invalidate()")
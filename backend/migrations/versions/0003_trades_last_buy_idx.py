@@ -0,0 +1,34 @@
+"""trades last buy index
+
+Частичный индекс для последней цены покупки по бумаге (app.bonds: GET /bonds).
+
+Revision ID: 0003_trades_last_buy_idx
+Revises: 0002_cache_notify
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_trades_last_buy_idx"
+down_revision: Union[str, Sequence[str], None] = "0002_cache_notify"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_trades_bond_last_buy", "trades",
+        ["bond_id", sa.text("buy_date DESC NULLS LAST"), sa.text("id DESC")],
+        postgresql_where=sa.text("buy_price IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_trades_bond_last_buy", table_name="trades")
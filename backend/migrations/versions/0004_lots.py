@@ -0,0 +1,121 @@
+"""lot accounting tables
+
+Таблицы app.lots (lot_positions, position_lots, realized_pnl) и очередь lots_dirty:
+строковый триггер на trades помечает bond_id старой и новой версии строки.
+Все бумаги со сделками помечаются сразу — первый refresh_dirty построит лоты.
+
+Revision ID: 0004_lots
+Revises: 0003_trades_last_buy_idx
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_lots"
+down_revision: Union[str, Sequence[str], None] = "0003_trades_last_buy_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "lot_positions",
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("method", sa.String(length=8), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("avg_price", sa.Float(), nullable=True),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("cost_rub", sa.Float(), nullable=False),
+        sa.Column("realized_pnl", sa.Float(), nullable=False),
+        sa.Column("realized_pnl_rub", sa.Float(), nullable=False),
+        sa.Column("nkd_income", sa.Float(), nullable=False),
+        sa.Column("nkd_income_rub", sa.Float(), nullable=False),
+        sa.Column("unmatched_qty", sa.Integer(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("bond_id", "method"),
+    )
+
+    op.create_table(
+        "position_lots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("method", sa.String(length=8), nullable=False),
+        sa.Column("trade_id", sa.Integer(), nullable=True),
+        sa.Column("open_date", sa.Date(), nullable=True),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("cost_rub", sa.Float(), nullable=False),
+        sa.Column("nkd_paid", sa.Float(), nullable=False),
+        sa.Column("nkd_paid_rub", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_position_lots_bond_method", "position_lots", ["bond_id", "method"])
+
+    op.create_table(
+        "realized_pnl",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("method", sa.String(length=8), nullable=False),
+        sa.Column("trade_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=True),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("proceeds", sa.Float(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("pnl", sa.Float(), nullable=False),
+        sa.Column("proceeds_rub", sa.Float(), nullable=False),
+        sa.Column("cost_rub", sa.Float(), nullable=False),
+        sa.Column("pnl_rub", sa.Float(), nullable=False),
+        sa.Column("nkd_income", sa.Float(), nullable=False),
+        sa.Column("nkd_income_rub", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_realized_pnl_bond_method", "realized_pnl", ["bond_id", "method"])
+
+    op.create_table(
+        "lots_dirty",
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("marked_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("bond_id"),
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mark_lots_dirty() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                INSERT INTO lots_dirty (bond_id) VALUES (OLD.bond_id) ON CONFLICT DO NOTHING;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                INSERT INTO lots_dirty (bond_id) VALUES (NEW.bond_id) ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute(
+        'CREATE TRIGGER "trades_lots_dirty" AFTER INSERT OR UPDATE OR DELETE ON "trades" '
+        "FOR EACH ROW EXECUTE FUNCTION mark_lots_dirty()"
+    )
+    op.execute("INSERT INTO lots_dirty (bond_id) SELECT DISTINCT bond_id FROM trades")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS "trades_lots_dirty" ON "trades"')
+    op.execute("DROP FUNCTION IF EXISTS mark_lots_dirty()")
+    op.drop_table("lots_dirty")
+    op.drop_index("ix_realized_pnl_bond_method", table_name="realized_pnl")
+    op.drop_table("realized_pnl")
+    op.drop_index("ix_position_lots_bond_method", table_name="position_lots")
+    op.drop_table("position_lots")
+    op.drop_table("lot_positions")
@@ -0,0 +1,65 @@
+"""bond catalog for screener
+
+Таблица bond_catalog (app.screener): все облигации MOEX с купоном, сроками,
+рейтинговой корзиной, доходностью и дюрацией; индексы (значение, secid) под
+сортировки с keyset-пагинацией и составной индекс под частые фильтры.
+
+Revision ID: 0005_bond_catalog
+Revises: 0004_lots
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_bond_catalog"
+down_revision: Union[str, Sequence[str], None] = "0004_lots"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_bond_catalog_ytm_secid": ["ytm", "secid"],
+    "ix_bond_catalog_duration_secid": ["duration", "secid"],
+    "ix_bond_catalog_maturity_secid": ["maturity_date", "secid"],
+    "ix_bond_catalog_currency_rating_maturity": ["currency", "rating_bucket", "maturity_date"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "bond_catalog",
+        sa.Column("secid", sa.String(), nullable=False),
+        sa.Column("isin", sa.String(), nullable=True),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("emitent", sa.String(), nullable=True),
+        sa.Column("market", sa.String(), nullable=True),
+        sa.Column("currency", sa.String(length=8), nullable=True),
+        sa.Column("coupon", sa.Float(), nullable=True),
+        sa.Column("coupon_period", sa.Integer(), nullable=True),
+        sa.Column("maturity_date", sa.Date(), nullable=True),
+        sa.Column("offer_date", sa.Date(), nullable=True),
+        sa.Column("amortization", sa.Boolean(), nullable=True),
+        sa.Column("rating", sa.String(), nullable=True),
+        sa.Column("rating_bucket", sa.Integer(), nullable=True),
+        sa.Column("face_value", sa.Float(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("accrued", sa.Float(), nullable=True),
+        sa.Column("ytm", sa.Float(), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("secid"),
+    )
+    for name, columns in INDEXES.items():
+        op.create_index(name, "bond_catalog", columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in INDEXES:
+        op.drop_index(name, table_name="bond_catalog")
+    op.drop_table("bond_catalog")
@@ -0,0 +1,95 @@
+"""normalized credit ratings
+
+Сводный рейтинг бумаги (app.ratings): bonds.rating_notch / rating_composite с индексом
+(rating_notch, id), история изменений rating_history и очередь ratings_dirty.
+Строковый триггер на bonds помечает бумагу, когда меняется рейтинг или прогноз
+любого агентства. Бумаги с рейтингами помечаются сразу — первый refresh_dirty
+посчитает ступени и запишет исходное состояние в историю.
+
+Revision ID: 0006_ratings
+Revises: 0005_bond_catalog
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_ratings"
+down_revision: Union[str, Sequence[str], None] = "0005_bond_catalog"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATING_COLUMNS = (
+    "akra_rating", "akra_forecast", "raexpert_rating", "raexpert_forecast", "nkr_rating", "nkr_forecast",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("bonds", sa.Column("rating_notch", sa.Integer(), nullable=True))
+    op.add_column("bonds", sa.Column("rating_composite", sa.String(length=8), nullable=True))
+    op.create_index("ix_bonds_rating_notch_id", "bonds", ["rating_notch", "id"])
+
+    op.create_table(
+        "rating_history",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("agency", sa.String(length=16), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.Column("rating", sa.String(), nullable=True),
+        sa.Column("forecast", sa.String(), nullable=True),
+        sa.Column("notch", sa.Integer(), nullable=True),
+        sa.Column("prev_rating", sa.String(), nullable=True),
+        sa.Column("prev_forecast", sa.String(), nullable=True),
+        sa.Column("prev_notch", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["bond_id"], ["bonds.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_rating_history_bond_agency_changed", "rating_history", ["bond_id", "agency", "changed_at"])
+    op.create_index("ix_rating_history_changed_at", "rating_history", ["changed_at"])
+
+    op.create_table(
+        "ratings_dirty",
+        sa.Column("bond_id", sa.Integer(), nullable=False),
+        sa.Column("marked_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("bond_id"),
+    )
+
+    old = ", ".join(f"OLD.{c}" for c in RATING_COLUMNS)
+    new = ", ".join(f"NEW.{c}" for c in RATING_COLUMNS)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION mark_ratings_dirty() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' OR ROW({old}) IS DISTINCT FROM ROW({new}) THEN
+                INSERT INTO ratings_dirty (bond_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute(
+        f'CREATE TRIGGER "bonds_ratings_dirty" AFTER INSERT OR UPDATE OF {", ".join(RATING_COLUMNS)} ON "bonds" '
+        "FOR EACH ROW EXECUTE FUNCTION mark_ratings_dirty()"
+    )
+    op.execute(
+        "INSERT INTO ratings_dirty (bond_id) SELECT id FROM bonds "
+        "WHERE coalesce(akra_rating, raexpert_rating, nkr_rating) IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS "bonds_ratings_dirty" ON "bonds"')
+    op.execute("DROP FUNCTION IF EXISTS mark_ratings_dirty()")
+    op.drop_table("ratings_dirty")
+    op.drop_index("ix_rating_history_changed_at", table_name="rating_history")
+    op.drop_index("ix_rating_history_bond_agency_changed", table_name="rating_history")
+    op.drop_table("rating_history")
+    op.drop_index("ix_bonds_rating_notch_id", table_name="bonds")
+    op.drop_column("bonds", "rating_composite")
+    op.drop_column("bonds", "rating_notch")
@@ -0,0 +1,34 @@
+"""price_weekly first/last date
+
+Первый и последний день, вошедшие в недельный бар: повторная свёртка недели
+(стык лет, догрузка цен задним числом) дополняет бар, а не перезаписывает его
+(app.price_history.rollup_year). У существующих баров даты не известны — NULL.
+
+Revision ID: 0007_price_weekly_span
+Revises: 0006_ratings
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_price_weekly_span"
+down_revision: Union[str, Sequence[str], None] = "0006_ratings"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("price_weekly", sa.Column("first_date", sa.Date(), nullable=True))
+    op.add_column("price_weekly", sa.Column("last_date", sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("price_weekly", "last_date")
+    op.drop_column("price_weekly", "first_date")
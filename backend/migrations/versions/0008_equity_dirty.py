@@ -0,0 +1,64 @@
+"""equity curve dirty date
+
+Очередь equity_dirty для app.equity_curve: строковый триггер на trades пишет самую
+раннюю дату старой и новой версии строки (buy_date, sell_date, date). Следующий
+extend_equity_curve пересчитывает сохранённую кривую начиная с минимальной из них —
+правка сделки задним числом больше не оставляет последующие дни устаревшими.
+
+Revision ID: 0008_equity_dirty
+Revises: 0007_price_weekly_span
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_equity_dirty"
+down_revision: Union[str, Sequence[str], None] = "0007_price_weekly_span"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "equity_dirty",
+        sa.Column("since", sa.Date(), nullable=False),
+        sa.Column("marked_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("since"),
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mark_equity_dirty() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            since date;
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                since := LEAST(OLD.buy_date, OLD.sell_date, OLD.date);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                since := LEAST(since, NEW.buy_date, NEW.sell_date, NEW.date);
+            END IF;
+            IF since IS NOT NULL THEN
+                INSERT INTO equity_dirty (since) VALUES (since) ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute(
+        'CREATE TRIGGER "trades_equity_dirty" AFTER INSERT OR UPDATE OR DELETE ON "trades" '
+        "FOR EACH ROW EXECUTE FUNCTION mark_equity_dirty()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS "trades_equity_dirty" ON "trades"')
+    op.execute("DROP FUNCTION IF EXISTS mark_equity_dirty()")
+    op.drop_table("equity_dirty")
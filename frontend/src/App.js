@@ -12,6 +12,10 @@ import RGBIChart from "./RGBIChart";
 import FxRatesPanel from "./FxRatesPanel";
 import "./index.css";
 
+const LOGS_PAGE_SIZE = 100;
+// события обновления котировок пишутся, но в ленте не показываются
+const HIDDEN_LOG_TYPES = ["refresh", "refresh_error"];
+
 export default function App() {
   const [query, setQuery]     = useState("");
   const [results, setResults] = useState([]);
@@ -20,6 +24,7 @@ export default function App() {
     localStorage.getItem("lastUpdateTime") || null
   );
   const [logs, setLogs] = useState([]);
+  const [logsCursor, setLogsCursor] = useState(null);
   const [invested, setInvested] = useState(0);
   const [tradesSum, setTradesSum] = useState(0);
   const [couponProfit, setCouponProfit] = useState(0);
@@ -44,7 +49,7 @@ export default function App() {
   // Загружаем список облигаций
   const loadBonds = async () => {
     try {
-      const data = await apiFetch("/bonds");
+      const data = await apiFetch("/bonds?coupons=false");
       setBonds(Array.isArray(data) ? [...data] : []);
     } catch (err) {
       console.error("Ошибка загрузки облигаций", err);
@@ -66,29 +71,41 @@ export default function App() {
   useEffect(() => {
     (async () => {
       await Promise.all([loadBonds(), loadPositions(), loadCoupons()]);
-      try {
-        const logsData = await apiFetch("/logs");
-        setLogs(Array.isArray(logsData) ? logsData : []);
-      } catch (err) {
-        console.error("Ошибка загрузки логов", err);
-        showToast(err instanceof Error ? err.message : "Ошибка загрузки логов", "error");
-      }
+      await loadLogs();
       await loadSummary();
     })();
     // пустой массив — запуск один раз при монтировании
   }, []);
 
-  const addLog = async (msg) => {
+  // Логи: страницы по курсору с сервера, служебные типы отфильтрованы там же
+  const loadLogs = async (before = null) => {
+    try {
+      const params = new URLSearchParams({ limit: String(LOGS_PAGE_SIZE) });
+      HIDDEN_LOG_TYPES.forEach(t => params.append("exclude_type", t));
+      if (before) params.set("before", before);
+      const page = await apiFetch(`/logs?${params.toString()}`);
+      const items = Array.isArray(page?.items) ? page.items : [];
+      setLogs(prev => (before ? [...prev, ...items] : items));
+      setLogsCursor(page?.next_cursor ?? null);
+    } catch (err) {
+      console.error("Ошибка загрузки логов", err);
+      showToast(err instanceof Error ? err.message : "Ошибка загрузки логов", "error");
+    }
+  };
+
+  const addLog = async (msg, type = "ui", bondId = null) => {
     try {
       const saved = await apiFetch(`/logs`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: msg }),
+        body: JSON.stringify({ message: msg, event_type: type, bond_id: bondId }),
       });
+      if (HIDDEN_LOG_TYPES.includes(type)) return;
       const logObj = {
-        id: saved.id ?? Date.now(),
+        id: saved.id ?? `local-${Date.now()}`,
         timestamp: saved.timestamp ?? new Date().toISOString(),
         message: saved.message ?? msg,
+        event_type: saved.event_type ?? type,
       };
       setLogs(prev => [logObj, ...prev]);
     } catch (e) {
@@ -212,10 +229,10 @@ export default function App() {
       const now = new Date().toISOString();
       setLastUpdateTime(now);
       localStorage.setItem("lastUpdateTime", now);
-      addLog("Обновлены все облигации");
+      addLog("Обновлены все облигации", "refresh");
     } catch (e) {
       console.error("PUT /bonds failed", e);
-      addLog("Ошибка обновления");
+      addLog("Ошибка обновления", "refresh_error");
     }
   };
 
@@ -291,7 +308,7 @@ export default function App() {
           <CouponsPage bonds={bonds} coupons={coupons} loadCoupons={loadCoupons} />
         </div>
         <div className="logs-wrapper">
-          <LogsPage logs={logs} />
+          <LogsPage logs={logs} hasMore={!!logsCursor} onLoadMore={() => loadLogs(logsCursor)} />
         </div>
       </div>
 
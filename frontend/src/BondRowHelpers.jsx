@@ -3,35 +3,6 @@ import React from "react";
 
 export const currencySymbols = { RUB: "₽", SUR: "₽", USD: "$", CNY: "¥", CNH: "¥", EUR: "€", GBP: "£" };
 
-export const formatMoney = (amount, symbol, code) => {
-  if (amount == null || !isFinite(Number(amount))) return "-";
-  const numStr = Number(amount).toLocaleString("ru-RU", { minimumFractionDigits: 2, maximumFractionDigits: 2 });
-  if (symbol) return `${numStr} ${symbol}`;
-  if (code) return `${numStr} ${code}`;
-  return numStr;
-};
-
-export const tryGetRate = (map, keyRaw) => {
-  if (!map) return null;
-  const k = String(keyRaw ?? "").trim().toUpperCase();
-  const candidates = [k, k.slice(0, 3), k.replace(/[^A-Z]/g, ''), k.slice(0, 2)];
-  for (const c of candidates) {
-    if (!c) continue;
-    const v = map[c];
-    if (v != null && isFinite(Number(v)) && Number(v) > 0) return Number(v);
-  }
-  return null;
-};
-
-export const toRub = (value, currency, fxRates = {}) => {
-  if (value == null || !isFinite(Number(value))) return null;
-  const cur = (currency || "SUR").toString().trim().toUpperCase();
-  if (cur === "SUR" || cur === "RUB") return Number(value);
-  const rate = tryGetRate(fxRates, cur);
-  if (!rate) return null;
-  return Number(value) * rate;
-};
-
 export const renderArrows = (bond, formatPrice) => {
   const isFx = bond.currency && bond.currency !== "SUR" && bond.currency !== "RUB";
   const symbol = bond.currency_symbol ?? currencySymbols[bond.currency] ?? (bond.currency || "");
@@ -269,144 +240,6 @@ export function WeightCell(props) {
 );
 }
 
-export const computeMergedBondsWithValues = (mergedBonds, tradesByBond = {}, fxRates = {}, currencySymbolsMap = currencySymbols) => {
-  if (!Array.isArray(mergedBonds)) return [];
-
-  const rows = mergedBonds.map(b => {
-    const key = String(b.id ?? b.secid ?? b.isin ?? "");
-    const agg = tradesByBond && (tradesByBond[key] || tradesByBond[String(b.id)]) ? (tradesByBond[key] || tradesByBond[String(b.id)]) : null;
-
-    const parseNumberFromString = (s) => {
-      if (s == null) return null;
-      if (typeof s === "number" && isFinite(s)) return Number(s);
-      const m = String(s).match(/(-?[\d\s\.,]+)/);
-      if (!m) return null;
-      const cleaned = m[1].trim().replace(/\s+/g, "").replace(/,/g, ".");
-      const n = Number(cleaned);
-      return Number.isFinite(n) ? n : null;
-    };
-
-    const fromMerged_absRaw = (b.absRaw != null && isFinite(Number(b.absRaw))) ? Number(b.absRaw) : null;
-    const fromMerged_absValue = (b.abs_value != null && isFinite(Number(b.abs_value))) ? Number(b.abs_value) : null;
-    const fromMerged_weightAbsDisplay = (b.weightAbsDisplay && typeof b.weightAbsDisplay === "string") ? parseNumberFromString(b.weightAbsDisplay) : null;
-
-    const resolvedNative =
-      fromMerged_absRaw != null ? fromMerged_absRaw
-      : fromMerged_absValue != null ? fromMerged_absValue
-      : fromMerged_weightAbsDisplay != null ? fromMerged_weightAbsDisplay
-      : (agg && agg.amount != null && isFinite(Number(agg.amount)) ? Number(agg.amount) : null);
-
-    const mergedCurrency = (b.display_currency ?? b.srcCurrency ?? b.currency ?? null);
-    const aggCurrency = agg && agg.currency ? String(agg.currency) : null;
-    const cur = (mergedCurrency || aggCurrency || "SUR").toString().trim().toUpperCase();
-
-    // try get valueInRub from resolvedNative or from agg.qty * price
-    let valueInRub = null;
-    if (resolvedNative != null && isFinite(Number(resolvedNative))) {
-      if (cur === "SUR" || cur === "RUB") {
-        valueInRub = Number(resolvedNative);
-      } else {
-        const rate = tryGetRate(fxRates, cur);
-        valueInRub = (rate != null) ? Number(resolvedNative) * Number(rate) : null;
-      }
-    } else if (agg && agg.qty != null && isFinite(Number(agg.qty))) {
-      const aggPrice = (agg.last_price != null && isFinite(Number(agg.last_price))) ? Number(agg.last_price)
-                      : (b.last_price != null && isFinite(Number(b.last_price)) ? Number(b.last_price) : null);
-      if (aggPrice != null) {
-        const derived = Number(agg.qty) * aggPrice;
-        if (cur === "SUR" || cur === "RUB") valueInRub = derived;
-        else {
-          const rate = tryGetRate(fxRates, cur);
-          valueInRub = rate != null ? derived * Number(rate) : null;
-        }
-      }
-    }
-
-    // explicit rub fields override if present
-    const explicitRub = (b.abs_value_in_rub ?? b.total_value_in_rub ?? b.position_value_in_rub ?? null);
-    const explicitRubNum = (explicitRub != null && isFinite(Number(explicitRub))) ? Number(explicitRub) : null;
-
-    const finalValueInRub = (valueInRub != null) ? valueInRub : explicitRubNum;
-
-    // keep an absolute native value field for display
-    const nativeValue = resolvedNative != null ? Number(resolvedNative) : null;
-
-    // compute weightPercent if already present (normalize to percentage)
-    const rawWeight = b.weight ?? b.weightPercent ?? null;
-    const weightPercent = rawWeight == null ? null : (Number(rawWeight) > 1 ? Number(rawWeight) : Number(rawWeight) * 100);
-
-    const displaySym = b.currency_symbol ?? currencySymbolsMap?.[cur] ?? cur;
-
-    return {
-      ...b,
-      abs_value: nativeValue,
-      abs_value_in_rub: finalValueInRub,
-      display_currency: cur,
-      currency: cur, // ensure BondsTable can read b.currency consistently
-      display_symbol: displaySym,
-      weightPercent
-    };
-  });
-
-  // total only by valueInRub (ignore nulls)
-  const totalRub = rows.reduce((sum, r) => sum + (r.abs_value_in_rub != null ? Number(r.abs_value_in_rub) : 0), 0);
-
-  // attach percent (relative to totalRub). if totalRub === 0, percent = null
-  return rows.map(r => ({
-    ...r,
-    percent: (r.abs_value_in_rub != null && totalRub > 0) ? (Number(r.abs_value_in_rub) / totalRub) * 100 : null
-  }));
-};
-
-
-export const computeTradesByBond = (trades) => {
-  if (!Array.isArray(trades) || trades.length === 0) return {};
-  const map = {};
-  for (const t of trades) {
-    const bondIdRaw = t.bond_id ?? t.bond?.id ?? t.bondId ?? t.id;
-    if (bondIdRaw == null) continue;
-    const bondId = String(bondIdRaw);
-    map[bondId] = map[bondId] || { amount: 0, qty: 0, last_price: null, currency: null, currency_symbol: null };
-
-    if (t.total_amount != null && isFinite(Number(t.total_amount))) map[bondId].amount += Number(t.total_amount);
-    else if (t.amount != null && isFinite(Number(t.amount))) map[bondId].amount += Number(t.amount);
-    else {
-      const price = isFinite(Number(t.buy_price)) ? Number(t.buy_price) : (isFinite(Number(t.sell_price)) ? Number(t.sell_price) : (isFinite(Number(t.price)) ? Number(t.price) : null));
-      const qty = isFinite(Number(t.buy_qty)) ? Number(t.buy_qty) : (isFinite(Number(t.sell_qty)) ? Number(t.sell_qty) : (isFinite(Number(t.qty)) ? Number(t.qty) : 0));
-      const nkd = isFinite(Number(t.buy_nkd)) ? Number(t.buy_nkd) : (isFinite(Number(t.sell_nkd)) ? Number(t.sell_nkd) : 0);
-      if (price != null && qty != null) map[bondId].amount += price * qty + (nkd || 0);
-    }
-
-    if (t.buy_qty != null && isFinite(Number(t.buy_qty))) map[bondId].qty += Number(t.buy_qty);
-    else if (t.qty != null && isFinite(Number(t.qty))) map[bondId].qty += Number(t.qty);
-    if (t.sell_qty != null && isFinite(Number(t.sell_qty))) map[bondId].qty -= Number(t.sell_qty);
-
-    if (t.last_price != null && isFinite(Number(t.last_price))) map[bondId].last_price = Number(t.last_price);
-    else if (t.price != null && isFinite(Number(t.price))) map[bondId].last_price = Number(t.price);
-
-    const cur = t.currency ?? t.bond?.currency ?? null;
-    if (cur) map[bondId].currency = String(cur);
-    const sym = t.currency_symbol ?? t.bond?.currency_symbol ?? null;
-    if (sym) map[bondId].currency_symbol = sym;
-  }
-  return map;
-};
-
-export const parseNumber = (v) => {
-  if (v === null || v === undefined) return null;
-  if (typeof v === "number" && !Number.isNaN(v)) return v;
-  const s = String(v).replace(/\u00A0/g, "").replace(/\s+/g, "").replace(",", ".");
-  const n = Number(s);
-  return Number.isFinite(n) ? n : null;
-};
-
-export const parseCandidates = (obj, candidates) => {
-  for (const k of candidates) {
-    if (obj && obj[k] != null) return parseNumber(obj[k]);
-  }
-  return null;
-};
-
 export function getCategory(bond) {
   if (bond.currency && bond.currency !== "SUR") return "fx";
   if (bond.name?.toUpperCase().includes("ОФЗ")) return "ofz";
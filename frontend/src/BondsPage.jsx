@@ -1,5 +1,5 @@
 // frontend/src/BondsPage.jsx
-import React, { useState, useEffect, useMemo } from "react";
+import React, { useState, useEffect } from "react";
 import { apiFetch } from "./api";
 import Modal from "react-modal";
 import BondsTable from "./BondsTable";
@@ -7,8 +7,7 @@ import TradeModal from "./TradeModal";
 import UpBar from "./UpBar";
 import { useToastContext } from "./hooks";
 
-import { parseNumber, parseCandidates, getCategory } from "./BondRowHelpers";
-import { computeMergedBonds } from "./BondsDataHelpers";
+import { getCategory } from "./BondRowHelpers";
 
 Modal.setAppElement("#root");
 
@@ -39,10 +38,8 @@ export default function BondsPage(props) {
   const [refreshing, setRefreshing] = useState(false);
   const [progress, setProgress] = useState(0);
 
-  const [bondsWithWeights, setBondsWithWeights] = useState([]);
+  const [dashboardRows, setDashboardRows] = useState([]);
   const [fxRates, setFxRates] = useState({});
-  const [positionsByBond, setPositionsByBond] = useState({});
-  const [tradesByBond, setTradesByBond] = useState({});
   const { toast, showToast } = useToastContext();
 
   const formatPrice = (value, currency) => {
@@ -54,187 +51,27 @@ export default function BondsPage(props) {
     return `${Number(value).toLocaleString("ru-RU", { minimumFractionDigits: 2, maximumFractionDigits: 2 })} ${symbol}`;
   };
 
+  // Одна загрузка сводной таблицы: позиции, стоимость, вес и P&L посчитаны на бэкенде
   useEffect(() => {
     let mounted = true;
-    const loadWeights = async () => {
+    const loadDashboard = async () => {
       try {
-        const res = await apiFetch("/bonds/weights");
-        if (!res.ok) return;
-        const data = await res.json();
-        if (mounted) setBondsWithWeights(Array.isArray(data) ? data : []);
+        const data = await apiFetch("/api/dashboard");
+        if (!mounted) return;
+        setDashboardRows(Array.isArray(data?.rows) ? data.rows : []);
+        setFxRates(data?.fx_rates || {});
       } catch (e) {
-        if (mounted) setBondsWithWeights([]);
+        console.warn("Ошибка загрузки /api/dashboard", e);
       }
     };
-    loadWeights();
+    loadDashboard();
     const id = setInterval(() => {
-      loadWeights();
+      loadDashboard();
       if (onRefreshAll) onRefreshAll();
       if (loadSummary) loadSummary();
     }, 60_000);
     return () => { mounted = false; clearInterval(id); };
-  }, [onRefreshAll, loadSummary]);
-
-  useEffect(() => {
-    let mounted = true;
-    const loadFx = async () => {
-      try {
-        const res = await apiFetch("/fxrates");
-        if (!res.ok) throw new Error("fx fetch failed");
-        const arr = await res.json();
-        const map = {};
-        (arr || []).forEach(item => {
-          if (item && item.currency) map[String(item.currency).toUpperCase().trim()] = Number(item.rate) || 0;
-        });
-        if (mounted) setFxRates(map);
-      } catch (e) {
-        if (mounted) setFxRates({});
-      }
-    };
-    loadFx();
-    const id = setInterval(loadFx, 60_000);
-    return () => { mounted = false; clearInterval(id); };
-  }, [lastUpdateTime]);
-
-  useEffect(() => {
-    let mounted = true;
-    const loadPositionsApi = async () => {
-      try {
-        const res = await apiFetch("/positions");
-        if (!res.ok) {
-          if (mounted) setPositionsByBond({});
-          return;
-        }
-        const arr = await res.json();
-        const map = {};
-        (arr || []).forEach(p => {
-          const id = String(p.bond_id ?? p.id ?? p.secid ?? "");
-          if (!id) return;
-          map[id] = p;
-        });
-        if (mounted) setPositionsByBond(map);
-      } catch (e) {
-        if (mounted) setPositionsByBond({});
-      }
-    };
-    loadPositionsApi();
-    const id = setInterval(loadPositionsApi, 60_000);
-    return () => { mounted = false; clearInterval(id); };
-  }, [lastUpdateTime]);
-
-  useEffect(() => {
-    let mounted = true;
-
-    const parseNum = (v) => {
-      if (v == null) return null;
-      if (typeof v === "number") return v;
-      const s = String(v).trim().replace(",", ".").replace(/\s+/g, "");
-      const n = Number(s.replace(/[^\d\.\-]/g, ""));
-      return Number.isFinite(n) ? n : null;
-    };
-
-    const normalizeArrayToMap = (arr) => {
-      const map = {};
-      (arr || []).forEach(item => {
-        const id = String(item.bond_id ?? item.bond?.id ?? item.bondId ?? item.id ?? "");
-        if (!id) return;
-        map[id] = map[id] || { amount: 0, qty: 0 };
-        if (item.total_amount != null) map[id].amount = (map[id].amount || 0) + Number(item.total_amount);
-        else if (item.amount != null) map[id].amount = (map[id].amount || 0) + Number(item.amount);
-
-        const buyQtyRaw = item.buy_qty ?? item.qty ?? item.quantity ?? 0;
-        const sellQtyRaw = item.sell_qty ?? 0;
-        const buyQty = parseNum(buyQtyRaw) || 0;
-        const sellQty = parseNum(sellQtyRaw) || 0;
-        if (buyQty) map[id].qty = (map[id].qty || 0) + buyQty;
-        if (sellQty) map[id].qty = (map[id].qty || 0) - sellQty;
-
-        const priceRaw = item.buy_price ?? item.sell_price ?? item.price ?? item.last_price ?? null;
-        const price = parseNum(priceRaw);
-        if ((!map[id].amount || map[id].amount === 0) && price != null && (buyQty || parseNum(item.qty) || parseNum(item.buy_qty))) {
-          const q = buyQty || parseNum(item.qty) || parseNum(item.buy_qty) || 0;
-          map[id].amount = (map[id].amount || 0) + price * q + (parseNum(item.buy_nkd) || 0) + (parseNum(item.sell_nkd) || 0);
-        }
-        if (price != null) map[id].last_price = price;
-      });
-      Object.keys(map).forEach(k => {
-        const v = map[k];
-        if ((v.amount == null || v.amount === 0) && (v.qty == null || v.qty === 0) && !v.last_price) {
-          delete map[k];
-        }
-      });
-      return map;
-    };
-
-    const loadTradesAgg = async () => {
-      try {
-        const tried = [
-          "/api/trades",
-          "/api/trades_breakdown"
-        ];
-        let finalMap = {};
-        for (const ep of tried) {
-          try {
-            const data = await apiFetch(ep); // apiFetch уже вернёт JSON
-            if (Array.isArray(data)) {
-              const map = normalizeArrayToMap(data);
-              if (Object.keys(map).length > 0) { finalMap = map; break; }
-            } else if (data && typeof data === "object") {
-              if (Array.isArray(data.positions) && data.positions.length > 0) {
-                const map = normalizeArrayToMap(data.positions);
-                if (Object.keys(map).length > 0) { finalMap = map; break; }
-              }
-              const keys = Object.keys(data || {});
-              if (keys.length > 0 && typeof data[keys[0]] === "object") {
-                const map = {};
-                for (const k of keys) {
-                  const v = data[k];
-                  if (!v) continue;
-                  map[String(k)] = {
-                    amount: v.amount != null ? Number(v.amount) : (v.total_amount != null ? Number(v.total_amount) : undefined),
-                    qty: v.qty != null ? Number(v.qty) : (v.buy_qty != null ? Number(v.buy_qty) : undefined),
-                    last_price: v.last_price != null ? Number(v.last_price) : (v.price != null ? Number(v.price) : undefined)
-                  };
-                }
-                if (Object.keys(map).length > 0) { finalMap = map; break; }
-              }
-            }
-          } catch (e) {
-            continue;
-          }
-        }
-        if (mounted) {
-          setTradesByBond(finalMap);
-        }
-      } catch (err) {
-        if (mounted) setTradesByBond({});
-      }
-    };
-
-    loadTradesAgg();
-    const id = setInterval(loadTradesAgg, 60_000);
-    return () => { mounted = false; clearInterval(id); };
-  }, [lastUpdateTime]);
-
-  const normalizedBonds = useMemo(() => {
-    const coerce = (v) => {
-      if (v == null) return null;
-      if (typeof v === "number" && isFinite(v)) return Number(v);
-      try {
-        const s = String(v).trim().replace(/\s+/g, "").replace(/,/g, ".").replace(/[^\d\.\-]/g, "");
-        const n = Number(s);
-        return Number.isFinite(n) ? n : null;
-      } catch (e) {
-        return null;
-      }
-    };
-    return (bonds || []).map(b => ({ ...b, last_price: coerce(b.last_price ?? b.price ?? b.market_price ?? null) }));
-  }, [bonds]);
-
-
-  const mergedBonds = useMemo(() => {
-    return computeMergedBonds(normalizedBonds, bondsWithWeights, fxRates, formatPrice, positionsByBond, tradesByBond);
-  }, [normalizedBonds, bondsWithWeights, fxRates, positionsByBond, tradesByBond, formatPrice]);
+  }, [bonds, lastUpdateTime, onRefreshAll, loadSummary]);
 
   useEffect(() => {
     const handler = (ev) => {
@@ -351,7 +188,8 @@ export default function BondsPage(props) {
     <hr style={{ border: "none", borderTop: "1px solid #e6e6e6", margin: "12px 0" }} />
 
     <BondsTable
-      mergedBonds={mergedBonds}
+      mergedBonds={dashboardRows}
+      fxRates={fxRates}
       formatPrice={formatPrice}
       lastUpdateTime={lastUpdateTime}
       onRowClick={(bond) => { setActiveBond(bond); setModalOpen(true); }}
@@ -1,16 +1,10 @@
 // frontend/src/BondsTable.jsx
-import React, { useEffect, useMemo, useState } from "react";
-import { apiFetch } from "./api";
+import React from "react";
 
 import {
   currencySymbols,
-  formatMoney,
-  tryGetRate,
-  toRub,
   renderArrows,
-  WeightCell,
-  computeMergedBondsWithValues,
-  computeTradesByBond
+  WeightCell
 } from "./BondRowHelpers";
 
 export default function BondsTable(props) {
@@ -28,144 +22,18 @@ export default function BondsTable(props) {
     formatDate,
     getCategory,
     CATEGORY_COLORS,
-    formatPrice
+    formatPrice,
+    fxRates = {}
   } = props;
 
-  // trades loading
-  const [trades, setTrades] = useState(null);
-  
-  useEffect(() => {
-      let cancelled = false;
-      const loadTrades = async () => {
-        try {
-          const data = await apiFetch("/api/trades"); // сразу JSON
-          if (!cancelled) setTrades(Array.isArray(data) ? data : []);
-        } catch (e) {
-          console.warn("Failed to load trades for bonds aggregation", e);
-          if (!cancelled) setTrades([]);
-        }
-      };
-      loadTrades();
-      return () => { cancelled = true; };
-    }, []);
-
-
-  // compute tradesByBond using helper
-  const tradesByBond = useMemo(() => computeTradesByBond(trades), [trades]);
-
-  // fx rates with retry
-  const [fxRates, setFxRates] = useState({});
-  const [fxRetry, setFxRetry] = useState(0);
-
-  useEffect(() => {
-      let cancelled = false;
-      const loadFx = async () => {
-        try {
-          const data = await apiFetch("/fxrates"); // сразу JSON
-          const map = {};
-          if (Array.isArray(data)) {
-            for (const r of data) {
-              if (!r || !r.currency) continue;
-              const key = String(r.currency).trim().toUpperCase().slice(0, 3);
-              const rate = Number(r.rate);
-              if (isFinite(rate) && rate > 0) map[key] = rate;
-            }
-          } else if (data && typeof data === "object") {
-            for (const k of Object.keys(data)) {
-              const key = String(k).trim().toUpperCase().slice(0, 3);
-              const candidate = data[k];
-              const rate = (candidate && candidate.rate != null) ? Number(candidate.rate) : Number(candidate);
-              if (isFinite(rate) && rate > 0) map[key] = rate;
-            }
-          }
-          if (!cancelled) {
-            setFxRates(map);
-            setFxRetry(0);
-          }
-        } catch (err) {
-          console.warn("Failed to load fx rates", err);
-          if (!cancelled) {
-            setFxRates(prev => (prev && Object.keys(prev).length > 0) ? prev : {});
-            if (fxRetry < 3) setTimeout(() => setFxRetry(prev => prev + 1), 1000 * (fxRetry + 1));
-          }
-        }
-      };
-      loadFx();
-      return () => { cancelled = true; };
-    }, [fxRetry]);
-
-
-  // compute mergedBondsWithValues using helper
-  const mergedBondsWithValues = useMemo(() => {
-    // console.table(mergedBondsWithValues.map(r => ({ id: r.id, cur: r.currency, native: r.abs_value, rub: r.abs_value_in_rub, pct: r.percent })));
-    return computeMergedBondsWithValues(mergedBonds, tradesByBond, fxRates, currencySymbols);
-  }, [mergedBonds, tradesByBond, fxRates]);
-
-  // TEMP: export mergedBondsWithValues and tradesByBond for inspection in DevTools and log sample for id=103
-  useEffect(() => {
-    try { window.__mergedBondsWithValues = mergedBondsWithValues; } catch (e) {}
-    try { window.__tradesByBond = tradesByBond; } catch (e) {}
-  }, [mergedBondsWithValues, tradesByBond]);
-
+  // mergedBonds — строки /api/dashboard: net_qty, market_value(_rub), weight и P&L посчитаны на бэкенде
   const hasFxBonds = mergedBonds.some(b => {
     const cur = (b.currency ?? "SUR").toString().trim().toUpperCase();
     return cur !== "SUR" && cur !== "RUB";
   });
   const fxLoaded = Object.keys(fxRates || {}).length > 0;
 
-  // safe helpers for rendering: fallback names
-  const safePercent = (row) => {
-    if (!row) return null;
-    if (row.weight != null && isFinite(Number(row.weight))) return Number(row.weight);
-    if (row.weightPercent != null && isFinite(Number(row.weightPercent))) return Number(row.weightPercent);
-    if (typeof row.weightDisplay === "string" && row.weightDisplay.endsWith("%")) {
-      const n = parseFloat(row.weightDisplay.replace("%",""));
-      if (!Number.isNaN(n)) return n;
-    }
-    return null;
-  };
-
-  const parseFormattedAmount = (s) => {
-    if (!s || typeof s !== "string") return null;
-    const m = s.match(/([\d\s\.,]+)/);
-    if (!m) return null;
-    const sanitized = m[1].trim().replace(/\s+/g,"").replace(/,/g,".");
-    const n = Number(sanitized);
-    return isFinite(n) ? n : null;
-  };
-
-  const safeValue = (row) => {
-    if (!row) return null;
-    if (row.abs_value != null && isFinite(Number(row.abs_value))) return Number(row.abs_value);
-    if (row.abs_value_in_native != null && isFinite(Number(row.abs_value_in_native))) return Number(row.abs_value_in_native);
-    if (row.absRaw != null && isFinite(Number(row.absRaw))) return Number(row.absRaw);
-    if (row.weightAbsDisplay && typeof row.weightAbsDisplay === "string") {
-      const parsed = parseFormattedAmount(row.weightAbsDisplay);
-      if (parsed != null) return parsed;
-    }
-    return null;
-  };
-
-  const safeValueInRub = (row) => {
-    if (!row) return null;
-    if (row.abs_value_in_rub != null && isFinite(Number(row.abs_value_in_rub))) return Number(row.abs_value_in_rub);
-    const v = safeValue(row);
-    const cur = row.srcCurrency ?? row.currency ?? row.currency_code ?? null;
-    if (v != null && cur) {
-      const rate = tryGetRate(fxRates, cur);
-      if (rate != null && isFinite(Number(rate))) return v * Number(rate);
-    }
-    if (row.weightAbsDisplay && typeof row.weightAbsDisplay === "string" && row.weightAbsDisplay.includes("₽")) {
-      const parsed = parseFormattedAmount(row.weightAbsDisplay);
-      if (parsed != null) return parsed;
-    }
-    return null;
-  };
-
-  const safeSymbol = (row) => {
-    if (!row) return "";
-    return row.display_symbol ?? row.currency_symbol ?? currencySymbols[row.currency] ?? row.currency ?? "";
-  };
+  const symbolOf = (row) => row.currency_symbol ?? currencySymbols[row.currency] ?? row.currency ?? "";
 
   const formatTimeDate = (dt) => {
         if (!dt) return "-";
@@ -180,28 +48,6 @@ export default function BondsTable(props) {
         return `${day}.${month}.${year} ${hours}:${minutes}:${seconds}`;
     };
 
-    // helper: robust extraction of qty from tradesByBond entry
-  const getQtyFromTradesByBond = (bondId) => {
-    if (!tradesByBond || bondId == null) return 0;
-    const entry = tradesByBond[bondId] ?? tradesByBond[String(bondId)];
-    if (!entry) return 0;
-    // entry can be number, object with total_qty / qty / buy_qty, or array of trades
-    if (typeof entry === "number" && isFinite(entry)) return Number(entry);
-    if (Array.isArray(entry)) {
-      return entry.reduce((s, t) => s + (isFinite(Number(t.buy_qty)) ? Number(t.buy_qty) : 0), 0);
-    }
-    if (typeof entry === "object") {
-      if (isFinite(Number(entry.total_qty))) return Number(entry.total_qty);
-      if (isFinite(Number(entry.qty))) return Number(entry.qty);
-      if (isFinite(Number(entry.buy_qty))) return Number(entry.buy_qty);
-      // fallback: sum array fields if present
-      if (Array.isArray(entry.trades)) {
-        return entry.trades.reduce((s, t) => s + (isFinite(Number(t.buy_qty)) ? Number(t.buy_qty) : 0), 0);
-      }
-    }
-    return 0;
-  };
-
  return (
   <div className="bonds-panel-root">
     <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center", gap: 8, marginBottom: 8 }}>
@@ -256,7 +102,7 @@ export default function BondsTable(props) {
           <th>
             <input
               type="checkbox"
-              checked={selectedIds.length === mergedBondsWithValues.length && mergedBondsWithValues.length > 0}
+              checked={selectedIds.length === mergedBonds.length && mergedBonds.length > 0}
               onChange={toggleSelectAll}
             />
           </th>
@@ -275,43 +121,10 @@ export default function BondsTable(props) {
       </thead>
 
       <tbody>
-        {mergedBondsWithValues
+        {mergedBonds
           .slice()
-          .sort((a, b) => {
-            const parseFallbackNumber = (row) => {
-              if (!row) return 0;
-              // percent if present
-              if (row.percent != null && isFinite(Number(row.percent))) return Number(row.percent);
-              // abs_value_in_rub if present
-              if (row.abs_value_in_rub != null && isFinite(Number(row.abs_value_in_rub))) return Number(row.abs_value_in_rub);
-              // native abs_value
-              if (row.abs_value != null && isFinite(Number(row.abs_value))) return Number(row.abs_value);
-              // parse weightDisplay like "12.34%" or "1 234"
-              if (typeof row.weightDisplay === "string") {
-                const m = row.weightDisplay.match(/(-?[\d\s\.,]+)/);
-                if (m) {
-                  const cleaned = m[1].trim().replace(/\s+/g, "").replace(/,/g, ".");
-                  const n = Number(cleaned);
-                  if (isFinite(n)) return n;
-                }
-              }
-              return 0;
-            };
-
-            const aHasPct = a.percent != null && isFinite(Number(a.percent));
-            const bHasPct = b.percent != null && isFinite(Number(b.percent));
-
-            if (aHasPct || bHasPct) {
-              const ap = aHasPct ? Number(a.percent) : 0;
-              const bp = bHasPct ? Number(b.percent) : 0;
-              return bp - ap; // descending percent
-            }
-
-            // neither has explicit percent — compare by value (rub/native)
-            const va = parseFallbackNumber(a);
-            const vb = parseFallbackNumber(b);
-            return vb - va; // descending absolute
-          })
+          // по весу в портфеле, без веса (нет курса) — по рублёвой стоимости
+          .sort((a, b) => ((b.weight ?? 0) - (a.weight ?? 0)) || ((b.market_value_rub ?? 0) - (a.market_value_rub ?? 0)))
           .map((row) => {
             const b = row;
             const category = getCategory ? getCategory(b) : null;
@@ -327,11 +140,7 @@ export default function BondsTable(props) {
                 : `${Number(b.last_price).toFixed(2)} ${currencySymbols[b.currency] ?? b.currency}`;
             })();
 
-            const percent = (b.percent != null) ? b.percent : safePercent(b);
-            const numericValue = (b.abs_value != null) ? b.abs_value : safeValue(b);
-            const numericValueInRub = (b.abs_value_in_rub != null) ? b.abs_value_in_rub : safeValueInRub(b);
-
-            const symbol = safeSymbol(b);
+            const symbol = symbolOf(b);
 
             const ratingDisplay = (() => {
               const parts = [];
@@ -389,17 +198,7 @@ export default function BondsTable(props) {
                     const nkdRaw = b.nkd ?? b.accruedint ?? null;
                     const nkdNum = (nkdRaw != null && isFinite(Number(nkdRaw))) ? Number(nkdRaw) : null;
                     if (nkdNum == null) return <span style={{ color: "#666" }}>-</span>;
-                    const qtyFromTrades = getQtyFromTradesByBond(b.id);
-                    let qty = qtyFromTrades;
-                    if (!qty || qty === 0) {
-                      const qtyCandidates = ["total_qty", "buy_qty", "position_qty", "quantity", "qty"];
-                      for (const key of qtyCandidates) {
-                        if (Object.prototype.hasOwnProperty.call(b, key) && isFinite(Number(b[key]))) {
-                          qty = Number(b[key]);
-                          if (qty) break;
-                        }
-                      }
-                    }
+                    const qty = b.net_qty ?? 0;
 
                     const nkdStr = Number(nkdNum).toFixed(2);
                     const displayMain = `${nkdStr} ₽`;
@@ -428,14 +227,12 @@ export default function BondsTable(props) {
 
                 <td className="col-weight" style={{ textAlign: "right", whiteSpace: "nowrap", minWidth: 100 }}>
                   <WeightCell
-                    percent={percent}
-                    value={numericValue}
-                    valueInRub={numericValueInRub}
+                    percent={b.weight}
+                    value={b.market_value}
+                    valueInRub={b.market_value_rub}
                     currency={b.currency}
                     symbol={symbol}
                     formatPrice={formatPrice}
-                    weightDisplay={b.weightDisplay}
-                    weightAbsDisplay={b.weightAbsDisplay}
                   />
                 </td>
 
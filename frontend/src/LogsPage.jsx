@@ -1,7 +1,7 @@
 // frontend/src/LogsPage.jsx
 import React from "react";
 
-export default function LogsPage({ logs }) {
+export default function LogsPage({ logs, hasMore = false, onLoadMore }) {
     return (
   <>
     <div
@@ -16,9 +16,7 @@ export default function LogsPage({ logs }) {
       {logs.length === 0 ? (
         <div style={{ color: "#888", padding: "0px 0px", lineHeight: 1.02 }}>Пока нет событий</div>
       ) : (
-        logs
-          .filter(log => !["Обновлены все облигации", "Ошибка обновления"].includes(log.message))
-          .map((log) => (
+        logs.map((log) => (
             <div
               key={log.id}
               className="log-item"
@@ -32,6 +30,15 @@ export default function LogsPage({ logs }) {
             </div>
           ))
       )}
+      {hasMore && (
+        <button
+          type="button"
+          onClick={onLoadMore}
+          style={{ fontSize: "0.78rem", padding: "2px 0", background: "none", border: "none", color: "#2563eb", cursor: "pointer" }}
+        >
+          Показать ещё
+        </button>
+      )}
     </div>
   </>
 );
@@ -4,7 +4,7 @@ import {
   LineChart, Line, XAxis, YAxis, Tooltip,
   CartesianGrid, ResponsiveContainer
 } from "recharts";
-import { externalFetch } from "./api";   
+import { apiFetch } from "./api";
 
 function toMidnightTs(ts) {
   const d = new Date(ts);
@@ -23,119 +23,19 @@ function normalizeSeries(rows) {
     .sort((a, b) => a.date - b.date);
 }
 
-// --- базовый fetch ---
-async function fetchRGBIData({ from, to, limit = 500 }) {
-  let start = 0;
-  let allRows = [];
-  let hasMore = true;
-
-  while (hasMore) {
-    const url = new URL(
-      "https://iss.moex.com/iss/history/engines/stock/markets/index/boards/SNDX/securities/RGBI.json"
-    );
-    if (from) url.searchParams.set("from", from);
-    if (to) url.searchParams.set("till", to);
-    url.searchParams.set("start", start);
-    url.searchParams.set("limit", limit);
-
-    const json = await externalFetch(url);   // 👈 заменили fetch
-    const rows = (json.history?.data || []).map((row) => ({
-      date: new Date(row[2]).getTime(),
-      value: Number(row[5]),
-    }));
-    allRows = allRows.concat(rows);
-
-    const cursor = json["history.cursor"];
-    if (!cursor || !cursor.data || cursor.data.length === 0) {
-      hasMore = false;
-    } else {
-      const total = Number(cursor.data[0][1]);
-      start += limit;
-      hasMore = start < total;
-    }
-  }
-
-  return normalizeSeries(allRows);
-}
-
-// --- выборка для year каждые 14 дней ---
-async function fetchRGBIYearSampled() {
-  const now = new Date();
-  const startDate = new Date();
-  startDate.setFullYear(startDate.getFullYear() - 1);
-
-  const stepDays = 14;
-  const stepMs = stepDays * 24 * 3600 * 1000;
-  const points = [];
-
-  for (let ts = startDate.getTime(); ts <= now.getTime(); ts += stepMs) {
-    const dateStr = new Date(ts).toISOString().slice(0, 10);
-    const url = new URL(
-      "https://iss.moex.com/iss/history/engines/stock/markets/index/boards/SNDX/securities/RGBI.json"
-    );
-    url.searchParams.set("from", dateStr);
-    url.searchParams.set("limit", "1");
-
-    try {
-      const json = await externalFetch(url);   // 👈 заменили fetch
-      const row = json.history?.data?.[0];
-      if (row) {
-        points.push({
-          date: new Date(row[2]).getTime(),
-          value: Number(row[5]),
-        });
-      }
-    } catch (e) {
-      console.warn("Ошибка загрузки RGBI:", e);
-    }
-  }
-
-  return normalizeSeries(points);
-}
-
-// --- выборка для all чанками по 60 дней ---
-async function fetchRGBIHistoryByChunks(startDate, endDate, chunkDays = 60) {
-  let rows = [];
-  let cursor = new Date(startDate);
-
-  while (cursor <= endDate) {
-    const chunkEnd = new Date(cursor);
-    chunkEnd.setDate(chunkEnd.getDate() + chunkDays);
-    if (chunkEnd > endDate) chunkEnd.setTime(endDate.getTime());
-
-    const fromStr = cursor.toISOString().slice(0, 10);
-    const toStr = chunkEnd.toISOString().slice(0, 10);
-
-    const part = await fetchRGBIData({ from: fromStr, to: toStr });
-    rows = rows.concat(part);
-
-    cursor = new Date(chunkEnd);
-    cursor.setDate(cursor.getDate() + 1);
-  }
+// --- ряд с бэкенда: сервер хранит дневную историю и прореживает её до points точек ---
+const POINTS_BY_RANGE = { day: 50, week: 50, month: 100, year: 200, all: 300 };
 
+async function fetchIndexChart(secid, range) {
+  const points = POINTS_BY_RANGE[range] ?? 300;
+  const json = await apiFetch(`/api/chart/index/${secid}?range=${range}&points=${points}`);
+  const rows = (json.points || []).map((p) => ({
+    date: new Date(p.date).getTime(),
+    value: Number(p.value),
+  }));
   return normalizeSeries(rows);
 }
 
-// --- downsample каждые N дней ---
-function downsampleEveryNth(fullRows, stepDays = 30) {
-  if (!fullRows.length) return [];
-  const out = [];
-  let lastTs = 0;
-  const stepMs = stepDays * 24 * 3600 * 1000;
-
-  for (const row of fullRows) {
-    if (row.date - lastTs >= stepMs) {
-      out.push(row);
-      lastTs = row.date;
-    }
-  }
-  // гарантируем, что последняя точка попадёт
-  if (out[out.length - 1].date !== fullRows[fullRows.length - 1].date) {
-    out.push(fullRows[fullRows.length - 1]);
-  }
-  return out;
-}
-
 // --- добавляем хвост до сегодняшнего дня ---
 function extendWithLastValue(rows, maxDays = 10) {
   if (!rows.length) return rows;
@@ -163,29 +63,14 @@ export default function RGBIChart() {
 
   useEffect(() => {
     async function load() {
-      const now = new Date();
-      const todayStr = now.toISOString().slice(0, 10);
-      let rows = [];
-
-      if (range === "day") {
-        rows = await fetchRGBIData({ from: todayStr, to: todayStr });
-      } else if (range === "week" || range === "month") {
-        let fromDate = new Date(now);
-        if (range === "week") fromDate.setDate(fromDate.getDate() - 7);
-        if (range === "month") fromDate.setMonth(fromDate.getMonth() - 1);
-        const fromStr = fromDate.toISOString().slice(0, 10);
-        rows = await fetchRGBIData({ from: fromStr, to: todayStr });
-      } else if (range === "year") {
-        rows = await fetchRGBIYearSampled();
-      } else if (range === "all") {
-        const startDate = new Date("2012-03-01");
-        const endDate = new Date();
-        const full = await fetchRGBIHistoryByChunks(startDate, endDate, 60);
-        rows = downsampleEveryNth(full, 30);
-        rows = extendWithLastValue(rows, 10);
+      try {
+        let rows = await fetchIndexChart("RGBI", range);
+        if (range === "all") rows = extendWithLastValue(rows, 10);
+        setData(rows);
+      } catch (e) {
+        console.warn("Ошибка загрузки RGBI:", e);
+        setData([]);
       }
-
-      setData(rows);
     }
 
     load();
@@ -1,17 +1,44 @@
-import os, datetime, requests, docker, sys
+import os, sys, json, asyncio, hashlib, re, datetime, threading
+import docker, httpx
 
 container_name = os.environ.get("CONTAINER_NAME", "backend")
 n8n_webhook = os.environ.get("N8N_WEBHOOK")
 
-client = docker.from_env()
-container = client.containers.get(container_name)
-
-buffer = []
-collecting = False
 MAX_LINES = 30
 HEAD_LINES = 10
 TAIL_LINES = 10
 
+QUEUE_SIZE = int(os.environ.get("WATCHER_QUEUE_SIZE", "5000"))        # строк в очереди; при заполнении чтение логов ждёт
+DEDUP_WINDOW = int(os.environ.get("WATCHER_DEDUP_WINDOW", "300"))      # сек: повтор того же стека только увеличивает счётчик
+BATCH_INTERVAL = float(os.environ.get("WATCHER_BATCH_INTERVAL", "10")) # сек между отправками пачки в n8n
+TRACEBACK_IDLE = float(os.environ.get("WATCHER_TRACEBACK_IDLE", "1"))  # сек тишины — traceback считается законченным
+MAX_RETRIES = int(os.environ.get("WATCHER_MAX_RETRIES", "5"))
+MAX_PENDING = int(os.environ.get("WATCHER_MAX_PENDING", "500"))        # неотправленных алертов держим не больше
+STATE_FILE = os.environ.get("WATCHER_STATE_FILE", "/state/watcher.json")
+
+FRAME_RE = re.compile(r'^\s*File "([^"]+)", line \d+, in (\S+)')
+CHAIN_MARKERS = (
+    "During handling of the above exception",
+    "The above exception was the direct cause",
+)
+
+
+def now_iso():
+    return datetime.datetime.now().isoformat()
+
+
+def log(msg, err=False):
+    print(f"[{now_iso()}] {msg}", file=sys.stderr if err else sys.stdout, flush=True)
+
+
+def parse_ts(ts):
+    """RFC3339Nano от docker ('2024-05-01T12:00:00.1234Z') -> наносекунды с эпохи."""
+    ts = ts.rstrip("Z")
+    base, _, frac = ts.partition(".")
+    dt = datetime.datetime.fromisoformat(base).replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp()) * 1_000_000_000 + int((frac + "000000000")[:9])
+
+
 def compress_traceback(lines):
     total = len(lines)
     if total <= MAX_LINES:
@@ -20,39 +47,261 @@ def compress_traceback(lines):
     tail = lines[-TAIL_LINES:]
     return head + [f"... (обрезано {total - HEAD_LINES - TAIL_LINES} строк) ..."] + tail
 
-def send_payload(lines):
-    if not lines:
+
+def fingerprint(lines):
+    """Подпись стека: файлы/функции всех кадров + тип исключения (без номеров строк и текста)."""
+    frames = []
+    exc_type = ""
+    for line in lines:
+        m = FRAME_RE.match(line)
+        if m:
+            frames.append(f"{os.path.basename(m.group(1))}:{m.group(2)}")
+        elif line and not line[0].isspace() and not line.startswith("Traceback") \
+                and not line.startswith(CHAIN_MARKERS):
+            exc_type = line.split(":", 1)[0].strip()
+    sig = "|".join(frames) + "#" + exc_type
+    return hashlib.sha1(sig.encode("utf-8")).hexdigest()[:16], exc_type
+
+
+# --- состояние (resume после рестарта) ---
+
+def load_checkpoint():
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return int(json.load(f).get("last_ts_ns") or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def save_checkpoint(ts_ns):
+    if not ts_ns:
         return
-    timestamp = datetime.datetime.now().isoformat()
-    full_message = "\n".join(lines)
+    try:
+        os.makedirs(os.path.dirname(STATE_FILE) or ".", exist_ok=True)
+        tmp = STATE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"last_ts_ns": ts_ns, "container": container_name}, f)
+        os.replace(tmp, STATE_FILE)
+    except OSError as e:
+        log(f"Не удалось сохранить состояние: {e}", err=True)
+
+
+# --- чтение логов: поток docker SDK -> ограниченная очередь ---
+
+def reader_thread(loop, queue, since_ns, stop):
+    """Читает логи контейнера; при обрыве потока (рестарт backend) переподключается с последней метки."""
+    last_ns = since_ns
+    while not stop.is_set():
+        try:
+            client = docker.from_env()
+            container = client.containers.get(container_name)
+            kwargs = {"stream": True, "follow": True, "timestamps": True}
+            if last_ns:
+                kwargs["since"] = last_ns // 1_000_000_000
+            pending = b""
+            for chunk in container.logs(**kwargs):
+                if stop.is_set():
+                    break
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for raw in lines:
+                    text = raw.decode("utf-8", errors="replace").rstrip("\r")
+                    ts, _, line = text.partition(" ")
+                    try:
+                        ts_ns = parse_ts(ts)
+                    except ValueError:
+                        ts_ns, line = 0, text
+                    if last_ns and ts_ns and ts_ns <= last_ns:
+                        continue  # уже обработано (до рестарта или до переподключения)
+                    last_ns = ts_ns or last_ns
+                    # ждём, пока в очереди появится место — backpressure вместо потери строк
+                    asyncio.run_coroutine_threadsafe(queue.put((ts_ns, line.rstrip())), loop).result()
+        except Exception as e:
+            log(f"Поток логов {container_name} прерван: {e}", err=True)
+        if not stop.is_set():
+            stop.wait(5)
+    asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
 
-    # 🔹 логируем полный текст в stdout
-    print(f"\n[{timestamp}] [{container_name}] Caught error:\n{full_message}\n", file=sys.stdout, flush=True)
 
-    short_lines = compress_traceback(lines)
-    short_message = "\n".join(short_lines)
+# --- разбор и дедупликация ---
 
+class Aggregator:
+    def __init__(self):
+        self.seen = {}       # fingerprint -> {"first", "last", "count", "sent_count", "lines", "exc"}
+        self.pending = []    # fingerprints с новыми событиями к отправке
+
+    def add(self, lines, ts_ns):
+        fp, exc = fingerprint(lines)
+        now = datetime.datetime.now().timestamp()
+        item = self.seen.get(fp)
+        if item is None or now - item["first"] > DEDUP_WINDOW:
+            item = {"first": now, "count": 0, "sent_count": 0, "lines": lines, "exc": exc}
+            self.seen[fp] = item
+        item["count"] += 1
+        item["last"] = now
+        item["ts_ns"] = ts_ns
+        if fp not in self.pending:
+            if len(self.pending) >= MAX_PENDING:
+                self.pending.pop(0)
+            self.pending.append(fp)
+
+    def take_batch(self):
+        batch = []
+        for fp in self.pending:
+            item = self.seen[fp]
+            new = item["count"] - item["sent_count"]
+            if new <= 0:
+                continue
+            batch.append((fp, item, new))
+        self.pending = []
+        return batch
+
+    def expire(self):
+        now = datetime.datetime.now().timestamp()
+        for fp in [fp for fp, it in self.seen.items() if now - it["last"] > DEDUP_WINDOW]:
+            if fp not in self.pending:
+                del self.seen[fp]
+
+
+async def consume(queue, agg, state):
+    buffer = []
+    collecting = False
+    ended = False    # строка исключения уже пришла: дальше либо цепочка, либо конец traceback
+    chained = False  # последняя значимая строка — маркер цепочки, следующий Traceback — её часть
+    start_ts = 0
+
+    def flush():
+        nonlocal buffer, collecting, ended, chained
+        agg.add(buffer, start_ts)
+        buffer, collecting, ended, chained = [], False, False, False
+        state["open_since"] = 0
+
+    while True:
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout=TRACEBACK_IDLE if collecting else None)
+        except asyncio.TimeoutError:
+            flush()
+            continue
+        if item is None:
+            if collecting:
+                agg.add(buffer, start_ts)
+            return
+        ts_ns, text = item
+        state["last_ts"] = ts_ns or state["last_ts"]
+
+        if collecting:
+            stripped = text.strip()
+            if stripped.startswith(CHAIN_MARKERS):
+                buffer.append(text)
+                ended, chained = False, True
+                continue
+            if chained and "Traceback" in text:
+                buffer.append(text)
+                chained = False
+                continue
+            if stripped == "":
+                # пустые строки окружают маркер цепочки; конец решает следующая значимая строка
+                if not chained:
+                    ended = True
+                continue
+            if not ended and not text.startswith(("ERROR", "INFO", "WARNING")):
+                buffer.append(text)
+                if not text[:1].isspace():
+                    # строка исключения ("ValueError: ...") завершает traceback, если дальше нет цепочки
+                    ended = True
+                continue
+            flush()
+
+        if "Traceback" in text:
+            collecting, buffer, start_ts = True, [text], ts_ns
+            state["open_since"] = ts_ns
+
+
+# --- отправка ---
+
+def render(batch):
+    parts = []
+    for fp, item, new in batch:
+        head = f"[{item['exc'] or 'Error'}] x{new}" + (f" (всего {item['count']} за окно)" if item["count"] != new else "")
+        parts.append(head + "\n" + "\n".join(compress_traceback(item["lines"])))
+    return "\n\n".join(parts)
+
+
+async def send_batch(client, batch):
     payload = {
-        "error": short_message,
+        "error": render(batch),
         "service": container_name,
-        "timestamp": timestamp
+        "timestamp": now_iso(),
+        "alerts": [
+            {"fingerprint": fp, "exception": item["exc"], "count": new, "window_count": item["count"]}
+            for fp, item, new in batch
+        ],
     }
+    print(f"\n[{payload['timestamp']}] [{container_name}] Caught errors:\n{payload['error']}\n", flush=True)
+    if not n8n_webhook:
+        return True
+    delay = 1.0
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            r = await client.post(n8n_webhook, json=payload)
+            if r.status_code < 500:
+                return True
+            log(f"n8n ответил {r.status_code}, попытка {attempt}", err=True)
+        except httpx.HTTPError as e:
+            log(f"Ошибка отправки в n8n: {e}, попытка {attempt}", err=True)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60)
+    return False
+
+
+async def flusher(agg, state, done):
+    async with httpx.AsyncClient(timeout=5) as client:
+        while True:
+            finished = done.is_set()
+            batch = agg.take_batch()
+            if batch:
+                if await send_batch(client, batch):
+                    for fp, item, new in batch:
+                        item["sent_count"] += new
+                else:
+                    # не отправилось — вернём в очередь к следующей пачке
+                    agg.pending.extend(fp for fp, _, _ in batch if fp not in agg.pending)
+            agg.expire()
+            if not agg.pending:
+                # всё до открытого traceback (или до последней строки) обработано
+                safe = state["open_since"] - 1 if state["open_since"] else state["last_ts"]
+                if safe > state["saved_ts"]:
+                    save_checkpoint(safe)
+                    state["saved_ts"] = safe
+            if finished:
+                return
+            try:
+                await asyncio.wait_for(done.wait(), timeout=BATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def main():
+    since_ns = load_checkpoint()
+    if since_ns:
+        log(f"Продолжаем с {since_ns} (из {STATE_FILE})")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    agg = Aggregator()
+    state = {"last_ts": since_ns, "open_since": 0, "saved_ts": since_ns}
+    stop = threading.Event()
+    done = asyncio.Event()
+
+    reader = loop.run_in_executor(None, reader_thread, loop, queue, since_ns, stop)
+    send_task = asyncio.create_task(flusher(agg, state, done))
     try:
-        requests.post(n8n_webhook, json=payload, timeout=2)
-    except Exception as e:
-        print(f"[{timestamp}] Ошибка отправки в n8n: {e}", file=sys.stderr, flush=True)
-
-for raw in container.logs(stream=True, follow=True):
-    text = raw.decode("utf-8").rstrip()
-
-    if "Traceback" in text:
-        collecting = True
-        buffer = [text]
-        continue
-
-    if collecting:
-        buffer.append(text)
-        if text.strip() == "" or text.startswith(("ERROR", "INFO", "WARNING")):
-            send_payload(buffer)
-            buffer = []
-            collecting = False
+        await consume(queue, agg, state)
+    finally:
+        stop.set()
+        done.set()
+        await send_task
+    await reader
+
+
+if __name__ == "__main__":
+    asyncio.run(main())